@@ -0,0 +1,208 @@
+# ai_resilience_check.py
+# 가짜 AI 백엔드로 재시도/마감/헤징/비동기 동시 호출 동작을 확인하는 스크립트 (API 키, 네트워크, DB 불필요)
+#
+# 사용 예:  python ai_resilience_check.py
+#
+# 각 시나리오는 기대 동작과 다르면 AssertionError 로 종료합니다.
+
+import os
+import asyncio
+import statistics
+import threading
+import tempfile
+import time
+from PIL import Image
+
+from app.utils.ai_backends import FakeGenAIClient
+from app.utils.resilience import RetryPolicy, AIDeadlineExceeded, call_with_resilience, ai_deadline
+from app.utils.metrics import metrics
+from app.utils import ai_module
+from app.services.job_queue import JobQueue
+from app.utils.ai_call_log import ai_call_log
+
+
+def _generate(client: FakeGenAIClient):
+    return lambda: client.models.generate_content(model='fake-model', contents=['ping'])
+
+
+def check_transient_errors_are_retried() -> None:
+    client = FakeGenAIClient(latency=0.01, failure_plan=[503, 429])
+    policy = RetryPolicy(max_attempts=4, base_delay=0.05, deadline=5)
+    response = call_with_resilience(_generate(client), 'check', policy)
+    assert response.text == 'top', response.text
+    assert client.call_count == 3, client.call_count
+    print(f"[OK] 일시적 오류 2회 후 성공 (시도 {client.call_count}회)")
+
+
+def check_non_retryable_error_fails_fast() -> None:
+    client = FakeGenAIClient(latency=0.01, failure_plan=[400])
+    policy = RetryPolicy(max_attempts=4, base_delay=0.05, deadline=5)
+    try:
+        call_with_resilience(_generate(client), 'check', policy)
+        raise AssertionError("400 오류가 전달되지 않았습니다.")
+    except AIDeadlineExceeded:
+        raise AssertionError("400 오류가 마감 초과로 보고되었습니다.")
+    except Exception as e:
+        assert getattr(e, 'code', None) == 400, e
+    assert client.call_count == 1, client.call_count
+    print("[OK] 재시도 불가 오류(400)는 즉시 실패")
+
+
+def check_retries_exhausted() -> None:
+    client = FakeGenAIClient(latency=0.01, failure_rate=1.0, failure_codes=(503,))
+    policy = RetryPolicy(max_attempts=3, base_delay=0.01, deadline=5)
+    try:
+        call_with_resilience(_generate(client), 'check', policy)
+        raise AssertionError("계속 실패하는 호출이 성공했습니다.")
+    except AIDeadlineExceeded:
+        raise AssertionError("재시도 소진이 마감 초과로 보고되었습니다.")
+    except Exception as e:
+        assert getattr(e, 'code', None) == 503, e
+    assert client.call_count == 3, client.call_count
+    print("[OK] 최대 시도 횟수 후 마지막 오류 전달")
+
+
+def check_deadline() -> None:
+    client = FakeGenAIClient(latency=2.0)
+    policy = RetryPolicy(deadline=0.3)
+    start = time.monotonic()
+    try:
+        call_with_resilience(_generate(client), 'check', policy)
+        raise AssertionError("마감 시간이 지난 호출이 성공했습니다.")
+    except AIDeadlineExceeded:
+        elapsed = time.monotonic() - start
+    assert elapsed < 0.6, elapsed
+    print(f"[OK] 마감 시간 초과 시 AIDeadlineExceeded ({elapsed:.2f}초)")
+
+
+def check_request_deadline_cancels_call() -> None:
+    fd, image_path = tempfile.mkstemp(suffix='.png')
+    os.close(fd)
+    try:
+        Image.new('RGB', (64, 64), (30, 60, 90)).save(image_path)
+        client = FakeGenAIClient(latency=3.0)
+        start = time.monotonic()
+        try:
+            with ai_deadline(0.4): # 작업별 마감(기본 60초)보다 이른 요청 마감이 적용되어야 함
+                ai_module.classify_item_type(client, image_path)
+            raise AssertionError("요청 마감 시간이 지난 호출이 성공했습니다.")
+        except TimeoutError:
+            elapsed = time.monotonic() - start
+        assert elapsed < 0.8, elapsed
+        time.sleep(0.2)
+        assert client.cancelled_count == 1, client.cancelled_count
+        print(f"[OK] 요청 마감 시간 초과 시 HTTP 요청 취소 및 TimeoutError 전달 ({elapsed:.2f}초)")
+    finally:
+        os.remove(image_path)
+
+
+def check_hedging_cuts_tail_latency(calls: int = 60) -> None:
+    def run(hedge: bool) -> list[float]:
+        client = FakeGenAIClient(latency=0.02, slow_rate=0.1, slow_latency=0.5, seed=7)
+        policy = RetryPolicy(deadline=5, hedge=hedge, hedge_delay=0.06, hedge_min_samples=10**9)
+        durations = []
+        for _ in range(calls):
+            start = time.monotonic()
+            call_with_resilience(_generate(client), 'check_hedge' if hedge else 'check_plain', policy)
+            durations.append(time.monotonic() - start)
+        return durations
+
+    plain, hedged = run(False), run(True)
+    plain_p95 = statistics.quantiles(plain, n=20)[-1]
+    hedged_p95 = statistics.quantiles(hedged, n=20)[-1]
+    assert hedged_p95 < plain_p95, (plain_p95, hedged_p95)
+    print(f"[OK] 헤징 p95 {plain_p95 * 1000:.0f}ms -> {hedged_p95 * 1000:.0f}ms "
+          f"(헤징 {int(metrics.get_counter('ai_call_hedges', task='check_hedge'))}회, "
+          f"헤징 승리 {int(metrics.get_counter('ai_call_hedge_wins', task='check_hedge'))}회)")
+
+
+def check_ai_module_end_to_end() -> None:
+    fd, image_path = tempfile.mkstemp(suffix='.png')
+    os.close(fd)
+    try:
+        Image.new('RGB', (64, 64), (30, 60, 90)).save(image_path)
+        client = FakeGenAIClient(latency=0.01, failure_plan=[503], classify_label='shoes')
+        assert ai_module.classify_item_type(client, image_path) == 'shoes'
+        base = Image.new('RGB', (64, 64), (200, 10, 10))
+        base.save(image_path)
+        image_bytes = ai_module.synthesize_multi_items_single_call(
+            FakeGenAIClient(latency=0.01, failure_plan=[429]), image_path,
+            [{'path': image_path, 'type': 'top'}])
+        assert image_bytes and image_bytes[:4] == b'\x89PNG'
+        print("[OK] ai_module 분류/합성 함수가 일시적 오류 후 성공")
+    finally:
+        os.remove(image_path)
+
+
+def check_call_instrumentation() -> None:
+    fd, image_path = tempfile.mkstemp(suffix='.png')
+    os.close(fd)
+    try:
+        Image.new('RGB', (64, 64), (30, 60, 90)).save(image_path)
+        client = FakeGenAIClient(latency=0.01, failure_plan=[503])
+        calls = []
+        original_submit = ai_call_log.submit
+        ai_call_log.submit = calls.append
+        try:
+            ai_module.synthesize_multi_items_single_call(client, image_path, [{'path': image_path, 'type': 'top'}])
+        finally:
+            ai_call_log.submit = original_submit
+        call = calls[-1]
+        assert call.status == 'ok' and call.retries == 1, (call.status, call.retries)
+        assert call.request_bytes > 0 and call.response_bytes > 0
+        assert call.prompt_tokens and call.output_tokens and call.finish_reason == 'STOP'
+        assert call.ttfb_ms is not None and call.ttfb_ms <= call.latency_ms
+        print(f"[OK] 호출 기록: 재시도 {call.retries}회, 요청 {call.request_bytes}B, 응답 {call.response_bytes}B, "
+              f"토큰 {call.prompt_tokens}/{call.output_tokens}, ttfb {call.ttfb_ms:.0f}ms / 전체 {call.latency_ms:.0f}ms")
+    finally:
+        os.remove(image_path)
+
+
+def check_async_fan_out(jobs: int = 100) -> None:
+    fd, image_path = tempfile.mkstemp(suffix='.png')
+    os.close(fd)
+    try:
+        Image.new('RGB', (64, 64), (30, 60, 90)).save(image_path)
+        client = FakeGenAIClient(latency=0.5)
+        queue = JobQueue(max_concurrency=jobs)
+        threads_before = threading.active_count()
+        start = time.monotonic()
+        futures = [queue.submit(f'check-{i}', lambda: ai_module.asynthesize_multi_items(
+            client, image_path, [{'path': image_path, 'type': 'top'}])) for i in range(jobs)]
+        results = [future.result(timeout=30) for future in futures]
+        elapsed = time.monotonic() - start
+        extra_threads = threading.active_count() - threads_before
+        queue.stop()
+        assert all(r and r[:4] == b'\x89PNG' for r in results)
+        assert elapsed < 0.5 * jobs / 10, elapsed # 동시 진행되지 않으면 jobs * 0.5초
+        assert queue.stats()['succeeded'] == jobs, queue.stats()
+        print(f"[OK] 비동기 합성 {jobs}건 동시 진행 {elapsed:.2f}초 (추가 스레드 {extra_threads}개)")
+
+        async def _classify_with_deadline():
+            with ai_deadline(0.3):
+                return await ai_module.aclassify_item_type(FakeGenAIClient(latency=2.0), image_path)
+        try:
+            asyncio.run(_classify_with_deadline())
+            raise AssertionError("비동기 호출이 마감 시간을 넘기고 성공했습니다.")
+        except TimeoutError:
+            pass
+        print("[OK] 비동기 호출에도 요청 마감 시간 적용")
+    finally:
+        os.remove(image_path)
+
+
+if __name__ == "__main__":
+    ai_call_log.configure(enabled=False) # 점검 중에는 ai_calls 테이블에 저장하지 않음 (메트릭만)
+    check_transient_errors_are_retried()
+    check_non_retryable_error_fails_fast()
+    check_retries_exhausted()
+    check_deadline()
+    check_request_deadline_cancels_call()
+    check_hedging_cuts_tail_latency()
+    check_ai_module_end_to_end()
+    check_call_instrumentation()
+    check_async_fan_out()
+    print("\n시도별 메트릭:")
+    for key, value in sorted(metrics.snapshot()['counters'].items()):
+        if key.startswith('ai_call'):
+            print(f"  {key}: {int(value)}")
@@ -3,8 +3,6 @@
 import os
 from flask import Flask, jsonify, g
 from dotenv import load_dotenv
-# 수정: 사용자 성공 코드 기준 import 방식
-from google import genai
 from datetime import datetime # datetime import
 
 # .env 파일 로드
@@ -22,14 +20,28 @@ def create_app(config_name=None):
 
     # --- 1. 설정 로드 ---
     app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'default_dev_secret_key_please_change')
+    # 백그라운드 스레드(모델 점검, 캐시 예열)를 앱 생성 시 시작하지 않고 start_background_tasks() 호출 시 시작
+    # (gunicorn preload_app: 마스터에서 앱을 만들고 fork 하므로 스레드는 각 워커에서 시작해야 함 - gunicorn.conf.py 참고)
+    app.config['DEFER_BACKGROUND_TASKS'] = os.getenv('DEFER_BACKGROUND_TASKS', 'false').lower() == 'true'
     project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
     app.config['UPLOAD_FOLDER'] = os.path.join(project_root, 'uploads')
     app.config['OUTPUT_FOLDER'] = os.path.join(project_root, 'outputs')
+    # 합성 미리보기 (모델 결과 전에 보여줄 저해상도 로컬 합성)
+    app.config['PREVIEW_FOLDER'] = os.path.join(app.config['OUTPUT_FOLDER'], 'previews')
+    app.config['SYNTH_PREVIEW_ENABLED'] = os.getenv('SYNTH_PREVIEW_ENABLED', 'true').lower() == 'true'
+    app.config['SYNTH_PREVIEW_TTL'] = int(os.getenv('SYNTH_PREVIEW_TTL', '3600')) # 미리보기 파일 보관 시간(초)
     app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg'}
+    # 아이템 분류 캐시 (지각 해시 기반) 설정
+    app.config['CLASSIFY_CACHE_ENABLED'] = os.getenv('CLASSIFY_CACHE_ENABLED', 'true').lower() == 'true'
+    app.config['CLASSIFY_CACHE_MAX_DISTANCE'] = int(os.getenv('CLASSIFY_CACHE_MAX_DISTANCE', '3'))
+    app.config['CLASSIFY_BATCH_MAX'] = int(os.getenv('CLASSIFY_BATCH_MAX', '5')) # /classify_items 한 번의 요청/AI 호출당 최대 이미지 수
 
     print(f" * Flask App '{app.name}' 생성됨 (환경: {config_name or os.getenv('FLASK_ENV', 'development')})")
     print(f" * Upload Folder: {app.config['UPLOAD_FOLDER']}")
     print(f" * Output Folder: {app.config['OUTPUT_FOLDER']}")
+    print(f" * Classify Cache: {'사용' if app.config['CLASSIFY_CACHE_ENABLED'] else '미사용'} (최대 해밍 거리: {app.config['CLASSIFY_CACHE_MAX_DISTANCE']})")
+    if app.config['CLASSIFY_CACHE_MAX_DISTANCE'] > 3:
+        print(" * 경고: CLASSIFY_CACHE_MAX_DISTANCE 가 3보다 크면 밴드 인덱스로 일부 유사 이미지를 놓칠 수 있습니다.")
     if app.config['SECRET_KEY'] == 'default_dev_secret_key_please_change':
         print(" * 경고: 기본 SECRET_KEY 사용 중. 운영 환경에서는 반드시 변경하세요!")
 
@@ -37,19 +49,29 @@ def create_app(config_name=None):
     try:
         os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
         os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
+        os.makedirs(app.config['PREVIEW_FOLDER'], exist_ok=True)
         print(f" * 필수 폴더 확인/생성 완료.")
     except OSError as e:
         print(f" * 오류: 필수 폴더 생성 실패 - {e}")
 
     # --- 3. 확장 초기화 ---
-    # 수정: genai.Client() 사용하여 AI 클라이언트 초기화 (사용자 성공 테스트 기준)
-    api_key = os.getenv('GEMINI_API_KEY')
-    if api_key:
+    # AI 클라이언트 초기화: GEMINI_API_KEYS(쉼표 구분) 또는 GEMINI_API_KEY 로 키 풀 클라이언트 생성
+    # (호출마다 가장 여유 있는 정상 키 사용, 429/403 이 반복되는 키는 일시 제외)
+    from .utils.key_pool import load_api_keys, create_pooled_client
+    api_keys = load_api_keys()
+    app.config['AI_KEY_POOL'] = None
+    if os.getenv('AI_BACKEND', 'gemini').lower() == 'fake':
+        # 로컬 가짜 백엔드: API 키/네트워크 없이 지연·오류를 재현 (개발 및 복원력 점검용)
+        from .utils.ai_backends import FakeGenAIClient
+        app.config['AI_CLIENT'] = FakeGenAIClient.from_env()
+        print(" * 경고: AI_BACKEND=fake - 가짜 AI 백엔드 사용 중 (실제 합성 없음).")
+    elif api_keys:
         try:
-            # genai.Client 객체 생성 및 앱 설정에 저장
-            client = genai.Client(api_key=api_key)
+            # 키별 genai.Client 객체 생성 후 풀 클라이언트를 앱 설정에 저장
+            client = create_pooled_client(api_keys)
             app.config['AI_CLIENT'] = client
-            print(" * Google AI Client 초기화 완료 (genai.Client 사용).")
+            app.config['AI_KEY_POOL'] = client.pool
+            print(f" * Google AI Client 초기화 완료 (genai.Client 키 풀, 키 {len(client.pool)}개).")
         except AttributeError as ae:
              # 만약 여기서 다시 AttributeError 발생 시, 라이브러리/환경 문제 재확인 필요
              print(f" * 오류: genai.Client 초기화 실패! - {ae}")
@@ -59,19 +81,88 @@ def create_app(config_name=None):
             print(f" * 오류: Google AI Client 초기화 중 예상치 못한 오류 발생 - {e}")
             app.config['AI_CLIENT'] = None
     else:
-        print(" * 경고: GEMINI_API_KEY 환경 변수가 없습니다. AI 기능 사용 불가.")
+        print(" * 경고: GEMINI_API_KEY(S) 환경 변수가 없습니다. AI 기능 사용 불가.")
         app.config['AI_CLIENT'] = None
 
+    # AI 모델 레지스트리 (작업별 모델 점검 및 실패 모델 제외)
+    from .utils.model_registry import init_model_registry
+    init_model_registry(app, app.config['AI_CLIENT'])
+
+    # AI 호출 재시도/마감/헤징 정책
+    from .utils.resilience import configure_resilience
+    configure_resilience(app)
+
+    # AI 호출 레이트 리미터 (워커 프로세스 간 공유 토큰 버킷)
+    from .utils.rate_limiter import init_rate_limiter
+    init_rate_limiter(app)
+
+    # AI 호출 기록 (토큰/바이트/지연 메트릭 및 ai_calls 테이블, 사용자별/모델별 비용 집계)
+    from .utils.ai_call_log import init_ai_call_log
+    init_ai_call_log(app)
+
+    # 합성 요청 사전 추정 및 요청별 한도 (입력 토큰/요청 바이트 초과 시 이미지 축소 또는 거절)
+    from .services.cost_estimator import init_request_budget
+    init_request_budget(app)
+
+    # 아이템 이미지 전처리 (단색 배경 여백 자르기/배경 평탄화, 업로드 내용 해시로 캐시)
+    from .services.item_preprocess import init_item_preprocess
+    init_item_preprocess(app)
+
+    # 사용자별 옷장 (전처리된 아이템/종류/썸네일 보관, 합성 시 아이템 ID 로 지정)
+    from .services.wardrobe import init_wardrobe
+    init_wardrobe(app)
+
+    # 합성 기록 (syntheses 테이블, 갤러리 썸네일, 결과 파일 보존)
+    from .services.synthesis_history import init_synthesis_history
+    init_synthesis_history(app)
+
+    # 점진적 합성 (아이템 목록 접두별 중간 결과 캐시, 코디에 아이템을 더하면 새 아이템만 적용)
+    from .services.outfit_cache import init_outfit_cache
+    init_outfit_cache(app)
+
+    # 다중 아이템 합성 전략 (한 번의 호출 / 차례로 적용 / 아이템별 동시 호출 후 합성, 요청별 또는 아이템 수로 자동 선택)
+    from .services.synthesis_strategies import init_synthesis_strategy
+    init_synthesis_strategy(app)
+
+    # 합성 요청 멱등 키 (Idempotency-Key 헤더로 재전송/중복 클릭 시 처음 요청의 작업/결과 반환)
+    from .services.idempotency import init_idempotency
+    init_idempotency(app)
+
+    # 비동기 합성 작업 큐 (워커마다 asyncio 이벤트 루프 하나로 여러 합성을 동시에 진행)
+    from .services.job_queue import init_job_queue
+    init_job_queue(app)
+
+    # 추측 합성 (아이템을 올려 둔 뒤 '합성하기' 전까지 낮은 우선순위로 미리 합성해 캐시에 저장, 사용자가 화면에서 선택)
+    from .services.speculation import init_speculation
+    init_speculation(app)
+
+    # 인기 아이템 캐시 예열 (사용 기록 + 사용량이 적은 시간대/활성 모델 변경 시 인기 코디를 미리 합성)
+    from .services.cache_warmer import init_cache_warmer
+    init_cache_warmer(app)
+
+    # 로컬 CPU 아이템 분류기 (시작 시 한 번만 로드, 파일이 없으면 AI 분류만 사용)
+    from .utils.local_classifier import load_local_classifier
+    app.config['LOCAL_CLASSIFIER_PATH'] = os.getenv(
+        'LOCAL_CLASSIFIER_PATH', os.path.join(project_root, 'models', 'local_item_classifier.npz'))
+    app.config['LOCAL_CLASSIFIER_MIN_CONFIDENCE'] = float(os.getenv('LOCAL_CLASSIFIER_MIN_CONFIDENCE', '0.85'))
+    app.config['LOCAL_CLASSIFIER'] = load_local_classifier(app.config['LOCAL_CLASSIFIER_PATH'])
+
     # --- 4. 블루프린트 등록 ---
     from .routes import auth as auth_bp
     from .routes import synthesize as synthesize_bp
     from .routes import admin as admin_bp
+    from .routes import wardrobe as wardrobe_bp
 
     app.register_blueprint(auth_bp.bp, url_prefix='/auth')
     app.register_blueprint(synthesize_bp.bp)
     app.register_blueprint(admin_bp.bp, url_prefix='/admin')
+    app.register_blueprint(wardrobe_bp.bp, url_prefix='/wardrobe')
+
+    print(" * 블루프린트 등록 완료: auth, synthesize, admin, wardrobe")
 
-    print(" * 블루프린트 등록 완료: auth, synthesize, admin")
+    # CLI 명령: flask synth-batch (매니페스트 기반 대량 합성)
+    from .services.batch_synthesis import init_batch_command
+    init_batch_command(app)
 
     # --- 5. 에러 핸들러 등록 ---
     @app.errorhandler(403)
@@ -103,3 +194,34 @@ def create_app(config_name=None):
 
     # 완성된 앱 인스턴스 반환
     return app
+
+
+def start_background_tasks(app) -> None:
+    """
+    프로세스별 백그라운드 스레드(모델 점검, 캐시 예열)를 시작합니다. 이미 실행 중이면 건너뜁니다.
+    fork 하면 부모의 스레드는 자식에 복사되지 않으므로, 미리 로드한 앱을 fork 한 워커에서 호출합니다. (gunicorn post_fork)
+    작업 큐 이벤트 루프와 AI 호출 기록 스레드는 처음 사용할 때 프로세스마다 시작되므로 여기서 시작하지 않습니다.
+    """
+    from .utils.model_registry import model_registry
+    from .services.cache_warmer import cache_warmer
+    if app.config.get('AI_MODEL_PROBE_ENABLED'):
+        model_registry.start_background_probing()
+    cache_warmer.start(app)
+
+
+def stop_background_tasks(drain_timeout: float = 0) -> int:
+    """
+    백그라운드 스레드와 작업 큐 이벤트 루프를 멈춥니다. (워커 종료/재시작 시)
+    drain_timeout 동안 접수된 합성 작업(202 로 응답한 작업)이 끝나기를 기다린 뒤 멈춥니다.
+
+    Returns:
+        int: 끝내지 못하고 중단된 작업 수
+    """
+    from .utils.model_registry import model_registry
+    from .services.cache_warmer import cache_warmer
+    from .services.job_queue import job_queue
+    model_registry.stop_background_probing()
+    cache_warmer.stop()
+    unfinished = job_queue.drain(drain_timeout) if drain_timeout > 0 else 0
+    job_queue.stop()
+    return unfinished
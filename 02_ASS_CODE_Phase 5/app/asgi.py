@@ -0,0 +1,53 @@
+# app/asgi.py
+# ASGI 애플리케이션 팩토리: AI 응답을 오래 기다리는 라우트는 코루틴(app/routes/async_synthesize.py)으로 처리하고,
+# 나머지 요청은 기존 Flask 앱(WSGI)으로 넘깁니다. Flask 라우트는 asgiref 의 WsgiToAsgi 로 스레드에서 실행되므로 동작이 같습니다.
+# 실행: GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py asgi:app  (개발: uvicorn asgi:app)
+
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from asgiref.wsgi import WsgiToAsgi
+from starlette.applications import Starlette
+from starlette.routing import Mount, Route
+
+from app.utils.async_db import async_db, init_async_db
+
+
+def create_asgi_app(flask_app) -> Starlette:
+    """
+    Flask 앱을 감싼 ASGI 앱을 만듭니다.
+    ASYNC_ROUTES_ENABLED: /synthesize/web, /classify_item 을 비동기 라우트로 처리할지 여부 (기본 true, false 면 모두 Flask)
+    ASGI_THREADS: 워커당 스레드 수 (Flask 라우트와 비동기 라우트의 파일/이미지 작업이 함께 사용, 기본 32)
+    """
+    from app.routes import async_synthesize
+
+    async_enabled = os.getenv('ASYNC_ROUTES_ENABLED', 'true').lower() == 'true'
+    threads = int(os.getenv('ASGI_THREADS', '32'))
+    init_async_db(flask_app)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # 워커 프로세스의 이벤트 루프에서 실행 (연결 풀은 루프마다 따로 열어야 함)
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi'))
+        if async_enabled:
+            await async_db.open()
+        try:
+            yield
+        finally:
+            await async_db.close()
+
+    wsgi_app = WsgiToAsgi(flask_app)
+    routes = [Mount('/', app=wsgi_app)]
+    if async_enabled:
+        routes[:0] = [
+            Route('/synthesize/web', async_synthesize.synthesize_web, methods=['POST']),
+            Route('/classify_item', async_synthesize.classify_item, methods=['POST']),
+        ]
+    app = Starlette(routes=routes, lifespan=lifespan)
+    app.state.flask_app = flask_app
+    app.state.wsgi_app = wsgi_app
+    print(f" * ASGI: 비동기 라우트 {'/synthesize/web, /classify_item' if async_enabled else '미사용'} "
+          f"(나머지는 Flask, 스레드 {threads}개)")
+    return app
@@ -7,8 +7,14 @@ from app.utils.db_utils import (
     get_all_base_models, add_base_model, get_base_model_by_id, # get_base_model_by_id 추가 확인
     update_base_model, delete_base_model, get_setting, update_setting,
     get_active_base_model, # 활성 모델 정보 조회 위해 추가
-    get_total_usage_for_date # 총 사용량 조회 함수 import
+    get_total_usage_for_date, # 총 사용량 조회 함수 import
+    get_classification_cache_stats, # 분류 캐시 누적 통계
+    get_ai_cost_rollup, # AI 호출 비용 집계
+    get_popular_items, get_popular_item_pairs # 캐시 예열 대상 (인기 아이템)
 )
+from app.services.classification_service import get_cache_hit_rate
+from app.utils.model_registry import model_registry
+from app.services.cache_warmer import cache_warmer
 from datetime import date
 import traceback # 상세 오류 로깅용
 
@@ -40,12 +46,20 @@ def dashboard():
         today_date = date.today()
         total_today_usage = get_total_usage_for_date(today_date) # 함수 호출
 
+        # 분류 캐시 통계 (적중률은 현재 워커 프로세스 기준, 누적 적중은 DB 기준)
+        classify_cache = get_cache_hit_rate()
+        classify_cache.update(get_classification_cache_stats())
+
         return render_template(
             'admin/dashboard.html',
             model_count=model_count,
             total_today_usage=total_today_usage, # 계산된 값 전달
             active_model_id=active_model_id,
-            watermark_enabled=watermark_enabled
+            watermark_enabled=watermark_enabled,
+            classify_cache=classify_cache,
+            model_status=model_registry.status(), # 작업별 AI 모델 가용성
+            key_pool_status=current_app.config['AI_KEY_POOL'].status() if current_app.config.get('AI_KEY_POOL') else None, # API 키별 사용 현황
+            ai_costs=get_ai_cost_rollup(days=30, limit=10) # 최근 30일 모델별/사용자별 AI 호출 비용
         )
     except Exception as e:
         print(f"[Admin Route - GET /dashboard] 오류: {e}")
@@ -108,6 +122,51 @@ def manage_settings():
         return render_template('admin/manage_settings.html', settings={}, error="데이터 로딩 실패")
 
 
+# --- AI 호출 비용 집계 (API) ---
+
+@bp.route('/ai-costs', methods=['GET'])
+@login_required
+@admin_required
+def get_ai_costs():
+    """최근 days 일(기본 30) 동안의 AI 호출 비용/토큰/지연을 모델별, 사용자별로 집계합니다. (API)"""
+    days = request.args.get('days', type=int, default=30)
+    limit = request.args.get('limit', type=int, default=50)
+    print(f"[Admin API] GET /admin/ai-costs 요청 (days={days})")
+    if days <= 0 or days > 366:
+        return jsonify({"error": "days 는 1~366 사이여야 합니다."}), 400
+    try:
+        rollup = get_ai_cost_rollup(days=days, limit=max(1, min(limit, 500)))
+        for rows in rollup.values():
+            for row in rows:
+                row['cost_usd'] = float(row['cost_usd'] or 0) # NUMERIC -> JSON 숫자
+        return jsonify({"days": days, "priced_models": sorted(current_app.config.get('AI_MODEL_PRICES', {})), **rollup})
+    except Exception as e:
+        print(f"[Admin API - GET /ai-costs] 오류: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "AI 호출 비용 집계 중 오류가 발생했습니다."}), 500
+
+# --- 인기 아이템 캐시 예열 (API) ---
+
+@bp.route('/cache-warm', methods=['GET'])
+@login_required
+@admin_required
+def get_cache_warm_status():
+    """캐시 예열 현황과 현재 예열 대상(인기 아이템/쌍)을 반환합니다. (API)"""
+    print("[Admin API] GET /admin/cache-warm 요청")
+    items = get_popular_items(cache_warmer.top_items, cache_warmer.days)
+    pairs = get_popular_item_pairs(cache_warmer.top_pairs, cache_warmer.days)
+    return jsonify({"status": cache_warmer.status(), "items": items, "pairs": pairs})
+
+@bp.route('/cache-warm', methods=['POST'])
+@login_required
+@admin_required
+def run_cache_warm():
+    """예열 시간대와 관계없이 캐시 예열을 바로 시작합니다. (백그라운드, API)"""
+    print("[Admin API] POST /admin/cache-warm 요청")
+    if not cache_warmer.request_warm():
+        return jsonify({"error": "캐시 예열이 설정되어 있지 않습니다. (CACHE_WARM_ENABLED)"}), 409
+    return jsonify({"message": "캐시 예열을 시작합니다.", "status": cache_warmer.status()}), 202
+
 # --- Base Model Management Routes (API) ---
 
 @bp.route('/models', methods=['GET'])
@@ -203,6 +262,7 @@ def modify_base_model(model_id):
         )
         if updated_model:
             print(f"[Admin API - PUT /models/{model_id}] 성공")
+            cache_warmer.notify_model_changed() # 활성 모델 이미지가 바뀌었으면 다시 예열
             return jsonify(updated_model)
         else:
             # ID가 없거나 DB 오류 발생 시
@@ -229,6 +289,7 @@ def activate_base_model(model_id):
         updated_model = update_base_model(model_id=model_id, is_active=True)
         if updated_model:
             print(f"[Admin API - POST /models/{model_id}/activate] 성공")
+            cache_warmer.notify_model_changed() # 새 활성 모델로 인기 코디 다시 예열
             return jsonify(updated_model)
         else:
             existing_model = get_base_model_by_id(model_id)
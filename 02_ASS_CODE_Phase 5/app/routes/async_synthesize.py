@@ -0,0 +1,261 @@
+# app/routes/async_synthesize.py
+# 비동기(ASGI) 라우트: /synthesize/web 과 /classify_item 의 코루틴 버전 (app/asgi.py 에서 Flask 앱보다 먼저 확인)
+# AI 호출은 비동기 클라이언트로, DB 는 비동기 연결 풀(async_db)로 await 하므로 AI 응답을 기다리는 요청은 스레드 없이 코루틴만 차지합니다.
+# 이미지 저장/전처리, 결과 워터마크/저장 같은 CPU/파일 작업은 작업 큐(run_synthesis_job)처럼 스레드에서 실행합니다.
+# 로그인은 Flask 세션 쿠키를 같은 SECRET_KEY 로 확인합니다. (세션을 바꾸지 않으므로 쿠키를 다시 쓰지 않음)
+# Idempotency-Key 요청과 여러 베이스 모델 동시 합성(base_model_ids)은 기존 Flask 라우트로 넘깁니다. (응답 저장/스트리밍이 WSGI 기반)
+
+import os
+import time
+import asyncio
+import shutil
+import tempfile
+import traceback
+from contextlib import contextmanager
+from functools import wraps
+
+from itsdangerous import BadSignature
+from starlette.datastructures import UploadFile
+from starlette.responses import JSONResponse, RedirectResponse
+from werkzeug.datastructures import FileStorage, MIMEAccept, MultiDict
+from werkzeug.http import parse_accept_header
+
+from app.utils.async_db import aget_setting, aget_active_base_model, aget_todays_usage, areserve_usage, arelease_usage
+from app.utils.resilience import ai_deadline
+from app.utils.ai_call_log import ai_call_user
+from app.services.classification_service import aclassify_image, UNAVAILABLE
+from app.services.synthesis_service import (
+    SynthesisError, resolve_base_model_path, save_uploaded_items, finalize_result, cleanup_temp_files,
+    check_request_budget, validate_strategy, asynthesize_outfit
+)
+from app.services.cache_warmer import cache_warmer
+from app.services.idempotency import IDEMPOTENCY_HEADER
+from app.services.synthesis_history import synthesis_history, elapsed_ms
+from app.routes.synthesize import allowed_file
+
+
+# --- 세션/응답 도우미 ---
+def flask_session(flask_app, request) -> dict:
+    """Flask 세션 쿠키를 확인해 세션 내용을 반환합니다. (쿠키가 없거나 서명/만료 확인 실패 시 빈 dict)"""
+    value = request.cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    if not value or serializer is None:
+        return {}
+    try:
+        return serializer.loads(value, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return {}
+
+
+def url_for(request, endpoint: str, **values) -> str:
+    """Flask 라우트 URL (요청 컨텍스트 없이 Flask URL 규칙으로 생성)"""
+    adapter = request.app.state.flask_app.url_map.bind(request.url.hostname or '', script_name=request.scope.get('root_path') or '/',
+                                                       url_scheme=request.url.scheme)
+    return adapter.build(endpoint, values)
+
+
+def login_required(handler):
+    """auth.login_required 의 비동기 라우트 버전 (세션은 request.state.session)"""
+    @wraps(handler)
+    async def wrapper(request):
+        session = flask_session(request.app.state.flask_app, request)
+        if 'user_id' not in session:
+            print("[Auth Decorator] 로그인 필요 - 접근 거부됨")
+            accept = parse_accept_header(request.headers.get('accept'), MIMEAccept)
+            if accept.accept_json and not accept.accept_html:
+                return JSONResponse({"error": "로그인이 필요합니다."}, 401)
+            return RedirectResponse(url_for(request, 'auth.login', next=str(request.url)), 302)
+        request.state.session = session
+        return await handler(request)
+    return wrapper
+
+
+class FlaskFallback:
+    """
+    이미 읽은 요청 본문을 그대로 Flask 앱(WSGI)에 넘기는 응답. (비동기 라우트가 처리하지 않는 요청)
+    """
+
+    def __init__(self, request, body: bytes):
+        self.wsgi_app = request.app.state.wsgi_app
+        self.body = body
+
+    async def __call__(self, scope, receive, send):
+        sent = False
+
+        async def replay():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {'type': 'http.request', 'body': self.body, 'more_body': False}
+            return await receive() # 연결 종료 알림
+
+        await self.wsgi_app(scope, replay, send)
+
+
+def werkzeug_form(data) -> tuple[MultiDict, MultiDict]:
+    """Starlette 폼을 Flask request.form / request.files 와 같은 형식으로 바꿉니다. (합성 서비스 함수 재사용)"""
+    form, files = MultiDict(), MultiDict()
+    for name, value in data.multi_items():
+        if isinstance(value, UploadFile):
+            files.add(name, FileStorage(stream=value.file, filename=value.filename or '', name=name,
+                                        content_type=value.content_type))
+        else:
+            form.add(name, value)
+    return form, files
+
+
+@contextmanager
+def request_context(flask_app, request, user_id: int):
+    """Flask 앱 컨텍스트 + 요청별 AI 호출 마감 시간(X-Request-Deadline-Ms) + 호출 기록 사용자 (Flask before_request 와 같음)"""
+    seconds = flask_app.config.get('AI_REQUEST_DEADLINE', 100)
+    try:
+        header_ms = int(request.headers.get('X-Request-Deadline-Ms', ''))
+    except ValueError:
+        header_ms = None
+    if header_ms and header_ms > 0:
+        seconds = min(seconds, header_ms / 1000.0)
+    with flask_app.app_context(), ai_deadline(seconds), ai_call_user(user_id):
+        yield
+
+
+async def _reserve_synthesis(user_id: int):
+    """synthesize._reserve_synthesis 의 비동기 버전. (daily_limit, reserved_date)"""
+    limit_str = await aget_setting('max_user_syntheses'); daily_limit = int(limit_str) if limit_str and limit_str.isdigit() else 3
+    if await aget_todays_usage(user_id) >= daily_limit:
+        return daily_limit, None
+    return daily_limit, await areserve_usage(user_id, daily_limit)
+
+
+# --- 라우트 ---
+@login_required
+async def synthesize_web(request):
+    """POST /synthesize/web (synthesize.synthesize_web_route 와 같은 요청/응답)"""
+    flask_app = request.app.state.flask_app
+    user_id = request.state.session['user_id']
+    request_started = time.perf_counter()
+    print(f"[Async Route /synthesize/web] 요청 사용자 ID: {user_id}")
+
+    if not flask_app.config.get('AI_CLIENT'):
+        return JSONResponse({"error": "AI 서비스가 설정되지 않았거나 초기화에 실패했습니다."}, 503)
+
+    body = await request.body()
+    if request.headers.get(IDEMPOTENCY_HEADER, '').strip() and flask_app.config.get('IDEMPOTENCY_ENABLED', True):
+        return FlaskFallback(request, body)
+    async with request.form() as data:
+        form, files = werkzeug_form(data)
+        if form.get('base_model_ids'):
+            return FlaskFallback(request, body)
+        with request_context(flask_app, request, user_id):
+            return await _synthesize_web(request, flask_app, user_id, form, files, request_started)
+
+
+async def _synthesize_web(request, flask_app, user_id: int, form, files, request_started: float):
+    # --- 1. 사용량 제한 확인 및 1회분 예약 (실패/시간 초과 시 finally 에서 해제) ---
+    try:
+        daily_limit, reserved_date = await _reserve_synthesis(user_id)
+        if not reserved_date:
+            return JSONResponse({"error": f"일일 최대 합성 횟수({daily_limit}회)를 초과했습니다."}, 429)
+    except Exception as e:
+        print(f"[Async Route /synthesize/web] 사용량 확인 중 오류: {e}")
+        return JSONResponse({"error": "사용량 확인 중 오류가 발생했습니다."}, 500)
+
+    temp_files = []
+    items = []
+    usage_committed = False # 합성 결과를 사용자에게 전달했을 때만 예약 확정
+    try:
+        # --- 2. 베이스 모델 / 3. 아이템 저장, 요청 한도, 전략 (파일/이미지 작업은 스레드에서) ---
+        base_model = await aget_active_base_model()
+        base_path = await asyncio.to_thread(resolve_base_model_path, user_id, temp_files, base_model)
+        items = await asyncio.to_thread(save_uploaded_items, form, files, user_id, temp_files)
+        estimate = await asyncio.to_thread(check_request_budget, base_path, items)
+        strategy = validate_strategy(form.get('strategy'), len(items))
+
+        # --- 4. AI 합성 (비동기 클라이언트로 await) ---
+        print(f"[Async Route /synthesize/web] AI 합성 시작 ({len(items)}개 아이템)")
+        synthesis_started = time.perf_counter()
+        try:
+            result_image_bytes = await asynthesize_outfit(flask_app.config['AI_CLIENT'], base_path, items,
+                                                          estimate['max_image_side'], strategy)
+        except TimeoutError as timeout_e:
+            print(f"[Async Route /synthesize/web] AI 호출 시간 초과: {timeout_e}")
+            return JSONResponse({"error": "AI 응답 시간이 초과되었습니다. 잠시 후 다시 시도해주세요.", "timeout": True}, 504)
+        except Exception as ai_e:
+            print(f"[Async Route /synthesize/web] AI 호출 중 예외 발생: {ai_e}")
+            traceback.print_exc()
+            result_image_bytes = None
+        if not result_image_bytes:
+            return JSONResponse({"error": "AI 이미지 합성에 실패했습니다."}, 500)
+
+        # --- 5. 결과 처리 (워터마크 적용 및 저장) ---
+        try:
+            result = await asyncio.to_thread(finalize_result, user_id, result_image_bytes, items)
+        except Exception as save_e:
+            print(f"[Async Route /synthesize/web] 결과 이미지 저장 중 오류: {save_e}"); traceback.print_exc()
+            return JSONResponse({"error": "합성 결과 저장 중 오류가 발생했습니다."}, 500)
+        new_remaining = max(0, daily_limit - await aget_todays_usage(user_id))
+
+        usage_committed = True # 예약한 사용량 확정
+        await asyncio.to_thread(synthesis_history.record, user_id, 'web', items, result,
+                                base_model and base_model.get('id'), strategy, None,
+                                elapsed_ms(synthesis_started), elapsed_ms(request_started))
+        return JSONResponse({
+            "message": f"총 {len(items)}개 아이템 합성에 성공했습니다!",
+            "output_file_url": url_for(request, 'synthesize.serve_output_file', filename=result['output_filename']),
+            "watermarked": result['watermarked'],
+            "remaining_attempts": new_remaining,
+            "estimate": estimate
+        })
+
+    except SynthesisError as e:
+        return JSONResponse({"error": e.message, **e.payload}, e.status_code)
+    except Exception as e:
+        print(f"[Async Route /synthesize/web] 처리 중 예외 발생: {e}"); traceback.print_exc()
+        return JSONResponse({"error": "이미지 합성 처리 중 오류가 발생했습니다."}, 500)
+    finally:
+        if not usage_committed:
+            await arelease_usage(user_id, reserved_date)
+        else:
+            await asyncio.to_thread(cache_warmer.record, items) # 인기 아이템 기록 (임시 파일 삭제 전에 보관)
+        await asyncio.to_thread(cleanup_temp_files, temp_files)
+
+
+@login_required
+async def classify_item(request):
+    """POST /classify_item (synthesize.classify_item_route 와 같은 요청/응답)"""
+    flask_app = request.app.state.flask_app
+    print("[Async Route /classify_item] 아이템 분류 요청 수신")
+    ai_client = flask_app.config.get('AI_CLIENT') # 없어도 캐시/로컬 분류기로 분류할 수 있으면 분류
+
+    async with request.form() as data:
+        item_file = data.get('item_image')
+        if not isinstance(item_file, UploadFile):
+            return JSONResponse({"error": "분류할 이미지 파일('item_image')이 필요합니다."}, 400)
+        if not item_file.filename:
+            return JSONResponse({"error": "파일이 선택되지 않았습니다."}, 400)
+        with request_context(flask_app, request, request.state.session['user_id']):
+            if not allowed_file(item_file.filename):
+                return JSONResponse({"error": "허용되지 않는 파일 형식입니다 (PNG, JPG, JPEG만 가능)."}, 400)
+
+            temp_fd, temp_path = tempfile.mkstemp(suffix=os.path.splitext(item_file.filename)[1], prefix='classify_')
+            try:
+                with os.fdopen(temp_fd, 'wb') as f:
+                    await asyncio.to_thread(shutil.copyfileobj, item_file.file, f)
+                result = await aclassify_image(ai_client, temp_path)
+                detected_type = result['item_type']
+                if result['source'] == UNAVAILABLE:
+                    return JSONResponse({"error": "AI 서비스가 설정되지 않았습니다."}, 503)
+                if detected_type:
+                    print(f"[Async Route /classify_item] 분류 결과: {detected_type}")
+                    return JSONResponse({"item_type": detected_type})
+                return JSONResponse({"error": "아이템 종류를 분류할 수 없습니다."}, 400)
+            except TimeoutError as e:
+                print(f"[Async Route /classify_item] 분류 시간 초과: {e}")
+                return JSONResponse({"error": "AI 응답 시간이 초과되었습니다. 잠시 후 다시 시도해주세요.", "timeout": True}, 504)
+            except Exception as e:
+                print(f"[Async Route /classify_item] 분류 처리 중 오류 발생: {e}"); traceback.print_exc()
+                return JSONResponse({"error": "아이템 분류 중 서버 오류가 발생했습니다."}, 500)
+            finally:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
@@ -2,29 +2,44 @@
 # 이미지 합성 관련 라우트 및 기능
 
 import os
-import requests # requests 라이브러리 import
+import json
+import time
+import uuid
 import tempfile # 임시 파일 생성을 위해 import
+from concurrent.futures import wait, FIRST_COMPLETED, CancelledError
 from flask import (
     Blueprint, request, jsonify, session, current_app,
-    render_template, send_from_directory, flash, url_for
+    render_template, send_from_directory, flash, url_for, Response, stream_with_context
 )
 from werkzeug.utils import secure_filename
-from io import BytesIO
-from PIL import Image
 import traceback
 
 # 유틸리티 및 모듈 import
 from app.utils.db_utils import (
-    get_setting, get_active_base_model, get_todays_usage, increment_usage
+    get_setting, get_active_base_model, get_todays_usage, reserve_usage, release_usage,
+    create_synthesis_job, get_synthesis_job, find_outfit_prefixes, get_base_model_by_id, get_all_base_models,
+    get_syntheses
 )
 
-# 수정: classify_item_type 함수 import 추가
 from app.utils.ai_module import (
     synthesize_image, # 단일 합성 (현재 사용 안함)
-    synthesize_multi_items_single_call, # 다중 합성 함수
-    classify_item_type, # 아이템 분류 함수 추가
-    apply_watermark_func
 )
+# 아이템 분류는 캐시를 포함한 분류 서비스를 통해 호출
+from app.services.classification_service import classify_images, UNAVAILABLE
+# 합성 준비/마무리 단계와 비동기 합성 작업
+from app.services.synthesis_service import (
+    SynthesisError, resolve_base_model_path, save_uploaded_items, finalize_result,
+    cleanup_temp_files, run_synthesis_job, check_request_budget, estimate_synthesis, active_base_model_size,
+    image_size, synthesize_outfit, validate_strategy, run_speculative_synthesis, run_base_model_synthesis
+)
+from app.services.job_queue import job_queue
+from app.services.outfit_cache import prefix_keys
+from app.services.speculation import speculation
+from app.services.cache_warmer import cache_warmer
+from app.services.idempotency import idempotent
+from app.services.synthesis_history import synthesis_history, elapsed_ms
+from app.utils.model_registry import model_registry
+from app.services.preview_service import save_preview
 
 from app.routes.auth import login_required
 
@@ -43,6 +58,8 @@ def index():
     remaining_attempts = 0
     daily_limit = 3
     base_model_image_url = 'https://placehold.co/512x512/cccccc/666666?text=No+Active+Model'
+    active_base_model_id = None
+    base_models = []
     print(f"[Route /] 페이지 로드 요청: User ID={user_id}, Email={user_email}")
     try:
         limit_str = get_setting('max_user_syntheses')
@@ -60,189 +77,537 @@ def index():
             if not base_model_image_url.startswith('/static/') and not base_model_image_url.startswith('http'):
                  print(f"[Route /] 경고: 베이스 모델 image_url ('{base_model_image_url}')이 예상된 형식이 아닙니다.")
             print(f"[Route /] 활성 모델 로드: ID={active_model.get('id')}, URL={base_model_image_url}")
+            active_base_model_id = active_model.get('id')
         else:
             print("[Route /] 경고: 활성 베이스 모델을 찾을 수 없습니다.")
             flash("현재 설정된 기본 모델이 없습니다. 관리자에게 문의하세요.", "warning")
     except Exception as e:
         print(f"[Route /] 오류: 활성 베이스 모델 조회 중 오류 발생 - {e}")
         flash("기본 모델 정보를 불러오는 중 오류가 발생했습니다.", "error")
+    # 여러 체형으로 입혀 보기 (베이스 모델 동시 합성) 선택 목록
+    base_models = [model for model in get_all_base_models() if model.get('image_url')]
     return render_template(
         'synthesize/web.html',
         user_email=user_email,
         remaining_attempts=remaining_attempts,
-        base_model_image_url=base_model_image_url
+        base_model_image_url=base_model_image_url,
+        speculative_enabled=current_app.config.get('SYNTH_SPECULATIVE_ENABLED', False),
+        speculative_debounce_ms=current_app.config.get('SYNTH_SPECULATIVE_DEBOUNCE_MS', 1500),
+        base_models=base_models,
+        active_base_model_id=active_base_model_id,
+        fanout_max_bases=current_app.config.get('SYNTH_FANOUT_MAX_BASES', 4),
+        wardrobe_enabled=current_app.config.get('WARDROBE_ENABLED', False)
     )
 
+def _reserve_synthesis(user_id):
+    """일일 한도를 확인하고 합성 1회분을 예약합니다. (daily_limit, reserved_date) 또는 오류 응답."""
+    limit_str = get_setting('max_user_syntheses'); daily_limit = int(limit_str) if limit_str and limit_str.isdigit() else 3
+    current_usage = get_todays_usage(user_id)
+    if current_usage >= daily_limit:
+        return daily_limit, None
+    return daily_limit, reserve_usage(user_id, daily_limit)
+
 @bp.route('/synthesize/web', methods=['POST'])
 @login_required
+@idempotent('synthesize/web')
 def synthesize_web_route():
     user_id = session['user_id']
+    request_started = time.perf_counter()
     print(f"[Route /synthesize/web Multi-SingleCall] 요청 사용자 ID: {user_id}")
 
     ai_client = current_app.config.get('AI_CLIENT')
     if not ai_client:
         return jsonify({"error": "AI 서비스가 설정되지 않았거나 초기화에 실패했습니다."}), 503
 
-    # --- 1. 사용량 제한 확인 (동일) ---
+    # 여러 베이스 모델 동시 합성: 결과를 끝나는 순서대로 스트리밍 (사용량은 전달한 이미지마다 차감)
+    if request.form.get('base_model_ids'):
+        return _synthesize_fanout(user_id)
+
+    # --- 1. 사용량 제한 확인 및 1회분 예약 (실패/시간 초과 시 finally 에서 해제) ---
     try:
-        limit_str = get_setting('max_user_syntheses'); daily_limit = int(limit_str) if limit_str and limit_str.isdigit() else 3
-        current_usage = get_todays_usage(user_id)
-        if current_usage >= daily_limit:
+        daily_limit, reserved_date = _reserve_synthesis(user_id)
+        if not reserved_date:
             return jsonify({"error": f"일일 최대 합성 횟수({daily_limit}회)를 초과했습니다."}), 429
     except Exception as e:
          return jsonify({"error": "사용량 확인 중 오류가 발생했습니다."}), 500
 
     # --- 임시 파일 관리 ---
     temp_files_to_delete = []
-    base_img_fs_path = None
     result_image_bytes = None
-    final_response = None
+    usage_committed = False # 합성 결과를 사용자에게 전달했을 때만 예약 확정
 
     try:
-        # --- 2. 활성 베이스 모델 확인 및 경로 처리 (동일) ---
-        active_model = get_active_base_model()
-        if not active_model or not active_model.get("image_url"):
-            return jsonify({"error": "현재 사용 가능한 베이스 모델이 없습니다."}), 500
-
-        base_img_url_path = active_model["image_url"]
-
-        if base_img_url_path.startswith('/static/'):
-            relative_path = os.path.normpath(base_img_url_path[len('/static/'):])
-            base_img_fs_path = os.path.join(current_app.static_folder, relative_path)
-            if not os.path.exists(base_img_fs_path) or not os.path.isfile(base_img_fs_path):
-                return jsonify({"error": "베이스 모델 이미지 파일을 찾거나 접근할 수 없습니다. (Local)"}), 500
-        elif base_img_url_path.startswith('http'):
-            try:
-                response = requests.get(base_img_url_path, stream=True, timeout=15)
-                response.raise_for_status()
-                content_type = response.headers.get('content-type')
-                if not content_type or not content_type.lower().startswith('image/'):
-                    return jsonify({"error": f"베이스 모델 URL에서 유효한 이미지를 찾을 수 없습니다 (Type: {content_type})."}), 400
-                suffix = '.' + content_type.split('/')[-1].split(';')[0] if content_type else '.tmp'
-                temp_base_image_fd, base_img_fs_path = tempfile.mkstemp(suffix=suffix, prefix=f'base_user{user_id}_')
-                os.close(temp_base_image_fd)
-                with open(base_img_fs_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192): f.write(chunk)
-                temp_files_to_delete.append(base_img_fs_path) # 삭제 목록 추가
-                print(f"[Route /synthesize/web Multi-SingleCall] 외부 URL 이미지 다운로드 및 임시 저장 완료: {base_img_fs_path}")
-            except requests.exceptions.RequestException as req_e: return jsonify({"error": f"베이스 모델 이미지 다운로드 중 오류: {req_e}"}), 500
-            except Exception as down_e: return jsonify({"error": f"베이스 모델 처리 중 오류: {down_e}"}), 500
-        else:
-            base_img_fs_path = base_img_url_path
-            if not os.path.exists(base_img_fs_path) or not os.path.isfile(base_img_fs_path):
-                 return jsonify({"error": "베이스 모델 이미지 파일을 찾거나 접근할 수 없습니다. (Path)"}), 500
-
-        # --- 3. 입력 아이템 데이터 처리 (동일) ---
-        item_count = request.form.get('item_count', type=int, default=0)
-        print(f"[Route /synthesize/web Multi-SingleCall] 전달된 아이템 개수: {item_count}")
-        if item_count == 0: return jsonify({"error": "합성할 아이템이 전달되지 않았습니다."}), 400
-
-        items_to_synthesize = [] # [{'type': str, 'path': str}]
-        for i in range(item_count):
-            item_type_key = f'item_type_{i}'; item_image_key = f'item_image_{i}'
-            if item_type_key not in request.form or item_image_key not in request.files: continue
-            item_type = request.form[item_type_key]; item_file = request.files[item_image_key]
-            if item_file.filename == '' or not item_type: continue
-            if not allowed_file(item_file.filename): continue
-            try:
-                file_ext = os.path.splitext(item_file.filename)[1]
-                temp_item_fd, item_filepath = tempfile.mkstemp(suffix=file_ext, prefix=f'item_user{user_id}_{i}_')
-                os.close(temp_item_fd)
-                item_file.save(item_filepath)
-                temp_files_to_delete.append(item_filepath) # 삭제 목록 추가
-                items_to_synthesize.append({'type': item_type, 'path': item_filepath})
-                print(f"[Route /synthesize/web Multi-SingleCall] 아이템 {i} 임시 저장: {item_filepath} (Type: {item_type})")
-            except Exception as e:
-                print(f"[Route /synthesize/web Multi-SingleCall] 아이템 {i} 저장 중 오류: {e}")
-                return jsonify({"error": f"아이템 {i+1} 이미지 저장 중 오류가 발생했습니다."}), 500
-
-        if not items_to_synthesize: return jsonify({"error": "처리할 유효한 아이템이 없습니다."}), 400
+        # --- 2. 활성 베이스 모델 확인 및 경로 처리 / 3. 입력 아이템 데이터 처리 ---
+        base_model = get_active_base_model()
+        base_img_fs_path = resolve_base_model_path(user_id, temp_files_to_delete, base_model)
+        items_to_synthesize = save_uploaded_items(request.form, request.files, user_id, temp_files_to_delete)
+        # 모델에 보내기 전에 요청 한도 확인 (초과 시 413, 축소로 맞출 수 있으면 이미지 축소)
+        estimate = check_request_budget(base_img_fs_path, items_to_synthesize)
+        # 요청별 합성 전략 (single / sequential / parallel, 없으면 아이템 수로 자동 선택)
+        strategy = validate_strategy(request.form.get('strategy'), len(items_to_synthesize))
 
         # --- 4. AI 동시 합성 호출 (수정됨) ---
         print(f"\n[Route /synthesize/web Multi-SingleCall] AI 동시 합성 호출 시작 ({len(items_to_synthesize)}개 아이템)...")
+        synthesis_started = time.perf_counter()
         try:
-            # 새 함수 호출
-            result_image_bytes = synthesize_multi_items_single_call(
+            # 캐시된 중간 결과가 있으면 새 아이템만 적용 (점진적 합성)
+            result_image_bytes = synthesize_outfit(
                 client=ai_client,
                 base_image_path=base_img_fs_path,
-                items_info=items_to_synthesize # 아이템 정보 리스트 전달
+                items=items_to_synthesize, # 아이템 정보 리스트 전달
+                max_image_side=estimate['max_image_side'],
+                strategy=strategy
             )
+        except TimeoutError as timeout_e:
+             # 마감 시간 초과는 모델 오류와 구분하여 504 로 응답 (예약한 사용량은 finally 에서 해제)
+             print(f"[Route /synthesize/web Multi-SingleCall] AI 호출 시간 초과: {timeout_e}")
+             return jsonify({"error": "AI 응답 시간이 초과되었습니다. 잠시 후 다시 시도해주세요.", "timeout": True}), 504
         except Exception as ai_e:
              print(f"[Route /synthesize/web Multi-SingleCall] AI 호출 중 예외 발생: {ai_e}")
              traceback.print_exc()
              result_image_bytes = None # 오류 시 결과 없도록 처리
 
-        # --- 5. 최종 결과 처리 (동일) ---
-        if result_image_bytes:
-            print("[Route /synthesize/web Multi-SingleCall] AI 합성 성공 (결과 바이트 수신).")
-            final_image_bytes = result_image_bytes
-            apply_wm = False
-            # 워터마크 적용
-            try:
-                apply_wm_setting = get_setting('apply_watermark'); apply_wm = apply_wm_setting.lower() == 'true' if isinstance(apply_wm_setting, str) else False
-                print(f"[Route /synthesize/web Multi-SingleCall] 워터마크 적용 설정: {apply_wm}")
-                if apply_wm:
-                    watermark_path = os.path.join(current_app.static_folder, 'images', 'watermark.png')
-                    if not os.path.exists(watermark_path): print(f"  - 경고: 워터마크 파일 없음: {watermark_path}")
-                    else:
-                        print(f"  - 워터마크 적용 시도...")
-                        watermarked_bytes = apply_watermark_func(result_image_bytes, watermark_path)
-                        if watermarked_bytes and watermarked_bytes != result_image_bytes: final_image_bytes = watermarked_bytes; print("  - 워터마크 적용 성공.")
-                        else: print("  - 워터마크 적용 실패 또는 변경 없음.")
-            except Exception as wm_e: print(f"  - 워터마크 처리 중 오류: {wm_e}")
-
-            # 사용량 증가
-            usage_incremented = increment_usage(user_id)
-            if not usage_incremented: print(f"[Route /synthesize/web Multi-SingleCall] 경고: 사용량 증가 실패 (User ID: {user_id})")
-
-            # 최종 결과 이미지 저장
-            try:
-                first_item_type = items_to_synthesize[0]['type'] if items_to_synthesize else 'multi'
-                first_item_name = os.path.splitext(os.path.basename(items_to_synthesize[0]['path']))[0] if items_to_synthesize else 'items'
-                output_filename_base = f"output_{user_id}_{first_item_type}_{first_item_name}"
-                output_filename = f"{output_filename_base}.png"
-                output_filepath = os.path.join(current_app.config['OUTPUT_FOLDER'], output_filename)
-                img = Image.open(BytesIO(final_image_bytes)); img.save(output_filepath, format='PNG')
-                print(f"[Route /synthesize/web Multi-SingleCall] 최종 결과 이미지 저장 완료: {output_filepath}")
-                output_url = url_for('synthesize.serve_output_file', filename=output_filename, _external=False)
-
-                # 남은 횟수 계산
-                current_usage_after = get_todays_usage(user_id)
-                new_remaining = max(0, daily_limit - current_usage_after)
-
-                # final_response = jsonify({
-                #     "message": f"총 {len(items_to_synthesize)}개 아이템 합성에 성공했습니다!" if not ai_e else "합성 중 일부 오류 발생", # 메시지 수정 고려
-                #     "output_file_url": output_url,
-                #     "watermarked": apply_wm,
-                #     "remaining_attempts": new_remaining
-                #     })
-                final_response = jsonify({
-                    "message": f"총 {len(items_to_synthesize)}개 아이템 합성에 성공했습니다!", # 성공 메시지만 사용
-                    "output_file_url": output_url,
-                    "watermarked": apply_wm,
-                    "remaining_attempts": new_remaining
-                    })
-            except Exception as save_e:
-                print(f"[Route /synthesize/web Multi-SingleCall] 결과 이미지 저장 중 오류: {save_e}"); traceback.print_exc()
-                final_response = jsonify({"error": "합성 결과 저장 중 오류가 발생했습니다."}), 500
-        else:
-            # AI 합성 실패
+        # --- 5. 최종 결과 처리 (워터마크 적용 및 저장) ---
+        if not result_image_bytes:
             print("[Route /synthesize/web Multi-SingleCall] AI 합성 실패 (ai_module 반환값 없음).")
-            final_response = jsonify({"error": "AI 이미지 합성에 실패했습니다."}), 500
-
-        # 최종 응답 반환
-        return final_response
+            return jsonify({"error": "AI 이미지 합성에 실패했습니다."}), 500
 
+        print("[Route /synthesize/web Multi-SingleCall] AI 합성 성공 (결과 바이트 수신).")
+        try:
+            result = finalize_result(user_id, result_image_bytes, items_to_synthesize)
+        except Exception as save_e:
+            print(f"[Route /synthesize/web Multi-SingleCall] 결과 이미지 저장 중 오류: {save_e}"); traceback.print_exc()
+            return jsonify({"error": "합성 결과 저장 중 오류가 발생했습니다."}), 500
+        output_url = url_for('synthesize.serve_output_file', filename=result['output_filename'], _external=False)
+
+        # 남은 횟수 계산 (예약 시 이미 사용량 증가)
+        current_usage_after = get_todays_usage(user_id)
+        new_remaining = max(0, daily_limit - current_usage_after)
+
+        usage_committed = True # 예약한 사용량 확정
+        synthesis_history.record(user_id, 'web', items_to_synthesize, result, base_model and base_model.get('id'),
+                                 strategy, synthesis_ms=elapsed_ms(synthesis_started),
+                                 total_ms=elapsed_ms(request_started))
+        return jsonify({
+            "message": f"총 {len(items_to_synthesize)}개 아이템 합성에 성공했습니다!", # 성공 메시지만 사용
+            "output_file_url": output_url,
+            "watermarked": result['watermarked'],
+            "remaining_attempts": new_remaining,
+            "estimate": estimate
+            })
+
+    except SynthesisError as e:
+        return jsonify({"error": e.message, **e.payload}), e.status_code
     except Exception as e:
         print(f"[Route /synthesize/web Multi-SingleCall] 처리 중 예외 발생: {e}"); traceback.print_exc()
         return jsonify({"error": "이미지 합성 처리 중 오류가 발생했습니다."}), 500
     finally:
+        # --- 실패/시간 초과 시 예약한 사용량 해제 ---
+        if not usage_committed:
+            release_usage(user_id, reserved_date)
+        else:
+            cache_warmer.record(items_to_synthesize) # 인기 아이템 기록 (임시 파일 삭제 전에 보관)
         # --- 모든 임시 파일 삭제 ---
-        print(f"[Route /synthesize/web Multi-SingleCall] 임시 파일 삭제 시작 (총 {len(temp_files_to_delete)}개)...")
-        for temp_file_path in temp_files_to_delete:
-            if temp_file_path and os.path.exists(temp_file_path):
-                try: os.remove(temp_file_path); print(f"  - 삭제 완료: {temp_file_path}")
-                except OSError as e: print(f"  - 경고: 임시 파일 삭제 실패 - {e}")
+        print(f"[Route /synthesize/web Multi-SingleCall] 임시 파일 삭제 (총 {len(temp_files_to_delete)}개)")
+        cleanup_temp_files(temp_files_to_delete)
+
+
+def _parse_base_model_ids(form) -> list[int]:
+    """form 'base_model_ids' (여러 값 또는 쉼표 구분) -> 중복 없는 베이스 모델 ID 목록 (ValueError: 숫자 아님)"""
+    model_ids = []
+    for value in form.getlist('base_model_ids'):
+        for part in value.split(','):
+            if part.strip() and int(part) not in model_ids:
+                model_ids.append(int(part))
+    return model_ids
+
+def _ndjson(data: dict) -> str:
+    return json.dumps(data, ensure_ascii=False, default=str) + '\n'
+
+def _fanout_error(model_id: int, future) -> dict:
+    """실패한 베이스 모델 합성 작업의 오류 줄"""
+    try:
+        future.result()
+        error, status = "AI 이미지 합성에 실패했습니다.", 500
+    except CancelledError:
+        error, status = "합성이 취소되었습니다.", 499
+    except TimeoutError:
+        error, status = "AI 응답 시간이 초과되었습니다. 잠시 후 다시 시도해주세요.", 504
+    except SynthesisError as e:
+        error, status = e.message, e.status_code
+    except Exception:
+        error, status = "이미지 합성 처리 중 오류가 발생했습니다.", 500
+    return {"event": "error", "base_model_id": model_id, "error": error, "status": status}
+
+def _synthesize_fanout(user_id: int):
+    """
+    같은 아이템을 여러 베이스 모델(체형)에 입혀 봅니다. 아이템은 한 번만 업로드/정리하고,
+    베이스 모델마다 합성 작업을 작업 큐에 넣어 최대 SYNTH_FANOUT_CONCURRENCY 개씩 동시에 진행하며,
+    끝나는 순서대로 결과를 NDJSON 으로 스트리밍합니다.
+    사용량은 각 합성을 시작하기 전에 1회분 예약하고 결과 줄을 보낸 뒤에 확정합니다. (실패/연결 끊김 시 해제)
+
+    응답 (application/x-ndjson, 한 줄에 JSON 하나):
+        {"event": "start", "base_model_ids": [...], "estimate": {...}}
+        {"event": "result", "base_model_id", "output_file_url", "watermarked", "remaining_attempts"}
+        {"event": "error", "base_model_id", "error", "status"}
+        {"event": "done", "delivered", "failed", "remaining_attempts"}
+    """
+    try:
+        base_model_ids = _parse_base_model_ids(request.form)
+    except ValueError:
+        return jsonify({"error": "base_model_ids 는 숫자 ID 목록이어야 합니다."}), 400
+    max_bases = current_app.config.get('SYNTH_FANOUT_MAX_BASES', 4)
+    if len(base_model_ids) > max_bases:
+        return jsonify({"error": f"한 번에 최대 {max_bases}개의 베이스 모델에 합성할 수 있습니다."}), 400
+    print(f"[Route /synthesize/web Fan-out] 베이스 모델 {base_model_ids} 동시 합성 요청 (User ID: {user_id})")
+    request_started = time.perf_counter()
+
+    temp_files = []
+    streaming = False # 스트리밍 응답을 만든 뒤에는 응답 종료 시 임시 파일 삭제
+    try:
+        limit_str = get_setting('max_user_syntheses'); daily_limit = int(limit_str) if limit_str and limit_str.isdigit() else 3
+        if get_todays_usage(user_id) >= daily_limit:
+            return jsonify({"error": f"일일 최대 합성 횟수({daily_limit}회)를 초과했습니다."}), 429
+        models = []
+        for model_id in base_model_ids:
+            model = get_base_model_by_id(model_id)
+            if not model:
+                return jsonify({"error": f"ID {model_id}의 베이스 모델을 찾을 수 없습니다."}), 404
+            models.append(model)
+        items = save_uploaded_items(request.form, request.files, user_id, temp_files)
+        strategy = validate_strategy(request.form.get('strategy'), len(items))
+        tasks = [] # (베이스 모델 ID, 베이스 이미지 경로, 요청 한도 추정)
+        for model in models:
+            base_path = resolve_base_model_path(user_id, temp_files, model)
+            tasks.append((model['id'], base_path, check_request_budget(base_path, items)))
+        streaming = True
+    except SynthesisError as e:
+        return jsonify({"error": e.message, **e.payload}), e.status_code
+    except Exception as e:
+        print(f"[Route /synthesize/web Fan-out] 합성 준비 중 예외 발생: {e}"); traceback.print_exc()
+        return jsonify({"error": "이미지 합성 처리 중 오류가 발생했습니다."}), 500
+    finally:
+        if not streaming:
+            cleanup_temp_files(temp_files)
+
+    app = current_app._get_current_object()
+    deadline = app.config.get('SYNTH_JOB_DEADLINE', 120)
+    concurrency = app.config.get('SYNTH_FANOUT_CONCURRENCY', 3)
+
+    def generate():
+        queued = list(tasks)
+        pending = {} # future -> (베이스 모델 ID, 예약 날짜) - 결과를 전달하기 전까지 예약 유지
+        delivered = failed = 0
+        try:
+            yield _ndjson({"event": "start", "base_model_ids": base_model_ids, "estimate": tasks[0][2] if tasks else None})
+            while queued or pending:
+                while queued and len(pending) < concurrency:
+                    model_id, base_path, estimate = queued.pop(0)
+                    limit, reserved_date = _reserve_synthesis(user_id)
+                    if not reserved_date:
+                        failed += 1
+                        yield _ndjson({"event": "error", "base_model_id": model_id, "status": 429,
+                                       "error": f"일일 최대 합성 횟수({limit}회)를 초과했습니다."})
+                        continue
+                    future = job_queue.submit(
+                        f"fanout-{uuid.uuid4().hex}",
+                        lambda model_id=model_id, base_path=base_path, max_side=estimate['max_image_side'],
+                               submitted_at=time.perf_counter():
+                            run_base_model_synthesis(app, user_id, model_id, base_path, items, deadline, max_side, strategy,
+                                                     submitted_at),
+                        user_id=user_id)
+                    pending[future] = (model_id, reserved_date)
+                if not pending:
+                    continue
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    model_id, reserved_date = pending[future]
+                    if future.cancelled() or future.exception() is not None:
+                        del pending[future]
+                        release_usage(user_id, reserved_date)
+                        failed += 1
+                        yield _ndjson(_fanout_error(model_id, future))
+                        continue
+                    result = future.result()
+                    yield _ndjson({
+                        "event": "result", "base_model_id": model_id, "watermarked": result['watermarked'],
+                        "output_file_url": url_for('synthesize.serve_output_file', filename=result['output_filename']),
+                        "remaining_attempts": max(0, daily_limit - get_todays_usage(user_id))})
+                    del pending[future] # 결과를 전달했으므로 예약한 사용량 확정
+                    delivered += 1
+                    synthesis_history.record(user_id, 'fanout', items, result, model_id, strategy,
+                                             total_ms=elapsed_ms(request_started), **result['timings'])
+            print(f"[Route /synthesize/web Fan-out] 완료: 전달 {delivered}개, 실패 {failed}개")
+            yield _ndjson({"event": "done", "delivered": delivered, "failed": failed,
+                           "remaining_attempts": max(0, daily_limit - get_todays_usage(user_id))})
+        finally:
+            # 연결이 끊기면 남은 작업을 취소하고 전달하지 못한 결과의 사용량을 해제
+            for future, (model_id, reserved_date) in pending.items():
+                future.cancel()
+                release_usage(user_id, reserved_date)
+            if pending:
+                print(f"[Route /synthesize/web Fan-out] 연결 종료로 {len(pending)}개 합성 취소")
+                wait(list(pending), timeout=5) # 실행 중인 작업이 임시 파일을 놓을 때까지 잠시 대기
+            if delivered:
+                cache_warmer.record(items)
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Accel-Buffering'] = 'no' # 프록시(nginx) 버퍼링 없이 줄마다 전달
+    # 생성기를 닫은 뒤(또는 시작 전에 연결이 끊겨도) 임시 파일 삭제
+    response.call_on_close(lambda: cleanup_temp_files(temp_files))
+    return response
+
+
+# --- 신규: 비동기 합성 작업 라우트 ---
+@bp.route('/synthesize/jobs', methods=['POST'])
+@login_required
+@idempotent('synthesize/jobs')
+def create_synthesis_job_route():
+    """
+    /synthesize/web 과 같은 입력으로 합성 작업을 큐에 넣고 바로 202 를 반환합니다.
+    작업은 워커의 asyncio 이벤트 루프에서 비동기 AI 클라이언트로 실행되며, 결과는 status_url 로 조회합니다.
+    """
+    user_id = session['user_id']
+    print(f"[Route /synthesize/jobs] 작업 생성 요청 사용자 ID: {user_id}")
+
+    if not current_app.config.get('AI_CLIENT'):
+        return jsonify({"error": "AI 서비스가 설정되지 않았거나 초기화에 실패했습니다."}), 503
+
+    try:
+        daily_limit, reserved_date = _reserve_synthesis(user_id)
+        if not reserved_date:
+            return jsonify({"error": f"일일 최대 합성 횟수({daily_limit}회)를 초과했습니다."}), 429
+    except Exception as e:
+         return jsonify({"error": "사용량 확인 중 오류가 발생했습니다."}), 500
+
+    temp_files = []
+    submitted = False # 큐에 넣은 뒤에는 작업이 사용량 해제/임시 파일 삭제를 담당
+    try:
+        base_model = get_active_base_model()
+        base_img_fs_path = resolve_base_model_path(user_id, temp_files, base_model)
+        items = save_uploaded_items(request.form, request.files, user_id, temp_files)
+        estimate = check_request_budget(base_img_fs_path, items)
+        strategy = validate_strategy(request.form.get('strategy'), len(items))
+
+        job_id = uuid.uuid4().hex
+        create_synthesis_job(job_id, user_id, len(items))
+        # 모델 결과를 기다리는 동안 보여줄 저해상도 미리보기 (작업 등록 전에 만들어야 임시 파일이 남아 있음)
+        preview_filename = None
+        if current_app.config.get('SYNTH_PREVIEW_ENABLED'):
+            preview_filename = save_preview(base_img_fs_path, items, current_app.config['PREVIEW_FOLDER'],
+                                            f"preview_{job_id}", current_app.config.get('SYNTH_PREVIEW_TTL', 3600))
+        app = current_app._get_current_object()
+        submitted_at = time.perf_counter()
+        job_queue.submit(job_id, lambda: run_synthesis_job(
+            app, job_id, user_id, reserved_date, base_img_fs_path, items, temp_files,
+            current_app.config.get('SYNTH_JOB_DEADLINE', 120), estimate['max_image_side'], strategy,
+            base_model and base_model.get('id'), submitted_at),
+            user_id=user_id)
+        submitted = True
+        print(f"[Route /synthesize/jobs] 작업 등록: {job_id} ({len(items)}개 아이템)")
+        return jsonify({
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": url_for('synthesize.get_synthesis_job_route', job_id=job_id),
+            "preview_url": url_for('synthesize.serve_preview_file', filename=preview_filename) if preview_filename else None,
+            "estimate": estimate
+        }), 202
+
+    except SynthesisError as e:
+        return jsonify({"error": e.message, **e.payload}), e.status_code
+    except Exception as e:
+        print(f"[Route /synthesize/jobs] 작업 생성 중 예외 발생: {e}"); traceback.print_exc()
+        return jsonify({"error": "합성 작업을 등록하는 중 오류가 발생했습니다."}), 500
+    finally:
+        if not submitted:
+            release_usage(user_id, reserved_date)
+            cleanup_temp_files(temp_files)
+
+@bp.route('/synthesize/estimate', methods=['POST'])
+@login_required
+def estimate_synthesis_route():
+    """
+    합성 요청의 입력 토큰/요청 바이트/예상 비용을 미리 추정하고, 한도 초과 시 처리 방법(downscale/reject)을 알려줍니다.
+    사용량을 차감하지 않으며 모델을 호출하지 않습니다.
+
+    요청 형식:
+        JSON {"items": [{"width": 1200, "height": 1600}, ...]} - 브라우저에서 읽은 이미지 크기 (업로드 없이 추정)
+        또는 /synthesize/web 과 같은 multipart 폼 (item_count, item_image_<i>) - 서버에서 크기 확인
+    """
+    user_id = session['user_id']
+    temp_files = []
+    try:
+        data = request.get_json(silent=True)
+        if data is not None:
+            item_sizes = []
+            for item in data.get('items') or []:
+                try:
+                    width, height = int(item['width']), int(item['height'])
+                except (KeyError, TypeError, ValueError):
+                    return jsonify({"error": "각 아이템에 width, height(정수)가 필요합니다."}), 400
+                if width <= 0 or height <= 0:
+                    return jsonify({"error": "width, height 는 0보다 커야 합니다."}), 400
+                item_sizes.append((width, height))
+        else:
+            items = save_uploaded_items(request.form, request.files, user_id, temp_files)
+            item_sizes = [image_size(item['path']) for item in items]
+        if not item_sizes:
+            return jsonify({"error": "추정할 아이템이 없습니다."}), 400
+
+        return jsonify(estimate_synthesis([active_base_model_size(user_id)] + item_sizes))
+
+    except SynthesisError as e:
+        return jsonify({"error": e.message, **e.payload}), e.status_code
+    except Exception as e:
+        print(f"[Route /synthesize/estimate] 추정 중 예외 발생: {e}"); traceback.print_exc()
+        return jsonify({"error": "요청 추정 중 오류가 발생했습니다."}), 500
+    finally:
+        cleanup_temp_files(temp_files)
+
+@bp.route('/synthesize/speculate', methods=['POST'])
+@login_required
+def speculate_synthesis_route():
+    """
+    /synthesize/jobs 와 같은 입력으로 추측 합성을 시작합니다. (사용자가 화면에서 켠 경우, 아이템 목록이 잠시 바뀌지 않으면 호출)
+    결과는 중간 결과 캐시에만 저장되며 사용량을 차감하지 않습니다. 같은 코디로 합성을 요청하면 캐시 결과를 바로 받고,
+    그때 평소처럼 사용량이 차감됩니다. 같은 사용자의 이전 추측 합성은 취소됩니다.
+    """
+    user_id = session['user_id']
+    if not speculation.enabled:
+        return jsonify({"error": "추측 합성을 사용하지 않습니다."}), 404
+    if not current_app.config.get('AI_CLIENT'):
+        return jsonify({"error": "AI 서비스가 설정되지 않았거나 초기화에 실패했습니다."}), 503
+
+    # 남은 합성 횟수가 없으면 가져갈 수 없으므로 시작하지 않음 (사용량은 예약하지 않음)
+    limit_str = get_setting('max_user_syntheses'); daily_limit = int(limit_str) if limit_str and limit_str.isdigit() else 3
+    if get_todays_usage(user_id) >= daily_limit:
+        speculation.cancel(user_id)
+        return jsonify({"status": "skipped", "reason": "limit"}), 200
+
+    temp_files = []
+    submitted = False # 등록한 뒤에는 작업이 끝날 때(on_done) 임시 파일 삭제
+    try:
+        base_img_fs_path = resolve_base_model_path(user_id, temp_files)
+        items = save_uploaded_items(request.form, request.files, user_id, temp_files)
+        estimate = check_request_budget(base_img_fs_path, items)
+        strategy = validate_strategy(request.form.get('strategy'), len(items))
+
+        key = prefix_keys(model_registry.resolve('synthesize'), base_img_fs_path, items, strategy,
+                          estimate['max_image_side'])[-1]
+        if find_outfit_prefixes([key]): # 이미 합성한 코디
+            speculation.cancel(user_id)
+            return jsonify({"status": "cached"}), 200
+
+        app = current_app._get_current_object()
+        started = speculation.start(user_id, key, lambda: run_speculative_synthesis(
+            app, user_id, base_img_fs_path, items, current_app.config.get('SYNTH_JOB_DEADLINE', 120),
+            estimate['max_image_side'], strategy), on_done=lambda: cleanup_temp_files(temp_files))
+        if started is None:
+            return jsonify({"error": "추측 합성 상태를 저장하지 못했습니다."}), 503
+        submitted = started['started']
+        print(f"[Route /synthesize/speculate] 추측 합성 {'등록' if submitted else '진행 중'}: {started['job_id']} "
+              f"({len(items)}개 아이템)")
+        return jsonify({"status": "started" if submitted else "running", "job_id": started['job_id']}), 202
+
+    except SynthesisError as e:
+        return jsonify({"error": e.message, **e.payload}), e.status_code
+    except Exception as e:
+        print(f"[Route /synthesize/speculate] 추측 합성 등록 중 예외 발생: {e}"); traceback.print_exc()
+        return jsonify({"error": "추측 합성을 등록하는 중 오류가 발생했습니다."}), 500
+    finally:
+        if not submitted:
+            cleanup_temp_files(temp_files)
+
+@bp.route('/synthesize/speculate', methods=['DELETE'])
+@login_required
+def cancel_speculation_route():
+    """아이템 목록이 비었거나 사용자가 추측 합성을 끈 경우 진행 중인 추측 합성을 취소합니다."""
+    return jsonify({"cancelled": speculation.cancel(session['user_id'])}), 200
+
+@bp.route('/synthesize/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_synthesis_job_route(job_id):
+    """합성 작업 상태를 조회합니다. (DB 에 기록이 없으면 현재 워커의 메모리 상태 사용)"""
+    user_id = session['user_id']
+    job = get_synthesis_job(job_id)
+    if job:
+        status, output_filename, error = job['status'], job['output_filename'], job['error_message']
+    else:
+        job = job_queue.get(job_id)
+        if job:
+            status, error = job['status'], job['error']
+            output_filename = (job['result'] or {}).get('output_filename')
+    if not job or job['user_id'] != user_id:
+        return jsonify({"error": "작업을 찾을 수 없습니다."}), 404
+
+    payload = {"job_id": job_id, "status": status}
+    if status == 'succeeded' and output_filename:
+        payload["output_file_url"] = url_for('synthesize.serve_output_file', filename=output_filename, _external=False)
+        limit_str = get_setting('max_user_syntheses'); daily_limit = int(limit_str) if limit_str and limit_str.isdigit() else 3
+        payload["remaining_attempts"] = max(0, daily_limit - get_todays_usage(user_id))
+    elif status in ('failed', 'timeout'):
+        payload["error"] = error or "AI 이미지 합성에 실패했습니다."
+        payload["timeout"] = status == 'timeout'
+    return jsonify(payload)
+
+
+# --- 합성 기록 (갤러리) ---
+HISTORY_PAGE_SIZE = 24
+HISTORY_MAX_PAGE_SIZE = 100
+
+@bp.route('/synthesize/history', methods=['GET'])
+@login_required
+def synthesis_history_route():
+    """
+    사용자의 합성 기록 (최신순, 키셋 페이지네이션)
+    페이지의 썸네일은 스프라이트 시트 한 장(sprite)으로 묶어 주고, 각 기록에 칸 번호(sprite_index)와
+    먼저 보여줄 자리 표시 이미지(placeholder)를 넣습니다. 원본(output_file_url)은 사용자가 열 때만 받으면 됩니다.
+    썸네일/스프라이트는 작업 큐에서 만들므로, 아직 없으면 thumbnail_url / sprite 가 None 입니다.
+
+    Query:
+        limit (int): 한 페이지 개수 (기본 24, 최대 100)
+        before (int): 이전 응답의 next_before (다음 페이지)
+    """
+    if not synthesis_history.enabled:
+        return jsonify({"error": "합성 기록을 사용하지 않습니다."}), 404
+    user_id = session['user_id']
+    limit = max(1, min(request.args.get('limit', type=int, default=HISTORY_PAGE_SIZE), HISTORY_MAX_PAGE_SIZE))
+    before_id = request.args.get('before', type=int)
+    # 한 개 더 조회해서 다음 페이지가 있는지 확인
+    records = get_syntheses(user_id, limit + 1, before_id)
+    has_more = len(records) > limit
+    records = records[:limit]
+    sprite, sprite_indexes = synthesis_history.page_sprite(records)
+    return jsonify({
+        "items": [synthesis_history.to_json(record, sprite_indexes.get(record['id'])) for record in records],
+        "sprite": sprite,
+        "next_before": records[-1]['id'] if has_more else None
+    })
+
+@bp.route('/synthesize/sprites/<path:filename>')
+@login_required
+def serve_sprite_file(filename):
+    """갤러리 스프라이트 시트 (썸네일 목록 해시 이름이므로 내용이 바뀌지 않음 - 브라우저 캐시 사용)"""
+    safe_filename = secure_filename(filename)
+    if safe_filename != filename or not synthesis_history.sprite_folder:
+        return jsonify({"error": "요청한 파일을 찾을 수 없습니다."}), 404
+    try:
+        response = send_from_directory(synthesis_history.sprite_folder, safe_filename, as_attachment=False, max_age=86400)
+        response.cache_control.public = False
+        response.cache_control.private = True # 사용자별 이미지 - 공유 캐시(프록시)에 저장하지 않음
+        return response
+    except FileNotFoundError:
+        return jsonify({"error": "요청한 파일을 찾을 수 없습니다."}), 404
+
+@bp.route('/gallery')
+@login_required
+def gallery():
+    """합성 기록 갤러리 페이지 (목록은 /synthesize/history 에서 불러옴)"""
+    if not synthesis_history.enabled:
+        flash("합성 기록을 사용하지 않습니다.", "warning")
+    return render_template('synthesize/gallery.html', user_email=session.get('user_email', 'Unknown'),
+                           history_enabled=synthesis_history.enabled, page_size=HISTORY_PAGE_SIZE)
 
 
 # --- 신규: 아이템 분류 API 라우트 ---
@@ -254,11 +619,8 @@ def classify_item_route():
     """
     print("[Route /classify_item] 아이템 분류 요청 수신")
 
-    # 1. AI 클라이언트 확인
+    # 1. AI 클라이언트 (없어도 캐시/로컬 분류기로 분류할 수 있으면 분류, AI 가 필요할 때만 503)
     ai_client = current_app.config.get('AI_CLIENT')
-    if not ai_client:
-        print("[Route /classify_item] 오류: AI Client 없음")
-        return jsonify({"error": "AI 서비스가 설정되지 않았습니다."}), 503
 
     # 2. 이미지 파일 확인
     if 'item_image' not in request.files:
@@ -283,10 +645,14 @@ def classify_item_route():
         item_file.save(temp_image_path) # 파일 저장
         print(f"[Route /classify_item] 분류용 이미지 임시 저장: {temp_image_path}")
 
-        # 4. AI 분류 함수 호출
-        detected_type = classify_item_type(ai_client, temp_image_path)
+        # 4. 분류 (지각 해시 캐시 -> 로컬 분류기 -> AI)
+        result = classify_images(ai_client, [temp_image_path])[0]
+        detected_type = result['item_type']
 
         # 5. 결과 반환
+        if result['source'] == UNAVAILABLE:
+            print("[Route /classify_item] 오류: AI Client 없음 (캐시/로컬 분류 실패)")
+            return jsonify({"error": "AI 서비스가 설정되지 않았습니다."}), 503
         if detected_type:
             print(f"[Route /classify_item] 분류 결과: {detected_type}")
             return jsonify({"item_type": detected_type})
@@ -294,6 +660,9 @@ def classify_item_route():
             print("[Route /classify_item] 오류: 아이템 종류를 분류할 수 없습니다.")
             return jsonify({"error": "아이템 종류를 분류할 수 없습니다."}), 400 # 또는 500
 
+    except TimeoutError as e:
+        print(f"[Route /classify_item] 분류 시간 초과: {e}")
+        return jsonify({"error": "AI 응답 시간이 초과되었습니다. 잠시 후 다시 시도해주세요.", "timeout": True}), 504
     except Exception as e:
         print(f"[Route /classify_item] 분류 처리 중 오류 발생: {e}")
         traceback.print_exc()
@@ -310,6 +679,76 @@ def classify_item_route():
             except OSError as e:
                 print(f"[Route /classify_item] 경고: 임시 파일 삭제 실패 - {e}")
 
+@bp.route('/classify_items', methods=['POST'])
+@login_required
+def classify_items_route():
+    """
+    여러 아이템 이미지('item_images')를 한 번에 분류합니다.
+    캐시/로컬 분류기에서 처리되지 않은 이미지는 AI 호출 한 번으로 일괄 분류합니다.
+    AI 클라이언트가 없으면 AI 가 필요한 항목에만 오류(status 503)를 넣고, 모든 항목이 그렇다면 응답 전체가 503 입니다.
+    """
+    print("[Route /classify_items] 일괄 아이템 분류 요청 수신")
+
+    # 1. AI 클라이언트 (없어도 캐시/로컬 분류기로 처리되는 항목은 분류)
+    ai_client = current_app.config.get('AI_CLIENT')
+
+    # 2. 이미지 파일 확인
+    item_files = [f for f in request.files.getlist('item_images') if f and f.filename]
+    if not item_files:
+        print("[Route /classify_items] 오류: 'item_images' 파일 누락")
+        return jsonify({"error": "분류할 이미지 파일('item_images')이 필요합니다."}), 400
+    max_items = current_app.config.get('CLASSIFY_BATCH_MAX', 5)
+    if len(item_files) > max_items:
+        print(f"[Route /classify_items] 오류: 파일 수 초과 ({len(item_files)} > {max_items})")
+        return jsonify({"error": f"한 번에 최대 {max_items}개의 이미지만 분류할 수 있습니다."}), 400
+    for item_file in item_files:
+        if not allowed_file(item_file.filename):
+            print(f"[Route /classify_items] 오류: 허용되지 않는 파일 형식 - {item_file.filename}")
+            return jsonify({"error": f"허용되지 않는 파일 형식입니다 (PNG, JPG, JPEG만 가능): {item_file.filename}"}), 400
+
+    # 3. 이미지 임시 저장
+    temp_image_paths = []
+    try:
+        for i, item_file in enumerate(item_files):
+            file_ext = os.path.splitext(item_file.filename)[1]
+            temp_image_fd, temp_image_path = tempfile.mkstemp(suffix=file_ext, prefix=f'classify_{i}_')
+            os.close(temp_image_fd)
+            temp_image_paths.append(temp_image_path)
+            item_file.save(temp_image_path)
+        print(f"[Route /classify_items] 분류용 이미지 {len(temp_image_paths)}개 임시 저장 완료")
+
+        # 4. 일괄 분류 (캐시 -> 로컬 -> AI 일괄 호출)
+        classified = classify_images(ai_client, temp_image_paths)
+
+        # 5. 결과 반환 (분류 실패 항목은 item_type=None, AI 가 필요한데 클라이언트가 없는 항목은 error/status 503)
+        results = [
+            {"index": i, "filename": item_file.filename,
+             "item_type": result['item_type'], "source": result['source']}
+            for i, (item_file, result) in enumerate(zip(item_files, classified))
+        ]
+        unavailable = [r for r in results if r['source'] == UNAVAILABLE]
+        for r in unavailable:
+            r.update(error="AI 서비스가 설정되지 않았습니다.", status=503)
+        print(f"[Route /classify_items] 분류 결과: {[r['item_type'] for r in results]}")
+        if len(unavailable) == len(results):
+            print("[Route /classify_items] 오류: AI Client 없음 (캐시/로컬 분류 실패)")
+            return jsonify({"error": "AI 서비스가 설정되지 않았습니다.", "results": results}), 503
+        return jsonify({"results": results})
+
+    except TimeoutError as e:
+        print(f"[Route /classify_items] 분류 시간 초과: {e}")
+        return jsonify({"error": "AI 응답 시간이 초과되었습니다. 잠시 후 다시 시도해주세요.", "timeout": True}), 504
+    except Exception as e:
+        print(f"[Route /classify_items] 분류 처리 중 오류 발생: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "아이템 분류 중 서버 오류가 발생했습니다."}), 500
+    finally:
+        # 6. 임시 파일 삭제
+        for temp_image_path in temp_image_paths:
+            if os.path.exists(temp_image_path):
+                try: os.remove(temp_image_path)
+                except OSError as e: print(f"[Route /classify_items] 경고: 임시 파일 삭제 실패 - {e}")
+
 # --- /outputs/<filename> 라우트 ---
 @bp.route('/outputs/<path:filename>')
 def serve_output_file(filename):
@@ -327,4 +766,15 @@ def serve_output_file(filename):
         return send_from_directory( output_dir, safe_filename, as_attachment=False )
     except FileNotFoundError:
          print(f"[Route /outputs] 오류: 파일을 찾을 수 없음 - {safe_filename}")
-         return jsonify({"error": "요청한 파일을 찾을 수 없습니다."}), 404
\ No newline at end of file
+         return jsonify({"error": "요청한 파일을 찾을 수 없습니다."}), 404
+@bp.route('/synthesize/previews/<path:filename>')
+def serve_preview_file(filename):
+    """합성 미리보기 이미지 (작업 ID 가 포함된 파일 이름, SYNTH_PREVIEW_TTL 후 삭제)"""
+    preview_dir = current_app.config['PREVIEW_FOLDER']
+    safe_filename = secure_filename(filename)
+    if safe_filename != filename:
+        return jsonify({"error": "잘못된 파일 경로입니다."}), 400
+    try:
+        return send_from_directory(preview_dir, safe_filename, as_attachment=False, max_age=0)
+    except FileNotFoundError:
+        return jsonify({"error": "요청한 파일을 찾을 수 없습니다."}), 404
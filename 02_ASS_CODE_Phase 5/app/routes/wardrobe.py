@@ -0,0 +1,132 @@
+# app/routes/wardrobe.py
+# 사용자별 옷장 API (저장한 아이템 목록/추가/종류 수정/삭제, 아이템 이미지와 썸네일)
+
+import os
+import tempfile
+from flask import Blueprint, request, jsonify, session, current_app, send_from_directory
+import traceback
+
+from app.routes.auth import login_required
+from app.services.wardrobe import wardrobe, WardrobeError
+from app.utils.db_utils import get_wardrobe_items, update_wardrobe_item_type
+from app.utils.ai_module import ALLOWED_CATEGORIES
+
+# 'wardrobe' 이름으로 Blueprint 객체 생성 (url_prefix='/wardrobe')
+bp = Blueprint('wardrobe', __name__)
+
+# 목록 한 페이지 기본/최대 개수
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+
+@bp.before_request
+def check_wardrobe_enabled():
+    if not current_app.config.get('WARDROBE_ENABLED'):
+        return jsonify({"error": "옷장 기능을 사용할 수 없습니다."}), 404
+
+
+@bp.route('/items', methods=['GET'])
+@login_required
+def list_wardrobe_items():
+    """
+    옷장 아이템 목록 (최근 추가 순, 키셋 페이지네이션)
+
+    Query:
+        limit (int): 한 페이지 개수 (기본 24, 최대 100)
+        before (int): 이전 응답의 next_before (다음 페이지)
+        type (str): 아이템 종류 필터
+    """
+    user_id = session['user_id']
+    limit = max(1, min(request.args.get('limit', type=int, default=DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+    before_id = request.args.get('before', type=int)
+    item_type = request.args.get('type') or None
+    # 한 개 더 조회해서 다음 페이지가 있는지 확인
+    items = get_wardrobe_items(user_id, limit + 1, before_id, item_type)
+    has_more = len(items) > limit
+    items = items[:limit]
+    return jsonify({
+        "items": [wardrobe.to_json(item) for item in items],
+        "next_before": items[-1]['id'] if has_more else None
+    })
+
+
+@bp.route('/items', methods=['POST'])
+@login_required
+def add_wardrobe_items():
+    """
+    아이템 이미지를 옷장에 추가합니다. (multipart: item_image 여러 개 가능, item_type 선택 - 없으면 자동 분류)
+    이미 있는 아이템(같은 내용)은 기존 아이템을 반환합니다. 새로 추가한 아이템이 있으면 201.
+    """
+    user_id = session['user_id']
+    files = [f for f in request.files.getlist('item_image') if f and f.filename]
+    if not files:
+        return jsonify({"error": "추가할 이미지 파일('item_image')이 필요합니다."}), 400
+    item_type = request.form.get('item_type') or None
+    if item_type and item_type not in ALLOWED_CATEGORIES:
+        return jsonify({"error": f"아이템 종류는 {', '.join(ALLOWED_CATEGORIES)} 중 하나여야 합니다."}), 400
+
+    added, errors = [], []
+    for item_file in files:
+        ext = os.path.splitext(item_file.filename)[1].lower().lstrip('.')
+        if ext not in current_app.config['ALLOWED_EXTENSIONS']:
+            errors.append({"name": item_file.filename, "error": "허용되지 않는 파일 형식입니다 (PNG, JPG, JPEG만 가능)."})
+            continue
+        temp_fd, temp_path = tempfile.mkstemp(suffix=f'.{ext}', prefix=f'wardrobe_user{user_id}_')
+        os.close(temp_fd)
+        try:
+            item_file.save(temp_path)
+            item = wardrobe.add(user_id, temp_path, item_type, item_file.filename, current_app.config.get('AI_CLIENT'))
+            added.append(wardrobe.to_json(item))
+        except WardrobeError as e:
+            errors.append({"name": item_file.filename, "error": e.message, "status": e.status_code})
+        except Exception as e:
+            print(f"[Route /wardrobe/items] 아이템 추가 중 오류: {e}"); traceback.print_exc()
+            errors.append({"name": item_file.filename, "error": "아이템을 옷장에 추가하는 중 오류가 발생했습니다."})
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    if not added:
+        status = errors[0].get('status', 400) if len(errors) == 1 else 400
+        return jsonify({"error": errors[0]['error'], "errors": errors}), status
+    status = 201 if any(item.get('created') for item in added) else 200
+    return jsonify({"items": added, "errors": errors}), status
+
+
+@bp.route('/items/<int:item_id>', methods=['PATCH'])
+@login_required
+def update_wardrobe_item(item_id):
+    """옷장 아이템의 종류를 바꿉니다. (JSON {"type": "top"})"""
+    user_id = session['user_id']
+    item_type = (request.get_json(silent=True) or {}).get('type')
+    if item_type not in ALLOWED_CATEGORIES:
+        return jsonify({"error": f"아이템 종류는 {', '.join(ALLOWED_CATEGORIES)} 중 하나여야 합니다."}), 400
+    item = update_wardrobe_item_type(user_id, item_id, item_type)
+    if not item:
+        return jsonify({"error": "옷장 아이템을 찾을 수 없습니다."}), 404
+    return jsonify(wardrobe.to_json(item))
+
+
+@bp.route('/items/<int:item_id>', methods=['DELETE'])
+@login_required
+def delete_wardrobe_item_route(item_id):
+    """옷장 아이템과 파일을 삭제합니다."""
+    user_id = session['user_id']
+    if not wardrobe.remove(user_id, item_id):
+        return jsonify({"error": "옷장 아이템을 찾을 수 없습니다."}), 404
+    print(f"[Route /wardrobe/items] 아이템 삭제: 사용자 {user_id}, ID {item_id}")
+    return jsonify({"message": "옷장에서 삭제했습니다.", "id": item_id})
+
+
+@bp.route('/files/<path:filename>')
+@login_required
+def serve_wardrobe_file(filename):
+    """옷장 아이템 이미지/썸네일 (본인 폴더의 파일만)"""
+    user_id = session['user_id']
+    if filename.split('/', 1)[0] != str(user_id):
+        return jsonify({"error": "요청한 파일을 찾을 수 없습니다."}), 404
+    try:
+        # 내용 해시 이름이므로 파일 내용이 바뀌지 않음 - 브라우저 캐시 사용
+        return send_from_directory(wardrobe.folder, filename, as_attachment=False, max_age=86400)
+    except FileNotFoundError:
+        return jsonify({"error": "요청한 파일을 찾을 수 없습니다."}), 404
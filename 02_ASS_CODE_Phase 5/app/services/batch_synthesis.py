@@ -0,0 +1,312 @@
+# app/services/batch_synthesis.py
+# 오프라인 대량 합성: 매니페스트(CSV/JSONL)의 베이스 모델 x 아이템 조합을 프로세스 풀로 나눠 합성합니다.
+# 각 워커 프로세스는 create_app() 으로 웹 서버와 같은 설정(AI 클라이언트, 공유 레이트 리미터, 점진적 합성 캐시,
+# 아이템 전처리, 요청 한도)을 사용하고, 결과는 finalize_result() 로 출력 폴더에 저장합니다. (워터마크 설정 포함)
+# 작업이 끝날 때마다 체크포인트 파일에 기록하므로, 중단되어도 다시 실행하면 끝나지 않은 작업부터 이어서 합성합니다.
+#
+# 매니페스트 형식 (상대 경로는 매니페스트 파일 기준):
+#   JSONL: {"id": "sku123-m1", "base": "models/m1.png", "items": [{"type": "top", "path": "catalog/123.jpg"}], "strategy": "single"}
+#   CSV  : id,base,items[,strategy]  - items 는 'top=catalog/123.jpg;bottom=catalog/456.jpg'
+# base 가 비어 있는 행은 --bases 로 지정한 베이스 모델마다 하나씩 작업이 됩니다. (카탈로그 x 베이스 모델)
+
+import os
+import asyncio
+import csv
+import json
+import statistics
+import sys
+import time
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import click
+from werkzeug.utils import secure_filename
+
+from app.utils.resilience import ai_deadline
+from app.services.item_preprocess import item_preprocessor
+from app.services.synthesis_service import (
+    SynthesisError, asynthesize_outfit, check_request_budget, finalize_result, validate_strategy
+)
+
+# 워커 프로세스 상태 (_init_worker 에서 설정)
+_worker_app = None
+_worker_loop = None
+
+
+class ManifestError(ValueError):
+    """매니페스트 형식 오류"""
+
+
+def _resolve(path: str, root: str) -> str:
+    return path if os.path.isabs(path) else os.path.normpath(os.path.join(root, path))
+
+
+def _parse_csv_items(value: str) -> list[dict]:
+    items = []
+    for entry in (value or '').split(';'):
+        item_type, sep, path = entry.partition('=')
+        if entry.strip() and not sep:
+            raise ManifestError(f"아이템 형식은 'type=path' 이어야 합니다: '{entry}'")
+        if entry.strip():
+            items.append({'type': item_type.strip(), 'path': path.strip()})
+    return items
+
+
+def read_manifest(path: str, bases: list[str] = None) -> list[dict]:
+    """
+    매니페스트를 읽어 작업 목록을 만듭니다.
+
+    Args:
+        path (str): .jsonl 또는 .csv 매니페스트 경로
+        bases (list[str], optional): base 가 없는 행에 적용할 베이스 모델 이미지들
+
+    Returns:
+        list[dict]: [{'id', 'base', 'items': [{'type', 'path'}], 'strategy'}]
+
+    Raises:
+        ManifestError: 형식 오류, 중복 ID, 베이스 모델 없음
+    """
+    root = os.path.dirname(os.path.abspath(path))
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            rows = [dict(row, items=_parse_csv_items(row.get('items'))) for row in csv.DictReader(f)]
+        else:
+            rows = []
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        rows.append(json.loads(line))
+                    except json.JSONDecodeError as e:
+                        raise ManifestError(f"{line_no}번째 줄 JSON 오류: {e}")
+
+    tasks, seen = [], set()
+    for index, row in enumerate(rows, 1):
+        row_id = str(row.get('id') or f"row{index}")
+        items = [{'type': item['type'], 'path': _resolve(item['path'], root)} for item in row.get('items') or []]
+        if not items:
+            raise ManifestError(f"'{row_id}': 아이템이 없습니다.")
+        if row.get('base'):
+            row_bases = [(None, _resolve(row['base'], root))]
+        elif bases:
+            row_bases = [(os.path.splitext(os.path.basename(base))[0], base) for base in bases]
+        else:
+            raise ManifestError(f"'{row_id}': base 가 없습니다. (--bases 로 베이스 모델을 지정하세요)")
+        for suffix, base in row_bases:
+            task_id = f"{row_id}@{suffix}" if suffix else row_id
+            if task_id in seen:
+                raise ManifestError(f"작업 ID 중복: '{task_id}'")
+            seen.add(task_id)
+            tasks.append({'id': task_id, 'base': base, 'items': items, 'strategy': row.get('strategy') or None})
+    return tasks
+
+
+def load_checkpoint(path: str) -> dict:
+    """체크포인트(JSONL)의 작업별 마지막 결과 {id: result}"""
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue # 중단 시 마지막 줄이 잘렸을 수 있음
+            results[result['id']] = result
+    return results
+
+
+def _init_worker(output_folder: str = None, quiet: bool = True) -> None:
+    """워커 프로세스 초기화: 앱(설정/클라이언트/리미터)과 이벤트 루프를 한 번만 만듭니다."""
+    global _worker_app, _worker_loop
+    if quiet:
+        sys.stdout = open(os.devnull, 'w', encoding='utf-8')
+    from app import create_app # 앱 팩토리가 이 모듈을 불러오므로 지연 import
+    os.environ['CACHE_WARM_ENABLED'] = 'false' # 예열은 웹 워커가 담당 (배치 워커마다 예열 스레드를 띄우지 않음)
+    _worker_app = create_app()
+    if output_folder:
+        _worker_app.config['OUTPUT_FOLDER'] = output_folder
+        os.makedirs(output_folder, exist_ok=True)
+    # 비동기 AI 클라이언트가 루프에 묶이지 않도록 작업 묶음마다 같은 루프를 사용
+    _worker_loop = asyncio.new_event_loop()
+
+
+def _run_chunk(tasks: list[dict], concurrency: int) -> list[dict]:
+    """워커 프로세스에서 작업 묶음을 최대 concurrency 개씩 동시에 합성합니다."""
+    return _worker_loop.run_until_complete(_run_tasks(_worker_app, tasks, concurrency))
+
+
+async def _run_tasks(app, tasks: list[dict], concurrency: int) -> list[dict]:
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def _bounded(task):
+        async with semaphore:
+            return await _run_task(app, task)
+
+    return await asyncio.gather(*(_bounded(task) for task in tasks))
+
+
+def _prepare(app, task: dict) -> tuple[list[dict], dict]:
+    with app.app_context():
+        items = [{'type': item['type'], 'path': item_preprocessor.process(item['path'])} for item in task['items']]
+        return items, check_request_budget(task['base'], items)
+
+
+def _finalize(app, image_bytes: bytes, task: dict) -> dict:
+    with app.app_context():
+        return finalize_result(None, image_bytes, task['items'],
+                               output_filename=f"batch_{secure_filename(task['id'].replace('@', '__')) or 'task'}.png")
+
+
+async def _run_task(app, task: dict) -> dict:
+    """작업 하나를 합성하고 결과를 dict 로 반환합니다. (예외를 던지지 않음)"""
+    start = time.perf_counter()
+    result = {'id': task['id'], 'status': 'failed', 'output': None, 'error': None, 'pid': os.getpid()}
+    try:
+        items, estimate = await asyncio.to_thread(_prepare, app, task)
+        strategy = validate_strategy(task.get('strategy'), len(items))
+        with ai_deadline(app.config.get('SYNTH_JOB_DEADLINE', 120)):
+            image_bytes = await asynthesize_outfit(app.config.get('AI_CLIENT'), task['base'], items,
+                                                   estimate['max_image_side'], strategy)
+        if not image_bytes:
+            raise SynthesisError("AI 이미지 합성에 실패했습니다.", 500)
+        output = await asyncio.to_thread(_finalize, app, image_bytes, task)
+        result.update(status='ok', output=output['output_filename'])
+    except TimeoutError as e:
+        result['error'] = f"timeout: {e}"
+    except SynthesisError as e:
+        result['error'] = e.message
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['elapsed_ms'] = round((time.perf_counter() - start) * 1000)
+    return result
+
+
+def summarize(results: list[dict], skipped: int, total: int, wall_seconds: float) -> dict:
+    """처리량/실패 통계"""
+    ok = [r for r in results if r['status'] == 'ok']
+    latencies = sorted(r['elapsed_ms'] for r in ok)
+    return {
+        'total': total, 'skipped': skipped, 'processed': len(results), 'ok': len(ok),
+        'failed': len(results) - len(ok), 'wall_seconds': round(wall_seconds, 1),
+        'throughput_per_min': round(len(ok) / wall_seconds * 60, 2) if wall_seconds > 0 else 0.0,
+        'p50_ms': statistics.median(latencies) if latencies else None,
+        'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None,
+        'errors': Counter(r['error'] for r in results if r['status'] != 'ok').most_common(5),
+    }
+
+
+def run_batch(manifest: str, checkpoint: str = None, bases: list[str] = None, processes: int = 2,
+              concurrency: int = 4, output_folder: str = None, retry_failed: bool = True, limit: int = None,
+              quiet: bool = True, progress_every: int = 10) -> dict:
+    """
+    매니페스트의 작업을 프로세스 풀로 합성합니다. 체크포인트에 성공으로 기록된 작업은 건너뜁니다.
+
+    Args:
+        manifest (str): 매니페스트 경로 (.jsonl / .csv)
+        checkpoint (str, optional): 체크포인트 경로 (기본 '<매니페스트>.checkpoint.jsonl')
+        bases (list[str], optional): base 가 없는 행에 적용할 베이스 모델 이미지들
+        processes (int): 워커 프로세스 수 (0 이면 현재 프로세스에서 실행)
+        concurrency (int): 프로세스당 동시에 진행할 합성 수
+        output_folder (str, optional): 결과 폴더 (기본 OUTPUT_FOLDER)
+        retry_failed (bool): 체크포인트에 실패로 기록된 작업도 다시 합성
+        limit (int, optional): 이번 실행에서 처리할 최대 작업 수
+        quiet (bool): 워커 프로세스의 로그 출력 숨김
+        progress_every (int): 이 개수마다 진행 상황 출력
+
+    Returns:
+        dict: summarize() 결과
+    """
+    tasks = read_manifest(manifest, bases)
+    checkpoint = checkpoint or f"{manifest}.checkpoint.jsonl"
+    done = load_checkpoint(checkpoint)
+    pending = [task for task in tasks
+               if done.get(task['id'], {}).get('status') != 'ok' and (retry_failed or task['id'] not in done)]
+    skipped = len(tasks) - len(pending)
+    if limit:
+        pending = pending[:limit]
+    print(f"[Batch] 작업 {len(tasks)}개 중 {skipped}개 완료됨(체크포인트), 이번 실행 {len(pending)}개 "
+          f"(프로세스 {processes}개 x 동시 {concurrency}개)")
+
+    chunks = [pending[i:i + concurrency] for i in range(0, len(pending), concurrency)]
+    results = []
+    start = time.perf_counter()
+    with open(checkpoint, 'a', encoding='utf-8') as checkpoint_file:
+        def _record(chunk_results):
+            for result in chunk_results:
+                checkpoint_file.write(json.dumps(result, ensure_ascii=False) + '\n')
+                results.append(result)
+                if result['status'] != 'ok':
+                    print(f"[Batch] 실패 {result['id']}: {result['error']}")
+                if len(results) % progress_every == 0 or len(results) == len(pending):
+                    elapsed = time.perf_counter() - start
+                    ok = sum(1 for r in results if r['status'] == 'ok')
+                    print(f"[Batch] {len(results)}/{len(pending)} (성공 {ok}, 실패 {len(results) - ok}) "
+                          f"{ok / elapsed * 60:.1f}개/분")
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno()) # 중단되어도 끝난 작업은 다시 합성하지 않도록
+
+        try:
+            if processes <= 0:
+                _init_worker(output_folder, quiet=False)
+                for chunk in chunks:
+                    _record(_run_chunk(chunk, concurrency))
+            elif chunks:
+                # fork 는 부모의 백그라운드 스레드(모델 점검, 작업 큐 루프) 상태를 복사하므로 spawn 사용
+                context = multiprocessing.get_context('spawn')
+                with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=_init_worker,
+                                         initargs=(output_folder, quiet)) as executor:
+                    futures = [executor.submit(_run_chunk, chunk, concurrency) for chunk in chunks]
+                    try:
+                        for future in as_completed(futures):
+                            _record(future.result())
+                    except BaseException:
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        raise
+        except KeyboardInterrupt:
+            print("\n[Batch] 중단됨 - 다시 실행하면 끝나지 않은 작업부터 이어서 합성합니다.")
+
+    stats = summarize(results, skipped, len(tasks), time.perf_counter() - start)
+    print_summary(stats)
+    return stats
+
+
+def print_summary(stats: dict) -> None:
+    print(f"\n[Batch] 전체 {stats['total']}개 | 이전 완료 {stats['skipped']}개 | 이번 처리 {stats['processed']}개 "
+          f"(성공 {stats['ok']}, 실패 {stats['failed']})")
+    print(f"[Batch] 소요 {stats['wall_seconds']}초, 처리량 {stats['throughput_per_min']}개/분, "
+          f"지연 p50 {stats['p50_ms'] if stats['p50_ms'] is not None else '-'}ms / "
+          f"p95 {stats['p95_ms'] if stats['p95_ms'] is not None else '-'}ms")
+    for error, count in stats['errors']:
+        print(f"  - {count}건: {error}")
+
+
+@click.command('synth-batch')
+@click.argument('manifest', type=click.Path(exists=True, dir_okay=False))
+@click.option('--checkpoint', help="체크포인트 파일 (기본 <매니페스트>.checkpoint.jsonl)")
+@click.option('--bases', help="base 가 없는 행에 적용할 베이스 모델 이미지 (쉼표 구분)")
+@click.option('--processes', type=int, default=2, show_default=True, help="워커 프로세스 수 (0 이면 현재 프로세스)")
+@click.option('--concurrency', type=int, default=4, show_default=True, help="프로세스당 동시 합성 수")
+@click.option('--output-dir', help="결과 폴더 (기본 OUTPUT_FOLDER)")
+@click.option('--no-retry-failed', is_flag=True, help="체크포인트에 실패로 기록된 작업은 건너뜀")
+@click.option('--limit', type=int, help="이번 실행에서 처리할 최대 작업 수")
+@click.option('--verbose', is_flag=True, help="워커 프로세스 로그 출력")
+@click.option('--report', help="통계를 JSON 으로 저장")
+def synth_batch_command(manifest, checkpoint, bases, processes, concurrency, output_dir, no_retry_failed, limit,
+                        verbose, report):
+    """매니페스트의 베이스 모델 x 아이템 조합을 대량 합성합니다. (중단 후 다시 실행하면 이어서 진행)"""
+    try:
+        stats = run_batch(manifest, checkpoint, [b.strip() for b in bases.split(',') if b.strip()] if bases else None,
+                          processes, concurrency, output_dir, not no_retry_failed, limit, quiet=not verbose)
+    except ManifestError as e:
+        raise click.ClickException(f"매니페스트 오류: {e}")
+    if report:
+        with open(report, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+    if stats['failed']:
+        sys.exit(1)
+
+
+def init_batch_command(app) -> None:
+    """'flask synth-batch' 명령 등록"""
+    app.cli.add_command(synth_batch_command)
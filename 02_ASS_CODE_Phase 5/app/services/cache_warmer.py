@@ -0,0 +1,398 @@
+# app/services/cache_warmer.py
+# 인기 아이템 캐시 예열
+# 합성에 사용된 아이템(내용 해시)과 함께 사용된 아이템 쌍의 사용 횟수를 기록하고(item_popularity 테이블),
+# 사용량이 적은 시간대(CACHE_WARM_HOURS)에 상위 N개 아이템/쌍을 현재 활성 베이스 모델로 미리 합성해
+# 점진적 합성 캐시(outfit_cache)에 넣어 둡니다. 인기 코디 요청은 모델 호출 없이 바로 결과를 받습니다.
+# 활성 베이스 모델(또는 합성 모델)이 바뀌면 시간대와 관계없이 바로 다시 예열합니다.
+# 예열 합성은 작업 큐의 낮은 우선순위로 실행되어 사용자 요청을 밀어내지 않습니다.
+# 마지막으로 예열한 모델과 날짜는 노드의 잠금 파일에 기록되어 워커끼리 공유합니다. 워커가 새로 뜨거나(fork, max_requests 재시작)
+# 여러 워커가 동시에 확인해도 이미 다른 워커가 예열한 모델/날짜이면 다시 예열하지 않습니다.
+# 집계 기간(CACHE_WARM_DAYS) 동안 사용되지 않은 아이템의 기록과 보관 이미지는 주기적으로 삭제합니다. (prune)
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from app.utils.db_utils import (
+    get_active_base_model, record_item_usage, get_popular_items, get_popular_item_pairs, find_outfit_prefixes,
+    prune_item_usage
+)
+from app.utils.metrics import metrics
+from app.utils.model_registry import model_registry
+from app.utils.resilience import ai_deadline
+from app.services.job_queue import job_queue
+from app.services.outfit_cache import outfit_cache, file_digest, prefix_keys
+
+try:
+    import fcntl # POSIX
+except ImportError: # Windows - 워커 간 잠금 없이 예열 (이미 캐시된 조합은 건너뜀)
+    fcntl = None
+
+# 이 횟수만큼 사용을 기록할 때마다 오래된 기록/보관 이미지 정리
+PRUNE_EVERY_RECORDS = 200
+
+
+def parse_hours(value: str | None) -> tuple[int, int] | None:
+    """'2-6' (2시 이상 6시 미만, '23-5' 처럼 자정을 넘길 수 있음) -> (2, 6). 비어 있으면 None (항상 허용)"""
+    if not value:
+        return None
+    start, _, end = value.partition('-')
+    try:
+        return int(start) % 24, int(end) % 24
+    except ValueError:
+        print(f"[Cache Warmer] 경고: 잘못된 CACHE_WARM_HOURS '{value}' - 시간대 제한 없음")
+        return None
+
+
+class CacheWarmer:
+    """
+    인기 아이템 사용 기록과 예열 스케줄러.
+
+    Args:
+        top_items (int): 예열할 인기 아이템 수 (아이템 하나만 입힌 결과)
+        top_pairs (int): 예열할 인기 아이템 쌍 수
+        days (int): 인기도 집계 기간(일) - 이 기간 동안 사용되지 않은 아이템 기록/이미지는 삭제
+        hours (tuple, optional): 예정된 예열을 허용하는 시간대 (시작 시, 끝 시)
+        check_interval (float): 활성 모델 변경/예열 시간대를 확인하는 주기(초)
+        item_folder (str): 예열에 쓸 아이템 이미지 보관 폴더
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.top_items = 20
+        self.top_pairs = 10
+        self.days = 30
+        self.hours = (2, 6)
+        self.check_interval = 300.0
+        self.item_folder = None
+        self._app = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._last_model_key = None
+        self._last_warm_date = None
+        self._manual_requested = False
+        self._records = 0
+        self._records_lock = threading.Lock()
+        self._status = {'running': False, 'last_run': None, 'last_reason': None, 'last_result': None}
+
+    def configure(self, **settings) -> None:
+        for name, value in settings.items():
+            if value is not None:
+                setattr(self, name, value)
+
+    # --- 인기도 기록 ---
+    def record(self, items: list[dict]) -> bool:
+        """
+        합성에 사용된 아이템을 기록합니다. 예열에 다시 쓸 수 있도록 아이템 이미지를 내용 해시 이름으로 보관합니다.
+        (요청의 임시 파일이 삭제되기 전에 호출해야 함, 파일/DB 처리 - 비동기 코드에서는 스레드로 호출)
+        """
+        if not self.enabled or not self.item_folder or not items:
+            return False
+        retained = []
+        try:
+            for item in items:
+                digest = file_digest(item['path'])
+                ext = os.path.splitext(item['path'])[1].lower() or '.png'
+                file_path = os.path.join(self.item_folder, digest[:2], f"{digest}{ext}")
+                if os.path.isfile(file_path):
+                    os.utime(file_path)
+                else:
+                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                    temp_path = f"{file_path}.{os.getpid()}.tmp"
+                    shutil.copyfile(item['path'], temp_path)
+                    os.replace(temp_path, file_path)
+                retained.append({'digest': digest, 'type': item['type'], 'file_path': file_path})
+        except OSError as e:
+            print(f"[Cache Warmer] 경고: 아이템 사용 기록 실패 - {e}")
+            return False
+        recorded = record_item_usage(retained)
+
+        with self._records_lock:
+            self._records += 1
+            prune = self._records % PRUNE_EVERY_RECORDS == 0
+        if prune:
+            self.prune()
+        return recorded
+
+    def prune(self) -> int:
+        """
+        집계 기간(days) 동안 사용되지 않은 아이템의 인기도 기록과 보관 이미지를 삭제합니다.
+        DB 기록이 없는 파일(기록 실패)도 수정 시각(사용할 때마다 갱신)이 기간을 지났으면 삭제합니다.
+        """
+        removed = 0
+        for file_path in prune_item_usage(self.days):
+            try:
+                os.remove(file_path)
+                removed += 1
+            except OSError:
+                pass
+        cutoff = time.time() - self.days * 86400
+        for root, _, files in os.walk(self.item_folder):
+            for name in files:
+                file_path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(file_path) < cutoff:
+                        os.remove(file_path)
+                        removed += 1
+                except OSError:
+                    pass
+        if removed:
+            print(f"[Cache Warmer] 사용하지 않은 아이템 이미지 {removed}개 삭제")
+        return removed
+
+    # --- 예열 ---
+    def candidates(self) -> list[list[dict]]:
+        """예열할 아이템 목록들: 인기 아이템 하나씩, 그다음 인기 쌍 (쌍은 단일 아이템 결과 위에 점진 합성될 수 있음)"""
+        outfits = []
+        for row in get_popular_items(self.top_items, self.days):
+            outfits.append([{'type': row['item_type'], 'path': row['file_path']}])
+        for row in get_popular_item_pairs(self.top_pairs, self.days):
+            outfits.append([{'type': row['first_type'], 'path': row['first_path']},
+                            {'type': row['second_type'], 'path': row['second_path']}])
+        return [items for items in outfits if all(os.path.isfile(item['path']) for item in items)]
+
+    def warm(self, reason: str = 'manual', model_key: str = None) -> dict:
+        """
+        인기 아이템/쌍을 현재 활성 베이스 모델로 합성해 캐시에 넣습니다. 이미 캐시에 있는 조합은 건너뜁니다.
+        같은 노드의 다른 워커가 예열 중이면 바로 반환합니다. (블로킹 - 백그라운드 스레드에서 호출)
+
+        Args:
+            reason (str): 예열 사유 ('manual', 'startup', 'active model changed', 'off-peak')
+            model_key (str, optional): 예열할 활성 모델 키. 지정하면 잠금을 얻은 뒤 다른 워커가 이미 예열했는지 다시 확인하고,
+                예열을 마치면 공유 상태에 기록합니다.
+
+        Returns:
+            dict: {'warmed', 'cached', 'failed', 'candidates', 'seconds'} 또는 {'skipped': 사유}
+        """
+        if not self.enabled or self._app is None:
+            return {'skipped': 'disabled'}
+        if not outfit_cache.policy.enabled or not outfit_cache.policy.reuse_exact:
+            return {'skipped': 'outfit cache disabled'}
+        lock_file = self._try_lock()
+        if lock_file is False:
+            return {'skipped': 'another worker is warming'}
+        if model_key and reason != 'manual' and self._due(model_key, *self._read_shared_state()) is None:
+            self._unlock(lock_file)
+            return {'skipped': 'already warmed by another worker'}
+
+        from app.services.synthesis_service import (
+            SynthesisError, asynthesize_outfit, check_request_budget, cleanup_temp_files, resolve_base_model_path
+        )
+        app = self._app
+        start = time.perf_counter()
+        result = {'warmed': 0, 'cached': 0, 'failed': 0, 'candidates': 0}
+        temp_files = []
+        self._status.update(running=True, last_reason=reason)
+        try:
+            with app.app_context():
+                base_path = resolve_base_model_path(None, temp_files)
+                model_name = model_registry.resolve('synthesize')
+                outfits = self.candidates()
+                result['candidates'] = len(outfits)
+                print(f"[Cache Warmer] 예열 시작 ({reason}): 후보 {len(outfits)}개")
+                for items in outfits:
+                    if self._stop_event.is_set():
+                        break
+                    try:
+                        estimate = check_request_budget(base_path, items)
+                    except SynthesisError:
+                        result['failed'] += 1
+                        continue
+                    if find_outfit_prefixes([prefix_keys(model_name, base_path, items, None,
+                                                         estimate['max_image_side'])[-1]]):
+                        result['cached'] += 1
+                        continue
+                    deadline = app.config.get('SYNTH_JOB_DEADLINE', 120)
+
+                    async def _warm_one(items=items, max_side=estimate['max_image_side']):
+                        with ai_deadline(deadline):
+                            return await asynthesize_outfit(app.config.get('AI_CLIENT'), base_path, items, max_side)
+
+                    try:
+                        future = job_queue.submit(f"warm-{int(time.time() * 1000)}", _warm_one, priority='low')
+                        ok = bool(future.result(timeout=deadline + 60))
+                    except Exception as e:
+                        print(f"[Cache Warmer] 예열 합성 실패 ({', '.join(item['type'] for item in items)}): {e}")
+                        ok = False
+                    result['warmed' if ok else 'failed'] += 1
+                    metrics.increment('cache_warm_syntheses', outcome='ok' if ok else 'failed')
+        except SynthesisError as e:
+            print(f"[Cache Warmer] 예열 중단: {e.message}")
+            result['error'] = e.message
+        finally:
+            cleanup_temp_files(temp_files)
+            if model_key and 'error' not in result and not self._stop_event.is_set():
+                self._write_shared_state(model_key, datetime.now().date())
+            self._unlock(lock_file)
+            result['seconds'] = round(time.perf_counter() - start, 1)
+            self._status.update(running=False, last_run=datetime.now().isoformat(timespec='seconds'), last_result=result)
+        print(f"[Cache Warmer] 예열 완료 ({reason}): 합성 {result['warmed']}개, 이미 캐시됨 {result['cached']}개, "
+              f"실패 {result['failed']}개, {result['seconds']}초")
+        return result
+
+    @staticmethod
+    def _lock_path() -> str:
+        return os.path.join(tempfile.gettempdir(), 'cache_warmer.lock')
+
+    def _read_shared_state(self) -> tuple:
+        """잠금 파일에 기록된 (마지막 예열 모델 키, 날짜). 없거나 읽을 수 없으면 (None, None)"""
+        try:
+            with open(self._lock_path()) as f:
+                model_key, _, warm_date = f.read().strip().rpartition('\t')
+            return (model_key, datetime.strptime(warm_date, '%Y-%m-%d').date()) if model_key else (None, None)
+        except (OSError, ValueError):
+            return None, None
+
+    def _write_shared_state(self, model_key: str, warm_date) -> None:
+        """예열한 모델 키와 날짜를 잠금 파일에 기록합니다. (잠금을 가진 상태에서 호출)"""
+        try:
+            with open(self._lock_path(), 'r+' if os.path.exists(self._lock_path()) else 'w') as f:
+                f.truncate(0)
+                f.write(f"{model_key}\t{warm_date.isoformat()}")
+        except OSError as e:
+            print(f"[Cache Warmer] 경고: 예열 상태 기록 실패 - {e}")
+
+    def _try_lock(self):
+        if fcntl is None:
+            return None
+        lock_file = open(self._lock_path(), 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return lock_file
+        except OSError:
+            lock_file.close()
+            return False
+
+    def _unlock(self, lock_file) -> None:
+        if lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    # --- 스케줄러 ---
+    def in_off_peak(self, now: datetime = None) -> bool:
+        if self.hours is None:
+            return True
+        hour = (now or datetime.now()).hour
+        start, end = self.hours
+        return start <= hour < end if start <= end else (hour >= start or hour < end)
+
+    def _model_key(self) -> str | None:
+        active = get_active_base_model()
+        if not active:
+            return None
+        return f"{active.get('id')}:{active.get('image_url')}:{model_registry.resolve('synthesize')}"
+
+    def _due(self, model_key: str, last_model_key: str | None, last_warm_date) -> str | None:
+        """마지막 예열 기록에 비춰 지금 예열해야 하는 사유, 필요 없으면 None"""
+        if model_key != last_model_key:
+            return 'startup' if last_model_key is None else 'active model changed'
+        if self.in_off_peak() and last_warm_date != datetime.now().date():
+            return 'off-peak'
+        return None
+
+    def check(self) -> dict | None:
+        """활성 모델이 바뀌었거나 예열 시간대의 첫 확인이면 예열합니다. (다른 워커의 예열 기록 포함)"""
+        model_key = self._model_key()
+        if model_key is None:
+            return None
+        shared_model_key, shared_date = self._read_shared_state()
+        if shared_model_key is not None:
+            self._last_model_key, self._last_warm_date = shared_model_key, shared_date
+        if self._manual_requested:
+            self._manual_requested = False
+            reason = 'manual'
+        else:
+            reason = self._due(model_key, self._last_model_key, self._last_warm_date)
+            if reason is None:
+                return None
+        result = self.warm(reason, model_key)
+        if 'skipped' not in result and 'error' not in result:
+            self._last_model_key, self._last_warm_date = model_key, datetime.now().date()
+        return result
+
+    def notify_model_changed(self) -> None:
+        """활성 베이스 모델 변경 직후 (관리자 API) 다음 확인 주기를 기다리지 않고 확인하도록 깨웁니다."""
+        self._wake_event.set()
+
+    def request_warm(self) -> bool:
+        """시간대와 관계없이 다음 확인에서 예열하도록 요청합니다. (관리자 API, 사용 중이 아니면 False)"""
+        if not self.enabled or not (self._thread and self._thread.is_alive()):
+            return False
+        self._manual_requested = True
+        self._wake_event.set()
+        return True
+
+    def start(self, app) -> None:
+        self._app = app
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+
+        def _loop():
+            while not self._stop_event.is_set():
+                try:
+                    self.check()
+                except Exception as e:
+                    print(f"[Cache Warmer] 경고: 예열 확인 중 오류 - {e}")
+                self._wake_event.wait(self.check_interval)
+                self._wake_event.clear()
+
+        self._thread = threading.Thread(target=_loop, name='cache-warmer', daemon=True)
+        self._thread.start()
+        print(f"[Cache Warmer] 백그라운드 예열 시작 (확인 주기 {self.check_interval:.0f}초)")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._wake_event.set()
+
+    def status(self) -> dict:
+        """관리자 화면용 현황 (현재 워커 프로세스 기준)"""
+        return dict(self._status, enabled=self.enabled, top_items=self.top_items, top_pairs=self.top_pairs,
+                    hours=f"{self.hours[0]}-{self.hours[1]}" if self.hours else None)
+
+
+# 애플리케이션 전역 예열기
+cache_warmer = CacheWarmer()
+
+
+def init_cache_warmer(app) -> CacheWarmer:
+    """
+    환경 변수로 인기 아이템 사용 기록과 캐시 예열을 설정합니다. (점진적 합성 캐시가 꺼져 있으면 사용하지 않음)
+    CACHE_WARM_ENABLED: 사용 여부 (기본 false)
+    CACHE_WARM_TOP_ITEMS / CACHE_WARM_TOP_PAIRS: 예열할 인기 아이템 / 아이템 쌍 수 (기본 20 / 10)
+    CACHE_WARM_DAYS: 인기도 집계 기간(일, 기본 30) - 이 기간 동안 사용되지 않은 아이템 기록/보관 이미지는 삭제
+    CACHE_WARM_HOURS: 예정된 예열 시간대 (서버 현지 시각, 기본 '2-6', 비우면 제한 없음)
+    CACHE_WARM_CHECK_INTERVAL: 활성 모델 변경/시간대 확인 주기(초, 기본 300)
+    CACHE_WARM_ITEM_FOLDER: 예열용 아이템 이미지 보관 폴더 (기본 <프로젝트>/warm_items)
+    """
+    enabled = os.getenv('CACHE_WARM_ENABLED', 'false').lower() == 'true'
+    if enabled and not (outfit_cache.policy.enabled and outfit_cache.policy.reuse_exact):
+        print(" * 경고: 점진적 합성 캐시(동일 코디 재사용)가 꺼져 있어 캐시 예열을 사용하지 않습니다.")
+        enabled = False
+    folder = os.getenv('CACHE_WARM_ITEM_FOLDER') or \
+        os.path.join(os.path.dirname(app.config['OUTPUT_FOLDER']), 'warm_items')
+    if enabled:
+        try:
+            os.makedirs(folder, exist_ok=True)
+        except OSError as e:
+            print(f" * 오류: 예열 아이템 폴더 생성 실패 - {e} (캐시 예열 미사용)")
+            enabled = False
+    cache_warmer.configure(
+        enabled=enabled, item_folder=folder,
+        top_items=int(os.getenv('CACHE_WARM_TOP_ITEMS', '20')), top_pairs=int(os.getenv('CACHE_WARM_TOP_PAIRS', '10')),
+        days=int(os.getenv('CACHE_WARM_DAYS', '30')),
+        check_interval=float(os.getenv('CACHE_WARM_CHECK_INTERVAL', '300')))
+    cache_warmer.hours = parse_hours(os.getenv('CACHE_WARM_HOURS', '2-6'))
+    app.config['CACHE_WARM_ENABLED'] = enabled
+    if enabled:
+        print(f" * 캐시 예열: 인기 아이템 {cache_warmer.top_items}개 + 쌍 {cache_warmer.top_pairs}개 "
+              f"(시간대 {os.getenv('CACHE_WARM_HOURS', '2-6') or '제한 없음'}, 활성 모델 변경 시 즉시)")
+        if not app.config.get('DEFER_BACKGROUND_TASKS'): # 미루면 fork 된 워커에서 start_background_tasks() 로 시작
+            cache_warmer.start(app)
+    else:
+        print(" * 캐시 예열: 미사용")
+    return cache_warmer
@@ -0,0 +1,246 @@
+# app/services/classification_service.py
+# 아이템 분류 서비스: 지각 해시 캐시 조회 -> 로컬 CPU 분류기 -> (확신도 낮으면) AI 분류(일괄) -> 캐시 저장
+
+import asyncio
+from flask import current_app
+from PIL import Image
+import traceback
+
+from app.utils.ai_module import classify_item_type, classify_items_batch, aclassify_item_type
+from app.utils.image_hash import (
+    compute_image_hashes, hamming_distance, to_signed64, from_signed64
+)
+from app.utils.db_utils import (
+    find_classification_cache_candidates, add_classification_cache_entry,
+    record_classification_cache_hit
+)
+from app.utils.async_db import (
+    afind_classification_cache_candidates, aadd_classification_cache_entry, arecord_classification_cache_hit
+)
+from app.utils.metrics import metrics
+
+DEFAULT_MAX_DISTANCE = 3
+DEFAULT_LOCAL_MIN_CONFIDENCE = 0.85
+DEFAULT_BATCH_MAX = 5
+# 캐시/로컬 분류기로 분류하지 못했는데 AI 클라이언트가 없는 항목의 source (라우트에서 503)
+UNAVAILABLE = 'unavailable'
+
+
+def _max_distance() -> int:
+    """설정된 해밍 거리 임계값 (CLASSIFY_CACHE_MAX_DISTANCE)"""
+    return current_app.config.get('CLASSIFY_CACHE_MAX_DISTANCE', DEFAULT_MAX_DISTANCE)
+
+
+def lookup_cached_type(hashes: dict) -> str | None:
+    """
+    지각 해시로 분류 캐시를 조회합니다.
+    pHash 거리가 임계값 이하이고, dHash 거리가 임계값의 2배 이하인 가장 가까운 항목을 사용합니다.
+
+    Args:
+        hashes (dict): compute_image_hashes() 결과
+
+    Returns:
+        str or None: 캐시된 아이템 종류, 없으면 None
+    """
+    best = _closest_candidate(hashes, find_classification_cache_candidates(hashes['bands']))
+    if best is None:
+        return None
+    distance, entry = best
+    record_classification_cache_hit(entry['id'])
+    print(f"[Classify Service] 캐시 적중: type={entry['item_type']}, 거리={distance}")
+    return entry['item_type']
+
+
+def _closest_candidate(hashes: dict, candidates: list[dict]) -> tuple[int, dict] | None:
+    """임계값 안의 후보 중 pHash 거리가 가장 가까운 (거리, 후보)"""
+    max_distance = _max_distance()
+    best = None
+    for candidate in candidates:
+        p_dist = hamming_distance(hashes['phash'], from_signed64(candidate['phash']))
+        d_dist = hamming_distance(hashes['dhash'], from_signed64(candidate['dhash']))
+        if p_dist <= max_distance and d_dist <= max_distance * 2:
+            if best is None or p_dist < best[0]:
+                best = (p_dist, candidate)
+    return best
+
+
+def store_cached_type(hashes: dict, item_type: str) -> bool:
+    """AI 분류 결과를 캐시 테이블에 저장합니다."""
+    return add_classification_cache_entry(
+        to_signed64(hashes['phash']), to_signed64(hashes['dhash']), hashes['bands'], item_type
+    )
+
+
+def classify_locally(image_paths: list[str]) -> list[tuple[str, float] | None]:
+    """
+    앱 시작 시 로드된 로컬 분류기로 여러 이미지를 한 번에(배치) 분류합니다.
+
+    Returns:
+        list: 이미지별 (예측 종류, 보정된 확신도), 분류기가 없거나 오류 시 None
+    """
+    model = current_app.config.get('LOCAL_CLASSIFIER')
+    if model is None or not image_paths:
+        return [None] * len(image_paths)
+    try:
+        images = []
+        for image_path in image_paths:
+            with Image.open(image_path) as img_fp:
+                images.append(img_fp.copy())
+        return model.predict(images)
+    except Exception as e:
+        print(f"[Classify Service] 경고: 로컬 분류 실패 - {e}")
+        return [None] * len(image_paths)
+
+
+def classify_images(client, image_paths: list[str]) -> list[dict]:
+    """
+    여러 아이템 이미지를 분류합니다. 단계별로 남은 이미지만 다음 단계로 넘깁니다.
+      1) 지각 해시 캐시 (AI 호출 없음)
+      2) 로컬 CPU 분류기 (배치 추론, 확신도 임계값 이상만 채택)
+      3) AI 일괄 분류 (CLASSIFY_BATCH_MAX 개씩 한 번의 호출, 응답 형식이 잘못되면 개별 호출로 전환)
+    AI 분류 결과만 캐시에 저장합니다. AI 클라이언트가 없으면 3단계까지 남은 이미지는 source 가 'unavailable' 입니다.
+
+    Args:
+        client (genai.Client): 초기화된 Google AI 클라이언트 객체. (None 이면 캐시/로컬 분류만)
+        image_paths (list[str]): 분류할 이미지 파일 경로 리스트.
+
+    Returns:
+        list[dict]: 입력 순서대로 {'item_type': str | None, 'source': 'cache' | 'local' | 'model' | 'unavailable' | None}
+    """
+    results = [{'item_type': None, 'source': None} for _ in image_paths]
+    hashes_list = [None] * len(image_paths)
+
+    # --- 1. 캐시 조회 ---
+    pending = []
+    for index, image_path in enumerate(image_paths):
+        if current_app.config.get('CLASSIFY_CACHE_ENABLED', True):
+            try:
+                hashes_list[index] = compute_image_hashes(image_path)
+                cached_type = lookup_cached_type(hashes_list[index])
+                if cached_type:
+                    metrics.increment('classify_cache_lookups', result='hit')
+                    metrics.increment('classify_source', source='cache')
+                    results[index] = {'item_type': cached_type, 'source': 'cache'}
+                    continue
+                metrics.increment('classify_cache_lookups', result='miss')
+            except Exception as e:
+                # 캐시 오류는 분류 자체를 막지 않음
+                print(f"[Classify Service] 경고: 분류 캐시 조회 실패 - {e}")
+                traceback.print_exc()
+                metrics.increment('classify_cache_lookups', result='error')
+        pending.append(index)
+
+    # --- 2. 로컬 분류기 ---
+    if pending:
+        min_confidence = current_app.config.get('LOCAL_CLASSIFIER_MIN_CONFIDENCE', DEFAULT_LOCAL_MIN_CONFIDENCE)
+        local_results = classify_locally([image_paths[i] for i in pending])
+        still_pending = []
+        for index, local_result in zip(pending, local_results):
+            if local_result and local_result[1] >= min_confidence:
+                print(f"[Classify Service] 로컬 분류 사용: type={local_result[0]}, 확신도={local_result[1]:.2f}")
+                metrics.increment('classify_source', source='local')
+                results[index] = {'item_type': local_result[0], 'source': 'local'}
+            else:
+                if local_result:
+                    print(f"[Classify Service] 로컬 확신도 낮음 ({local_result[0]}, {local_result[1]:.2f} < {min_confidence}) - AI 분류로 전환")
+                still_pending.append(index)
+        pending = still_pending
+
+    # --- 3. AI 분류 (일괄 -> 실패 시 개별) ---
+    if pending and client is None:
+        print(f"[Classify Service] AI 클라이언트 없음 - 이미지 {len(pending)}개 분류 불가")
+        for index in pending:
+            results[index] = {'item_type': None, 'source': UNAVAILABLE}
+        return results
+    batch_max = max(1, current_app.config.get('CLASSIFY_BATCH_MAX', DEFAULT_BATCH_MAX))
+    for chunk_start in range(0, len(pending), batch_max):
+        chunk = pending[chunk_start:chunk_start + batch_max]
+        batch_types = None
+        if len(chunk) > 1:
+            batch_types = classify_items_batch(client, [image_paths[i] for i in chunk])
+            if batch_types is None:
+                print("[Classify Service] 일괄 분류 응답 오류 - 개별 분류로 전환")
+                metrics.increment('classify_batch_calls', result='fallback')
+            else:
+                metrics.increment('classify_batch_calls', result='ok')
+        for position, index in enumerate(chunk):
+            detected_type = batch_types[position] if batch_types else None
+            if detected_type is None:
+                detected_type = classify_item_type(client, image_paths[index])
+            metrics.increment('classify_source', source='model' if detected_type else 'failed')
+            results[index] = {'item_type': detected_type, 'source': 'model' if detected_type else None}
+            if detected_type and hashes_list[index]:
+                store_cached_type(hashes_list[index], detected_type)
+
+    return results
+
+
+def classify_image(client, image_path: str) -> str | None:
+    """
+    아이템 이미지 한 장을 분류합니다. (classify_images 의 단일 이미지 버전)
+
+    Args:
+        client (genai.Client): 초기화된 Google AI 클라이언트 객체.
+        image_path (str): 분류할 이미지 파일 경로.
+
+    Returns:
+        str or None: 아이템 종류 (예: 'top'), 실패 시 None
+    """
+    return classify_images(client, [image_path])[0]['item_type']
+
+
+async def aclassify_image(client, image_path: str) -> dict:
+    """
+    classify_images(client, [image_path])[0] 의 비동기 버전 (비동기 라우트용). 캐시 조회/저장은 비동기 DB 로,
+    해시 계산과 로컬 분류는 스레드에서, AI 분류는 비동기 클라이언트로 await 하므로 AI 응답을 기다리는 동안
+    스레드를 차지하지 않습니다. (Flask 앱 컨텍스트 안에서 호출)
+
+    Returns:
+        dict: {'item_type': str | None, 'source': 'cache' | 'local' | 'model' | 'unavailable' | None}
+    """
+    hashes = None
+    if current_app.config.get('CLASSIFY_CACHE_ENABLED', True):
+        try:
+            hashes = await asyncio.to_thread(compute_image_hashes, image_path)
+            best = _closest_candidate(hashes, await afind_classification_cache_candidates(hashes['bands']))
+            if best is not None:
+                distance, entry = best
+                await arecord_classification_cache_hit(entry['id'])
+                print(f"[Classify Service] 캐시 적중: type={entry['item_type']}, 거리={distance}")
+                metrics.increment('classify_cache_lookups', result='hit')
+                metrics.increment('classify_source', source='cache')
+                return {'item_type': entry['item_type'], 'source': 'cache'}
+            metrics.increment('classify_cache_lookups', result='miss')
+        except Exception as e:
+            print(f"[Classify Service] 경고: 분류 캐시 조회 실패 - {e}")
+            metrics.increment('classify_cache_lookups', result='error')
+
+    min_confidence = current_app.config.get('LOCAL_CLASSIFIER_MIN_CONFIDENCE', DEFAULT_LOCAL_MIN_CONFIDENCE)
+    local_result = (await asyncio.to_thread(classify_locally, [image_path]))[0]
+    if local_result and local_result[1] >= min_confidence:
+        print(f"[Classify Service] 로컬 분류 사용: type={local_result[0]}, 확신도={local_result[1]:.2f}")
+        metrics.increment('classify_source', source='local')
+        return {'item_type': local_result[0], 'source': 'local'}
+
+    if client is None:
+        print("[Classify Service] AI 클라이언트 없음 - 분류 불가")
+        return {'item_type': None, 'source': UNAVAILABLE}
+    detected_type = await aclassify_item_type(client, image_path)
+    metrics.increment('classify_source', source='model' if detected_type else 'failed')
+    if detected_type and hashes:
+        await aadd_classification_cache_entry(to_signed64(hashes['phash']), to_signed64(hashes['dhash']),
+                                              hashes['bands'], detected_type)
+    return {'item_type': detected_type, 'source': 'model' if detected_type else None}
+
+
+def get_cache_hit_rate() -> dict:
+    """
+    현재 프로세스의 분류 캐시 적중률을 반환합니다.
+
+    Returns:
+        dict: {'hits': int, 'misses': int, 'hit_rate': float | None}
+    """
+    hits = int(metrics.get_counter('classify_cache_lookups', result='hit'))
+    misses = int(metrics.get_counter('classify_cache_lookups', result='miss'))
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': (hits / total) if total else None}
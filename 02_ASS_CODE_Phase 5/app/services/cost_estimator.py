@@ -0,0 +1,179 @@
+# app/services/cost_estimator.py
+# 합성 요청 사전(pre-flight) 비용 추정
+# 이미지 크기와 아이템 수만으로 모델 입력 토큰/요청 바이트를 추정하여, 요청별 한도(예산)를 넘는 요청은
+# 모델에 보내기 전에 거절하거나 이미지 크기를 줄여(downscale) 한도 안으로 맞춥니다.
+# 추정값은 클라이언트에도 반환되어 UI 가 업로드 전에 미리 경고할 수 있습니다.
+
+import math
+import os
+
+# Gemini 이미지 토큰 규칙: 두 변이 모두 384px 이하이면 258 토큰,
+# 그보다 크면 짧은 변/1.5 (256~768px) 크기 타일로 나눠 타일당 258 토큰
+TOKENS_PER_TILE = 258
+SMALL_IMAGE_MAX_SIDE = 384
+MIN_TILE_SIDE, MAX_TILE_SIDE = 256, 768
+
+# 사진을 PNG 로 인코딩했을 때의 대략적인 픽셀당 바이트 (RGB 원본 3바이트의 약 55%)
+PNG_BYTES_PER_PIXEL = 1.6
+
+# 합성 프롬프트 텍스트 길이 추정 (고정 지시문 + 아이템당 한 줄), 텍스트 약 4자당 1토큰
+PROMPT_BASE_CHARS = 450
+PROMPT_CHARS_PER_ITEM = 50
+CHARS_PER_TOKEN = 4
+
+# 출력 이미지 1장의 토큰 수 (이미지 생성 모델 기준)
+OUTPUT_IMAGE_TOKENS = 1290
+
+# 한도 초과 시 차례로 시도할 최대 변 길이(px)
+DOWNSCALE_STEPS = (2048, 1536, 1024, 768, 512)
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """이미지 한 장의 입력 토큰 수를 추정합니다."""
+    if width <= SMALL_IMAGE_MAX_SIDE and height <= SMALL_IMAGE_MAX_SIDE:
+        return TOKENS_PER_TILE
+    tile = min(MAX_TILE_SIDE, max(MIN_TILE_SIDE, int(min(width, height) / 1.5)))
+    return math.ceil(width / tile) * math.ceil(height / tile) * TOKENS_PER_TILE
+
+
+def estimate_image_bytes(width: int, height: int) -> int:
+    """PNG 로 인코딩된 이미지 한 장의 요청 바이트를 추정합니다."""
+    return int(width * height * PNG_BYTES_PER_PIXEL)
+
+
+def scale_to_max_side(size: tuple[int, int], max_side: int | None) -> tuple[int, int]:
+    """PIL thumbnail 과 같은 방식으로 (가로, 세로)를 긴 변이 max_side 이하가 되도록 줄입니다."""
+    width, height = size
+    if not max_side or max(width, height) <= max_side:
+        return width, height
+    ratio = max_side / max(width, height)
+    return max(1, round(width * ratio)), max(1, round(height * ratio))
+
+
+def estimate_request(image_sizes: list[tuple[int, int]], max_image_side: int = None) -> dict:
+    """
+    합성 요청(베이스 + 아이템 이미지들) 하나의 입력 토큰/요청 바이트를 추정합니다.
+
+    Args:
+        image_sizes (list[tuple]): [(가로, 세로)], 첫 번째는 베이스 모델 이미지
+        max_image_side (int, optional): 모든 이미지를 이 크기 이하로 줄였을 때를 추정
+
+    Returns:
+        dict: {'input_tokens', 'output_tokens', 'request_bytes', 'item_count', 'images': [{'width','height','tokens','bytes'}]}
+    """
+    images = []
+    for size in image_sizes:
+        width, height = scale_to_max_side(size, max_image_side)
+        images.append({'width': width, 'height': height,
+                       'tokens': estimate_image_tokens(width, height),
+                       'bytes': estimate_image_bytes(width, height)})
+    item_count = max(0, len(image_sizes) - 1)
+    prompt_chars = PROMPT_BASE_CHARS + PROMPT_CHARS_PER_ITEM * item_count
+    return {
+        'input_tokens': sum(image['tokens'] for image in images) + prompt_chars // CHARS_PER_TOKEN,
+        'output_tokens': OUTPUT_IMAGE_TOKENS,
+        'request_bytes': sum(image['bytes'] for image in images) + prompt_chars,
+        'item_count': item_count,
+        'images': images,
+    }
+
+
+class RequestBudget:
+    """
+    요청별 한도.
+
+    Args:
+        max_input_tokens (int): 입력 토큰 한도 (0 이면 제한 없음)
+        max_request_bytes (int): 요청 바이트 한도 (0 이면 제한 없음)
+        max_items (int): 아이템 수 한도
+        mode (str): 한도 초과 시 'downscale'(이미지 축소 후 진행) 또는 'reject'(거절)
+    """
+
+    def __init__(self, max_input_tokens: int = 0, max_request_bytes: int = 0, max_items: int = 0,
+                 mode: str = 'downscale'):
+        self.max_input_tokens = max_input_tokens
+        self.max_request_bytes = max_request_bytes
+        self.max_items = max_items
+        self.mode = mode
+
+    @classmethod
+    def from_config(cls, config) -> 'RequestBudget':
+        return cls(config.get('SYNTH_MAX_INPUT_TOKENS', 0), config.get('SYNTH_MAX_REQUEST_BYTES', 0),
+                   config.get('SYNTH_MAX_ITEMS', 0), config.get('SYNTH_BUDGET_MODE', 'downscale'))
+
+    def violations(self, estimate: dict) -> list[str]:
+        """추정값이 넘는 한도 목록 ('input_tokens', 'request_bytes')"""
+        exceeded = []
+        if self.max_input_tokens and estimate['input_tokens'] > self.max_input_tokens:
+            exceeded.append('input_tokens')
+        if self.max_request_bytes and estimate['request_bytes'] > self.max_request_bytes:
+            exceeded.append('request_bytes')
+        return exceeded
+
+    def as_dict(self) -> dict:
+        return {'max_input_tokens': self.max_input_tokens, 'max_request_bytes': self.max_request_bytes,
+                'max_items': self.max_items, 'mode': self.mode}
+
+
+def plan_request(image_sizes: list[tuple[int, int]], budget: RequestBudget, prices: tuple = None) -> dict:
+    """
+    요청을 한도와 비교하여 처리 방법을 정합니다.
+
+    Args:
+        image_sizes (list[tuple]): [(가로, 세로)], 첫 번째는 베이스 모델 이미지
+        budget (RequestBudget): 요청별 한도
+        prices (tuple, optional): (입력, 출력) 100만 토큰당 USD - 지정하면 예상 비용 포함
+
+    Returns:
+        dict: 추정값(estimate_request) + {
+            'action': 'ok' | 'downscale' | 'reject',
+            'max_image_side': 축소할 최대 변 길이 (downscale 일 때),
+            'original': 축소 전 추정값 요약 (downscale/reject 일 때),
+            'exceeded': 넘은 한도 목록, 'budget': 한도, 'estimated_cost_usd': 예상 비용 }
+    """
+    original = estimate_request(image_sizes)
+    plan = dict(original, action='ok', max_image_side=None, exceeded=[], budget=budget.as_dict())
+
+    if budget.max_items and original['item_count'] > budget.max_items:
+        plan.update(action='reject', exceeded=['items'])
+    else:
+        exceeded = budget.violations(original)
+        if exceeded:
+            plan.update(action='reject', exceeded=exceeded)
+            if budget.mode == 'downscale':
+                largest_side = max((max(size) for size in image_sizes), default=0)
+                for side in DOWNSCALE_STEPS:
+                    if side >= largest_side:
+                        continue
+                    scaled = estimate_request(image_sizes, max_image_side=side)
+                    if not budget.violations(scaled):
+                        plan.update(scaled, action='downscale', max_image_side=side)
+                        break
+        if plan['action'] != 'ok':
+            plan['original'] = {'input_tokens': original['input_tokens'], 'request_bytes': original['request_bytes']}
+
+    if prices:
+        plan['estimated_cost_usd'] = round(
+            (plan['input_tokens'] * prices[0] + plan['output_tokens'] * prices[1]) / 1_000_000, 6)
+    return plan
+
+
+def init_request_budget(app) -> RequestBudget:
+    """
+    환경 변수로 요청별 한도를 설정합니다.
+    SYNTH_MAX_INPUT_TOKENS: 요청당 입력 토큰 한도 (기본 12000, 0 이면 제한 없음)
+    SYNTH_MAX_REQUEST_BYTES: 요청당 바이트 한도 (기본 18MB - Gemini 인라인 요청 한도 20MB 보다 작게)
+    SYNTH_MAX_ITEMS: 요청당 아이템 수 한도 (기본 6)
+    SYNTH_BUDGET_MODE: 한도 초과 시 'downscale'(기본) 또는 'reject'
+    """
+    app.config['SYNTH_MAX_INPUT_TOKENS'] = int(os.getenv('SYNTH_MAX_INPUT_TOKENS', '12000'))
+    app.config['SYNTH_MAX_REQUEST_BYTES'] = int(os.getenv('SYNTH_MAX_REQUEST_BYTES', str(18 * 1024 * 1024)))
+    app.config['SYNTH_MAX_ITEMS'] = int(os.getenv('SYNTH_MAX_ITEMS', '6'))
+    app.config['SYNTH_BUDGET_MODE'] = os.getenv('SYNTH_BUDGET_MODE', 'downscale').lower()
+    if app.config['SYNTH_BUDGET_MODE'] not in ('downscale', 'reject'):
+        print(f" * 경고: 알 수 없는 SYNTH_BUDGET_MODE '{app.config['SYNTH_BUDGET_MODE']}' - 'downscale' 사용")
+        app.config['SYNTH_BUDGET_MODE'] = 'downscale'
+    budget = RequestBudget.from_config(app.config)
+    print(f" * 합성 요청 한도: 입력 토큰 {budget.max_input_tokens or '무제한'}, "
+          f"요청 {budget.max_request_bytes / 1048576:.0f}MB, 아이템 {budget.max_items or '무제한'}개 (초과 시 {budget.mode})")
+    return budget
@@ -0,0 +1,239 @@
+# app/services/idempotency.py
+# 합성 요청 멱등 키 (Idempotency-Key 헤더)
+# 네트워크 재전송이나 중복 클릭으로 같은 합성 요청이 다시 와도 모델 호출과 사용량 차감을 반복하지 않고 처음 요청의 응답을 돌려줍니다.
+# - 처음 요청: 키를 'in_progress' 로 선점하고 처리한 뒤 응답을 저장 (5xx/429 는 키를 지워 같은 키로 다시 시도 가능)
+# - 진행 중에 온 재요청: 처음 요청이 끝날 때까지 기다렸다가 같은 응답 (IDEMPOTENCY_WAIT_SECONDS 를 넘기면 409)
+# - 끝난 뒤 온 재요청: 저장된 응답 (Idempotent-Replayed: true 헤더)
+# - 같은 키로 내용이 다른 요청: 422
+# - 처리하던 워커가 죽은 키: 선점(lease, IDEMPOTENCY_LEASE_SECONDS)이 만료되면 기다리던/새로 온 같은 요청이 이어받아 처리
+# 스트리밍 응답(NDJSON)은 끝까지 보낸 내용을 모아 저장하고, 중간에 연결이 끊기면 키를 지웁니다.
+# 처리 중인 키의 선점은 워커 프로세스마다 하나인 백그라운드 스레드가 주기적으로 연장합니다.
+
+import os
+import hashlib
+import threading
+import time
+import uuid
+from functools import wraps
+
+from flask import current_app, jsonify, request, session
+
+from app.utils.db_utils import (
+    claim_idempotency_key, get_idempotency_key, complete_idempotency_key, release_idempotency_key,
+    renew_idempotency_leases, delete_expired_idempotency_keys
+)
+from app.utils.metrics import metrics
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# 응답을 저장하지 않고 키를 지우는 상태 코드 (같은 키로 다시 시도하면 새로 처리)
+RETRYABLE_STATUS = 429
+# 이 횟수만큼 키를 선점할 때마다 만료된 키 정리
+PRUNE_EVERY_CLAIMS = 200
+
+_claims = 0
+
+
+class LeaseRenewer:
+    """
+    이 워커 프로세스가 처리 중인 멱등 키의 선점을 lease_seconds / 3 마다 한 번의 UPDATE 로 연장합니다.
+    워커가 죽으면 연장이 멈춰 lease_seconds 뒤에 다른 요청이 키를 이어받을 수 있습니다.
+    """
+
+    def __init__(self, lease_seconds: float = 30.0):
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._leases = {} # (user_id, idem_key) -> lease_token
+        self._thread = None
+
+    def add(self, user_id: int, key: str, token: str) -> None:
+        with self._lock:
+            self._leases[(user_id, key)] = token
+            if self._thread is None or not self._thread.is_alive(): # fork 된 워커에서는 처음 선점할 때 시작
+                self._thread = threading.Thread(target=self._run, name='idempotency-lease', daemon=True)
+                self._thread.start()
+
+    def remove(self, user_id: int, key: str, token: str) -> None:
+        with self._lock:
+            if self._leases.get((user_id, key)) == token:
+                del self._leases[(user_id, key)]
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.lease_seconds / 3)
+            with self._lock:
+                leases = [(user_id, key, token) for (user_id, key), token in self._leases.items()]
+            if leases:
+                renew_idempotency_leases(leases, self.lease_seconds)
+
+
+# 워커 프로세스 전역 선점 연장기
+lease_renewer = LeaseRenewer()
+
+
+def request_fingerprint(endpoint: str) -> str:
+    """엔드포인트, 폼 필드, 업로드 파일 내용으로 요청 해시를 만듭니다. (파일 스트림은 처음 위치로 되돌림)"""
+    digest = hashlib.sha256(endpoint.encode())
+    for name in sorted(request.form):
+        for value in request.form.getlist(name):
+            digest.update(f"\n{name}={value}".encode())
+    for name in sorted(request.files):
+        for storage in request.files.getlist(name):
+            digest.update(f"\n{name}:{storage.filename}\n".encode())
+            for chunk in iter(lambda: storage.stream.read(1 << 20), b''):
+                digest.update(chunk)
+            storage.stream.seek(0)
+    return digest.hexdigest()
+
+
+def _replay(record: dict):
+    response = current_app.response_class(record['response_body'] or '', status=record['response_status'],
+                                          content_type=record['content_type'] or 'application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _wait_for_completion(user_id: int, key: str, timeout: float) -> dict | None:
+    """
+    진행 중인 처음 요청이 끝날 때까지 기다립니다. (다른 워커일 수 있으므로 DB 를 간격을 늘려 가며 조회)
+
+    Returns:
+        dict or None: 끝난 레코드, 시간 초과면 status 'in_progress' 레코드, 처음 요청이 실패해 키가 지워졌으면 None,
+                      처리하던 워커의 선점이 만료되었으면 lease_expired 가 True 인 레코드 (이어받아 처리)
+    """
+    deadline = time.monotonic() + timeout
+    interval = 0.2
+    record = {'status': 'in_progress'}
+    while time.monotonic() < deadline:
+        time.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+        interval = min(interval * 1.5, 2.0)
+        record = get_idempotency_key(user_id, key)
+        if record is None or record['status'] == 'completed' or record.get('lease_expired'):
+            return record
+    return record
+
+
+def _release(user_id: int, key: str, token: str) -> None:
+    lease_renewer.remove(user_id, key, token)
+    release_idempotency_key(user_id, key, token)
+
+
+def _complete(user_id: int, key: str, token: str, response, body: str) -> None:
+    lease_renewer.remove(user_id, key, token)
+    if not complete_idempotency_key(user_id, key, token, response.status_code, body, response.content_type):
+        print(f"[Idempotency] 경고: 응답을 저장하지 못했습니다. (key={key}, 선점 만료 또는 DB 오류)")
+
+
+def _store(user_id: int, key: str, token: str, response):
+    """처음 요청의 응답을 키에 저장합니다. 스트리밍 응답은 끝까지 보낸 뒤에 저장합니다."""
+    if response.status_code >= 500 or response.status_code == RETRYABLE_STATUS:
+        _release(user_id, key, token)
+        return response
+    if not response.is_streamed:
+        _complete(user_id, key, token, response, response.get_data(as_text=True))
+        return response
+
+    inner = response.response
+    chunks = []
+    state = {'finished': False}
+
+    def generate():
+        try:
+            for chunk in inner:
+                chunks.append(chunk.encode() if isinstance(chunk, str) else chunk)
+                yield chunk
+            state['finished'] = True
+            _complete(user_id, key, token, response, b''.join(chunks).decode('utf-8'))
+        finally:
+            if hasattr(inner, 'close'):
+                inner.close()
+
+    def on_close():
+        if not state['finished']:
+            _release(user_id, key, token) # 끝까지 보내지 못함 - 같은 키로 다시 시도 가능
+
+    response.response = generate()
+    response.call_on_close(on_close)
+    return response
+
+
+def idempotent(endpoint: str):
+    """
+    라우트 데코레이터: Idempotency-Key 헤더가 있으면 같은 사용자의 같은 키 요청을 한 번만 처리합니다.
+    헤더가 없거나 DB 를 쓸 수 없으면 그대로 처리합니다. (login_required 안쪽에 적용)
+
+    Args:
+        endpoint (str): 키를 구분할 엔드포인트 이름 (다른 엔드포인트에 같은 키를 쓰면 422)
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            global _claims
+            key = request.headers.get(IDEMPOTENCY_HEADER, '').strip()
+            user_id = session.get('user_id')
+            if not key or user_id is None or not current_app.config.get('IDEMPOTENCY_ENABLED', True):
+                return view(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return jsonify({"error": f"{IDEMPOTENCY_HEADER} 는 최대 {MAX_KEY_LENGTH}자입니다."}), 400
+
+            request_hash = request_fingerprint(endpoint)
+            ttl_seconds = current_app.config.get('IDEMPOTENCY_TTL_HOURS', 24) * 3600
+            token = uuid.uuid4().hex
+            for _ in range(2): # 진행 중이던 처음 요청이 실패해 키가 지워지거나 선점이 만료되면 한 번 더 선점 시도
+                record = claim_idempotency_key(user_id, key, endpoint, request_hash, ttl_seconds,
+                                               token, lease_renewer.lease_seconds)
+                if record is None:
+                    print(f"[Idempotency] 경고: 멱등 키 저장소를 사용할 수 없어 그대로 처리합니다. (key={key})")
+                    return view(*args, **kwargs)
+                if record['claimed']:
+                    break
+                if record['endpoint'] != endpoint or record['request_hash'] != request_hash:
+                    metrics.increment('idempotent_requests', outcome='mismatch')
+                    return jsonify({"error": f"같은 {IDEMPOTENCY_HEADER} 로 다른 요청을 보낼 수 없습니다."}), 422
+                if record['status'] != 'completed':
+                    print(f"[Idempotency] 진행 중인 요청에 연결: key={key}")
+                    metrics.increment('idempotent_requests', outcome='attached')
+                    record = _wait_for_completion(user_id, key, current_app.config.get('IDEMPOTENCY_WAIT_SECONDS', 150))
+                    if record is None or record.get('lease_expired'):
+                        continue
+                    if record['status'] != 'completed':
+                        response = jsonify({"error": "같은 요청을 아직 처리 중입니다. 잠시 후 다시 시도해주세요."})
+                        response.headers['Retry-After'] = '5'
+                        return response, 409
+                print(f"[Idempotency] 저장된 응답 반환: key={key} (status={record['response_status']})")
+                metrics.increment('idempotent_requests', outcome='replayed')
+                return _replay(record)
+            else:
+                return jsonify({"error": "같은 요청을 처리하지 못했습니다. 잠시 후 다시 시도해주세요."}), 409
+
+            metrics.increment('idempotent_requests', outcome='first')
+            lease_renewer.add(user_id, key, token)
+            _claims += 1
+            if _claims % PRUNE_EVERY_CLAIMS == 0:
+                delete_expired_idempotency_keys()
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+            except BaseException:
+                _release(user_id, key, token)
+                raise
+            return _store(user_id, key, token, response)
+        return wrapper
+    return decorator
+
+
+def init_idempotency(app) -> None:
+    """
+    환경 변수로 합성 요청 멱등 키를 설정합니다.
+    IDEMPOTENCY_ENABLED: Idempotency-Key 헤더 처리 여부 (기본 true)
+    IDEMPOTENCY_TTL_HOURS: 키(와 저장한 응답) 유지 시간 (기본 24)
+    IDEMPOTENCY_WAIT_SECONDS: 진행 중인 처음 요청을 기다리는 최대 시간 (기본 150)
+    IDEMPOTENCY_LEASE_SECONDS: 처리 중인 키의 선점 유지 시간 (기본 30, 처리 중에는 1/3 마다 연장)
+    """
+    app.config['IDEMPOTENCY_ENABLED'] = os.getenv('IDEMPOTENCY_ENABLED', 'true').lower() == 'true'
+    app.config['IDEMPOTENCY_TTL_HOURS'] = float(os.getenv('IDEMPOTENCY_TTL_HOURS', '24'))
+    app.config['IDEMPOTENCY_WAIT_SECONDS'] = float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', '150'))
+    lease_renewer.lease_seconds = float(os.getenv('IDEMPOTENCY_LEASE_SECONDS', '30'))
+    if app.config['IDEMPOTENCY_ENABLED']:
+        print(f" * 합성 요청 멱등 키: 사용 ({IDEMPOTENCY_HEADER} 헤더, {app.config['IDEMPOTENCY_TTL_HOURS']:g}시간 유지)")
+    else:
+        print(" * 합성 요청 멱등 키: 미사용")
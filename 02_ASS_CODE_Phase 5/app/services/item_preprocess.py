@@ -0,0 +1,313 @@
+# app/services/item_preprocess.py
+# 아이템 이미지 전처리: 단색 배경 여백 자르기(trim)와 배경 평탄화(flatten) (NumPy 사용)
+# 상품 사진은 흰/단색 배경 여백이 넓은 경우가 많아, 여백까지 디코딩해 모델에 보내면 요청이 커지고 아이템 신호가 약해집니다.
+# 테두리 색으로 배경을 찾아 아이템 영역(+ 여유 padding)만 남기고, 테두리와 이어진 배경은 균일한 흰색으로 바꿉니다.
+# 같은 업로드는 내용 해시로 한 번만 처리하며, 결과 파일은 폴더 캐시에 보관합니다.
+
+import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image, ImageChops, ImageFilter, ImageOps
+
+from app.utils.metrics import metrics
+
+# 테두리 픽셀 중 이 비율 이상이 배경색과 비슷해야 단색 배경으로 봄
+BORDER_UNIFORM_RATIO = 0.85
+# 행/열에 아이템 픽셀이 이 비율 이상 있어야 아이템 영역으로 봄 (JPEG 잡음/먼지 무시)
+MIN_FOREGROUND_RATIO = 0.002
+# 잘라낸 영역이 원본 넓이의 이 비율 이상이면 자르지 않음 (이득이 작음)
+MIN_TRIM_GAIN = 0.95
+# 배경 연결 영역(flood fill)을 계산할 축소 마스크의 긴 변(px)
+MASK_MAX_SIDE = 192
+# 평탄화한 배경 색
+FLATTEN_COLOR = (255, 255, 255)
+# 투명 배경 판단용 알파 값
+ALPHA_THRESHOLD = 16
+JPEG_QUALITY = 92
+# 결과 버전 (알고리즘을 바꾸면 올려서 이전 캐시를 무시)
+PREPROCESS_VERSION = 1
+# 이 횟수만큼 처리할 때마다 오래된 캐시 파일 정리
+PRUNE_EVERY_RUNS = 200
+# 단색 배경이 아니어서 원본을 쓰는 업로드의 해시를 기억할 개수 (다시 디코딩하지 않도록)
+UNCHANGED_CACHE_SIZE = 1024
+
+
+def detect_background(pixels: np.ndarray, tolerance: int) -> np.ndarray | None:
+    """
+    테두리 픽셀로 단색 배경색을 찾습니다.
+
+    Args:
+        pixels (np.ndarray): (H, W, 3) uint8 RGB
+        tolerance (int): 배경색과의 채널별 최대 차이
+
+    Returns:
+        np.ndarray or None: 배경색 (3,), 테두리가 단색이 아니면 None
+    """
+    border = np.concatenate([pixels[0], pixels[-1], pixels[:, 0], pixels[:, -1]]).astype(np.int16)
+    color = np.median(border, axis=0)
+    uniform = (np.abs(border - color).max(axis=1) <= tolerance).mean()
+    return color.astype(np.int16) if uniform >= BORDER_UNIFORM_RATIO else None
+
+
+def foreground_bbox(foreground: np.ndarray, padding: float) -> tuple[int, int, int, int] | None:
+    """
+    아이템 픽셀 마스크의 경계 상자에 여유를 더합니다.
+
+    Args:
+        foreground (np.ndarray): (H, W) bool, True 가 아이템
+        padding (float): 경계 상자 긴 변 대비 여유 비율
+
+    Returns:
+        tuple or None: (left, top, right, bottom), 아이템이 없으면 None
+    """
+    height, width = foreground.shape
+    rows = np.flatnonzero(foreground.sum(axis=1) > max(1, width * MIN_FOREGROUND_RATIO))
+    cols = np.flatnonzero(foreground.sum(axis=0) > max(1, height * MIN_FOREGROUND_RATIO))
+    if rows.size == 0 or cols.size == 0:
+        return None
+    top, bottom, left, right = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+    pad = int(max(bottom - top, right - left) * padding)
+    return max(0, left - pad), max(0, top - pad), min(width, right + pad), min(height, bottom + pad)
+
+
+def border_connected(candidate: np.ndarray) -> np.ndarray:
+    """
+    배경 후보 마스크에서 테두리와 이어진 부분만 남깁니다. (흰 치마의 밝은 안쪽처럼 아이템 속 배경색은 제외)
+    축소한 마스크에서 4방향 팽창을 반복하는 flood fill 입니다.
+    """
+    reached = np.zeros_like(candidate)
+    reached[0], reached[-1], reached[:, 0], reached[:, -1] = candidate[0], candidate[-1], candidate[:, 0], candidate[:, -1]
+    while True:
+        grown = reached.copy()
+        grown[1:] |= reached[:-1]
+        grown[:-1] |= reached[1:]
+        grown[:, 1:] |= reached[:, :-1]
+        grown[:, :-1] |= reached[:, 1:]
+        grown &= candidate
+        if np.array_equal(grown, reached):
+            return reached
+        reached = grown
+
+
+def _background_distance(rgb: Image.Image, color: np.ndarray) -> np.ndarray:
+    """픽셀별 배경색과의 채널 최대 차이 (H, W) uint8 - 전체 해상도 연산이라 PIL(C) 로 계산"""
+    diff = ImageChops.difference(rgb, Image.new('RGB', rgb.size, tuple(int(c) for c in color)))
+    red, green, blue = diff.split()
+    return np.asarray(ImageChops.lighter(ImageChops.lighter(red, green), blue))
+
+
+def _flatten(pixels: np.ndarray, distance: np.ndarray, tolerance: int) -> np.ndarray:
+    """테두리와 이어진 배경을 FLATTEN_COLOR 로 바꾸고 경계는 부드럽게 섞습니다."""
+    height, width = distance.shape
+    scale = min(1.0, MASK_MAX_SIDE / max(height, width))
+    small_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    # 축소 시 칸 안의 최대 차이를 써야 가는 아이템 경계가 배경으로 새지 않음
+    small = Image.fromarray(distance).filter(ImageFilter.MaxFilter(3)).resize(small_size, Image.Resampling.BOX)
+    reached = border_connected(np.asarray(small) <= tolerance)
+    weight = Image.fromarray((reached * 255).astype(np.uint8)).resize((width, height), Image.Resampling.BILINEAR)
+    weight = np.asarray(weight.filter(ImageFilter.GaussianBlur(1)), dtype=np.float32) / 255
+    weight *= distance <= tolerance * 2 # 원본 해상도에서 배경과 확실히 다른 픽셀은 유지
+    flat = np.array(FLATTEN_COLOR, dtype=np.float32)
+    blended = pixels * (1 - weight[..., None]) + flat * weight[..., None]
+    return blended.round().astype(np.uint8)
+
+
+def trim_item_image(img: Image.Image, tolerance: int = 18, padding: float = 0.04,
+                    flatten: bool = True) -> tuple[Image.Image, dict] | None:
+    """
+    아이템 이미지의 단색(또는 투명) 배경 여백을 잘라내고, 필요하면 배경을 평탄화합니다.
+
+    Args:
+        img (Image.Image): 아이템 이미지
+        tolerance (int): 배경색과의 채널별 최대 차이 (JPEG 잡음 허용)
+        padding (float): 아이템 경계 상자 긴 변 대비 남길 여유 비율
+        flatten (bool): 배경을 FLATTEN_COLOR 로 평탄화
+
+    Returns:
+        tuple or None: (RGB 이미지, {'original': (w, h), 'size': (w, h), 'cropped': bool, 'flattened': bool}),
+                       배경을 찾지 못하면 None
+    """
+    img = ImageOps.exif_transpose(img)
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        rgba = np.asarray(img.convert('RGBA'))
+        alpha = rgba[..., 3]
+        if (np.concatenate([alpha[0], alpha[-1], alpha[:, 0], alpha[:, -1]]) < ALPHA_THRESHOLD).mean() < BORDER_UNIFORM_RATIO:
+            return None
+        foreground = alpha >= ALPHA_THRESHOLD
+        # 투명 배경은 흰 배경 위에 합친 것이 곧 평탄화
+        background = Image.new('RGBA', img.size, FLATTEN_COLOR + (255,))
+        pixels = np.asarray(Image.alpha_composite(background, img.convert('RGBA')).convert('RGB'))
+        distance = None
+    else:
+        rgb = img.convert('RGB')
+        pixels = np.asarray(rgb)
+        color = detect_background(pixels, tolerance)
+        if color is None:
+            return None
+        distance = _background_distance(rgb, color)
+        foreground = distance > tolerance
+
+    bbox = foreground_bbox(foreground, padding)
+    if bbox is None:
+        return None
+    left, top, right, bottom = bbox
+    cropped = (right - left) * (bottom - top) < pixels.shape[0] * pixels.shape[1] * MIN_TRIM_GAIN
+    if cropped:
+        pixels = pixels[top:bottom, left:right]
+        distance = distance[top:bottom, left:right] if distance is not None else None
+    flattened = flatten and distance is not None
+    if flattened:
+        pixels = _flatten(pixels, distance, tolerance)
+    return Image.fromarray(np.ascontiguousarray(pixels)), {
+        'original': img.size, 'size': (pixels.shape[1], pixels.shape[0]), 'cropped': cropped,
+        'flattened': flattened or distance is None}
+
+
+class ItemPreprocessor:
+    """
+    업로드 아이템 전처리기. 원본 내용 해시(+ 설정)로 결과 파일을 folder 에 캐시합니다.
+    (업로드 임시 파일과 달리 캐시 파일은 요청이 끝나도 남으며, ttl_hours 동안 쓰이지 않으면 삭제)
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.flatten = True
+        self.tolerance = 18
+        self.padding = 0.04
+        self.folder = None
+        self.ttl_hours = 72.0
+        self._lock = threading.Lock()
+        self._runs = 0
+        self._unchanged = OrderedDict() # 원본을 그대로 쓰는 업로드 해시 (프로세스 메모리)
+
+    def configure(self, enabled: bool = None, flatten: bool = None, tolerance: int = None, padding: float = None,
+                  folder: str = None, ttl_hours: float = None) -> None:
+        for name, value in (('enabled', enabled), ('flatten', flatten), ('tolerance', tolerance),
+                            ('padding', padding), ('folder', folder), ('ttl_hours', ttl_hours)):
+            if value is not None:
+                setattr(self, name, value)
+
+    def _cache_path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.folder, digest[:2], f"{digest}{ext}")
+
+    def process(self, path: str) -> str:
+        """
+        아이템 이미지를 전처리한 파일 경로를 반환합니다. 비활성화, 단색 배경이 아님, 오류 시에는 원본 경로 그대로.
+
+        Args:
+            path (str): 업로드한 아이템 이미지 경로
+
+        Returns:
+            str: 전처리 결과 파일 경로 (캐시) 또는 path
+        """
+        if not self.enabled or not self.folder:
+            return path
+        start = time.perf_counter()
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            settings = f"v{PREPROCESS_VERSION}:{self.tolerance}:{self.padding}:{self.flatten}"
+            digest = hashlib.sha256(settings.encode() + b'\n' + data).hexdigest()
+            with self._lock:
+                if digest in self._unchanged:
+                    self._unchanged.move_to_end(digest)
+                    metrics.increment('item_preprocess', result='unchanged')
+                    return path
+            # 결과 형식: JPEG 원본은 JPEG, 그 외(PNG 등)는 PNG
+            with Image.open(path) as img:
+                ext = '.jpg' if img.format == 'JPEG' else '.png'
+                cache_path = self._cache_path(digest, ext)
+                if os.path.isfile(cache_path):
+                    os.utime(cache_path) # 정리 기준(최근 사용 시각) 갱신
+                    metrics.increment('item_preprocess', result='cached')
+                    return cache_path
+                result = trim_item_image(img, self.tolerance, self.padding, self.flatten)
+            if result is None:
+                with self._lock:
+                    self._unchanged[digest] = True
+                    while len(self._unchanged) > UNCHANGED_CACHE_SIZE:
+                        self._unchanged.popitem(last=False)
+                metrics.increment('item_preprocess', result='unchanged')
+                return path
+            trimmed, info = result
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            temp_path = f"{cache_path}.{os.getpid()}.tmp"
+            if ext == '.jpg':
+                trimmed.save(temp_path, format='JPEG', quality=JPEG_QUALITY)
+            else:
+                trimmed.save(temp_path, format='PNG', optimize=True)
+            os.replace(temp_path, cache_path)
+        except Exception as e:
+            print(f"[Item Preprocess] 경고: 아이템 전처리 실패, 원본 사용 - {e}")
+            metrics.increment('item_preprocess', result='failed')
+            return path
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        saved = len(data) - os.path.getsize(cache_path)
+        metrics.increment('item_preprocess', result='trimmed')
+        metrics.observe('item_preprocess_ms', elapsed_ms)
+        metrics.observe('item_preprocess_saved_bytes', saved)
+        print(f"[Item Preprocess] {os.path.basename(path)}: {info['original']} -> {info['size']} "
+              f"(자르기 {'예' if info['cropped'] else '아니오'}, 배경 평탄화 {'예' if info['flattened'] else '아니오'}, "
+              f"{saved / 1024:+.0f}KB 절감, {elapsed_ms:.0f}ms)")
+
+        with self._lock:
+            self._runs += 1
+            prune = self._runs % PRUNE_EVERY_RUNS == 0
+        if prune:
+            self.prune()
+        return cache_path
+
+    def prune(self) -> int:
+        """ttl_hours 시간 동안 사용되지 않은 캐시 파일을 삭제합니다."""
+        removed = 0
+        cutoff = time.time() - self.ttl_hours * 3600
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                file_path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(file_path) < cutoff:
+                        os.remove(file_path)
+                        removed += 1
+                except OSError:
+                    pass
+        return removed
+
+
+# 애플리케이션 전역 아이템 전처리기
+item_preprocessor = ItemPreprocessor()
+
+
+def init_item_preprocess(app) -> ItemPreprocessor:
+    """
+    환경 변수로 아이템 이미지 전처리를 설정합니다.
+    ITEM_TRIM_ENABLED: 단색 배경 여백 자르기 사용 여부 (기본 true)
+    ITEM_TRIM_FLATTEN: 배경을 흰색으로 평탄화 (기본 true)
+    ITEM_TRIM_TOLERANCE: 배경색과의 채널별 최대 차이 (기본 18)
+    ITEM_TRIM_PADDING: 아이템 주변에 남길 여유 (경계 상자 긴 변 대비 비율, 기본 0.04)
+    ITEM_TRIM_FOLDER: 전처리 결과 캐시 폴더 (기본 <프로젝트>/item_cache)
+    ITEM_TRIM_TTL_HOURS: 이 시간 동안 사용되지 않은 결과 삭제 (기본 72)
+    """
+    enabled = os.getenv('ITEM_TRIM_ENABLED', 'true').lower() == 'true'
+    folder = os.getenv('ITEM_TRIM_FOLDER') or os.path.join(os.path.dirname(app.config['OUTPUT_FOLDER']), 'item_cache')
+    if enabled:
+        try:
+            os.makedirs(folder, exist_ok=True)
+        except OSError as e:
+            print(f" * 오류: 아이템 전처리 캐시 폴더 생성 실패 - {e} (전처리 미사용)")
+            enabled = False
+    item_preprocessor.configure(
+        enabled=enabled, flatten=os.getenv('ITEM_TRIM_FLATTEN', 'true').lower() == 'true',
+        tolerance=int(os.getenv('ITEM_TRIM_TOLERANCE', '18')), padding=float(os.getenv('ITEM_TRIM_PADDING', '0.04')),
+        folder=folder, ttl_hours=float(os.getenv('ITEM_TRIM_TTL_HOURS', '72')))
+    app.config['ITEM_TRIM_ENABLED'] = enabled
+    if enabled:
+        print(f" * 아이템 전처리: 여백 자르기{' + 배경 평탄화' if item_preprocessor.flatten else ''} "
+              f"(허용 차이 {item_preprocessor.tolerance}, 여유 {item_preprocessor.padding:.0%}, 폴더 {folder})")
+    else:
+        print(" * 아이템 전처리: 미사용")
+    return item_preprocessor
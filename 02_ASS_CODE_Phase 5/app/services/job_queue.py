@@ -0,0 +1,237 @@
+# app/services/job_queue.py
+# 비동기 합성 작업 큐
+# 워커 프로세스마다 asyncio 이벤트 루프 하나를 데몬 스레드에서 실행하고, 합성 작업(코루틴)을 그 루프에 올립니다.
+# 모델 호출은 SDK 비동기 클라이언트로 await 되므로, 호출마다 스레드를 쓰지 않고 프로세스당 수백 개의 호출을 동시에 진행할 수 있습니다.
+# 동시에 실행하는 작업 수는 세마포어(SYNTH_JOB_CONCURRENCY)로 제한하며, 나머지는 대기(queued) 상태로 순서를 기다립니다.
+# 낮은 우선순위(low) 작업(예: 추측 합성)은 별도 한도 안에서, 대기 중인 일반 작업이 없을 때만 시작합니다.
+
+import os
+import asyncio
+import threading
+import time
+from concurrent.futures import wait
+
+from app.utils.metrics import metrics
+
+# 완료된 작업의 메모리 상태 보관 시간(초) - DB 를 사용할 수 없을 때의 상태 조회용
+FINISHED_JOB_TTL = 3600
+
+
+class JobQueue:
+    """
+    asyncio 이벤트 루프 기반 작업 큐.
+    루프 스레드는 첫 submit() 때 시작합니다. (gunicorn preload 후 fork 된 워커에서는 워커마다 새로 시작)
+
+    Args:
+        max_concurrency (int): 동시에 실행할 최대 작업 수
+        max_low_priority (int): 동시에 실행할 최대 낮은 우선순위 작업 수 (max_concurrency 안에 포함)
+    """
+
+    def __init__(self, max_concurrency: int = 64, max_low_priority: int = 8):
+        self.max_concurrency = max_concurrency
+        self.max_low_priority = max_low_priority
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._pid = None
+        self._semaphore = None
+        self._low_semaphore = None
+        self._normal_idle = None # 대기 중인 일반 작업이 없으면 set
+        self._normal_waiting = 0
+        self._jobs = {} # job_id -> {'user_id', 'status', 'priority', 'result', 'error', 'created_at', 'finished_at'}
+        self._active = {} # 끝나지 않은 작업 Future -> 우선순위 (워커 종료 시 drain 용)
+
+    def configure(self, max_concurrency: int = None, max_low_priority: int = None) -> None:
+        if max_concurrency is not None:
+            self.max_concurrency = max_concurrency
+        if max_low_priority is not None:
+            self.max_low_priority = max_low_priority
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return self._loop
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._low_semaphore = asyncio.Semaphore(max(1, min(self.max_low_priority, self.max_concurrency)))
+                self._normal_idle = asyncio.Event()
+                self._normal_idle.set()
+                self._normal_waiting = 0
+                ready.set()
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=_run, name='synthesis-job-loop', daemon=True)
+            self._thread.start()
+            ready.wait()
+            self._loop, self._pid = loop, os.getpid()
+            print(f"[Job Queue] 이벤트 루프 시작 (PID={self._pid}, 최대 동시 작업 {self.max_concurrency}개)")
+            return loop
+
+    def submit(self, job_id: str, coro_factory, user_id: int = None, priority: str = 'normal'):
+        """
+        작업을 큐에 넣습니다.
+
+        Args:
+            job_id (str): 작업 ID
+            coro_factory (callable): 인자 없이 호출하면 작업 코루틴을 반환하는 함수
+            user_id (int, optional): 작업 소유자 (메모리 상태 조회 시 권한 확인용)
+            priority (str, optional): 'normal' 또는 'low' (대기 중인 일반 작업이 없을 때만 시작)
+
+        Returns:
+            concurrent.futures.Future: 작업 결과 (cancel() 로 대기/실행 중인 작업 취소)
+        """
+        loop = self._ensure_loop()
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = {'user_id': user_id, 'status': 'queued', 'priority': priority, 'result': None,
+                                  'error': None, 'created_at': time.time(), 'finished_at': None}
+        metrics.increment('job_queue_submitted', priority=priority)
+        runner = self._run_low if priority == 'low' else self._run
+        future = asyncio.run_coroutine_threadsafe(runner(job_id, coro_factory), loop)
+        with self._lock:
+            self._active[future] = priority
+        future.add_done_callback(lambda done: self._forget(job_id, done))
+        return future
+
+    def _forget(self, job_id: str, future) -> None:
+        with self._lock:
+            self._active.pop(future, None)
+            job = self._jobs.get(job_id)
+            # 루프에서 시작되기 전에 취소된 작업은 _run 이 실행되지 않으므로 여기서 상태 기록
+            if future.cancelled() and job and job['status'] == 'queued':
+                job.update(status='cancelled', finished_at=time.time())
+
+    def drain(self, timeout: float) -> int:
+        """
+        이 프로세스의 작업이 끝날 때까지 최대 timeout 초 기다립니다. (워커 재시작/종료 전에 호출)
+        낮은 우선순위 작업(추측 합성, 캐시 예열)은 다시 만들 수 있으므로 바로 취소합니다.
+
+        Returns:
+            int: 시간 안에 끝나지 않은 작업 수
+        """
+        with self._lock:
+            active = dict(self._active)
+        for future, priority in active.items():
+            if priority == 'low':
+                future.cancel()
+        pending = [future for future, priority in active.items() if priority != 'low']
+        if pending:
+            print(f"[Job Queue] 종료 전 진행 중인 작업 {len(pending)}개 대기 (최대 {timeout:g}초)")
+            wait(pending, timeout=timeout)
+        return sum(not future.done() for future in pending)
+
+    async def _run(self, job_id: str, coro_factory):
+        queued_at = time.perf_counter()
+        self._normal_waiting += 1
+        self._normal_idle.clear()
+        try:
+            await self._semaphore.acquire()
+        except asyncio.CancelledError: # 대기(queued) 중 취소 - 자리를 얻지 못했으므로 release 하지 않음
+            self._set(job_id, status='cancelled', finished_at=time.time())
+            raise
+        finally:
+            self._normal_waiting -= 1
+            if self._normal_waiting == 0:
+                self._normal_idle.set()
+        try:
+            metrics.observe('job_queue_wait_ms', (time.perf_counter() - queued_at) * 1000)
+            return await self._execute(job_id, coro_factory)
+        finally:
+            self._semaphore.release()
+
+    async def _run_low(self, job_id: str, coro_factory):
+        """낮은 우선순위 작업: 별도 한도 안에서, 일반 작업이 기다리지 않을 때 빈 자리를 사용"""
+        try:
+            async with self._low_semaphore:
+                while True:
+                    await self._normal_idle.wait()
+                    await self._semaphore.acquire() # 여기서 취소되면 자리를 얻지 못했으므로 release 하지 않음
+                    if self._normal_waiting == 0:
+                        break
+                    self._semaphore.release() # 그 사이 일반 작업이 들어왔으면 양보
+                try:
+                    return await self._execute(job_id, coro_factory)
+                finally:
+                    self._semaphore.release()
+        except asyncio.CancelledError:
+            self._set(job_id, status='cancelled', finished_at=time.time())
+            raise
+
+    async def _execute(self, job_id: str, coro_factory):
+        self._set(job_id, status='running')
+        try:
+            result = await coro_factory()
+        except asyncio.CancelledError:
+            self._set(job_id, status='cancelled', finished_at=time.time())
+            raise
+        except TimeoutError as e:
+            self._set(job_id, status='timeout', error=str(e), finished_at=time.time())
+            raise
+        except Exception as e:
+            self._set(job_id, status='failed', error=getattr(e, 'message', str(e)), finished_at=time.time())
+            raise
+        self._set(job_id, status='succeeded', result=result, finished_at=time.time())
+        return result
+
+    def _set(self, job_id: str, **fields) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _prune(self) -> None:
+        now = time.time()
+        for job_id in [j for j, job in self._jobs.items()
+                       if job['finished_at'] and now - job['finished_at'] > FINISHED_JOB_TTL]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> dict | None:
+        """현재 프로세스에 제출된 작업의 상태 (다른 워커의 작업은 DB 에서 조회)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def stats(self) -> dict:
+        """관리자 화면용 큐 현황 (현재 워커 프로세스 기준)"""
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+        return {'max_concurrency': self.max_concurrency, 'running': counts.get('running', 0),
+                'queued': counts.get('queued', 0), 'succeeded': counts.get('succeeded', 0),
+                'failed': counts.get('failed', 0) + counts.get('timeout', 0),
+                'cancelled': counts.get('cancelled', 0)}
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = self._thread = None
+
+
+# 애플리케이션 전역 작업 큐
+job_queue = JobQueue()
+
+
+def init_job_queue(app) -> JobQueue:
+    """
+    환경 변수로 작업 큐를 설정합니다.
+    SYNTH_JOB_CONCURRENCY: 워커 프로세스당 동시에 실행할 합성 작업 수 (기본 64)
+    SYNTH_JOB_DEADLINE: 합성 작업 하나의 마감 시간(초, 기본 120)
+    SYNTH_JOB_LOW_PRIORITY_CONCURRENCY: 그중 낮은 우선순위 작업(추측 합성 등)이 쓸 수 있는 최대 수 (기본 8)
+    SYNTH_FANOUT_MAX_BASES: 한 요청에서 합성할 수 있는 베이스 모델 수 (기본 4)
+    SYNTH_FANOUT_CONCURRENCY: 그중 동시에 진행할 합성 수 (기본 3)
+    """
+    app.config['SYNTH_JOB_CONCURRENCY'] = int(os.getenv('SYNTH_JOB_CONCURRENCY', '64'))
+    app.config['SYNTH_JOB_DEADLINE'] = float(os.getenv('SYNTH_JOB_DEADLINE', '120'))
+    app.config['SYNTH_JOB_LOW_PRIORITY_CONCURRENCY'] = int(os.getenv('SYNTH_JOB_LOW_PRIORITY_CONCURRENCY', '8'))
+    app.config['SYNTH_FANOUT_MAX_BASES'] = int(os.getenv('SYNTH_FANOUT_MAX_BASES', '4'))
+    app.config['SYNTH_FANOUT_CONCURRENCY'] = max(1, int(os.getenv('SYNTH_FANOUT_CONCURRENCY', '3')))
+    job_queue.configure(max_concurrency=app.config['SYNTH_JOB_CONCURRENCY'],
+                        max_low_priority=app.config['SYNTH_JOB_LOW_PRIORITY_CONCURRENCY'])
+    print(f" * 합성 작업 큐: 최대 동시 작업 {app.config['SYNTH_JOB_CONCURRENCY']}개, "
+          f"작업 마감 {app.config['SYNTH_JOB_DEADLINE']:.0f}초")
+    return job_queue
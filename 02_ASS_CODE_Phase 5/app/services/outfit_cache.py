@@ -0,0 +1,241 @@
+# app/services/outfit_cache.py
+# 점진적(incremental) 합성용 중간 결과 캐시
+# 아이템 목록의 접두(prefix)마다 합성 결과를 내용 해시 키로 저장해 두고, 이미 합성한 코디에 아이템을 더하는 요청은
+# 캐시된 중간 결과를 베이스로 새 아이템만 적용합니다. (모델 입력 이미지 수와 호출 비용 감소)
+# 점진 합성을 여러 번 쌓으면 화질이 떨어질 수 있으므로, 정책(IncrementalPolicy)에 따라 처음부터 다시 합성합니다.
+
+import os
+import hashlib
+import threading
+
+from app.utils.db_utils import (
+    find_outfit_prefixes, save_outfit_prefix, record_outfit_prefix_hit, delete_outfit_prefixes
+)
+from app.utils.metrics import metrics
+from app.utils.model_registry import model_registry
+from app.services.synthesis_strategies import strategy_selector
+
+# 이 횟수만큼 저장할 때마다 오래 사용되지 않은 항목 정리
+PRUNE_EVERY_STORES = 100
+
+
+def file_digest(path: str) -> str:
+    """파일 내용의 sha256 (16진수)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def prefix_keys(model_name: str, base_image_path: str, items: list[dict], strategy: str = None,
+                max_image_side: int = None) -> list[str]:
+    """
+    아이템 목록의 접두별 캐시 키를 만듭니다. 키 i 는 모델, 합성 전략, 이미지 축소 크기, 베이스 이미지,
+    아이템 1..i 의 (종류, 내용 해시)로 정해지므로 같은 베이스에 같은 아이템을 같은 순서로 같은 방법으로 입힌 결과는
+    사용자/파일 이름과 관계없이 같은 키를 가집니다. (전략이나 축소 크기가 다르면 결과 화질이 달라 따로 저장)
+
+    Args:
+        strategy (str, optional): 요청한 합성 전략 (없으면 SYNTH_STRATEGY 기본값)
+        max_image_side (int, optional): 모델에 보낼 이미지의 최대 변 길이 (check_request_budget 결과, 없으면 원본)
+
+    Returns:
+        list[str]: [키(아이템 1), 키(아이템 1..2), ..., 키(아이템 1..n)]
+    """
+    strategy = (strategy or strategy_selector.default or 'auto').lower()
+    key = hashlib.sha256(f"{model_name}\n{strategy}\n{max_image_side or 0}\n{file_digest(base_image_path)}".encode()).hexdigest()
+    keys = []
+    for item in items:
+        key = hashlib.sha256(f"{key}\n{item['type']}\n{file_digest(item['path'])}".encode()).hexdigest()
+        keys.append(key)
+    return keys
+
+
+class IncrementalPolicy:
+    """
+    캐시된 중간 결과를 쓸지, 처음부터 다시 합성할지 정하는 정책.
+
+    Args:
+        enabled (bool): 점진적 합성 사용 여부
+        max_chain_depth (int): 처음부터 합성한 결과 위에 쌓을 수 있는 최대 점진 합성 횟수 (넘으면 처음부터 다시 합성)
+        max_new_items (int): 한 번의 점진 합성에서 적용할 최대 새 아이템 수 (더 많으면 처음부터 합성)
+        reuse_exact (bool): 아이템 목록 전체가 캐시에 있으면 모델 호출 없이 캐시 결과 사용
+    """
+
+    def __init__(self, enabled: bool = True, max_chain_depth: int = 2, max_new_items: int = 1,
+                 reuse_exact: bool = True):
+        self.enabled = enabled
+        self.max_chain_depth = max_chain_depth
+        self.max_new_items = max_new_items
+        self.reuse_exact = reuse_exact
+
+    def decide(self, entry: dict, item_count: int) -> str:
+        """
+        캐시 항목 entry (접두 길이 entry['item_count'])로 item_count 개 아이템 요청을 처리하는 방법.
+
+        Returns:
+            str: 'cached' (캐시 결과 그대로), 'incremental' (캐시 위에 나머지 아이템만 적용), 'full' (처음부터 합성)
+        """
+        new_items = item_count - entry['item_count']
+        if new_items == 0:
+            return 'cached' if self.reuse_exact else 'full'
+        if new_items > self.max_new_items or entry['chain_depth'] + 1 > self.max_chain_depth:
+            return 'full'
+        return 'incremental'
+
+
+class OutfitCache:
+    """
+    접두별 중간 결과 캐시. 메타데이터는 outfit_prefix_cache 테이블(워커/노드 간 공유),
+    이미지는 folder 아래 PNG 파일로 저장합니다. (DB 를 사용할 수 없으면 항상 처음부터 합성)
+    """
+
+    def __init__(self):
+        self.policy = IncrementalPolicy()
+        self.folder = None
+        self.ttl_hours = 72.0
+        self._lock = threading.Lock()
+        self._stores = 0
+
+    def configure(self, policy: IncrementalPolicy = None, folder: str = None, ttl_hours: float = None) -> None:
+        if policy is not None:
+            self.policy = policy
+        if folder is not None:
+            self.folder = folder
+        if ttl_hours is not None:
+            self.ttl_hours = ttl_hours
+
+    def plan(self, base_image_path: str, items: list[dict], strategy: str = None, max_image_side: int = None) -> dict:
+        """
+        요청을 처리할 방법을 정합니다. (파일 해시/DB 조회를 하므로 비동기 코드에서는 스레드로 호출)
+        strategy, max_image_side 는 캐시 키에 들어갑니다. (prefix_keys 참고)
+
+        Returns:
+            dict: {
+                'mode': 'full' | 'incremental' | 'cached',
+                'base_image_path': 모델에 보낼 베이스 (incremental/cached 이면 캐시된 중간 결과),
+                'items': 모델에 보낼 아이템 (incremental 이면 새 아이템만),
+                'chain_depth': 결과의 점진 합성 깊이, 'keys': 접두별 캐시 키, 'model_name': 합성 모델 }
+        """
+        model_name = model_registry.resolve('synthesize')
+        plan = {'mode': 'full', 'base_image_path': base_image_path, 'items': items, 'chain_depth': 0,
+                'keys': [], 'model_name': model_name}
+        if not self.policy.enabled or not self.folder or not items:
+            return plan
+        try:
+            plan['keys'] = prefix_keys(model_name, base_image_path, items, strategy, max_image_side)
+        except OSError as e:
+            print(f"[Outfit Cache] 경고: 이미지 해시 계산 실패 - {e}")
+            return plan
+
+        entries = {entry['prefix_key'].strip(): entry for entry in find_outfit_prefixes(plan['keys'])}
+        for key in reversed(plan['keys']): # 가장 긴 접두부터
+            entry = entries.get(key)
+            if not entry or not os.path.isfile(entry['file_path']):
+                continue
+            decision = self.policy.decide(entry, len(items))
+            if decision == 'full':
+                continue
+            record_outfit_prefix_hit(key)
+            plan.update(mode=decision, base_image_path=entry['file_path'], items=items[entry['item_count']:],
+                        chain_depth=entry['chain_depth'] + (1 if decision == 'incremental' else 0))
+            break
+
+        metrics.increment('outfit_cache_lookups', result=plan['mode'])
+        if plan['mode'] != 'full':
+            print(f"[Outfit Cache] {plan['mode']}: 아이템 {len(items)}개 중 {len(items) - len(plan['items'])}개는 캐시된 중간 결과 사용 "
+                  f"(점진 합성 깊이 {plan['chain_depth']})")
+        return plan
+
+    def store(self, plan: dict, image_bytes: bytes) -> bool:
+        """
+        합성 결과(워터마크 적용 전)를 아이템 목록 전체의 접두 키로 저장합니다. (파일/DB 쓰기 - 비동기 코드에서는 스레드로 호출)
+
+        Returns:
+            bool: 저장 성공 여부
+        """
+        if not plan['keys'] or plan['mode'] == 'cached' or not image_bytes:
+            return False
+        key = plan['keys'][-1]
+        file_path = os.path.join(self.folder, key[:2], f"{key}.png")
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            temp_path = f"{file_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(image_bytes)
+            os.replace(temp_path, file_path) # 다른 워커가 읽는 중에도 완전한 파일만 보이도록
+        except OSError as e:
+            print(f"[Outfit Cache] 경고: 중간 결과 저장 실패 - {e}")
+            return False
+        if not save_outfit_prefix(key, plan['model_name'], len(plan['keys']), plan['chain_depth'], file_path):
+            _remove_files([file_path])
+            return False
+        metrics.increment('outfit_cache_stores', mode=plan['mode'])
+
+        with self._lock:
+            self._stores += 1
+            prune = self._stores % PRUNE_EVERY_STORES == 0
+        if prune:
+            self.prune()
+        return True
+
+    def prune(self) -> int:
+        """ttl_hours 시간 동안 사용되지 않은 항목과 파일을 삭제합니다."""
+        file_paths = delete_outfit_prefixes(unused_hours=self.ttl_hours)
+        _remove_files(file_paths)
+        return len(file_paths)
+
+    def read(self, plan: dict) -> bytes | None:
+        """'cached' 계획의 캐시된 결과 이미지"""
+        try:
+            with open(plan['base_image_path'], 'rb') as f:
+                return f.read()
+        except OSError as e:
+            print(f"[Outfit Cache] 경고: 캐시 파일 읽기 실패 - {e}")
+            return None
+
+
+def _remove_files(file_paths: list[str]) -> None:
+    for file_path in file_paths:
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+
+# 애플리케이션 전역 중간 결과 캐시
+outfit_cache = OutfitCache()
+
+
+def init_outfit_cache(app) -> OutfitCache:
+    """
+    환경 변수로 점진적 합성을 설정합니다.
+    SYNTH_INCREMENTAL_ENABLED: 점진적 합성 사용 여부 (기본 true)
+    SYNTH_INCREMENTAL_MAX_CHAIN: 처음부터 다시 합성하기 전까지 쌓을 수 있는 점진 합성 횟수 (기본 2)
+    SYNTH_INCREMENTAL_MAX_NEW_ITEMS: 한 번에 캐시 위에 적용할 최대 새 아이템 수 (기본 1)
+    SYNTH_INCREMENTAL_REUSE_EXACT: 같은 코디 재요청 시 캐시 결과 그대로 사용 (기본 true)
+    SYNTH_CACHE_FOLDER: 중간 결과 이미지 폴더 (기본 <프로젝트>/synthesis_cache)
+    SYNTH_CACHE_TTL_HOURS: 이 시간 동안 사용되지 않은 중간 결과 삭제 (기본 72)
+    """
+    policy = IncrementalPolicy(
+        enabled=os.getenv('SYNTH_INCREMENTAL_ENABLED', 'true').lower() == 'true',
+        max_chain_depth=int(os.getenv('SYNTH_INCREMENTAL_MAX_CHAIN', '2')),
+        max_new_items=int(os.getenv('SYNTH_INCREMENTAL_MAX_NEW_ITEMS', '1')),
+        reuse_exact=os.getenv('SYNTH_INCREMENTAL_REUSE_EXACT', 'true').lower() == 'true')
+    folder = os.getenv('SYNTH_CACHE_FOLDER') or \
+        os.path.join(os.path.dirname(app.config['OUTPUT_FOLDER']), 'synthesis_cache')
+    app.config['SYNTH_CACHE_FOLDER'] = folder
+    if policy.enabled:
+        try:
+            os.makedirs(folder, exist_ok=True)
+        except OSError as e:
+            print(f" * 오류: 중간 결과 캐시 폴더 생성 실패 - {e} (점진적 합성 미사용)")
+            policy.enabled = False
+    outfit_cache.configure(policy=policy, folder=folder,
+                           ttl_hours=float(os.getenv('SYNTH_CACHE_TTL_HOURS', '72')))
+    if policy.enabled:
+        print(f" * 점진적 합성: 사용 (최대 깊이 {policy.max_chain_depth}, 한 번에 새 아이템 {policy.max_new_items}개, "
+              f"동일 코디 재사용 {'예' if policy.reuse_exact else '아니오'}, 폴더 {folder})")
+    else:
+        print(" * 점진적 합성: 미사용")
+    return outfit_cache
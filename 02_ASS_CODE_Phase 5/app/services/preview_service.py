@@ -0,0 +1,157 @@
+# app/services/preview_service.py
+# 합성 미리보기: 모델 호출을 기다리는 동안 보여줄 저해상도 로컬 합성 이미지
+# 아이템 이미지를 종류별 대략적인 위치(상의는 몸통, 신발은 발 등)에 맞춰 베이스 모델 위에 PIL 로 붙입니다.
+# 모델 결과와는 다르지만 업로드 직후(수십 ms 안에) 보여줄 수 있어 체감 대기 시간과 재요청을 줄입니다.
+
+import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageFilter
+
+from app.utils.metrics import metrics
+
+# 미리보기 긴 변 길이(px)와 JPEG 품질
+PREVIEW_MAX_SIDE = 384
+PREVIEW_JPEG_QUALITY = 70
+
+# 아이템 종류별 위치 (베이스 이미지 대비 비율: 왼쪽, 위, 오른쪽, 아래) - 정면 전신 사진 기준
+ITEM_REGIONS = {
+    'shoes': (0.28, 0.84, 0.72, 0.99),
+    'bottom': (0.26, 0.48, 0.74, 0.88),
+    'top': (0.22, 0.20, 0.78, 0.55),
+    'bag': (0.62, 0.42, 0.92, 0.70),
+    'accessory': (0.38, 0.16, 0.62, 0.30),
+    'hair': (0.32, 0.00, 0.68, 0.18),
+}
+DEFAULT_REGION = (0.30, 0.30, 0.70, 0.70)
+# 붙이는 순서 (뒤에 붙인 아이템이 위에 보임)
+LAYER_ORDER = ('shoes', 'bottom', 'top', 'bag', 'accessory', 'hair')
+
+# 배경이 투명하지 않은 아이템 사진은 이 밝기 이상의 (흰) 배경을 투명하게 처리
+BACKGROUND_LIGHTNESS = 235
+
+# 이 횟수만큼 만들 때마다 오래된 미리보기 파일 정리
+PRUNE_EVERY_RENDERS = 50
+
+# 저해상도 베이스 이미지 캐시 (파일 내용 해시 -> 이미지) - 베이스 모델은 요청마다 거의 같으므로 디코딩을 건너뜀
+_BASE_CACHE_SIZE = 8
+_base_cache = OrderedDict()
+_lock = threading.Lock()
+_renders = 0
+# 아이템 이미지 디코딩용 스레드 풀 (PIL 은 디코딩 중 GIL 을 놓으므로 여러 장을 동시에 디코딩)
+_decode_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='preview-decode')
+
+
+def _load_reduced(path: str, max_side: int) -> Image.Image:
+    """이미지를 max_side 이하로 줄여 로드합니다. (JPEG 는 draft 모드로 축소 디코딩하여 빠름)"""
+    with Image.open(path) as img:
+        img.draft('RGB', (max_side, max_side)) # JPEG 외 형식은 무시됨
+        img.load()
+        reduced = img.convert('RGBA') if img.mode in ('RGBA', 'LA', 'P') else img.convert('RGB')
+    reduced.thumbnail((max_side, max_side), Image.Resampling.BILINEAR)
+    return reduced
+
+
+def _base_preview(base_image_path: str, max_side: int) -> Image.Image:
+    with open(base_image_path, 'rb') as f:
+        key = (hashlib.sha1(f.read()).hexdigest(), max_side)
+    with _lock:
+        if key in _base_cache:
+            _base_cache.move_to_end(key)
+            return _base_cache[key].copy()
+    base = _load_reduced(base_image_path, max_side).convert('RGB')
+    with _lock:
+        _base_cache[key] = base
+        while len(_base_cache) > _BASE_CACHE_SIZE:
+            _base_cache.popitem(last=False)
+    return base.copy()
+
+
+def _item_mask(item: Image.Image) -> Image.Image:
+    """아이템의 붙일 영역 마스크 (알파 채널, 없으면 흰 배경 제외)"""
+    if item.mode == 'RGBA':
+        return item.getchannel('A')
+    mask = item.convert('L').point(lambda value: 255 if value < BACKGROUND_LIGHTNESS else 0)
+    return mask.filter(ImageFilter.GaussianBlur(1))
+
+
+def render_preview(base_image_path: str, items: list[dict], max_side: int = PREVIEW_MAX_SIDE) -> Image.Image:
+    """
+    베이스 모델 위에 아이템 이미지를 종류별 위치에 붙인 저해상도 미리보기를 만듭니다.
+
+    Args:
+        base_image_path (str): 베이스 모델 이미지 경로
+        items (list[dict]): [{'type': str, 'path': str}]
+        max_side (int, optional): 미리보기 긴 변 길이
+
+    Returns:
+        Image.Image: RGB 미리보기 이미지
+    """
+    layered = sorted(items, key=lambda item: LAYER_ORDER.index(item['type']) if item['type'] in LAYER_ORDER else 0)
+    # 아이템 디코딩(가장 오래 걸림)을 베이스 준비와 동시에 시작 - 영역 크기는 베이스 비율과 관계없이 max_side 이하
+    futures = [_decode_executor.submit(_load_reduced, item['path'], max_side // 2) for item in layered]
+    preview = _base_preview(base_image_path, max_side)
+    width, height = preview.size
+    for item, future in zip(layered, futures):
+        left, top, right, bottom = ITEM_REGIONS.get(item['type'], DEFAULT_REGION)
+        box = (int(left * width), int(top * height), int(right * width), int(bottom * height))
+        item_img = future.result()
+        item_img.thumbnail((box[2] - box[0], box[3] - box[1]), Image.Resampling.BILINEAR)
+        # 영역 가운데 정렬
+        x = box[0] + (box[2] - box[0] - item_img.width) // 2
+        y = box[1] + (box[3] - box[1] - item_img.height) // 2
+        preview.paste(item_img.convert('RGB'), (x, y), _item_mask(item_img))
+    return preview
+
+
+def save_preview(base_image_path: str, items: list[dict], folder: str, name: str, ttl_seconds: float = 3600) -> str | None:
+    """
+    미리보기를 만들어 folder 에 '<name>.jpg' 로 저장합니다. 실패해도 합성은 계속되므로 예외 대신 None 을 반환합니다.
+
+    Returns:
+        str or None: 저장한 파일 이름
+    """
+    global _renders
+    start = time.perf_counter()
+    filename = f"{name}.jpg"
+    try:
+        preview = render_preview(base_image_path, items)
+        os.makedirs(folder, exist_ok=True)
+        preview.save(os.path.join(folder, filename), format='JPEG', quality=PREVIEW_JPEG_QUALITY)
+    except Exception as e:
+        print(f"[Preview Service] 경고: 미리보기 생성 실패 - {e}")
+        metrics.increment('synthesis_previews', outcome='failed')
+        return None
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    metrics.observe('synthesis_preview_ms', elapsed_ms)
+    metrics.increment('synthesis_previews', outcome='ok')
+    print(f"[Preview Service] 미리보기 생성 {elapsed_ms:.0f}ms: {filename}")
+
+    with _lock:
+        _renders += 1
+        prune = _renders % PRUNE_EVERY_RENDERS == 0
+    if prune:
+        prune_previews(folder, ttl_seconds)
+    return filename
+
+
+def prune_previews(folder: str, ttl_seconds: float) -> int:
+    """ttl_seconds 보다 오래된 미리보기 파일을 삭제합니다."""
+    removed = 0
+    cutoff = time.time() - ttl_seconds
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith('.jpg') and entry.stat().st_mtime < cutoff:
+                    try:
+                        os.remove(entry.path)
+                        removed += 1
+                    except OSError:
+                        pass
+    except OSError as e:
+        print(f"[Preview Service] 경고: 미리보기 정리 실패 - {e}")
+    return removed
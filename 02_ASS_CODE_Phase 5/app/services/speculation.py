@@ -0,0 +1,233 @@
+# app/services/speculation.py
+# 추측(speculative) 합성: 아이템을 올려 두고 '합성하기'를 누르기까지의 유휴 시간에 미리 합성을 시작합니다.
+# 결과는 점진적 합성 캐시(outfit_cache)에만 저장하므로, 사용자가 같은 코디로 합성하면 캐시 결과를 바로 받습니다.
+# - 작업 큐의 낮은 우선순위(low)로 실행되어 일반 합성 작업을 밀어내지 않습니다.
+# - 사용자당 하나만 유지하며, 아이템이 바뀌면(새 추측 요청 또는 취소 요청) 이전 작업을 취소합니다.
+# - 사용량을 예약하지 않습니다. 실제 합성 요청이 결과를 가져갈 때(claim) 그 요청이 평소처럼 사용량을 차감합니다.
+# - 진행/가져감/취소 상태는 DB(speculative_syntheses)에 두어 워커 프로세스끼리 공유합니다. 추측 요청과 실제 합성 요청이
+#   다른 워커로 가면, 실제 요청은 공유 캐시(outfit_prefix_cache)와 DB 상태를 확인하며 기다리고,
+#   작업을 실행하는 워커는 DB 상태를 주기적으로 확인해 다른 워커에서 받은 취소를 반영합니다.
+
+import os
+import asyncio
+import threading
+import time
+import uuid
+
+from app.utils.metrics import metrics
+from app.utils.db_utils import (
+    start_speculative_synthesis, cancel_speculative_synthesis, claim_speculative_synthesis,
+    get_speculative_synthesis_status, finish_speculative_synthesis, count_speculative_syntheses,
+    find_outfit_prefixes
+)
+from app.services.job_queue import job_queue
+from app.services.outfit_cache import outfit_cache
+
+# 끝나지 않은 작업 상태 (이 상태가 아니면 실행 중인 작업은 멈추고, 기다리던 요청은 직접 합성)
+IN_FLIGHT_STATUSES = ('running', 'claimed')
+
+
+class SpeculativeSynthesis:
+    """
+    사용자별 추측 합성 작업 관리자. 상태는 DB 에 있고, 이 워커에서 실행 중인 작업의 Future 만 메모리에 둡니다.
+
+    Args:
+        enabled (bool): 추측 합성 허용 여부 (사용자는 화면에서 다시 선택해야 사용)
+        debounce_ms (int): 아이템 목록이 이 시간(ms) 동안 바뀌지 않으면 화면이 추측 합성을 요청
+        poll_ms (int): 실행 중인 작업의 취소 여부 / 기다리는 요청의 결과를 DB 에서 확인하는 간격(ms)
+        ttl_seconds (float): 작업 마감까지의 시간(초, 작업 큐 대기 포함), 지나면 작업하던 워커가 죽은 것으로 봄
+    """
+
+    def __init__(self, enabled: bool = False, debounce_ms: int = 1500, poll_ms: int = 500, ttl_seconds: float = 240):
+        self.enabled = enabled
+        self.debounce_ms = debounce_ms
+        self.poll_ms = poll_ms
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._local = {} # job_id -> Future (이 워커에서 실행 중인 작업, 같은 워커에서 받은 취소를 바로 반영)
+
+    def configure(self, enabled: bool = None, debounce_ms: int = None, poll_ms: int = None,
+                  ttl_seconds: float = None) -> None:
+        if enabled is not None:
+            self.enabled = enabled
+        if debounce_ms is not None:
+            self.debounce_ms = debounce_ms
+        if poll_ms is not None:
+            self.poll_ms = poll_ms
+        if ttl_seconds is not None:
+            self.ttl_seconds = ttl_seconds
+
+    def start(self, user_id: int, key: str, coro_factory, on_done=None) -> dict | None:
+        """
+        코디(key)의 추측 합성을 시작합니다. 같은 사용자의 다른 코디 작업은 취소하고,
+        같은 코디가 이미 진행 중이면 (다른 워커에서라도) 새로 시작하지 않습니다.
+
+        Args:
+            user_id (int): 사용자 ID
+            key (str): 아이템 목록 전체의 캐시 키 (outfit_cache.prefix_keys 의 마지막 키)
+            coro_factory (callable): 합성 코루틴을 반환하는 함수 (결과를 outfit_cache 에 저장해야 함)
+            on_done (callable, optional): 작업이 끝나거나 취소된 뒤 호출 (임시 파일 삭제 등, 시작 전에 취소돼도 호출)
+
+        Returns:
+            dict or None: {'job_id': str, 'started': bool} - started 가 False 이면 이미 진행 중인 작업,
+                          상태를 DB 에 저장하지 못하면 None (작업을 시작하지 않음, on_done 호출 안 함)
+        """
+        job_id = f"spec-{uuid.uuid4().hex}"
+        record = start_speculative_synthesis(user_id, key, job_id, self.ttl_seconds)
+        if record is None:
+            return None
+        self._cancel_local(record['cancelled'])
+        if not record['started']:
+            return {'job_id': record['job_id'], 'started': False}
+
+        started_at = time.perf_counter()
+        with self._lock:
+            future = job_queue.submit(job_id, lambda: self._run(job_id, coro_factory), user_id=user_id, priority='low')
+            self._local[job_id] = future
+        future.add_done_callback(lambda done: self._finished(job_id, started_at, done, on_done))
+        metrics.increment('speculative_syntheses', outcome='started')
+        return {'job_id': job_id, 'started': True}
+
+    async def _run(self, job_id: str, coro_factory):
+        """합성 코루틴을 실행하면서 poll_ms 마다 DB 상태를 확인해, 다른 워커에서 취소되었으면 멈춥니다."""
+        task = asyncio.ensure_future(coro_factory())
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.poll_ms / 1000)
+                if done:
+                    return task.result()
+                status = await asyncio.to_thread(get_speculative_synthesis_status, job_id)
+                if status not in IN_FLIGHT_STATUSES:
+                    print(f"[Speculation] 추측 합성 중단 ({status or '다른 작업으로 바뀜'}): {job_id}")
+                    raise asyncio.CancelledError()
+        finally:
+            if not task.done():
+                task.cancel()
+
+    def cancel(self, user_id: int) -> bool:
+        """사용자의 추측 합성을 취소합니다. (실제 요청이 이미 가져간 작업은 취소하지 않음, 다른 워커의 작업은 상태 확인 때 멈춤)"""
+        job_ids = cancel_speculative_synthesis(user_id)
+        self._cancel_local(job_ids)
+        return bool(job_ids)
+
+    def _cancel_local(self, job_ids: list[str]) -> None:
+        with self._lock:
+            futures = [self._local[job_id] for job_id in job_ids if job_id in self._local]
+        for future in futures:
+            future.cancel() # 완료 콜백(_finished)이 잠금을 다시 잡으므로 잠금 밖에서 취소
+
+    def claim(self, key: str) -> str | None:
+        """
+        실제 합성 요청이 진행 중인 추측 합성 결과를 기다리도록 작업을 가져갑니다. (이후 아이템이 바뀌어도 취소되지 않음)
+
+        Returns:
+            str or None: 가져간 작업 ID (wait_claimed/await_claimed 로 기다림), 진행 중인 작업이 없으면 None
+        """
+        job_id = claim_speculative_synthesis(key)
+        if job_id is None:
+            return None
+        metrics.increment('speculative_syntheses', outcome='claimed')
+        print(f"[Speculation] 진행 중인 추측 합성 사용: {job_id}")
+        return job_id
+
+    def _poll(self, key: str, job_id: str) -> bool | None:
+        """가져간 작업의 결과 확인: 캐시에 있으면 True, 작업이 끝났는데 없으면 False, 진행 중이면 None"""
+        if find_outfit_prefixes([key]):
+            return True
+        if get_speculative_synthesis_status(job_id) in IN_FLIGHT_STATUSES:
+            return None
+        return bool(find_outfit_prefixes([key])) # 두 조회 사이에 끝난 경우
+
+    def wait_claimed(self, key: str, job_id: str, timeout: float = None) -> bool:
+        """
+        claim() 으로 가져간 작업이 끝날 때까지 공유 캐시와 DB 상태를 확인하며 기다립니다.
+
+        Args:
+            key (str): claim() 에 넘긴 캐시 키
+            job_id (str): claim() 이 반환한 작업 ID
+            timeout (float, optional): 최대 대기 시간(초), 없으면 ttl_seconds
+
+        Returns:
+            bool: 결과가 캐시에 있으면 True, 취소/실패/마감이면 False (직접 합성)
+        """
+        deadline = time.monotonic() + (self.ttl_seconds if timeout is None else timeout)
+        while True:
+            ready = self._poll(key, job_id)
+            if ready is not None:
+                return ready
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return False
+            time.sleep(min(self.poll_ms / 1000, left))
+
+    async def await_claimed(self, key: str, job_id: str, timeout: float = None) -> bool:
+        """wait_claimed 의 비동기 버전 (DB 조회는 스레드에서)"""
+        deadline = time.monotonic() + (self.ttl_seconds if timeout is None else timeout)
+        while True:
+            ready = await asyncio.to_thread(self._poll, key, job_id)
+            if ready is not None:
+                return ready
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return False
+            await asyncio.sleep(min(self.poll_ms / 1000, left))
+
+    def _finished(self, job_id: str, started_at: float, future, on_done) -> None:
+        with self._lock:
+            self._local.pop(job_id, None)
+        if future.cancelled():
+            outcome = 'cancelled'
+        elif future.exception() is not None or not future.result():
+            outcome = 'failed'
+        else:
+            outcome = 'completed'
+            metrics.observe('speculative_synthesis_ms', (time.perf_counter() - started_at) * 1000)
+        metrics.increment('speculative_syntheses', outcome=outcome)
+        # 작업 큐의 이벤트 루프 스레드에서 호출되므로 DB 기록/파일 정리는 별도 스레드에서
+        threading.Thread(target=self._record_outcome, args=(job_id, outcome, on_done),
+                         name='speculation-finish', daemon=True).start()
+
+    def _record_outcome(self, job_id: str, outcome: str, on_done) -> None:
+        finish_speculative_synthesis(job_id, outcome)
+        if on_done:
+            try:
+                on_done()
+            except Exception as e:
+                print(f"[Speculation] 경고: 작업 정리 중 오류 - {e}")
+
+    def stats(self) -> dict:
+        """관리자 화면용 현황 (in_flight/claimed 는 모든 워커, local 은 현재 워커에서 실행 중인 작업 수)"""
+        counts = count_speculative_syntheses()
+        with self._lock:
+            local = len(self._local)
+        return {'enabled': self.enabled, 'in_flight': counts['running'] + counts['claimed'],
+                'claimed': counts['claimed'], 'local': local}
+
+
+# 애플리케이션 전역 추측 합성 관리자
+speculation = SpeculativeSynthesis()
+
+
+def init_speculation(app) -> SpeculativeSynthesis:
+    """
+    환경 변수로 추측 합성을 설정합니다. 결과를 점진적 합성 캐시에 두므로 동일 코디 재사용(SYNTH_INCREMENTAL_REUSE_EXACT)이
+    꺼져 있으면 사용하지 않습니다. (init_job_queue 다음에 호출 - 작업 마감 시간 사용)
+    SYNTH_SPECULATIVE_ENABLED: 추측 합성 허용 여부 (기본 false, 허용해도 사용자가 화면에서 켜야 동작)
+    SYNTH_SPECULATIVE_DEBOUNCE_MS: 아이템 목록이 이 시간 동안 바뀌지 않으면 시작 (기본 1500)
+    SYNTH_SPECULATIVE_POLL_MS: 취소 여부/결과를 DB 에서 확인하는 간격 (기본 500)
+    """
+    enabled = os.getenv('SYNTH_SPECULATIVE_ENABLED', 'false').lower() == 'true'
+    if enabled and not (outfit_cache.policy.enabled and outfit_cache.policy.reuse_exact):
+        print(" * 경고: 점진적 합성 캐시(동일 코디 재사용)가 꺼져 있어 추측 합성을 사용하지 않습니다.")
+        enabled = False
+    speculation.configure(enabled=enabled, debounce_ms=int(os.getenv('SYNTH_SPECULATIVE_DEBOUNCE_MS', '1500')),
+                          poll_ms=int(os.getenv('SYNTH_SPECULATIVE_POLL_MS', '500')),
+                          ttl_seconds=app.config.get('SYNTH_JOB_DEADLINE', 120) * 2) # 낮은 우선순위 대기 시간 포함
+    app.config['SYNTH_SPECULATIVE_ENABLED'] = speculation.enabled
+    app.config['SYNTH_SPECULATIVE_DEBOUNCE_MS'] = speculation.debounce_ms
+    if speculation.enabled:
+        print(f" * 추측 합성: 허용 (아이템 변경 후 {speculation.debounce_ms}ms, 낮은 우선순위, "
+              f"상태 확인 {speculation.poll_ms}ms 간격)")
+    else:
+        print(" * 추측 합성: 미사용")
+    return speculation
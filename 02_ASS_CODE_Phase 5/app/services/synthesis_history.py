@@ -0,0 +1,223 @@
+# app/services/synthesis_history.py
+# 합성 기록: 사용자에게 전달한 합성마다 베이스 모델, 아이템 해시, 전략, 모델, 단계별 시간, 결과 크기/해시를
+# syntheses 테이블에 남기고, 갤러리에 보여줄 WebP 썸네일을 결과 파일 옆(<결과 이름>_thumb.webp)에 저장합니다.
+# 갤러리는 페이지마다 썸네일을 스프라이트 시트 한 장으로 묶어 받고, 기록에 저장한 자리 표시 이미지를 먼저 보여줍니다.
+# 썸네일과 스프라이트는 요청 안에서 만들지 않고 작업 큐의 낮은 우선순위 작업으로 만듭니다. 아직 없으면 갤러리는
+# 자리 표시 칸을 그대로 두고(원본은 열 때만 받음), 다음 페이지 조회부터 썸네일/스프라이트를 사용합니다.
+# 기록을 켜면 결과 파일 이름에 결과 해시 앞부분을 붙여, 같은 아이템으로 다시 합성해도 이전 결과가 덮어써지지 않습니다.
+
+import os
+import asyncio
+import time
+
+from flask import url_for
+
+from app.utils.db_utils import add_synthesis_record, set_synthesis_thumbnail
+from app.utils.metrics import metrics
+from app.utils.model_registry import model_registry
+from app.services.outfit_cache import file_digest
+from app.services.synthesis_strategies import strategy_selector
+from app.services.job_queue import job_queue
+from app.services.thumbnail_service import (
+    save_thumbnail, build_sprite, cached_sprite, sprite_filename, THUMBNAIL_EXT
+)
+
+# 결과 파일 이름에 붙이는 결과 해시 길이
+OUTPUT_DIGEST_LENGTH = 12
+# 스프라이트 시트 열 수 (화면 배치와 관계없이 칸 위치로 잘라 표시)
+SPRITE_COLUMNS = 8
+
+
+def elapsed_ms(started: float | None) -> int | None:
+    """time.perf_counter() 로 잰 시작 시각부터 지금까지(ms)"""
+    return None if started is None else int((time.perf_counter() - started) * 1000)
+
+
+class SynthesisHistory:
+    """
+    합성 기록 저장소.
+
+    Args:
+        output_folder (str): 결과 파일 폴더 (OUTPUT_FOLDER, 썸네일도 여기에 저장)
+        thumbnail_side (int): 썸네일 긴 변 길이(px)
+        sprite_folder (str): 갤러리 스프라이트 시트 폴더 (None 이면 스프라이트 미사용)
+        sprite_cell (int): 스프라이트 칸 크기(px)
+        sprite_ttl (float): 사용하지 않은 스프라이트 보관 시간(초)
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.output_folder = None
+        self.thumbnail_side = 320
+        self.sprite_folder = None
+        self.sprite_cell = 160
+        self.sprite_ttl = 86400
+
+    def configure(self, **settings) -> None:
+        for name, value in settings.items():
+            if value is not None:
+                setattr(self, name, value)
+
+    def output_filename(self, output_filename: str, output_digest: str) -> str:
+        """기록을 사용하면 결과 파일 이름에 결과 해시 앞부분을 붙입니다. (이전 결과 보존)"""
+        if not self.enabled:
+            return output_filename
+        stem, ext = os.path.splitext(output_filename)
+        return f"{stem}_{output_digest[:OUTPUT_DIGEST_LENGTH]}{ext}"
+
+    def _save_thumbnail(self, output_filename: str) -> tuple[str | None, str | None]:
+        """
+        결과 이미지의 썸네일과 자리 표시 이미지를 만듭니다. (실패 시 None - 갤러리는 자리 표시 칸 유지)
+
+        Returns:
+            tuple: (썸네일 파일 이름, 자리 표시 data URI)
+        """
+        thumbnail_filename = f"{os.path.splitext(output_filename)[0]}_thumb{THUMBNAIL_EXT}"
+        try:
+            _, placeholder = save_thumbnail(os.path.join(self.output_folder, output_filename),
+                                            os.path.join(self.output_folder, thumbnail_filename),
+                                            self.thumbnail_side, with_placeholder=True)
+            return thumbnail_filename, placeholder
+        except Exception as e:
+            print(f"[Synthesis History] 썸네일 저장 실패 ({output_filename}): {e}")
+            return None, None
+
+    def _build_thumbnail(self, record_id: int, output_filename: str) -> bool:
+        """썸네일/자리 표시 이미지를 만들어 기록에 저장합니다. (작업 큐에서 실행)"""
+        thumbnail_filename, placeholder = self._save_thumbnail(output_filename)
+        return bool(thumbnail_filename) and set_synthesis_thumbnail(record_id, thumbnail_filename, placeholder)
+
+    def _submit_once(self, job_id: str, work, *args) -> None:
+        """work(*args) 를 스레드에서 실행하는 낮은 우선순위 작업을 넣습니다. (같은 작업이 대기/실행 중이면 생략)"""
+        job = job_queue.get(job_id)
+        if job and job['status'] in ('queued', 'running'):
+            return
+        try:
+            job_queue.submit(job_id, lambda: asyncio.to_thread(work, *args), priority='low')
+        except Exception as e:
+            print(f"[Synthesis History] 백그라운드 작업 등록 실패 ({job_id}): {e}")
+
+    def schedule_thumbnail(self, record_id: int, output_filename: str) -> None:
+        """기록의 썸네일을 작업 큐에서 만듭니다."""
+        self._submit_once(f"thumb-{record_id}", self._build_thumbnail, record_id, output_filename)
+
+    def record(self, user_id: int, source: str, items: list[dict], result: dict, base_model_id: int = None,
+               strategy: str = None, queue_ms: int = None, synthesis_ms: int = None,
+               total_ms: int = None) -> int | None:
+        """
+        전달한 합성 결과를 기록합니다. 기록 실패는 합성 응답에 영향을 주지 않습니다. (아이템 임시 파일 삭제 전에 호출)
+        썸네일은 기록 후 작업 큐에서 만듭니다. (schedule_thumbnail)
+
+        Args:
+            user_id (int): 사용자 ID
+            source (str): 요청 경로 ('web', 'job', 'fanout')
+            items (list[dict]): [{'type': str, 'path': str}]
+            result (dict): finalize_result() 결과
+            base_model_id (int, optional): 베이스 모델 ID
+            strategy (str, optional): 요청한 합성 전략 (None 이면 아이템 수로 선택된 전략 기록)
+            queue_ms, synthesis_ms, total_ms (int, optional): 작업 큐 대기 / 합성 / 전체 시간(ms)
+
+        Returns:
+            int or None: 기록 ID, 사용하지 않거나 실패 시 None
+        """
+        if not self.enabled:
+            return None
+        try:
+            record_id = add_synthesis_record(
+                user_id, source, [item['type'] for item in items], [file_digest(item['path']) for item in items],
+                result['output_filename'], base_model_id=base_model_id,
+                strategy=strategy_selector.select(len(items), strategy),
+                model_name=model_registry.resolve('synthesize'), queue_ms=queue_ms, synthesis_ms=synthesis_ms,
+                total_ms=total_ms, output_bytes=result.get('output_bytes'), output_digest=result.get('output_digest'),
+                watermarked=result.get('watermarked', False))
+        except Exception as e:
+            print(f"[Synthesis History] 합성 기록 실패: {e}")
+            record_id = None
+        metrics.increment('synthesis_history_records', outcome='ok' if record_id else 'error')
+        if record_id:
+            self.schedule_thumbnail(record_id, result['output_filename'])
+        return record_id
+
+    def page_sprite(self, records: list[dict]) -> tuple[dict | None, dict[int, int]]:
+        """
+        한 페이지 기록의 썸네일을 묶은 스프라이트 시트를 찾습니다. 아직 없으면 작업 큐에서 만들고 이번 응답은
+        스프라이트 없이(칸마다 썸네일) 보냅니다. 썸네일이 없는 기록(만드는 중이거나 워커 종료로 취소됨)은 다시 요청합니다.
+
+        Returns:
+            tuple: (스프라이트 정보 {'url', 'columns', 'rows', 'cell'} 또는 None, {기록 ID: 칸 번호})
+        """
+        for record in records:
+            if not record.get('thumbnail_filename'):
+                self.schedule_thumbnail(record['id'], record['output_filename'])
+        with_thumbnail = [record for record in records if record.get('thumbnail_filename')]
+        if not self.sprite_folder or not with_thumbnail:
+            return None, {}
+        thumbnail_paths = [os.path.join(self.output_folder, record['thumbnail_filename']) for record in with_thumbnail]
+        filename = cached_sprite(thumbnail_paths, self.sprite_folder, self.sprite_cell, SPRITE_COLUMNS)
+        if not filename:
+            self._submit_once(f"sprite-{sprite_filename(thumbnail_paths, self.sprite_cell, SPRITE_COLUMNS)}",
+                              build_sprite, thumbnail_paths, self.sprite_folder, self.sprite_cell, SPRITE_COLUMNS,
+                              self.sprite_ttl)
+            return None, {}
+        columns = min(SPRITE_COLUMNS, len(with_thumbnail))
+        sprite = {
+            'url': url_for('synthesize.serve_sprite_file', filename=filename), 'cell': self.sprite_cell,
+            'columns': columns, 'rows': (len(with_thumbnail) + columns - 1) // columns,
+        }
+        return sprite, {record['id']: index for index, record in enumerate(with_thumbnail)}
+
+    def to_json(self, record: dict, sprite_index: int = None) -> dict:
+        """API 응답용 기록 (결과/썸네일 URL, 자리 표시 이미지, 스프라이트 칸 번호 포함, 썸네일이 아직 없으면 thumbnail_url=None)"""
+        output_url = url_for('synthesize.serve_output_file', filename=record['output_filename'])
+        thumbnail_filename = record.get('thumbnail_filename')
+        return {
+            'id': record['id'], 'created_at': record['created_at'], 'source': record['source'],
+            'base_model_id': record['base_model_id'], 'base_model_name': record.get('base_model_name'),
+            'item_types': list(record['item_types'] or []), 'strategy': record['strategy'],
+            'model': record['model_name'], 'watermarked': record['watermarked'],
+            'output_bytes': record['output_bytes'], 'output_digest': record['output_digest'],
+            'timings': {'queue_ms': record['queue_ms'], 'synthesis_ms': record['synthesis_ms'],
+                        'total_ms': record['total_ms']},
+            'output_file_url': output_url,
+            'thumbnail_url': url_for('synthesize.serve_output_file', filename=thumbnail_filename)
+                             if thumbnail_filename else None,
+            'placeholder': record.get('placeholder'),
+            'sprite_index': sprite_index,
+        }
+
+
+# 애플리케이션 전역 합성 기록
+synthesis_history = SynthesisHistory()
+
+
+def init_synthesis_history(app) -> SynthesisHistory:
+    """
+    환경 변수로 합성 기록을 설정합니다.
+    SYNTH_HISTORY_ENABLED: 합성 기록/갤러리 사용 여부 (기본 true)
+    SYNTH_HISTORY_THUMBNAIL_SIDE: 갤러리 썸네일 긴 변 길이(px, 기본 320)
+    GALLERY_SPRITES_ENABLED: 갤러리 페이지 썸네일을 스프라이트 시트로 묶을지 여부 (기본 true)
+    GALLERY_SPRITE_FOLDER: 스프라이트 시트 폴더 (기본 <OUTPUT_FOLDER>/sprites)
+    GALLERY_SPRITE_CELL: 스프라이트 칸 크기(px, 기본 160)
+    GALLERY_SPRITE_TTL: 사용하지 않은 스프라이트 보관 시간(초, 기본 86400)
+    """
+    enabled = os.getenv('SYNTH_HISTORY_ENABLED', 'true').lower() == 'true'
+    sprite_folder = None
+    if enabled and os.getenv('GALLERY_SPRITES_ENABLED', 'true').lower() == 'true':
+        sprite_folder = os.getenv('GALLERY_SPRITE_FOLDER') or os.path.join(app.config['OUTPUT_FOLDER'], 'sprites')
+        try:
+            os.makedirs(sprite_folder, exist_ok=True)
+        except OSError as e:
+            print(f" * 오류: 스프라이트 폴더 생성 실패 - {e} (스프라이트 미사용)")
+            sprite_folder = None
+    synthesis_history.configure(enabled=enabled, output_folder=app.config['OUTPUT_FOLDER'],
+                                thumbnail_side=int(os.getenv('SYNTH_HISTORY_THUMBNAIL_SIDE', '320')),
+                                sprite_cell=int(os.getenv('GALLERY_SPRITE_CELL', '160')),
+                                sprite_ttl=float(os.getenv('GALLERY_SPRITE_TTL', '86400')))
+    synthesis_history.sprite_folder = sprite_folder
+    app.config['SYNTH_HISTORY_ENABLED'] = enabled
+    if enabled:
+        print(f" * 합성 기록: 사용 (갤러리 썸네일 {synthesis_history.thumbnail_side}px, "
+              f"스프라이트 {'사용' if sprite_folder else '미사용'})")
+    else:
+        print(" * 합성 기록: 미사용")
+    return synthesis_history
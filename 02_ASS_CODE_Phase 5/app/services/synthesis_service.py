@@ -0,0 +1,477 @@
+# app/services/synthesis_service.py
+# 합성 서비스: 베이스 모델 경로 확인, 업로드 아이템 임시 저장, 결과 워터마크/저장, 비동기 합성 작업 실행
+# 동기 라우트(/synthesize/web)와 작업 큐(/synthesize/jobs)가 같은 준비/마무리 단계를 사용합니다.
+
+import os
+import time
+import asyncio
+import hashlib
+import tempfile
+import traceback
+from io import BytesIO
+
+import requests
+from flask import current_app
+from PIL import Image
+
+from app.utils.ai_module import apply_watermark_func
+from app.utils.db_utils import get_setting, get_active_base_model, release_usage, update_synthesis_job
+from app.utils.metrics import metrics
+from app.utils.resilience import ai_deadline, remaining_time
+from app.utils.ai_call_log import ai_call_user, ai_call_log
+from app.utils.model_registry import model_registry
+from app.services.cost_estimator import RequestBudget, plan_request
+from app.services.item_preprocess import item_preprocessor
+from app.services.outfit_cache import outfit_cache
+from app.services.synthesis_strategies import strategy_selector, synthesize_with_strategy, asynthesize_with_strategy
+from app.services.speculation import speculation
+from app.services.cache_warmer import cache_warmer
+from app.services.wardrobe import wardrobe, WardrobeError
+from app.services.synthesis_history import synthesis_history, elapsed_ms
+
+
+class SynthesisError(Exception):
+    """사용자에게 그대로 보여줄 수 있는 합성 준비/처리 오류 (status_code 는 HTTP 응답 코드)"""
+
+    def __init__(self, message: str, status_code: int = 500, payload: dict = None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.payload = payload or {} # 오류 응답에 함께 담을 추가 정보 (예: 'estimate')
+
+
+def _allowed_file(filename: str) -> bool:
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+
+def resolve_base_model_path(user_id: int, temp_files: list[str], model: dict = None) -> str:
+    """
+    베이스 모델(기본값: 활성 베이스 모델) 이미지의 로컬 파일 경로를 반환합니다.
+    /static/ 경로는 정적 폴더에서 찾고, http(s) URL 은 임시 파일로 내려받아 temp_files 에 추가합니다.
+
+    Args:
+        model (dict, optional): get_base_model_by_id() 결과 (여러 베이스 모델 동시 합성)
+
+    Raises:
+        SynthesisError: 활성 모델이 없거나 이미지에 접근할 수 없음
+    """
+    active_model = model or get_active_base_model()
+    if not active_model or not active_model.get("image_url"):
+        raise SynthesisError("현재 사용 가능한 베이스 모델이 없습니다.", 500)
+
+    base_img_url_path = active_model["image_url"]
+
+    if base_img_url_path.startswith('/static/'):
+        relative_path = os.path.normpath(base_img_url_path[len('/static/'):])
+        base_img_fs_path = os.path.join(current_app.static_folder, relative_path)
+        if not os.path.exists(base_img_fs_path) or not os.path.isfile(base_img_fs_path):
+            raise SynthesisError("베이스 모델 이미지 파일을 찾거나 접근할 수 없습니다. (Local)", 500)
+        return base_img_fs_path
+
+    if base_img_url_path.startswith('http'):
+        try:
+            response = requests.get(base_img_url_path, stream=True, timeout=15)
+            response.raise_for_status()
+            content_type = response.headers.get('content-type')
+            if not content_type or not content_type.lower().startswith('image/'):
+                raise SynthesisError(f"베이스 모델 URL에서 유효한 이미지를 찾을 수 없습니다 (Type: {content_type}).", 400)
+            suffix = '.' + content_type.split('/')[-1].split(';')[0] if content_type else '.tmp'
+            temp_base_image_fd, base_img_fs_path = tempfile.mkstemp(suffix=suffix, prefix=f'base_user{user_id}_')
+            os.close(temp_base_image_fd)
+            temp_files.append(base_img_fs_path) # 삭제 목록 추가
+            with open(base_img_fs_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=8192): f.write(chunk)
+            print(f"[Synthesis Service] 외부 URL 이미지 다운로드 및 임시 저장 완료: {base_img_fs_path}")
+            return base_img_fs_path
+        except SynthesisError:
+            raise
+        except requests.exceptions.RequestException as req_e:
+            raise SynthesisError(f"베이스 모델 이미지 다운로드 중 오류: {req_e}", 500)
+        except Exception as down_e:
+            raise SynthesisError(f"베이스 모델 처리 중 오류: {down_e}", 500)
+
+    if not os.path.exists(base_img_url_path) or not os.path.isfile(base_img_url_path):
+        raise SynthesisError("베이스 모델 이미지 파일을 찾거나 접근할 수 없습니다. (Path)", 500)
+    return base_img_url_path
+
+
+def save_uploaded_items(form, files, user_id: int, temp_files: list[str]) -> list[dict]:
+    """
+    요청의 item_count / item_type_<i> / item_image_<i> 를 읽어 아이템 이미지를 임시 파일로 저장합니다.
+    저장한 파일은 temp_files 에 추가됩니다. (호출하는 쪽에서 삭제)
+    단색 배경 상품 사진은 여백을 잘라내고 배경을 평탄화한 캐시 파일을 사용합니다. (item_preprocess 참고)
+    item_image_<i> 대신 item_wardrobe_id_<i> 로 옷장 아이템을 지정할 수 있습니다. (업로드/전처리 없음, 종류 생략 가능)
+    save_to_wardrobe 가 'true' 이면 업로드한 아이템을 옷장에도 저장합니다.
+
+    Returns:
+        list[dict]: [{'type': str, 'path': str}]
+
+    Raises:
+        SynthesisError: 아이템이 없거나 저장 실패, 옷장 아이템을 찾을 수 없음
+    """
+    item_count = form.get('item_count', type=int, default=0)
+    print(f"[Synthesis Service] 전달된 아이템 개수: {item_count}")
+    if item_count == 0:
+        raise SynthesisError("합성할 아이템이 전달되지 않았습니다.", 400)
+
+    wardrobe_ids = {i: form.get(f'item_wardrobe_id_{i}', type=int) for i in range(item_count)}
+    wardrobe_ids = {i: item_id for i, item_id in wardrobe_ids.items() if item_id is not None}
+    wardrobe_items = wardrobe.resolve(user_id, list(wardrobe_ids.values())) if wardrobe_ids and wardrobe.enabled else {}
+    save_to_wardrobe = wardrobe.enabled and form.get('save_to_wardrobe', '').lower() == 'true'
+
+    items = []
+    for i in range(item_count):
+        if i in wardrobe_ids:
+            wardrobe_item = wardrobe_items.get(wardrobe_ids[i])
+            if not wardrobe_item:
+                raise SynthesisError(f"아이템 {i+1}: 옷장 아이템을 찾을 수 없습니다.", 404)
+            items.append({'type': form.get(f'item_type_{i}') or wardrobe_item['item_type'], 'path': wardrobe_item['file_path']})
+            print(f"[Synthesis Service] 아이템 {i} 옷장 사용: ID {wardrobe_item['id']} (Type: {items[-1]['type']})")
+            continue
+        item_type_key = f'item_type_{i}'; item_image_key = f'item_image_{i}'
+        if item_type_key not in form or item_image_key not in files: continue
+        item_type = form[item_type_key]; item_file = files[item_image_key]
+        if item_file.filename == '' or not item_type: continue
+        if not _allowed_file(item_file.filename): continue
+        try:
+            file_ext = os.path.splitext(item_file.filename)[1]
+            temp_item_fd, item_filepath = tempfile.mkstemp(suffix=file_ext, prefix=f'item_user{user_id}_{i}_')
+            os.close(temp_item_fd)
+            temp_files.append(item_filepath) # 삭제 목록 추가
+            item_file.save(item_filepath)
+            if save_to_wardrobe:
+                try:
+                    wardrobe_item = wardrobe.add(user_id, item_filepath, item_type, item_file.filename)
+                    items.append({'type': item_type, 'path': wardrobe_item['file_path']})
+                    print(f"[Synthesis Service] 아이템 {i} 옷장 저장: ID {wardrobe_item['id']} (Type: {item_type})")
+                    continue
+                except WardrobeError as e:
+                    print(f"[Synthesis Service] 아이템 {i} 옷장 저장 실패 (합성은 계속): {e.message}")
+            items.append({'type': item_type, 'path': item_preprocessor.process(item_filepath)})
+            print(f"[Synthesis Service] 아이템 {i} 임시 저장: {item_filepath} (Type: {item_type})")
+        except Exception as e:
+            print(f"[Synthesis Service] 아이템 {i} 저장 중 오류: {e}")
+            raise SynthesisError(f"아이템 {i+1} 이미지 저장 중 오류가 발생했습니다.", 500)
+
+    if not items:
+        raise SynthesisError("처리할 유효한 아이템이 없습니다.", 400)
+    return items
+
+
+def image_size(path: str) -> tuple[int, int]:
+    """이미지의 (가로, 세로) - 헤더만 읽으므로 픽셀 디코딩 없이 빠릅니다."""
+    with Image.open(path) as img:
+        return img.size
+
+
+# 베이스 모델 이미지 크기 캐시 (image_url -> (가로, 세로)) - 사전 추정 때 외부 URL 을 매번 내려받지 않도록
+_base_model_sizes = {}
+
+
+def active_base_model_size(user_id: int) -> tuple[int, int]:
+    """
+    활성 베이스 모델 이미지의 (가로, 세로).
+
+    Raises:
+        SynthesisError: 활성 모델이 없거나 이미지에 접근할 수 없음
+    """
+    active_model = get_active_base_model()
+    image_url = active_model.get("image_url") if active_model else None
+    if image_url in _base_model_sizes:
+        return _base_model_sizes[image_url]
+    temp_files = []
+    try:
+        size = image_size(resolve_base_model_path(user_id, temp_files))
+    finally:
+        cleanup_temp_files(temp_files)
+    _base_model_sizes[image_url] = size
+    return size
+
+
+def estimate_synthesis(image_sizes: list[tuple[int, int]]) -> dict:
+    """
+    현재 설정된 요청 한도와 합성 모델 단가로 요청을 사전 추정합니다. (cost_estimator.plan_request 참고)
+
+    Args:
+        image_sizes (list[tuple]): [(가로, 세로)], 첫 번째는 베이스 모델 이미지
+    """
+    prices = ai_call_log.prices
+    model_name = model_registry.resolve('synthesize')
+    plan = plan_request(image_sizes, RequestBudget.from_config(current_app.config),
+                        prices.get(model_name, prices.get('*')))
+    plan['model'] = model_name
+    return plan
+
+
+def check_request_budget(base_image_path: str, items: list[dict]) -> dict:
+    """
+    모델에 보내기 전에 요청을 한도와 비교합니다. 축소가 필요하면 estimate['max_image_side'] 로 알려줍니다.
+
+    Returns:
+        dict: estimate_synthesis() 결과
+
+    Raises:
+        SynthesisError: 한도를 넘고 축소로도 맞출 수 없음 (413, payload 에 'estimate')
+    """
+    try:
+        sizes = [image_size(base_image_path)] + [image_size(item['path']) for item in items]
+    except Exception as e:
+        print(f"[Synthesis Service] 이미지 크기 확인 실패: {e}")
+        raise SynthesisError("이미지 파일을 읽을 수 없습니다. 올바른 이미지인지 확인해주세요.", 400)
+    estimate = estimate_synthesis(sizes)
+    if estimate['action'] == 'reject':
+        print(f"[Synthesis Service] 요청 한도 초과로 거절: {estimate['exceeded']} "
+              f"(입력 토큰 {estimate['input_tokens']}, 요청 {estimate['request_bytes']}B)")
+        if 'items' in estimate['exceeded']:
+            message = f"한 번에 합성할 수 있는 아이템은 최대 {estimate['budget']['max_items']}개입니다."
+        else:
+            message = "이미지가 너무 크거나 많아 합성할 수 없습니다. 더 작은 이미지를 사용하거나 아이템 수를 줄여주세요."
+        raise SynthesisError(message, 413, {'estimate': estimate})
+    if estimate['action'] == 'downscale':
+        print(f"[Synthesis Service] 요청 한도에 맞춰 이미지 축소 예정: 최대 {estimate['max_image_side']}px "
+              f"(입력 토큰 {estimate['original']['input_tokens']} -> {estimate['input_tokens']})")
+    return estimate
+
+
+def validate_strategy(requested: str | None, item_count: int) -> str | None:
+    """
+    요청한 합성 전략(form 'strategy')을 확인합니다. 없으면 None (설정된 기본 전략 사용).
+
+    Raises:
+        SynthesisError: 알 수 없는 전략 (400)
+    """
+    if not requested:
+        return None
+    try:
+        strategy_selector.select(item_count, requested)
+    except ValueError:
+        raise SynthesisError(f"알 수 없는 합성 전략입니다: {requested} (auto, single, sequential, parallel 중 선택)", 400)
+    return requested.lower()
+
+
+def _claim_speculation(plan: dict) -> str | None:
+    """캐시에 없는 코디가 추측 합성으로 (어느 워커에서든) 진행 중이면 그 작업을 가져옵니다. (작업 ID)"""
+    if plan['mode'] == 'cached' or not plan['keys'] or not speculation.enabled:
+        return None
+    return speculation.claim(plan['keys'][-1])
+
+
+def synthesize_outfit(client, base_image_path: str, items: list[dict], max_image_side: int = None,
+                      strategy: str = None) -> bytes | None:
+    """
+    아이템들을 베이스 모델에 합성합니다. 이미 합성한 코디의 중간 결과가 캐시에 있으면 그 위에 새 아이템만 적용하고,
+    결과는 다음 요청을 위해 캐시에 저장합니다. (outfit_cache 참고)
+    모델에 보낼 아이템은 strategy(없거나 'auto' 이면 아이템 수로 자동 선택) 전략으로 합성합니다. (synthesis_strategies 참고)
+
+    Returns:
+        bytes or None: 워터마크 적용 전 합성 이미지, 실패 시 None
+    """
+    plan = outfit_cache.plan(base_image_path, items, strategy, max_image_side)
+    job_id = _claim_speculation(plan)
+    if job_id is not None:
+        if speculation.wait_claimed(plan['keys'][-1], job_id, remaining_time()):
+            plan = outfit_cache.plan(base_image_path, items, strategy, max_image_side) # 'cached'
+        else: # 취소/실패/마감 - 직접 합성
+            print(f"[Synthesis Service] 추측 합성 결과 사용 실패 ({job_id}), 직접 합성")
+    if plan['mode'] == 'cached':
+        image_bytes = outfit_cache.read(plan)
+        if image_bytes:
+            return image_bytes
+        plan.update(mode='full', base_image_path=base_image_path, items=items, chain_depth=0)
+    image_bytes = synthesize_with_strategy(client, strategy_selector.select(len(plan['items']), strategy),
+                                           plan['base_image_path'], plan['items'], max_image_side,
+                                           base_is_outfit=plan['mode'] == 'incremental')
+    outfit_cache.store(plan, image_bytes)
+    return image_bytes
+
+
+async def asynthesize_outfit(client, base_image_path: str, items: list[dict], max_image_side: int = None,
+                             strategy: str = None, speculative: bool = False) -> bytes | None:
+    """
+    synthesize_outfit 의 비동기 버전 (캐시 조회/저장은 스레드에서, 모델 호출은 await)
+    speculative 가 True 이면 추측 합성 작업 자신이므로 진행 중인 추측 합성을 기다리지 않습니다.
+    """
+    plan = await asyncio.to_thread(outfit_cache.plan, base_image_path, items, strategy, max_image_side)
+    job_id = None if speculative else await asyncio.to_thread(_claim_speculation, plan)
+    if job_id is not None:
+        # 결과를 기다리기만 하므로 이 작업이 취소되어도 추측 합성은 계속 (다른 요청이 가져갈 수 있음)
+        if await speculation.await_claimed(plan['keys'][-1], job_id, remaining_time()):
+            plan = await asyncio.to_thread(outfit_cache.plan, base_image_path, items, strategy, max_image_side)
+        else:
+            print(f"[Synthesis Service] 추측 합성 결과 사용 실패 ({job_id}), 직접 합성")
+    if plan['mode'] == 'cached':
+        image_bytes = await asyncio.to_thread(outfit_cache.read, plan)
+        if image_bytes:
+            return image_bytes
+        plan.update(mode='full', base_image_path=base_image_path, items=items, chain_depth=0)
+    image_bytes = await asynthesize_with_strategy(client, strategy_selector.select(len(plan['items']), strategy),
+                                                  plan['base_image_path'], plan['items'], max_image_side,
+                                                  base_is_outfit=plan['mode'] == 'incremental')
+    await asyncio.to_thread(outfit_cache.store, plan, image_bytes)
+    return image_bytes
+
+
+def finalize_result(user_id: int, image_bytes: bytes, items: list[dict], output_filename: str = None) -> dict:
+    """
+    합성 결과에 (설정된 경우) 워터마크를 적용하고 출력 폴더에 PNG 로 저장합니다.
+    output_filename 이 없으면 사용자 ID 와 첫 아이템으로 이름을 정합니다.
+    합성 기록을 사용하면 사용자 결과 파일 이름에 결과 해시 앞부분을 붙입니다. (synthesis_history 참고)
+
+    Returns:
+        dict: {'output_filename': str, 'watermarked': bool, 'output_bytes': int, 'output_digest': str}
+    """
+    final_image_bytes = image_bytes
+    apply_wm = False
+    try:
+        apply_wm_setting = get_setting('apply_watermark'); apply_wm = apply_wm_setting.lower() == 'true' if isinstance(apply_wm_setting, str) else False
+        print(f"[Synthesis Service] 워터마크 적용 설정: {apply_wm}")
+        if apply_wm:
+            watermark_path = os.path.join(current_app.static_folder, 'images', 'watermark.png')
+            if not os.path.exists(watermark_path): print(f"  - 경고: 워터마크 파일 없음: {watermark_path}")
+            else:
+                watermarked_bytes = apply_watermark_func(image_bytes, watermark_path)
+                if watermarked_bytes and watermarked_bytes != image_bytes: final_image_bytes = watermarked_bytes; print("  - 워터마크 적용 성공.")
+                else: print("  - 워터마크 적용 실패 또는 변경 없음.")
+    except Exception as wm_e: print(f"  - 워터마크 처리 중 오류: {wm_e}")
+
+    if not output_filename:
+        first_item_type = items[0]['type'] if items else 'multi'
+        first_item_name = os.path.splitext(os.path.basename(items[0]['path']))[0] if items else 'items'
+        output_filename = f"output_{user_id}_{first_item_type}_{first_item_name}.png"
+    png_buffer = BytesIO()
+    Image.open(BytesIO(final_image_bytes)).save(png_buffer, format='PNG')
+    png_bytes = png_buffer.getvalue()
+    output_digest = hashlib.sha256(png_bytes).hexdigest()
+    if user_id is not None:
+        output_filename = synthesis_history.output_filename(output_filename, output_digest)
+    output_filepath = os.path.join(current_app.config['OUTPUT_FOLDER'], output_filename)
+    with open(output_filepath, 'wb') as f:
+        f.write(png_bytes)
+    print(f"[Synthesis Service] 최종 결과 이미지 저장 완료: {output_filepath}")
+    return {'output_filename': output_filename, 'watermarked': apply_wm, 'output_bytes': len(png_bytes),
+            'output_digest': output_digest}
+
+
+def cleanup_temp_files(temp_files: list[str]) -> None:
+    """임시 파일을 삭제합니다. (삭제 실패는 경고만 출력)"""
+    for temp_file_path in temp_files:
+        if temp_file_path and os.path.exists(temp_file_path):
+            try: os.remove(temp_file_path)
+            except OSError as e: print(f"[Synthesis Service] 경고: 임시 파일 삭제 실패 - {e}")
+
+
+# --- 비동기 합성 작업 (job_queue 이벤트 루프에서 실행) ---
+def _finalize_in_app(app, user_id: int, image_bytes: bytes, items: list[dict], output_filename: str = None) -> dict:
+    with app.app_context():
+        return finalize_result(user_id, image_bytes, items, output_filename)
+
+
+async def run_synthesis_job(app, job_id: str, user_id: int, reserved_date, base_image_path: str,
+                            items: list[dict], temp_files: list[str], deadline: float,
+                            max_image_side: int = None, strategy: str = None, base_model_id: int = None,
+                            submitted_at: float = None) -> dict:
+    """
+    합성 작업 하나를 실행합니다. 모델 호출은 비동기 클라이언트로 await 하고,
+    DB/파일 처리(블로킹)는 스레드로 넘겨 이벤트 루프가 다른 작업의 호출을 계속 진행할 수 있게 합니다.
+    결과를 저장하기 전에 실패하거나 마감 시간을 넘기면 예약한 사용량을 되돌립니다.
+
+    Args:
+        app (Flask): 애플리케이션 (설정/앱 컨텍스트용)
+        job_id (str): 작업 ID
+        user_id (int): 사용자 ID
+        reserved_date (date): reserve_usage() 가 반환한 날짜
+        base_image_path (str): 베이스 모델 이미지 경로
+        items (list[dict]): [{'type': str, 'path': str}]
+        temp_files (list[str]): 작업이 끝나면 삭제할 임시 파일
+        deadline (float): 작업 마감 시간(초)
+        max_image_side (int, optional): 요청 한도에 맞춰 이미지를 줄일 최대 변 길이 (check_request_budget 결과)
+        strategy (str, optional): 합성 전략 (validate_strategy 결과, None 이면 자동 선택)
+        base_model_id (int, optional): 베이스 모델 ID (합성 기록용)
+        submitted_at (float, optional): 작업을 큐에 넣은 시각 (time.perf_counter(), 합성 기록의 대기 시간)
+
+    Returns:
+        dict: finalize_result() 결과
+    """
+    committed = False
+    queue_ms = elapsed_ms(submitted_at)
+    await asyncio.to_thread(update_synthesis_job, job_id, 'running')
+    try:
+        synthesis_started = time.perf_counter()
+        with ai_deadline(deadline), ai_call_user(user_id):
+            image_bytes = await asynthesize_outfit(app.config.get('AI_CLIENT'), base_image_path, items, max_image_side,
+                                                   strategy)
+        synthesis_ms = elapsed_ms(synthesis_started)
+        if not image_bytes:
+            raise SynthesisError("AI 이미지 합성에 실패했습니다.", 500)
+        result = await asyncio.to_thread(_finalize_in_app, app, user_id, image_bytes, items)
+        committed = True
+        await asyncio.to_thread(synthesis_history.record, user_id, 'job', items, result, base_model_id, strategy,
+                                queue_ms, synthesis_ms, elapsed_ms(submitted_at or synthesis_started))
+        await asyncio.to_thread(cache_warmer.record, items) # 인기 아이템 기록 (임시 파일 삭제 전에 보관)
+        await asyncio.to_thread(update_synthesis_job, job_id, 'succeeded', result['output_filename'])
+        metrics.increment('synthesis_jobs', outcome='succeeded')
+        return result
+    except TimeoutError as e:
+        print(f"[Synthesis Job {job_id}] AI 호출 시간 초과: {e}")
+        metrics.increment('synthesis_jobs', outcome='timeout')
+        await asyncio.to_thread(update_synthesis_job, job_id, 'timeout', None,
+                                "AI 응답 시간이 초과되었습니다. 잠시 후 다시 시도해주세요.")
+        raise
+    except Exception as e:
+        if not isinstance(e, SynthesisError):
+            traceback.print_exc()
+        metrics.increment('synthesis_jobs', outcome='failed')
+        message = e.message if isinstance(e, SynthesisError) else "이미지 합성 처리 중 오류가 발생했습니다."
+        await asyncio.to_thread(update_synthesis_job, job_id, 'failed', None, message)
+        raise
+    finally:
+        if not committed:
+            await asyncio.to_thread(release_usage, user_id, reserved_date)
+        await asyncio.to_thread(cleanup_temp_files, temp_files)
+
+
+async def run_speculative_synthesis(app, user_id: int, base_image_path: str, items: list[dict], deadline: float,
+                                    max_image_side: int = None, strategy: str = None) -> bool:
+    """
+    추측 합성 작업: 코디를 합성해 outfit_cache 에만 저장합니다. (워터마크/출력 파일/사용량 차감 없음)
+    임시 파일은 speculation.start 의 on_done 에서 삭제합니다.
+
+    Returns:
+        bool: 캐시에 결과가 있으면 True
+    """
+    with ai_deadline(deadline), ai_call_user(user_id):
+        image_bytes = await asynthesize_outfit(app.config.get('AI_CLIENT'), base_image_path, items, max_image_side,
+                                               strategy, speculative=True)
+    return bool(image_bytes)
+
+
+async def run_base_model_synthesis(app, user_id: int, base_model_id: int, base_image_path: str, items: list[dict],
+                                   deadline: float, max_image_side: int = None, strategy: str = None,
+                                   submitted_at: float = None) -> dict:
+    """
+    여러 베이스 모델 동시 합성(fan-out)에서 베이스 모델 하나의 합성 작업입니다.
+    출력 파일 이름에 베이스 모델 ID 를 넣어 같은 아이템의 결과끼리 겹치지 않게 합니다.
+    사용량 예약/해제, 합성 기록, 임시 파일 삭제는 결과를 스트리밍하는 쪽(/synthesize/web)이 전달 여부에 따라 처리합니다.
+
+    Returns:
+        dict: finalize_result() 결과 + 'timings' (queue_ms, synthesis_ms - 합성 기록용)
+
+    Raises:
+        SynthesisError: 합성 결과 없음
+        TimeoutError: 마감 시간 초과
+    """
+    queue_ms = elapsed_ms(submitted_at)
+    synthesis_started = time.perf_counter()
+    with ai_deadline(deadline), ai_call_user(user_id):
+        image_bytes = await asynthesize_outfit(app.config.get('AI_CLIENT'), base_image_path, items, max_image_side,
+                                               strategy)
+    synthesis_ms = elapsed_ms(synthesis_started)
+    if not image_bytes:
+        raise SynthesisError("AI 이미지 합성에 실패했습니다.", 500)
+    first_item_type = items[0]['type'] if items else 'multi'
+    first_item_name = os.path.splitext(os.path.basename(items[0]['path']))[0] if items else 'items'
+    output_filename = f"output_{user_id}_base{base_model_id}_{first_item_type}_{first_item_name}.png"
+    result = await asyncio.to_thread(_finalize_in_app, app, user_id, image_bytes, items, output_filename)
+    result['timings'] = {'queue_ms': queue_ms, 'synthesis_ms': synthesis_ms}
+    return result
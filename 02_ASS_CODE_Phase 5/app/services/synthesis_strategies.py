@@ -0,0 +1,240 @@
+# app/services/synthesis_strategies.py
+# 다중 아이템 합성 전략
+#   single     : 베이스 + 모든 아이템을 한 번의 호출로 합성 (호출 1회, 요청이 가장 큼)
+#   sequential : 아이템을 하나씩 차례로 적용, 이전 결과를 다음 호출의 베이스로 사용 (호출 N회, 지연 N배)
+#   parallel   : 아이템마다 베이스에 따로 적용(동시 호출)한 뒤, 베이스와 달라진 영역만 모아 한 장으로 합성(compositing)
+# 요청마다 지정할 수 있고, 지정하지 않으면 아이템 수에 따라 SYNTH_STRATEGY_AUTO 규칙으로 고릅니다.
+# 전략별 지연/바이트/실패율은 synthesis_strategy_bench.py 로 측정합니다.
+
+import os
+import asyncio
+import contextvars
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image, ImageChops, ImageFilter
+
+from app.utils.ai_module import synthesize_multi_items_single_call, asynthesize_multi_items
+from app.utils.metrics import metrics
+
+SINGLE, SEQUENTIAL, PARALLEL = 'single', 'sequential', 'parallel'
+STRATEGIES = (SINGLE, SEQUENTIAL, PARALLEL)
+
+# parallel 합성: 베이스와 픽셀 차이가 이 값(0~255)보다 큰 영역을 아이템이 바뀐 영역으로 봄
+COMPOSITE_DIFF_THRESHOLD = 24
+# 바뀐 영역 마스크를 넓히고(px) 경계를 부드럽게 하는 정도(px)
+COMPOSITE_MASK_GROW = 9
+COMPOSITE_MASK_FEATHER = 4
+
+
+def parse_auto_rule(value: str | None) -> list[tuple[int, str]]:
+    """
+    '1:single,4:parallel' 형식 (아이템 수 이상이면 전략)을 [(최소 아이템 수, 전략)] 으로 변환합니다.
+    잘못된 항목은 무시하며, 결과가 비면 항상 single.
+    """
+    rule = []
+    for entry in (value or '').split(','):
+        count, _, strategy = entry.partition(':')
+        strategy = strategy.strip().lower()
+        try:
+            count = int(count)
+        except ValueError:
+            count = None
+        if count is None or strategy not in STRATEGIES:
+            if entry.strip():
+                print(f"[Synthesis Strategy] 경고: 잘못된 자동 선택 규칙 무시 - '{entry}'")
+            continue
+        rule.append((count, strategy))
+    return sorted(rule) or [(1, SINGLE)]
+
+
+class StrategySelector:
+    """
+    전략 선택기.
+
+    Args:
+        default (str): 'auto' 또는 고정 전략 (요청에 전략이 없을 때)
+        auto_rule (list[tuple]): parse_auto_rule() 결과
+    """
+
+    def __init__(self, default: str = 'auto', auto_rule: list[tuple[int, str]] = None):
+        self.default = default
+        self.auto_rule = auto_rule or [(1, SINGLE)]
+
+    def configure(self, default: str = None, auto_rule: list[tuple[int, str]] = None) -> None:
+        if default is not None:
+            self.default = default
+        if auto_rule is not None:
+            self.auto_rule = auto_rule
+
+    def select(self, item_count: int, requested: str = None) -> str:
+        """
+        요청한 전략(없거나 'auto' 이면 기본 설정)과 아이템 수로 사용할 전략을 정합니다.
+
+        Raises:
+            ValueError: 알 수 없는 전략
+        """
+        strategy = (requested or self.default or 'auto').lower()
+        if strategy == 'auto':
+            strategy = SINGLE
+            for min_items, candidate in self.auto_rule:
+                if item_count >= min_items:
+                    strategy = candidate
+        if strategy not in STRATEGIES:
+            raise ValueError(f"알 수 없는 합성 전략: {strategy}")
+        if item_count <= 1:
+            return SINGLE # 아이템이 하나면 세 전략이 같은 호출
+        return strategy
+
+
+# 애플리케이션 전역 전략 선택기
+strategy_selector = StrategySelector()
+
+
+def composite_item_results(base_image_path: str, results: list[bytes]) -> bytes:
+    """
+    아이템별 합성 결과를 한 장으로 합칩니다.
+    결과마다 베이스와 달라진 영역(아이템이 입혀진 부분)의 마스크를 만들어, 베이스 위에 순서대로 붙입니다.
+    (모델이 얼굴/포즈/배경을 유지한다는 합성 프롬프트 조건에 기대는 방식 - 겹치는 영역은 뒤 아이템이 우선)
+
+    Returns:
+        bytes: PNG 이미지
+    """
+    with Image.open(base_image_path) as base_fp:
+        base = base_fp.convert('RGB')
+    composite = base.copy()
+    for image_bytes in results:
+        with Image.open(BytesIO(image_bytes)) as result_fp:
+            result = result_fp.convert('RGB')
+        if result.size != base.size:
+            result = result.resize(base.size, Image.Resampling.LANCZOS)
+        diff = ImageChops.difference(result, base).convert('L')
+        mask = diff.point(lambda value: 255 if value > COMPOSITE_DIFF_THRESHOLD else 0)
+        mask = mask.filter(ImageFilter.MaxFilter(COMPOSITE_MASK_GROW))
+        mask = mask.filter(ImageFilter.GaussianBlur(COMPOSITE_MASK_FEATHER))
+        composite = Image.composite(result, composite, mask)
+    buffer = BytesIO()
+    composite.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _write_temp_image(image_bytes: bytes) -> str:
+    fd, path = tempfile.mkstemp(suffix='.png', prefix='synth_step_')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(image_bytes)
+    return path
+
+
+def _remove(paths: list[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def synthesize_with_strategy(client, strategy: str, base_image_path: str, items: list[dict],
+                             max_image_side: int = None, base_is_outfit: bool = False) -> bytes | None:
+    """
+    지정한 전략으로 아이템들을 합성합니다. (인자는 synthesize_multi_items_single_call 과 같음)
+
+    Returns:
+        bytes or None: 합성 이미지, 한 단계라도 실패하면 None
+    """
+    metrics.increment('synthesis_strategy', strategy=strategy)
+    if strategy == SINGLE or len(items) <= 1:
+        return synthesize_multi_items_single_call(client, base_image_path, items, max_image_side, base_is_outfit)
+
+    if strategy == SEQUENTIAL:
+        temp_paths = []
+        current_path, image_bytes = base_image_path, None
+        try:
+            for i, item in enumerate(items):
+                image_bytes = synthesize_multi_items_single_call(client, current_path, [item], max_image_side,
+                                                                 base_is_outfit or i > 0)
+                if not image_bytes:
+                    print(f"[Synthesis Strategy] sequential: {i+1}번째 아이템 ({item['type']}) 적용 실패")
+                    return None
+                if i < len(items) - 1:
+                    current_path = _write_temp_image(image_bytes)
+                    temp_paths.append(current_path)
+            return image_bytes
+        finally:
+            _remove(temp_paths)
+
+    if strategy == PARALLEL:
+        # 아이템마다 호출자의 컨텍스트(마감 시간, 호출 사용자)를 복사하여 동시에 실행
+        with ThreadPoolExecutor(max_workers=len(items), thread_name_prefix='synth-parallel') as executor:
+            futures = [executor.submit(contextvars.copy_context().run, synthesize_multi_items_single_call,
+                                       client, base_image_path, [item], max_image_side, base_is_outfit)
+                       for item in items]
+            results = [future.result() for future in futures]
+        if not all(results):
+            print(f"[Synthesis Strategy] parallel: 아이템 {sum(1 for r in results if not r)}개 적용 실패")
+            return None
+        return composite_item_results(base_image_path, results)
+
+    raise ValueError(f"알 수 없는 합성 전략: {strategy}")
+
+
+async def asynthesize_with_strategy(client, strategy: str, base_image_path: str, items: list[dict],
+                                    max_image_side: int = None, base_is_outfit: bool = False) -> bytes | None:
+    """synthesize_with_strategy 의 비동기 버전 (parallel 은 아이템별 태스크로 동시 호출, 하나가 실패하면 나머지 취소)"""
+    metrics.increment('synthesis_strategy', strategy=strategy)
+    if strategy == SINGLE or len(items) <= 1:
+        return await asynthesize_multi_items(client, base_image_path, items, max_image_side, base_is_outfit)
+
+    if strategy == SEQUENTIAL:
+        temp_paths = []
+        current_path, image_bytes = base_image_path, None
+        try:
+            for i, item in enumerate(items):
+                image_bytes = await asynthesize_multi_items(client, current_path, [item], max_image_side,
+                                                            base_is_outfit or i > 0)
+                if not image_bytes:
+                    print(f"[Synthesis Strategy] sequential: {i+1}번째 아이템 ({item['type']}) 적용 실패")
+                    return None
+                if i < len(items) - 1:
+                    current_path = await asyncio.to_thread(_write_temp_image, image_bytes)
+                    temp_paths.append(current_path)
+            return image_bytes
+        finally:
+            await asyncio.to_thread(_remove, temp_paths)
+
+    if strategy == PARALLEL:
+        # 하나라도 실패(예외/결과 없음)하면 결과를 쓸 수 없으므로 나머지 호출은 바로 취소 (이 작업이 취소될 때도)
+        tasks = [asyncio.create_task(asynthesize_multi_items(client, base_image_path, [item], max_image_side,
+                                                             base_is_outfit)) for item in items]
+        try:
+            for completed in asyncio.as_completed(tasks):
+                if not await completed:
+                    print(f"[Synthesis Strategy] parallel: 아이템 적용 실패 - 나머지 {sum(not t.done() for t in tasks)}개 호출 취소")
+                    return None
+            results = [task.result() for task in tasks]
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return await asyncio.to_thread(composite_item_results, base_image_path, results)
+
+    raise ValueError(f"알 수 없는 합성 전략: {strategy}")
+
+
+def init_synthesis_strategy(app) -> StrategySelector:
+    """
+    환경 변수로 합성 전략 선택을 설정합니다.
+    SYNTH_STRATEGY: 요청에 전략이 없을 때 사용할 전략 - auto(기본), single, sequential, parallel
+    SYNTH_STRATEGY_AUTO: auto 일 때 아이템 수별 규칙 (기본 '1:single' - 항상 한 번의 호출,
+                         예: '1:single,4:parallel' 은 아이템 4개 이상이면 parallel)
+    """
+    default = os.getenv('SYNTH_STRATEGY', 'auto').lower()
+    if default != 'auto' and default not in STRATEGIES:
+        print(f" * 경고: 알 수 없는 SYNTH_STRATEGY '{default}' - 'auto' 사용")
+        default = 'auto'
+    auto_rule = parse_auto_rule(os.getenv('SYNTH_STRATEGY_AUTO', '1:single'))
+    strategy_selector.configure(default=default, auto_rule=auto_rule)
+    app.config['SYNTH_STRATEGY'] = default
+    print(f" * 합성 전략: {default}"
+          f"{' (' + ', '.join(f'{n}개 이상 {s}' for n, s in auto_rule) + ')' if default == 'auto' else ''}")
+    return strategy_selector
@@ -0,0 +1,192 @@
+# app/services/thumbnail_service.py
+# 목록 화면용 작은 이미지: WebP 썸네일, 인라인 저화질 자리 표시 이미지(LQIP), 페이지 단위 스프라이트 시트
+# 갤러리 한 페이지(수십 장)를 원본 PNG 대신 스프라이트 한 장 + 수백 바이트짜리 자리 표시 이미지로 보여주고,
+# 원본은 사용자가 열 때만 내려받습니다. 썸네일/스프라이트 파일 이름은 내용으로 정해지므로 브라우저가 오래 캐시해도 됩니다.
+
+import os
+import base64
+import hashlib
+import threading
+import time
+from io import BytesIO
+
+from PIL import Image, ImageOps, features
+
+from app.utils.metrics import metrics
+
+# WebP 를 쓸 수 없는 Pillow 빌드에서는 JPEG 사용
+THUMBNAIL_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+THUMBNAIL_EXT = '.webp' if THUMBNAIL_FORMAT == 'WEBP' else '.jpg'
+THUMBNAIL_MIME = 'image/webp' if THUMBNAIL_FORMAT == 'WEBP' else 'image/jpeg'
+THUMBNAIL_QUALITY = 75
+SPRITE_QUALITY = 70
+
+# 자리 표시 이미지 긴 변 길이(px)와 품질 - data URI 로 API 응답에 넣으므로 수백 바이트 이내
+PLACEHOLDER_SIDE = 16
+PLACEHOLDER_QUALITY = 30
+
+# 이 횟수만큼 스프라이트를 만들 때마다 오래된 스프라이트 정리
+PRUNE_EVERY_SPRITES = 50
+
+_lock = threading.Lock()
+_sprites_built = 0
+
+
+def _encode(image: Image.Image, quality: int) -> bytes:
+    buffer = BytesIO()
+    if THUMBNAIL_FORMAT == 'WEBP':
+        image.save(buffer, format='WEBP', quality=quality, method=4)
+    else:
+        _flatten(image).save(buffer, format='JPEG', quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """투명 배경을 흰색으로 채운 RGB 이미지 (JPEG 저장/스프라이트용)"""
+    if image.mode not in ('RGBA', 'LA', 'P'):
+        return image.convert('RGB')
+    image = image.convert('RGBA')
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def load_reduced(path: str, max_side: int) -> Image.Image:
+    """이미지를 max_side 이하로 줄여 로드합니다. (JPEG 는 draft 모드로 축소 디코딩, 투명도 유지)"""
+    with Image.open(path) as img:
+        img.draft('RGB', (max_side, max_side)) # JPEG 외 형식은 무시됨
+        img.load()
+        reduced = img.convert('RGBA') if img.mode in ('RGBA', 'LA', 'P') else img.convert('RGB')
+    reduced.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    return reduced
+
+
+def placeholder_data_uri(image: Image.Image) -> str:
+    """이미지의 저화질 자리 표시 이미지 (data URI, 브라우저에서 흐리게 늘려 표시)"""
+    tiny = image.copy()
+    tiny.thumbnail((PLACEHOLDER_SIDE, PLACEHOLDER_SIDE), Image.Resampling.BILINEAR)
+    return f"data:{THUMBNAIL_MIME};base64,{base64.b64encode(_encode(tiny, PLACEHOLDER_QUALITY)).decode()}"
+
+
+def save_thumbnail(source_path: str, thumbnail_path: str, max_side: int,
+                   with_placeholder: bool = False) -> tuple[tuple[int, int], str | None]:
+    """
+    source_path 이미지의 썸네일을 thumbnail_path 에 저장합니다. (THUMBNAIL_FORMAT, 투명도 유지)
+
+    Args:
+        source_path (str): 원본 이미지 경로
+        thumbnail_path (str): 저장할 경로 (확장자는 THUMBNAIL_EXT 사용)
+        max_side (int): 썸네일 긴 변 길이(px)
+        with_placeholder (bool): 자리 표시 이미지도 만들지 여부
+
+    Returns:
+        tuple: (원본 (가로, 세로), 자리 표시 data URI 또는 None)
+    """
+    with Image.open(source_path) as img:
+        size = img.size
+    thumbnail = load_reduced(source_path, max_side)
+    _write_atomic(thumbnail_path, _encode(thumbnail, THUMBNAIL_QUALITY))
+    metrics.increment('thumbnails_saved')
+    return size, (placeholder_data_uri(thumbnail) if with_placeholder else None)
+
+
+def sprite_filename(thumbnail_paths: list[str], cell: int, columns: int) -> str:
+    """스프라이트 파일 이름 (썸네일 목록/칸 크기/열 수 해시)"""
+    key = hashlib.sha256(f"{cell}:{columns}:{THUMBNAIL_FORMAT}\n".encode() + '\n'.join(
+        os.path.basename(path) for path in thumbnail_paths).encode()).hexdigest()
+    return f"sprite_{key[:32]}{THUMBNAIL_EXT}"
+
+
+def cached_sprite(thumbnail_paths: list[str], folder: str, cell: int, columns: int) -> str | None:
+    """이미 만든 스프라이트가 있으면 파일 이름 (정리 대상에서 제외되도록 사용 시각 갱신), 없으면 None"""
+    if not thumbnail_paths:
+        return None
+    filename = sprite_filename(thumbnail_paths, cell, columns)
+    sprite_path = os.path.join(folder, filename)
+    if not os.path.isfile(sprite_path):
+        return None
+    try:
+        os.utime(sprite_path)
+    except OSError:
+        pass
+    metrics.increment('gallery_sprites', outcome='hit')
+    return filename
+
+
+def build_sprite(thumbnail_paths: list[str], folder: str, cell: int, columns: int,
+                 ttl_seconds: float = 86400) -> str | None:
+    """
+    썸네일들을 cell x cell 칸(가운데를 잘라 채움)에 columns 열로 배치한 스프라이트 시트를 만듭니다.
+    같은 썸네일 목록이면 이미 만든 파일을 그대로 사용합니다. (파일 이름 = 목록/칸 크기 해시)
+
+    Args:
+        thumbnail_paths (list[str]): 썸네일 경로 (스프라이트 순서, 파일이 없으면 빈 칸)
+        folder (str): 스프라이트 폴더
+        cell (int): 칸 크기(px)
+        columns (int): 열 수
+        ttl_seconds (float): 이 시간 동안 사용하지 않은 스프라이트는 정리
+
+    Returns:
+        str or None: 스프라이트 파일 이름, 실패 시 None
+    """
+    global _sprites_built
+    if not thumbnail_paths:
+        return None
+    cached = cached_sprite(thumbnail_paths, folder, cell, columns)
+    if cached:
+        return cached
+    filename = sprite_filename(thumbnail_paths, cell, columns)
+    sprite_path = os.path.join(folder, filename)
+
+    start = time.perf_counter()
+    rows = (len(thumbnail_paths) + columns - 1) // columns
+    try:
+        sheet = Image.new('RGB', (cell * min(columns, len(thumbnail_paths)), cell * rows), (243, 244, 246))
+        for index, path in enumerate(thumbnail_paths):
+            try:
+                tile = ImageOps.fit(_flatten(load_reduced(path, cell * 2)), (cell, cell), Image.Resampling.LANCZOS)
+            except (OSError, ValueError):
+                continue # 썸네일이 없으면 빈 칸 (화면에서는 자리 표시 이미지 유지)
+            sheet.paste(tile, ((index % columns) * cell, (index // columns) * cell))
+        _write_atomic(sprite_path, _encode(sheet, SPRITE_QUALITY))
+    except Exception as e:
+        print(f"[Thumbnail Service] 경고: 스프라이트 생성 실패 - {e}")
+        metrics.increment('gallery_sprites', outcome='failed')
+        return None
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    metrics.observe('gallery_sprite_ms', elapsed_ms)
+    metrics.increment('gallery_sprites', outcome='built')
+    print(f"[Thumbnail Service] 스프라이트 생성 {elapsed_ms:.0f}ms: {filename} ({len(thumbnail_paths)}장)")
+
+    with _lock:
+        _sprites_built += 1
+        prune = _sprites_built % PRUNE_EVERY_SPRITES == 0
+    if prune:
+        prune_sprites(folder, ttl_seconds)
+    return filename
+
+
+def prune_sprites(folder: str, ttl_seconds: float = 86400) -> int:
+    """ttl_seconds 동안 사용하지 않은 스프라이트 파일을 삭제합니다. (필요하면 다시 만듦)"""
+    removed = 0
+    cutoff = time.time() - ttl_seconds
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.startswith('sprite_') and entry.stat().st_mtime < cutoff:
+                    try:
+                        os.remove(entry.path)
+                        removed += 1
+                    except OSError:
+                        pass
+    except OSError as e:
+        print(f"[Thumbnail Service] 경고: 스프라이트 정리 실패 - {e}")
+    return removed
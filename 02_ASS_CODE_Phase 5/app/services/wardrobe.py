@@ -0,0 +1,167 @@
+# app/services/wardrobe.py
+# 사용자별 옷장: 업로드한 아이템을 전처리된 이미지, 분류된 종류, 썸네일과 함께 보관합니다.
+# 같은 내용(전처리 후 sha256)은 사용자당 한 번만 저장하므로, 다시 합성할 때 아이템 ID 만 보내면
+# 업로드/분류/전처리를 반복하지 않고 합성 캐시 키(outfit_cache.prefix_keys)도 항상 같습니다.
+# 파일 배치: <WARDROBE_FOLDER>/<사용자 ID>/<해시 앞 2자리>/<해시>.<jpg|png> 와 <해시>_thumb.webp
+
+import os
+import shutil
+
+from flask import url_for
+
+from app.utils.db_utils import (
+    add_wardrobe_item, get_wardrobe_item_by_digest, get_wardrobe_items_by_ids, delete_wardrobe_item,
+    count_wardrobe_items
+)
+from app.utils.metrics import metrics
+from app.services.item_preprocess import item_preprocessor
+from app.services.outfit_cache import file_digest
+from app.services.classification_service import classify_image
+from app.services.thumbnail_service import save_thumbnail, THUMBNAIL_EXT
+
+
+class WardrobeError(Exception):
+    """옷장 처리 오류 (라우트에서 status_code 로 응답)"""
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class Wardrobe:
+    """
+    옷장 파일 저장소. 아이템 정보는 wardrobe_items 테이블에 있습니다.
+
+    Args:
+        folder (str): 옷장 파일 폴더
+        max_items (int): 사용자당 최대 아이템 수
+        thumbnail_side (int): 썸네일 긴 변 길이(px)
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.folder = None
+        self.max_items = 500
+        self.thumbnail_side = 256
+
+    def configure(self, **settings) -> None:
+        for name, value in settings.items():
+            if value is not None:
+                setattr(self, name, value)
+
+    def _paths(self, user_id: int, digest: str, ext: str) -> tuple[str, str]:
+        directory = os.path.join(self.folder, str(user_id), digest[:2])
+        return os.path.join(directory, f"{digest}{ext}"), os.path.join(directory, f"{digest}_thumb{THUMBNAIL_EXT}")
+
+    def add(self, user_id: int, source_path: str, item_type: str = None, original_filename: str = None,
+            client=None) -> dict:
+        """
+        업로드한 아이템 이미지를 전처리해 옷장에 추가합니다. 같은 내용이 이미 있으면 기존 아이템을 반환합니다.
+        종류가 없으면 분류합니다. (이미 있는 아이템은 저장된 종류를 그대로 사용)
+
+        Args:
+            user_id (int): 사용자 ID
+            source_path (str): 업로드한 이미지 파일 경로 (임시 파일, 호출하는 쪽에서 삭제)
+            item_type (str, optional): 아이템 종류
+            original_filename (str, optional): 업로드한 파일 이름
+            client (optional): 분류에 사용할 AI 클라이언트
+
+        Returns:
+            dict: 옷장 아이템 정보 + 'created'
+
+        Raises:
+            WardrobeError: 옷장이 가득 참, 분류 실패, 저장 실패
+        """
+        processed_path = item_preprocessor.process(source_path)
+        digest = file_digest(processed_path)
+        existing = get_wardrobe_item_by_digest(user_id, digest)
+        if existing and os.path.isfile(existing['file_path']):
+            metrics.increment('wardrobe_items', outcome='duplicate')
+            return dict(existing, created=False)
+        if not existing and count_wardrobe_items(user_id) >= self.max_items:
+            raise WardrobeError(f"옷장에는 최대 {self.max_items}개까지 저장할 수 있습니다. 사용하지 않는 아이템을 삭제해주세요.", 409)
+
+        if not item_type:
+            item_type = classify_image(client, processed_path) # AI 클라이언트가 없어도 캐시/로컬 분류기는 사용
+            if not item_type:
+                raise WardrobeError("아이템 종류를 분류하지 못했습니다. 종류를 직접 선택해주세요.", 422)
+
+        ext = os.path.splitext(processed_path)[1].lower() or '.png'
+        file_path, thumbnail_path = self._paths(user_id, digest, ext)
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            temp_path = f"{file_path}.{os.getpid()}.tmp"
+            shutil.copyfile(processed_path, temp_path)
+            os.replace(temp_path, file_path)
+            (width, height), _ = save_thumbnail(file_path, thumbnail_path, self.thumbnail_side)
+        except Exception as e:
+            print(f"[Wardrobe] 아이템 파일 저장 실패: {e}")
+            raise WardrobeError("옷장에 아이템을 저장하지 못했습니다.", 500)
+
+        item = add_wardrobe_item(user_id, digest, item_type, file_path, thumbnail_path, width, height, original_filename)
+        if item is None:
+            raise WardrobeError("옷장에 아이템을 저장하지 못했습니다.", 500)
+        metrics.increment('wardrobe_items', outcome='created' if item['created'] else 'duplicate')
+        print(f"[Wardrobe] 아이템 저장: 사용자 {user_id}, ID {item['id']} ({item_type}, {width}x{height})")
+        return item
+
+    def resolve(self, user_id: int, item_ids: list[int]) -> dict[int, dict]:
+        """합성에 사용할 사용자의 옷장 아이템 (파일이 없는 아이템 제외)"""
+        items = get_wardrobe_items_by_ids(user_id, item_ids)
+        return {item_id: item for item_id, item in items.items() if os.path.isfile(item['file_path'])}
+
+    def remove(self, user_id: int, item_id: int) -> bool:
+        """옷장 아이템과 파일을 삭제합니다."""
+        item = delete_wardrobe_item(user_id, item_id)
+        if not item:
+            return False
+        for path in (item['file_path'], item['thumbnail_path']):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return True
+
+    def file_url(self, path: str) -> str:
+        return url_for('wardrobe.serve_wardrobe_file', filename=os.path.relpath(path, self.folder).replace(os.sep, '/'))
+
+    def to_json(self, item: dict) -> dict:
+        """API 응답용 아이템 정보 (서버 파일 경로 대신 URL)"""
+        data = {
+            'id': item['id'], 'type': item['item_type'], 'width': item['width'], 'height': item['height'],
+            'name': item.get('original_filename'), 'created_at': item.get('created_at'),
+            'image_url': self.file_url(item['file_path']), 'thumbnail_url': self.file_url(item['thumbnail_path']),
+        }
+        if 'created' in item:
+            data['created'] = item['created']
+        return data
+
+
+# 애플리케이션 전역 옷장
+wardrobe = Wardrobe()
+
+
+def init_wardrobe(app) -> Wardrobe:
+    """
+    환경 변수로 옷장을 설정합니다.
+    WARDROBE_ENABLED: 사용 여부 (기본 true)
+    WARDROBE_FOLDER: 옷장 파일 폴더 (기본 <프로젝트>/wardrobe)
+    WARDROBE_MAX_ITEMS: 사용자당 최대 아이템 수 (기본 500)
+    WARDROBE_THUMBNAIL_SIDE: 썸네일 긴 변 길이(px, 기본 256)
+    """
+    enabled = os.getenv('WARDROBE_ENABLED', 'true').lower() == 'true'
+    folder = os.getenv('WARDROBE_FOLDER') or os.path.join(os.path.dirname(app.config['OUTPUT_FOLDER']), 'wardrobe')
+    if enabled:
+        try:
+            os.makedirs(folder, exist_ok=True)
+        except OSError as e:
+            print(f" * 오류: 옷장 폴더 생성 실패 - {e} (옷장 미사용)")
+            enabled = False
+    wardrobe.configure(enabled=enabled, folder=folder, max_items=int(os.getenv('WARDROBE_MAX_ITEMS', '500')),
+                       thumbnail_side=int(os.getenv('WARDROBE_THUMBNAIL_SIDE', '256')))
+    app.config['WARDROBE_ENABLED'] = enabled
+    if enabled:
+        print(f" * 옷장: 사용 (사용자당 최대 {wardrobe.max_items}개, {folder})")
+    else:
+        print(" * 옷장: 미사용")
+    return wardrobe
@@ -0,0 +1,243 @@
+# app/utils/ai_backends.py
+# 로컬 가짜(fake) AI 백엔드
+# genai.Client 와 같은 인터페이스(client.models.generate_content / client.models.get / client.aio.models)를 제공하여
+# API 키나 네트워크 없이 지연시간, 일시적 오류(429/5xx)를 재현하고 재시도/헤징/제한 로직을 확인할 때 사용합니다.
+# AI_BACKEND=fake 로 앱을 실행하면 실제 클라이언트 대신 사용됩니다.
+# RecordedGenAIClient 는 운영에서 기록한 실제 호출(ai_calls)의 지연/오류를 순서대로 재생합니다. (벤치마크용)
+
+import os
+import asyncio
+import json
+import random
+import threading
+import time
+from io import BytesIO
+import httpx
+from PIL import Image
+from google.genai import errors, types
+
+_ERROR_STATUS = {
+    400: 'INVALID_ARGUMENT', 403: 'PERMISSION_DENIED', 404: 'NOT_FOUND', 429: 'RESOURCE_EXHAUSTED',
+    500: 'INTERNAL', 503: 'UNAVAILABLE', 504: 'DEADLINE_EXCEEDED',
+}
+
+
+def make_api_error(code: int, message: str = None) -> errors.APIError:
+    """실제 SDK 와 같은 예외 타입(ClientError/ServerError)을 만듭니다."""
+    response_json = {'error': {'code': code, 'message': message or f'fake error {code}',
+                               'status': _ERROR_STATUS.get(code, 'UNKNOWN')}}
+    error_class = errors.ClientError if code < 500 else errors.ServerError
+    return error_class(code, response_json)
+
+
+class FakeModels:
+    """client.models 대체 객체"""
+
+    def __init__(self, client: 'FakeGenAIClient'):
+        self._client = client
+
+    def get(self, model: str, config=None) -> types.Model:
+        return types.Model(name=model, supported_actions=['generateContent'])
+
+    def generate_content(self, model: str, contents, config=None) -> types.GenerateContentResponse:
+        return self._client._generate(model, contents, config)
+
+
+class FakeAsyncModels:
+    """client.aio.models 대체 객체 (asyncio.sleep 으로 지연 재현)"""
+
+    def __init__(self, client: 'FakeGenAIClient'):
+        self._client = client
+
+    async def get(self, model: str, config=None) -> types.Model:
+        return types.Model(name=model, supported_actions=['generateContent'])
+
+    async def generate_content(self, model: str, contents, config=None) -> types.GenerateContentResponse:
+        delay, error_code, timeout_ms = self._client._plan(config)
+        if timeout_ms is not None and delay * 1000 > timeout_ms:
+            await asyncio.sleep(timeout_ms / 1000)
+            self._client._record_cancel()
+            raise httpx.ReadTimeout(f"fake request cancelled after {timeout_ms}ms")
+        await asyncio.sleep(delay)
+        return self._client._respond(contents, config, error_code)
+
+
+class _FakeAsyncClient:
+    def __init__(self, client: 'FakeGenAIClient'):
+        self.models = FakeAsyncModels(client)
+
+
+class FakeGenAIClient:
+    """
+    genai.Client 대체용 가짜 클라이언트.
+
+    Args:
+        latency (float): 기본 응답 지연(초)
+        latency_jitter (float): 지연에 더해지는 0 ~ latency_jitter 사이 무작위 값(초)
+        slow_rate (float): 느린 응답(꼬리 지연) 비율 0~1
+        slow_latency (float): 느린 응답의 지연(초)
+        failure_rate (float): 무작위 오류 비율 0~1
+        failure_codes (tuple): 무작위 오류에 사용할 HTTP 상태 코드
+        failure_plan (list): 앞에서부터 순서대로 적용할 결과 (상태 코드 또는 None=성공). 소진 후 무작위 설정 적용
+        classify_label (str): 분류 요청에 대한 응답 라벨
+        seed (int, optional): 난수 시드
+    """
+
+    def __init__(self, latency: float = 0.05, latency_jitter: float = 0.0, slow_rate: float = 0.0,
+                 slow_latency: float = 2.0, failure_rate: float = 0.0, failure_codes: tuple = (503,),
+                 failure_plan: list = None, classify_label: str = 'top', seed: int = None):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.failure_rate = failure_rate
+        self.failure_codes = tuple(failure_codes)
+        self.failure_plan = list(failure_plan or [])
+        self.classify_label = classify_label
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.call_count = 0
+        self.cancelled_count = 0 # http_options.timeout 으로 취소된 요청 수
+        self.models = FakeModels(self)
+        self.aio = _FakeAsyncClient(self)
+
+    @classmethod
+    def from_env(cls) -> 'FakeGenAIClient':
+        """FAKE_AI_LATENCY, FAKE_AI_SLOW_RATE, FAKE_AI_FAILURE_RATE 등 환경 변수로 생성합니다."""
+        codes = tuple(int(c) for c in os.getenv('FAKE_AI_FAILURE_CODES', '503,429').split(',') if c.strip())
+        return cls(latency=float(os.getenv('FAKE_AI_LATENCY', '0.5')),
+                   latency_jitter=float(os.getenv('FAKE_AI_LATENCY_JITTER', '0.2')),
+                   slow_rate=float(os.getenv('FAKE_AI_SLOW_RATE', '0')),
+                   slow_latency=float(os.getenv('FAKE_AI_SLOW_LATENCY', '5')),
+                   failure_rate=float(os.getenv('FAKE_AI_FAILURE_RATE', '0')),
+                   failure_codes=codes or (503,))
+
+    # --- 동작 결정 ---
+    def _next_outcome(self) -> tuple[float, int | None]:
+        """이번 호출의 (지연, 오류 코드 또는 None)"""
+        with self._lock:
+            self.call_count += 1
+            delay = self.latency + self._random.uniform(0, self.latency_jitter)
+            if self._random.random() < self.slow_rate:
+                delay = self.slow_latency
+            if self.failure_plan:
+                return delay, self.failure_plan.pop(0)
+            if self._random.random() < self.failure_rate:
+                return delay, self._random.choice(self.failure_codes)
+            return delay, None
+
+    def _plan(self, config) -> tuple[float, int | None, int | None]:
+        """이번 호출의 (지연, 오류 코드, 요청 타임아웃 ms)"""
+        delay, error_code = self._next_outcome()
+        timeout_ms = getattr(getattr(config, 'http_options', None), 'timeout', None)
+        return delay, error_code, timeout_ms
+
+    def _record_cancel(self) -> None:
+        with self._lock:
+            self.cancelled_count += 1
+
+    # --- 응답 생성 ---
+    def _generate(self, model: str, contents, config=None) -> types.GenerateContentResponse:
+        delay, error_code, timeout_ms = self._plan(config)
+        if timeout_ms is not None and delay * 1000 > timeout_ms:
+            # 실제 SDK(httpx)처럼 요청 타임아웃에서 연결을 끊고 예외 발생
+            time.sleep(timeout_ms / 1000)
+            self._record_cancel()
+            raise httpx.ReadTimeout(f"fake request cancelled after {timeout_ms}ms")
+        time.sleep(delay)
+        return self._respond(contents, config, error_code)
+
+    def _respond(self, contents, config, error_code: int | None) -> types.GenerateContentResponse:
+        if error_code:
+            raise make_api_error(error_code)
+
+        images = [self._to_image(part) for part in contents]
+        images = [image for image in images if image is not None]
+        modalities = [m.lower() for m in (getattr(config, 'response_modalities', None) or [])]
+        if 'image' in modalities:
+            return self._image_response(images)
+        if getattr(config, 'response_mime_type', None) == 'application/json':
+            payload = [{'index': i + 1, 'item_type': self.classify_label} for i in range(len(images))]
+            return self._text_response(json.dumps(payload), len(images))
+        return self._text_response(self.classify_label, len(images))
+
+    @staticmethod
+    def _to_image(part) -> Image.Image | None:
+        """입력 파트가 이미지(PIL 또는 인코딩된 inline_data)이면 PIL 이미지로 반환합니다."""
+        if isinstance(part, Image.Image):
+            return part
+        blob = getattr(part, 'inline_data', None)
+        if blob is not None and blob.mime_type and blob.mime_type.startswith('image/'):
+            return Image.open(BytesIO(blob.data))
+        return None
+
+    @staticmethod
+    def _usage(prompt_images: int, output_tokens: int) -> types.GenerateContentResponseUsageMetadata:
+        # 실제 API 와 비슷한 크기: 입력 이미지당 258 토큰 + 텍스트, 출력 이미지당 1290 토큰
+        prompt_tokens = 258 * prompt_images + 60
+        return types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens, candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens)
+
+    @classmethod
+    def _text_response(cls, text: str, prompt_images: int = 0) -> types.GenerateContentResponse:
+        return types.GenerateContentResponse(candidates=[
+            types.Candidate(content=types.Content(role='model', parts=[types.Part(text=text)]),
+                            finish_reason=types.FinishReason.STOP)
+        ], usage_metadata=cls._usage(prompt_images, max(1, len(text) // 4)))
+
+    @classmethod
+    def _image_response(cls, images: list) -> types.GenerateContentResponse:
+        """첫 번째 입력 이미지(베이스 모델)를 그대로 PNG 로 돌려줍니다."""
+        source = images[0] if images else Image.new('RGB', (512, 512), (200, 200, 200))
+        buffer = BytesIO()
+        source.convert('RGB').save(buffer, format='PNG')
+        return types.GenerateContentResponse(candidates=[
+            types.Candidate(content=types.Content(role='model', parts=[
+                types.Part(inline_data=types.Blob(mime_type='image/png', data=buffer.getvalue()))
+            ]), finish_reason=types.FinishReason.STOP)
+        ], usage_metadata=cls._usage(len(images), 1290))
+
+
+class RecordedGenAIClient(FakeGenAIClient):
+    """
+    기록된 실제 호출의 지연/오류를 재생하는 가짜 클라이언트.
+    기록은 ai_calls 테이블 행 (task, status, attempts, ttfb_ms, latency_ms, error_code)을 JSON Lines 로 내보낸 파일입니다.
+    (synthesis_strategy_bench.py --export-recording 으로 생성)
+
+    Args:
+        records (list[dict]): 재생할 호출 기록 (순서대로 반복)
+        latency_scale (float): 기록된 지연에 곱할 배율 (빠른 재생용)
+        **kwargs: FakeGenAIClient 인자 (classify_label, seed 등)
+    """
+
+    def __init__(self, records: list[dict], latency_scale: float = 1.0, **kwargs):
+        super().__init__(**kwargs)
+        if not records:
+            raise ValueError("재생할 호출 기록이 없습니다.")
+        self.records = list(records)
+        self.latency_scale = latency_scale
+        self._position = 0
+
+    @classmethod
+    def from_file(cls, path: str, task: str = 'synthesize', **kwargs) -> 'RecordedGenAIClient':
+        """JSON Lines 기록 파일에서 task 작업의 호출만 읽어 생성합니다."""
+        with open(path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        return cls([r for r in records if not task or r.get('task') == task], **kwargs)
+
+    def _next_outcome(self) -> tuple[float, int | None]:
+        with self._lock:
+            self.call_count += 1
+            record = self.records[self._position % len(self.records)]
+            self._position += 1
+        attempts = max(1, record.get('attempts') or 1)
+        if record.get('status') == 'ok':
+            # 성공한 시도의 서버 응답 시간 (재시도/대기 제외)
+            delay_ms = record.get('ttfb_ms') or (record.get('latency_ms') or 0) / attempts
+            return delay_ms / 1000 * self.latency_scale, None
+        delay_ms = (record.get('latency_ms') or 0) / attempts
+        if record.get('status') == 'timeout':
+            # 응답이 오지 않은 호출 - 오류 없이 오래 걸리는 호출로 재생 (요청 타임아웃이 취소)
+            return (record.get('latency_ms') or 0) / 1000 * self.latency_scale, None
+        return delay_ms / 1000 * self.latency_scale, record.get('error_code') or 500
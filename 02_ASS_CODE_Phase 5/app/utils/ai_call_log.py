@@ -0,0 +1,277 @@
+# app/utils/ai_call_log.py
+# AI 모델 호출 계측: 호출마다 모델, 요청/응답 바이트, 토큰 수(usage_metadata), 첫 바이트까지 시간, 전체 지연,
+# 재시도 횟수, finish_reason 을 메트릭 레지스트리에 기록하고 ai_calls 테이블에 저장합니다.
+# DB 저장은 요청 경로를 막지 않도록 백그라운드 스레드가 모아서(batch) 한 번에 INSERT 합니다.
+# 비용은 AI_MODEL_PRICES(모델별 100만 토큰당 USD)로 계산하며, 관리자 화면에서 사용자별/모델별로 집계합니다.
+
+import os
+import contextvars
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from app.utils.metrics import metrics
+
+# 호출한 사용자 (요청/작업 단위로 설정, 스레드 풀/비동기 태스크로 복사됨)
+_call_user = contextvars.ContextVar('ai_call_user', default=None)
+
+
+@contextmanager
+def ai_call_user(user_id: int | None):
+    """이 블록 안의 AI 호출을 user_id 사용자의 호출로 기록합니다. (비동기 작업 등 요청 밖에서 사용)"""
+    token = _call_user.set(user_id)
+    try:
+        yield
+    finally:
+        _call_user.reset(token)
+
+
+def parse_model_prices(value: str | None) -> dict:
+    """
+    'gemini-2.0-flash=0.10:0.40,*=0.10:0.40' 형식 (모델=입력:출력, 100만 토큰당 USD)을
+    {모델: (입력 단가, 출력 단가)} 로 변환합니다. '*' 는 개별 설정이 없는 모든 모델에 적용됩니다.
+    """
+    prices = {}
+    for entry in (value or '').split(','):
+        if '=' not in entry:
+            continue
+        model, _, rates = entry.partition('=')
+        input_rate, _, output_rate = rates.partition(':')
+        try:
+            prices[model.strip()] = (float(input_rate), float(output_rate or input_rate))
+        except ValueError:
+            print(f"[AI Call Log] 경고: 잘못된 단가 설정 무시 - '{entry}'")
+    return prices
+
+
+class AICall:
+    """
+    모델 호출 하나(재시도/헤징 시도 포함)의 계측값.
+    시도 함수 안에서 attempt_started() / response_received() 를, 호출이 끝나면 set_response() 를 호출합니다.
+    """
+
+    def __init__(self, task: str, model_name: str, request_bytes: int = 0):
+        self.task = task
+        self.model_name = model_name
+        self.user_id = _call_user.get()
+        self.request_bytes = request_bytes
+        self.response_bytes = 0
+        self.prompt_tokens = None
+        self.output_tokens = None
+        self.total_tokens = None
+        self.attempts = 0
+        self.rate_limit_wait_ms = 0.0
+        self.ttfb_ms = None
+        self.latency_ms = None
+        self.finish_reason = None
+        self.status = 'ok'
+        self.error_code = None
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+    def attempt_started(self, rate_limit_wait: float = 0.0) -> float:
+        """시도 하나를 셉니다. 반환값(요청 전송 시각)은 response_received() 에 전달합니다."""
+        with self._lock:
+            self.attempts += 1
+            self.rate_limit_wait_ms += rate_limit_wait * 1000
+        return time.perf_counter()
+
+    def response_received(self, sent_at: float) -> None:
+        """
+        성공한 시도의 요청 전송부터 응답 수신까지 시간(첫 바이트까지 시간)을 기록합니다.
+        비스트리밍 호출은 응답 본문이 한 번에 오므로, 재시도 대기/레이트 리밋 대기를 뺀 서버 응답 시간에 해당합니다.
+        """
+        with self._lock:
+            if self.ttfb_ms is None:
+                self.ttfb_ms = (time.perf_counter() - sent_at) * 1000
+
+    def set_response(self, response) -> None:
+        """응답에서 토큰 수(usage_metadata), 응답 바이트, finish_reason 을 추출합니다."""
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None:
+            self.prompt_tokens = usage.prompt_token_count
+            self.output_tokens = (usage.candidates_token_count or 0) + (usage.thoughts_token_count or 0) \
+                if usage.candidates_token_count is not None or usage.thoughts_token_count is not None else None
+            self.total_tokens = usage.total_token_count
+        candidates = getattr(response, 'candidates', None) or []
+        if candidates:
+            reason = candidates[0].finish_reason
+            self.finish_reason = getattr(reason, 'name', None) or (str(reason) if reason else None)
+        size = 0
+        for candidate in candidates:
+            for part in (candidate.content.parts if candidate.content and candidate.content.parts else []):
+                if part.inline_data and part.inline_data.data:
+                    size += len(part.inline_data.data)
+                elif part.text:
+                    size += len(part.text.encode('utf-8'))
+        self.response_bytes = size
+
+    def set_error(self, error: BaseException) -> None:
+        """예외로 끝난 호출의 상태: timeout, error, 취소(CancelledError, KeyboardInterrupt 등 Exception 이 아닌 예외)는 cancelled"""
+        if not isinstance(error, Exception):
+            self.status = 'cancelled'
+        else:
+            self.status = 'timeout' if isinstance(error, TimeoutError) else 'error'
+        self.error_code = getattr(error, 'code', None) if isinstance(getattr(error, 'code', None), int) else None
+
+    def cost_usd(self, prices: dict) -> float | None:
+        rates = prices.get(self.model_name, prices.get('*'))
+        if not rates or self.prompt_tokens is None:
+            return None
+        return ((self.prompt_tokens or 0) * rates[0] + (self.output_tokens or 0) * rates[1]) / 1_000_000
+
+    def as_row(self, prices: dict) -> dict:
+        return {
+            'user_id': self.user_id, 'task': self.task, 'model_name': self.model_name, 'status': self.status,
+            'attempts': self.attempts, 'retries': self.retries,
+            'request_bytes': self.request_bytes, 'response_bytes': self.response_bytes,
+            'prompt_tokens': self.prompt_tokens, 'output_tokens': self.output_tokens, 'total_tokens': self.total_tokens,
+            'ttfb_ms': round(self.ttfb_ms) if self.ttfb_ms is not None else None,
+            'latency_ms': round(self.latency_ms) if self.latency_ms is not None else None,
+            'rate_limit_wait_ms': round(self.rate_limit_wait_ms),
+            'finish_reason': self.finish_reason, 'error_code': self.error_code,
+            'cost_usd': self.cost_usd(prices),
+        }
+
+
+class AICallLogWriter:
+    """
+    ai_calls 테이블 비동기 기록기. 큐에 쌓인 행을 batch_size 개 또는 flush_interval 초마다 한 번에 저장합니다.
+    큐가 가득 차면 (DB 장애 등) 새 기록은 버리고 메트릭만 남깁니다.
+    """
+
+    def __init__(self, batch_size: int = 100, flush_interval: float = 2.0, max_queue: int = 10000):
+        self.enabled = True
+        self.prices = {}
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def configure(self, enabled: bool = None, prices: dict = None) -> None:
+        if enabled is not None:
+            self.enabled = enabled
+        if prices is not None:
+            self.prices = dict(prices)
+
+    def _ensure_thread(self) -> None:
+        # fork 된 워커 프로세스에서는 스레드를 새로 시작
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._thread = threading.Thread(target=self._run, name='ai-call-log-writer', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def submit(self, call: AICall) -> None:
+        if not self.enabled:
+            return
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(call.as_row(self.prices))
+        except queue.Full:
+            metrics.increment('ai_call_log_dropped')
+
+    def _run(self) -> None:
+        from app.utils.db_utils import insert_ai_calls # 순환 import 방지
+        while True:
+            rows = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    rows.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if insert_ai_calls(rows) < len(rows):
+                metrics.increment('ai_call_log_dropped', len(rows))
+
+
+# 애플리케이션 전역 기록기
+ai_call_log = AICallLogWriter()
+
+
+def record_ai_call(call: AICall) -> None:
+    """호출 계측값을 메트릭 레지스트리와 ai_calls 테이블(비동기)에 기록합니다."""
+    call.latency_ms = (time.perf_counter() - call._start) * 1000
+    labels = {'task': call.task, 'model': call.model_name}
+    metrics.increment('ai_calls', status=call.status, **labels)
+    metrics.observe('ai_call_total_latency_ms', call.latency_ms, **labels)
+    if call.ttfb_ms is not None:
+        metrics.observe('ai_call_ttfb_ms', call.ttfb_ms, **labels)
+    metrics.increment('ai_call_request_bytes', call.request_bytes, **labels)
+    metrics.increment('ai_call_response_bytes', call.response_bytes, **labels)
+    if call.prompt_tokens is not None:
+        metrics.increment('ai_call_tokens', call.prompt_tokens, kind='prompt', **labels)
+    if call.output_tokens is not None:
+        metrics.increment('ai_call_tokens', call.output_tokens, kind='output', **labels)
+    if call.finish_reason:
+        metrics.increment('ai_call_finish_reasons', reason=call.finish_reason, **labels)
+    cost = call.cost_usd(ai_call_log.prices)
+    if cost:
+        metrics.increment('ai_call_cost_usd', cost, **labels)
+    print(f"[AI Call] {call.task}/{call.model_name} {call.status} {call.latency_ms:.0f}ms "
+          f"(ttfb {call.ttfb_ms or 0:.0f}ms, 시도 {call.attempts}회, 요청 {call.request_bytes}B, 응답 {call.response_bytes}B, "
+          f"토큰 {call.prompt_tokens}/{call.output_tokens}, finish={call.finish_reason})")
+    ai_call_log.submit(call)
+
+
+@contextmanager
+def track_ai_call(task: str, model_name: str, request_bytes: int = 0):
+    """
+    모델 호출 하나를 계측합니다. 블록이 예외로 끝나면 상태(error/timeout/cancelled)를 기록하고 예외를 다시 발생시킵니다.
+    작업 취소(asyncio.CancelledError)는 Exception 이 아니므로 따로 받아 cancelled 로 기록합니다.
+
+    사용 예:
+        with track_ai_call('synthesize', model, request_bytes) as call:
+            response = call_with_resilience(_attempt, 'synthesize')
+            call.set_response(response)
+    """
+    call = AICall(task, model_name, request_bytes)
+    try:
+        yield call
+    except BaseException as e: # 취소(CancelledError)도 기록
+        call.set_error(e)
+        raise
+    finally:
+        record_ai_call(call)
+
+
+def init_ai_call_log(app) -> AICallLogWriter:
+    """
+    AI 호출 기록을 설정하고, 요청마다 로그인 사용자를 호출 기록에 연결합니다.
+    AI_CALL_LOG_ENABLED: ai_calls 테이블 저장 여부 (기본 true, 메트릭은 항상 기록)
+    AI_MODEL_PRICES: 모델별 100만 토큰당 USD 단가 (예: 'gemini-2.0-flash-exp-image-generation=0.10:0.40')
+    """
+    from flask import g, session
+
+    enabled = os.getenv('AI_CALL_LOG_ENABLED', 'true').lower() == 'true'
+    prices = parse_model_prices(os.getenv('AI_MODEL_PRICES'))
+    ai_call_log.configure(enabled=enabled, prices=prices)
+    app.config['AI_MODEL_PRICES'] = prices
+
+    @app.before_request
+    def _set_ai_call_user():
+        g.ai_call_user_token = _call_user.set(session.get('user_id'))
+
+    @app.teardown_request
+    def _reset_ai_call_user(exc=None):
+        token = g.pop('ai_call_user_token', None)
+        if token is not None:
+            _call_user.reset(token)
+
+    print(f" * AI 호출 기록: {'ai_calls 테이블 저장' if enabled else '메트릭만'}"
+          f"{', 단가 ' + str(len(prices)) + '개 모델' if prices else ', 단가 미설정 (비용 집계 없음)'}")
+    return ai_call_log
@@ -2,6 +2,7 @@
 # AI 이미지 합성 및 관련 처리 함수 모음 (사용자 성공 테스트 기반 수정)
 
 import os
+import asyncio
 from io import BytesIO
 from PIL import Image, ImageEnhance # Pillow 라이브러리
 # google import 방식 확인
@@ -9,6 +10,150 @@ from google import genai
 from google.genai import types
 import traceback # 상세 오류 로깅용
 import re # 정규표현식 사용을 위해 추가
+import json
+from app.utils.model_registry import model_registry, is_model_unavailable_error
+from app.utils.resilience import call_with_resilience, acall_with_resilience, remaining_time, mark_attempt_sent
+from app.utils.rate_limiter import rate_limiter
+from app.utils.ai_call_log import track_ai_call
+
+# --- 공통 모델 호출 함수 ---
+def _with_request_timeout(config):
+    """남은 마감 시간을 HTTP 요청 타임아웃(http_options.timeout, ms)으로 설정한 생성 설정을 반환합니다."""
+    remaining = remaining_time()
+    if remaining is None:
+        return config
+    timeout_ms = max(1, int(remaining * 1000))
+    if config is None:
+        return types.GenerateContentConfig(http_options=types.HttpOptions(timeout=timeout_ms))
+    http_options = (config.http_options.model_copy(update={'timeout': timeout_ms}) if config.http_options
+                    else types.HttpOptions(timeout=timeout_ms))
+    return config.model_copy(update={'http_options': http_options})
+
+def _encode_contents(contents: list) -> tuple[list, int]:
+    """
+    프롬프트의 PIL 이미지를 PNG 파트로 미리 인코딩합니다. (SDK 와 같은 형식)
+    재시도/헤징 시도마다 SDK 가 이미지를 다시 인코딩하지 않도록 호출당 한 번만 인코딩하고, 요청 바이트 수를 함께 계산합니다.
+
+    Returns:
+        tuple: (인코딩된 contents, 요청 바이트 수 - 이미지 + 텍스트)
+    """
+    encoded = []
+    request_bytes = 0
+    for part in contents:
+        if isinstance(part, Image.Image):
+            buffer = BytesIO()
+            part.save(buffer, format='PNG')
+            data = buffer.getvalue()
+            encoded.append(types.Part.from_bytes(data=data, mime_type='image/png'))
+            request_bytes += len(data)
+        else:
+            if isinstance(part, str):
+                request_bytes += len(part.encode('utf-8'))
+            encoded.append(part)
+    return encoded, request_bytes
+
+def _generate_content(client: genai.Client, task: str, contents: list, config=None, model_name: str = None):
+    """
+    작업(task)에 맞는 모델을 모델 레지스트리에서 골라 generate_content 를 호출합니다.
+    model_name 을 직접 지정하면 레지스트리를 거치지 않습니다.
+    선택된 모델이 사용 불가 오류를 내면 레지스트리에 기록(백오프 동안 제외)하고 다음 후보로 한 번만 재시도합니다.
+    각 모델 호출은 call_with_resilience 로 감싸져 일시적 오류(429/5xx) 재시도, 마감 시간, 헤징이 적용됩니다.
+    재시도/헤징 요청을 포함한 모든 시도는 보내기 전에 작업별/모델별 레이트 리미터 토큰을 얻습니다.
+    각 시도의 HTTP 요청 타임아웃은 남은 마감 시간으로 설정되어, 마감이 지나면 요청 자체가 취소됩니다.
+    모델 호출마다 바이트/토큰/지연/재시도/finish_reason 을 ai_call_log 에 기록합니다.
+
+    Args:
+        client (genai.Client): 초기화된 Google AI 클라이언트 객체.
+        task (str): 작업 종류 ('classify', 'synthesize')
+        contents (list): 프롬프트 파트 (이미지, 텍스트)
+        config (types.GenerateContentConfig, optional): 생성 설정
+        model_name (str, optional): 강제로 사용할 모델 이름
+
+    Returns:
+        GenerateContentResponse: API 응답 (오류 시 예외 발생, 마감 초과 시 AIDeadlineExceeded)
+    """
+    contents, request_bytes = _encode_contents(contents)
+
+    def _call(target):
+        with track_ai_call(task, target, request_bytes) as call:
+            def _attempt():
+                sent_at = call.attempt_started(rate_limiter.acquire(task, target))
+                mark_attempt_sent() # 레이트 리미터 대기는 호출 지연시간(헤징 기준)에서 제외
+                response = client.models.generate_content(model=target, contents=contents,
+                                                          config=_with_request_timeout(config))
+                call.response_received(sent_at)
+                return response
+            response = call_with_resilience(_attempt, task)
+            call.set_response(response)
+            return response
+
+    if model_name:
+        return _call(model_name)
+
+    tried = ()
+    while True:
+        target_model_name = _next_model(task, tried)
+        try:
+            response = _call(target_model_name)
+            model_registry.mark_ok(target_model_name)
+            return response
+        except Exception as e:
+            tried = _handle_model_failure(task, target_model_name, e, tried)
+
+async def _agenerate_content(client: genai.Client, task: str, contents: list, config=None, model_name: str = None):
+    """
+    _generate_content 의 비동기 버전. SDK 비동기 클라이언트(client.aio.models.generate_content)를 사용하여
+    하나의 이벤트 루프에서 스레드 없이 여러 모델 호출을 동시에 진행할 수 있습니다.
+    모델 선택/전환, 재시도/마감/헤징, 레이트 리미터, 요청 타임아웃, 호출 기록은 동기 버전과 같습니다.
+    """
+    contents, request_bytes = await asyncio.to_thread(_encode_contents, contents)
+
+    async def _call(target):
+        with track_ai_call(task, target, request_bytes) as call:
+            async def _attempt():
+                sent_at = call.attempt_started(await rate_limiter.aacquire(task, target))
+                mark_attempt_sent() # 레이트 리미터 대기는 호출 지연시간(헤징 기준)에서 제외
+                response = await client.aio.models.generate_content(model=target, contents=contents,
+                                                                    config=_with_request_timeout(config))
+                call.response_received(sent_at)
+                return response
+            response = await acall_with_resilience(_attempt, task)
+            call.set_response(response)
+            return response
+
+    if model_name:
+        return await _call(model_name)
+
+    tried = ()
+    while True:
+        target_model_name = _next_model(task, tried)
+        try:
+            response = await _call(target_model_name)
+            model_registry.mark_ok(target_model_name)
+            return response
+        except Exception as e:
+            tried = _handle_model_failure(task, target_model_name, e, tried)
+
+def _next_model(task: str, tried: tuple) -> str:
+    """레지스트리에서 이번에 호출할 모델을 고릅니다. (tried 의 모델 제외)"""
+    target_model_name = model_registry.resolve(task, exclude=tried)
+    if not target_model_name:
+        raise RuntimeError(f"'{task}' 작업에 사용할 수 있는 AI 모델이 없습니다.")
+    print(f"[AI Module] '{target_model_name}' 모델 API 호출 (task={task})...")
+    return target_model_name
+
+def _handle_model_failure(task: str, model_name: str, error: Exception, tried: tuple) -> tuple:
+    """
+    모델 사용 불가 오류이면 레지스트리에 기록하고 다음 후보를 위해 제외 목록을 반환합니다.
+    그 외 오류이거나 남은 후보가 없으면 오류를 그대로 다시 발생시킵니다.
+    """
+    if not is_model_unavailable_error(error):
+        raise error
+    model_registry.mark_failed(model_name, error)
+    tried += (model_name,)
+    if not model_registry.resolve(task, exclude=tried):
+        raise error
+    return tried
 
 # --- 이미지 합성 함수 ---
 # (synthesize_image 함수는 변경 없음 - 이전 코드 유지)
@@ -59,17 +204,12 @@ def synthesize_image(client: genai.Client, base_image_path: str, item_image_path
         prompt_parts = [base_img, item_img, prompt_text]
         print("[AI Module - Synthesize] 프롬프트 구성 완료.")
 
-        target_model_name = "gemini-2.0-flash-exp-image-generation"
         generation_config = types.GenerateContentConfig(
             response_modalities=['Text', 'Image']
         )
 
-        print(f"[AI Module - Synthesize] '{target_model_name}' 모델 API 호출...")
-        response = client.models.generate_content(
-            model=target_model_name,
-            contents=prompt_parts,
-            config=generation_config
-        )
+        # 모델은 레지스트리에서 'synthesize' 작업용으로 확인된 모델을 사용
+        response = _generate_content(client, 'synthesize', prompt_parts, config=generation_config)
         print("[AI Module - Synthesize] API 호출 완료.")
 
         image_bytes = None
@@ -104,13 +244,16 @@ def synthesize_image(client: genai.Client, base_image_path: str, item_image_path
         else:
             print("[AI Module - Synthesize] 최종 실패: 유효한 이미지 데이터를 얻지 못했습니다.")
             return None
+    except TimeoutError:
+        raise # 마감 시간 초과는 모델 오류와 구분하여 호출하는 쪽(라우트/작업)에 전달
     except Exception as e:
         print(f"[AI Module - Synthesize] 이미지 합성 중 예상치 못한 오류 발생: {e}")
         traceback.print_exc()
         return None
     
 # --- 신규: 다중 아이템 동시 합성 함수 (복합 프롬프트 사용) ---
-def synthesize_multi_items_single_call(client: genai.Client, base_image_path: str, items_info: list[dict]) -> bytes | None:
+def synthesize_multi_items_single_call(client: genai.Client, base_image_path: str, items_info: list[dict],
+                                       max_image_side: int = None, base_is_outfit: bool = False) -> bytes | None:
     """
     베이스 모델 이미지에 여러 아이템 이미지를 **한 번의 AI 호출**로 합성합니다. (복합 프롬프트 사용)
 
@@ -119,6 +262,10 @@ def synthesize_multi_items_single_call(client: genai.Client, base_image_path: st
         base_image_path (str): 베이스 모델 이미지 파일 경로.
         items_info (list[dict]): 합성할 아이템 정보 리스트.
                                   각 딕셔너리는 {'type': str, 'path': str} 형태.
+        max_image_side (int, optional): 지정하면 모든 이미지를 긴 변이 이 크기(px) 이하가 되도록 줄여서 전송
+                                        (요청 한도 초과 시 cost_estimator 가 정한 값)
+        base_is_outfit (bool, optional): 베이스 이미지가 이미 아이템을 입힌 중간 결과(점진적 합성)이면 True -
+                                         기존에 입힌 옷은 유지하고 새 아이템만 적용하도록 지시
 
     Returns:
         bytes or None: 성공 시 합성된 이미지 데이터(bytes), 실패 시 None.
@@ -131,9 +278,73 @@ def synthesize_multi_items_single_call(client: genai.Client, base_image_path: st
         print("[AI Module - Synthesize Multi] 오류: 합성할 아이템 정보가 없습니다.")
         return None
 
+    prompt_parts = _build_multi_item_prompt(base_image_path, items_info, max_image_side, base_is_outfit)
+    if prompt_parts is None:
+        return None
+
+    # --- 3. API 호출 ---
+    try:
+        # contents: [base_img, item1_img, item2_img, ..., complex_prompt_text]
+        response = _generate_content(client, 'synthesize', prompt_parts, config=_multi_item_config())
+        print("[AI Module - Synthesize Multi] API 호출 완료.")
+        return _extract_multi_item_image(response)
+
+    except TimeoutError:
+        raise # 마감 시간 초과는 모델 오류와 구분하여 호출하는 쪽(라우트/작업)에 전달
+    except Exception as e:
+        print(f"[AI Module - Synthesize Multi] API 호출 또는 처리 중 예상치 못한 오류 발생: {e}")
+        traceback.print_exc()
+        return None
+
+async def asynthesize_multi_items(client: genai.Client, base_image_path: str, items_info: list[dict],
+                                  max_image_side: int = None, base_is_outfit: bool = False) -> bytes | None:
+    """
+    synthesize_multi_items_single_call 의 비동기 버전 (SDK 비동기 클라이언트 사용).
+    이미지 로드(디코딩)는 이벤트 루프를 막지 않도록 스레드에서 실행하고, 모델 호출은 스레드 없이 await 합니다.
+    합성 작업 큐(job_queue)에서 하나의 이벤트 루프로 여러 합성을 동시에 진행할 때 사용합니다.
+
+    Args / Returns: synthesize_multi_items_single_call 과 동일
+    """
+    print(f"[AI Module - Synthesize Multi Async] 비동기 합성 시작 (Base: {os.path.basename(base_image_path)}, Items: {len(items_info)}개)")
+    if not client:
+        print("[AI Module - Synthesize Multi Async] 오류: 유효한 AI 클라이언트 객체가 전달되지 않았습니다.")
+        return None
+    if not items_info:
+        print("[AI Module - Synthesize Multi Async] 오류: 합성할 아이템 정보가 없습니다.")
+        return None
+
+    prompt_parts = await asyncio.to_thread(_build_multi_item_prompt, base_image_path, items_info, max_image_side,
+                                           base_is_outfit)
+    if prompt_parts is None:
+        return None
+    try:
+        response = await _agenerate_content(client, 'synthesize', prompt_parts, config=_multi_item_config())
+        print("[AI Module - Synthesize Multi Async] API 호출 완료.")
+        return _extract_multi_item_image(response)
+    except TimeoutError:
+        raise
+    except Exception as e:
+        print(f"[AI Module - Synthesize Multi Async] API 호출 또는 처리 중 예상치 못한 오류 발생: {e}")
+        traceback.print_exc()
+        return None
+
+def _multi_item_config() -> types.GenerateContentConfig:
+    return types.GenerateContentConfig(
+        response_modalities=['Text', 'Image'] # 이미지만 받도록 설정 (텍스트 설명 불필요)
+    )
+
+def _build_multi_item_prompt(base_image_path: str, items_info: list[dict], max_image_side: int = None,
+                             base_is_outfit: bool = False) -> list | None:
+    """
+    베이스/아이템 이미지를 로드하고 복합 프롬프트를 만듭니다.
+    max_image_side 가 주어지면 긴 변이 그 크기를 넘는 이미지는 비율을 유지하여 줄입니다.
+    base_is_outfit 이면 베이스 이미지의 사람이 이미 입고 있는 아이템을 유지하도록 지시합니다. (점진적 합성)
+
+    Returns:
+        list or None: [base_img, item1_img, ..., prompt_text], 이미지 로드 실패 시 None
+    """
     # --- 1. 모든 이미지 로드 (베이스 + 아이템들) ---
     loaded_images = [] # 로드된 Pillow Image 객체 저장 (첫번째는 베이스)
-    image_paths_for_prompt = [base_image_path] # 프롬프트 생성을 위한 경로 저장
 
     try:
         # 베이스 이미지 로드
@@ -145,9 +356,15 @@ def synthesize_multi_items_single_call(client: genai.Client, base_image_path: st
         for i, item in enumerate(items_info):
             with Image.open(item['path']) as item_img_fp:
                 loaded_images.append(item_img_fp.copy())
-            image_paths_for_prompt.append(item['path']) # 프롬프트용 경로 추가
             print(f"  - 아이템 {i+1} ({item['type']}) 이미지 로드 완료: {os.path.basename(item['path'])}")
 
+        if max_image_side:
+            for img in loaded_images:
+                if max(img.size) > max_image_side:
+                    original_size = img.size
+                    img.thumbnail((max_image_side, max_image_side), Image.Resampling.LANCZOS)
+                    print(f"  - 요청 한도에 맞춰 이미지 축소: {original_size} -> {img.size}")
+
     except FileNotFoundError as fnf_err:
          print(f"[AI Module - Synthesize Multi] 오류: 이미지 파일을 찾을 수 없습니다 - {fnf_err}")
          return None
@@ -171,71 +388,51 @@ def synthesize_multi_items_single_call(client: genai.Client, base_image_path: st
         prompt_text += f"   - The '{item_type}' item from image {image_index}.\n"
 
     prompt_text += "3. IMPORTANT: Keep the base person's original face, pose, body shape, and background strictly unchanged.\n"
+    if base_is_outfit:
+        prompt_text += "   The person in image 1 is already wearing previously applied items. Keep every existing item exactly as it is, " \
+                       "except where a new item covers the same part of the body.\n"
     prompt_text += "4. Ensure all applied items fit naturally, realistically, and are consistent with each other.\n"
     prompt_text += "5. Maintain a photorealistic style and high quality for the final output image.\n"
     prompt_text += "Provide only the final synthesized image."
 
     prompt_parts.append(prompt_text) # 최종 텍스트 프롬프트를 리스트에 추가
     print(f"[AI Module - Synthesize Multi] 복합 프롬프트 생성 완료:\n---\n{prompt_text}---\n")
+    return prompt_parts
+
+def _extract_multi_item_image(response) -> bytes | None:
+    """합성 응답에서 첫 번째 이미지 파트의 바이트를 추출합니다. 없으면 원인을 로그로 남기고 None."""
+    # --- 4. 응답 처리 ---
+    image_bytes = None
+    if response.candidates:
+        candidate = response.candidates[0]
+        if candidate.content and candidate.content.parts:
+             image_part = None
+             for part in candidate.content.parts:
+                 if hasattr(part, 'inline_data') and part.inline_data and hasattr(part.inline_data, 'mime_type') and part.inline_data.mime_type.startswith("image/"):
+                     image_part = part
+                     break
+             if image_part:
+                 image_bytes = image_part.inline_data.data
+                 print(f"[AI Module - Synthesize Multi] 응답에서 이미지 데이터 추출 성공.")
+             else:
+                  print("[AI Module - Synthesize Multi] 오류: 응답 파트에 이미지 데이터가 없습니다.")
+                  text_part = next((p for p in candidate.content.parts if hasattr(p, 'text') and p.text), None)
+                  if text_part: print(f"  - Text response received: {text_part.text[:200]}...")
 
-    # --- 3. API 호출 ---
-    try:
-        target_model_name = "gemini-2.0-flash-exp-image-generation" # 사용하는 모델 확인 필요
-        generation_config = types.GenerateContentConfig(
-            response_modalities=['Text', 'Image'] # 이미지만 받도록 설정 (텍스트 설명 불필요)
-        )
-        # Safety settings (필요시 설정)
-        # safety_settings = [...]
-
-        print(f"[AI Module - Synthesize Multi] '{target_model_name}' 모델 API 호출...")
-        response = client.models.generate_content(
-            model=target_model_name,
-            contents=prompt_parts, # [base_img, item1_img, item2_img, ..., complex_prompt_text]
-            config=generation_config
-            # safety_settings=safety_settings
-        )
-        print("[AI Module - Synthesize Multi] API 호출 완료.")
-
-        # --- 4. 응답 처리 ---
-        image_bytes = None
-        # (API 응답 구조가 동일하다고 가정하고 기존 로직 사용)
-        if response.candidates:
-            candidate = response.candidates[0]
-            if candidate.content and candidate.content.parts:
-                 image_part = None
-                 for part in candidate.content.parts:
-                     if hasattr(part, 'inline_data') and part.inline_data and hasattr(part.inline_data, 'mime_type') and part.inline_data.mime_type.startswith("image/"):
-                         image_part = part
-                         break
-                 if image_part:
-                     image_bytes = image_part.inline_data.data
-                     print(f"[AI Module - Synthesize Multi] 응답에서 이미지 데이터 추출 성공.")
-                 else:
-                      print("[AI Module - Synthesize Multi] 오류: 응답 파트에 이미지 데이터가 없습니다.")
-                      # (텍스트 응답 등 추가 디버깅 정보 출력 가능)
-                      text_part = next((p for p in candidate.content.parts if hasattr(p, 'text') and p.text), None)
-                      if text_part: print(f"  - Text response received: {text_part.text[:200]}...")
-
-            else:
-                 print("[AI Module - Synthesize Multi] 오류: 응답에 유효한 content 또는 parts가 없습니다.")
-                 if hasattr(candidate, 'finish_reason'): print(f"  - Finish Reason: {candidate.finish_reason}")
-                 if hasattr(candidate, 'safety_ratings'): print(f"  - Safety Ratings: {candidate.safety_ratings}")
-        else:
-            print("[AI Module - Synthesize Multi] 실패: API 응답에서 유효한 candidates를 찾을 수 없습니다.")
-            if hasattr(response, 'prompt_feedback'): print(f"  - Prompt Feedback: {response.prompt_feedback}")
-
-        # --- 5. 반환값 처리 ---
-        if image_bytes:
-            print("[AI Module - Synthesize Multi] 최종 합성 성공: 이미지 데이터 반환.")
-            return image_bytes
         else:
-            print("[AI Module - Synthesize Multi] 최종 실패: 유효한 이미지 데이터를 얻지 못했습니다.")
-            return None
-
-    except Exception as e:
-        print(f"[AI Module - Synthesize Multi] API 호출 또는 처리 중 예상치 못한 오류 발생: {e}")
-        traceback.print_exc()
-        return None
+             print("[AI Module - Synthesize Multi] 오류: 응답에 유효한 content 또는 parts가 없습니다.")
+             if hasattr(candidate, 'finish_reason'): print(f"  - Finish Reason: {candidate.finish_reason}")
+             if hasattr(candidate, 'safety_ratings'): print(f"  - Safety Ratings: {candidate.safety_ratings}")
+    else:
+        print("[AI Module - Synthesize Multi] 실패: API 응답에서 유효한 candidates를 찾을 수 없습니다.")
+        if hasattr(response, 'prompt_feedback'): print(f"  - Prompt Feedback: {response.prompt_feedback}")
+
+    # --- 5. 반환값 처리 ---
+    if image_bytes:
+        print("[AI Module - Synthesize Multi] 최종 합성 성공: 이미지 데이터 반환.")
+        return image_bytes
+    print("[AI Module - Synthesize Multi] 최종 실패: 유효한 이미지 데이터를 얻지 못했습니다.")
+    return None
 
 # --- 워터마크 적용 함수 (수정됨: 리사이즈 및 중앙 배치 로직) ---
 def apply_watermark_func(image_bytes: bytes, watermark_path: str, opacity: float = 0.5) -> bytes | None:
@@ -334,79 +531,172 @@ def classify_item_type(client: genai.Client, image_path: str) -> str | None:
         print("[AI Module - Classify] 오류: 유효한 AI 클라이언트 객체가 전달되지 않았습니다.")
         return None
 
-    # 분류 가능한 아이템 종류 목록 (프롬프트 및 결과 검증에 사용)
-    allowed_categories = ['top', 'bottom', 'shoes', 'bag', 'accessory', 'hair']
-    allowed_categories_str = ", ".join(allowed_categories)
-
     try:
-        # --- 1. 이미지 로드 ---
-        img = None
-        with Image.open(image_path) as img_fp:
-            img = img_fp.copy()
-        print(f"  - 이미지 로드 완료: {os.path.basename(image_path)}")
-
-        # --- 2. 분류용 프롬프트 생성 ---
-        prompt_parts = [
-            img, # 이미지 전달
-            ( # 텍스트 프롬프트
-                f"Analyze the image and identify the main fashion item shown. "
-                f"Choose the most appropriate category ONLY from the following list: {allowed_categories_str}. "
-                f"Respond with ONLY the single category name in lowercase. For example, if it's a t-shirt, respond with 'top'."
-            )
-        ]
+        # --- 1. 이미지 로드 / 2. 분류용 프롬프트 생성 ---
+        prompt_parts = _build_classify_prompt(image_path)
 
         # --- 3. API 호출 ---
         # 분류 작업에는 이미지 생성이 아닌 텍스트 응답만 필요
-        target_model_name = "gemini-pro-vision" # Vision 모델 명시적 사용 시도 (또는 기존 모델 사용)
-        # 참고: gemini-pro-vision 모델은 generate_content 에서 바로 사용 가능할 수 있음. 안되면 기존 모델 사용.
-        # 만약 gemini-pro-vision 사용이 복잡하다면, 이전처럼 gemini-2.0-flash-exp-image-generation 사용 가능
-        print(f"[AI Module - Classify] '{target_model_name}' 모델 API 호출...")
-        try:
-            response = client.models.generate_content(
-                model=target_model_name,
-                contents=prompt_parts,
-                # 분류 작업이므로 텍스트 응답만 필요
-                # config=types.GenerateContentConfig(response_modalities=['Text']) # Text만 요청하거나 기본값 사용
-            )
-        except Exception as model_call_err:
-            # 만약 gemini-pro-vision 호출 실패 시, 기존 모델로 재시도 (선택적)
-            print(f"  - 경고: '{target_model_name}' 호출 실패 ({model_call_err}), 기존 모델로 재시도...")
-            target_model_name = "gemini-2.0-flash-exp-image-generation" # 기존 이미지 생성 모델 사용
-            response = client.models.generate_content(
-                model=target_model_name,
-                contents=prompt_parts
-            )
+        # 모델 선택은 레지스트리가 담당: 시작 시/주기적 점검으로 사용 불가 모델(예: gemini-pro-vision)은
+        # 백오프 기간 동안 제외되므로, 매 호출마다 실패 후 재시도하는 왕복이 생기지 않음
+        response = _generate_content(client, 'classify', prompt_parts)
 
         print("[AI Module - Classify] API 호출 완료.")
 
         # --- 4. 응답 텍스트 추출 및 처리 ---
-        detected_type = None
-        if response.text:
-            # 응답 텍스트에서 소문자 알파벳만 추출하고 앞뒤 공백 제거
-            # 예: "top", "  bottom  ", "shoes." -> "top", "bottom", "shoes"
-            cleaned_text = re.sub(r'[^a-z]', '', response.text.lower().strip())
-            print(f"  - AI 응답 텍스트 (Raw): '{response.text}'")
-            print(f"  - AI 응답 텍스트 (Cleaned): '{cleaned_text}'")
-
-            # 허용된 카테고리 목록에 있는지 확인
-            if cleaned_text in allowed_categories:
-                detected_type = cleaned_text
-                print(f"[AI Module - Classify] 분류 성공: '{detected_type}'")
-            else:
-                print(f"[AI Module - Classify] 경고: AI 응답이 허용된 카테고리({allowed_categories_str})에 없습니다.")
-                # 가장 유사한 단어를 찾는 로직 추가 가능 (선택적)
-        else:
-            print("[AI Module - Classify] 오류: AI 응답에서 텍스트를 추출할 수 없습니다.")
-            # 상세 응답 내용 로깅
-            try: print(f"  - Full Response: {response}")
-            except: pass
-
-        return detected_type
+        return _parse_classify_response(response)
 
     except FileNotFoundError:
         print(f"[AI Module - Classify] 오류: 이미지 파일을 찾을 수 없습니다 - {image_path}")
         return None
+    except TimeoutError:
+        raise # 마감 시간 초과는 모델 오류와 구분하여 호출하는 쪽(라우트/작업)에 전달
     except Exception as e:
         print(f"[AI Module - Classify] 분류 중 예상치 못한 오류 발생: {e}")
         traceback.print_exc()
-        return None
\ No newline at end of file
+        return None
+
+async def aclassify_item_type(client: genai.Client, image_path: str) -> str | None:
+    """
+    classify_item_type 의 비동기 버전 (SDK 비동기 클라이언트 사용).
+
+    Args / Returns: classify_item_type 과 동일
+    """
+    print(f"[AI Module - Classify Async] 아이템 종류 비동기 분류 시작: {os.path.basename(image_path)}")
+    if not client:
+        print("[AI Module - Classify Async] 오류: 유효한 AI 클라이언트 객체가 전달되지 않았습니다.")
+        return None
+    try:
+        prompt_parts = await asyncio.to_thread(_build_classify_prompt, image_path)
+        response = await _agenerate_content(client, 'classify', prompt_parts)
+        print("[AI Module - Classify Async] API 호출 완료.")
+        return _parse_classify_response(response)
+    except FileNotFoundError:
+        print(f"[AI Module - Classify Async] 오류: 이미지 파일을 찾을 수 없습니다 - {image_path}")
+        return None
+    except TimeoutError:
+        raise
+    except Exception as e:
+        print(f"[AI Module - Classify Async] 분류 중 예상치 못한 오류 발생: {e}")
+        traceback.print_exc()
+        return None
+
+# 분류 가능한 아이템 종류 목록 (프롬프트 및 결과 검증에 사용)
+ALLOWED_CATEGORIES = ['top', 'bottom', 'shoes', 'bag', 'accessory', 'hair']
+
+def _build_classify_prompt(image_path: str) -> list:
+    """분류할 이미지를 로드하고 분류용 프롬프트를 만듭니다. (파일이 없으면 FileNotFoundError)"""
+    with Image.open(image_path) as img_fp:
+        img = img_fp.copy()
+    print(f"  - 이미지 로드 완료: {os.path.basename(image_path)}")
+    return [
+        img, # 이미지 전달
+        ( # 텍스트 프롬프트
+            f"Analyze the image and identify the main fashion item shown. "
+            f"Choose the most appropriate category ONLY from the following list: {', '.join(ALLOWED_CATEGORIES)}. "
+            f"Respond with ONLY the single category name in lowercase. For example, if it's a t-shirt, respond with 'top'."
+        )
+    ]
+
+def _parse_classify_response(response) -> str | None:
+    """분류 응답 텍스트를 허용된 카테고리로 정리합니다. 허용되지 않은 값이면 None."""
+    detected_type = None
+    if response.text:
+        # 응답 텍스트에서 소문자 알파벳만 추출하고 앞뒤 공백 제거
+        # 예: "top", "  bottom  ", "shoes." -> "top", "bottom", "shoes"
+        cleaned_text = re.sub(r'[^a-z]', '', response.text.lower().strip())
+        print(f"  - AI 응답 텍스트 (Raw): '{response.text}'")
+        print(f"  - AI 응답 텍스트 (Cleaned): '{cleaned_text}'")
+
+        # 허용된 카테고리 목록에 있는지 확인
+        if cleaned_text in ALLOWED_CATEGORIES:
+            detected_type = cleaned_text
+            print(f"[AI Module - Classify] 분류 성공: '{detected_type}'")
+        else:
+            print(f"[AI Module - Classify] 경고: AI 응답이 허용된 카테고리({', '.join(ALLOWED_CATEGORIES)})에 없습니다.")
+    else:
+        print("[AI Module - Classify] 오류: AI 응답에서 텍스트를 추출할 수 없습니다.")
+        # 상세 응답 내용 로깅
+        try: print(f"  - Full Response: {response}")
+        except: pass
+    return detected_type
+
+# --- 신규: 여러 아이템 이미지 일괄 분류 함수 (한 번의 AI 호출) ---
+def classify_items_batch(client: genai.Client, image_paths: list[str]) -> list[str | None] | None:
+    """
+    여러 아이템 이미지의 종류를 **한 번의 AI 호출**로 분류합니다. (JSON 구조화 응답 사용)
+
+    Args:
+        client (genai.Client): 초기화된 Google AI 클라이언트 객체.
+        image_paths (list[str]): 분류할 이미지 파일 경로 리스트.
+
+    Returns:
+        list[str | None] or None: 입력 순서대로 감지된 아이템 종류 (허용되지 않은 값은 None).
+                                  호출 실패 또는 응답 형식이 잘못된 경우 None (호출하는 쪽에서 개별 분류로 전환).
+    """
+    print(f"[AI Module - Classify Batch] 일괄 분류 시작: {len(image_paths)}개")
+    if not client:
+        print("[AI Module - Classify Batch] 오류: 유효한 AI 클라이언트 객체가 전달되지 않았습니다.")
+        return None
+    if not image_paths:
+        return []
+
+    allowed_categories_str = ", ".join(ALLOWED_CATEGORIES)
+
+    try:
+        # --- 1. 이미지 로드 ---
+        prompt_parts = []
+        for image_path in image_paths:
+            with Image.open(image_path) as img_fp:
+                prompt_parts.append(img_fp.copy())
+
+        # --- 2. 구조화 응답 프롬프트 ---
+        prompt_parts.append(
+            f"You are given {len(image_paths)} images, numbered 1 to {len(image_paths)} in order. "
+            f"For each image, identify the main fashion item and choose the most appropriate category ONLY from: {allowed_categories_str}. "
+            f"Respond with ONLY a JSON array of objects in image order, for example: "
+            f'[{{"index": 1, "item_type": "top"}}, {{"index": 2, "item_type": "shoes"}}]'
+        )
+        generation_config = types.GenerateContentConfig(response_mime_type='application/json')
+
+        # --- 3. API 호출 ---
+        response = _generate_content(client, 'classify', prompt_parts, config=generation_config)
+        print("[AI Module - Classify Batch] API 호출 완료.")
+
+        # --- 4. JSON 응답 검증 ---
+        raw_text = response.text or ''
+        parsed = json.loads(raw_text)
+        if not isinstance(parsed, list) or len(parsed) != len(image_paths):
+            print(f"[AI Module - Classify Batch] 경고: 응답 개수 불일치 또는 형식 오류 - {raw_text[:200]}")
+            return None
+        results = [None] * len(image_paths)
+        seen_indexes = set() # index 는 1..N 의 순열이어야 함 (개수가 같으므로 중복이 없으면 모두 한 번씩)
+        for position, entry in enumerate(parsed):
+            if not isinstance(entry, dict):
+                print(f"[AI Module - Classify Batch] 경고: 잘못된 항목 형식 - {entry}")
+                return None
+            index = entry.get('index', position + 1)
+            if not isinstance(index, int) or isinstance(index, bool) or not 1 <= index <= len(image_paths):
+                print(f"[AI Module - Classify Batch] 경고: 잘못된 index - {entry}")
+                return None
+            if index in seen_indexes: # 중복 index - 다른 이미지의 결과가 캐시에 저장되지 않도록 개별 분류로 전환
+                print(f"[AI Module - Classify Batch] 경고: 중복 index - {entry}")
+                return None
+            seen_indexes.add(index)
+            item_type = str(entry.get('item_type', '')).strip().lower()
+            results[index - 1] = item_type if item_type in ALLOWED_CATEGORIES else None
+        print(f"[AI Module - Classify Batch] 분류 결과: {results}")
+        return results
+
+    except (json.JSONDecodeError, TypeError, ValueError) as parse_err:
+        print(f"[AI Module - Classify Batch] 경고: JSON 응답 파싱 실패 - {parse_err}")
+        return None
+    except FileNotFoundError as fnf_err:
+        print(f"[AI Module - Classify Batch] 오류: 이미지 파일을 찾을 수 없습니다 - {fnf_err}")
+        return None
+    except TimeoutError:
+        raise # 마감 시간 초과는 모델 오류와 구분하여 호출하는 쪽(라우트/작업)에 전달
+    except Exception as e:
+        print(f"[AI Module - Classify Batch] 일괄 분류 중 예상치 못한 오류 발생: {e}")
+        traceback.print_exc()
+        return None
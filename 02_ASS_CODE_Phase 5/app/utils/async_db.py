@@ -0,0 +1,236 @@
+# app/utils/async_db.py
+# 비동기 라우트(app/asgi.py)용 데이터베이스 함수 모음
+# psycopg 3 의 AsyncConnectionPool 로 이벤트 루프를 막지 않고 조회/갱신합니다. 연결은 워커 프로세스의 풀에서 재사용합니다.
+# 함수 이름은 db_utils 의 같은 함수에 'a' 를 붙인 것이고, SQL 과 반환값(오류 시 기본값 포함)도 같습니다.
+# psycopg 3 이 설치되어 있지 않거나 풀을 열 수 없으면 db_utils 함수를 스레드에서 실행합니다.
+
+import os
+import asyncio
+from datetime import date
+
+try:
+    import psycopg
+    from psycopg.conninfo import make_conninfo
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+except ImportError: # psycopg2 만 설치된 환경 - 스레드에서 db_utils 사용
+    psycopg = None
+
+from app.utils import db_utils
+
+
+class AsyncDatabase:
+    """
+    워커 프로세스(이벤트 루프)별 비동기 연결 풀. ASGI lifespan 에서 open()/close() 합니다.
+
+    Args:
+        min_size (int): 유지할 최소 연결 수
+        max_size (int): 최대 연결 수 (넘으면 연결이 반환될 때까지 대기)
+        timeout (float): 연결을 기다리는 최대 시간(초)
+    """
+
+    def __init__(self):
+        self.pool = None
+        self.min_size = 1
+        self.max_size = 10
+        self.timeout = 10.0
+
+    def configure(self, **settings) -> None:
+        for name, value in settings.items():
+            if value is not None:
+                setattr(self, name, value)
+
+    async def open(self) -> bool:
+        """연결 풀을 엽니다. 실패하면 False (db_utils 를 스레드에서 사용)"""
+        if psycopg is None:
+            print("[Async DB] psycopg 3 미설치 - DB 조회는 스레드에서 실행합니다. (pip install \"psycopg[binary]\" psycopg_pool)")
+            return False
+        conninfo = make_conninfo(host=db_utils.db_host, port=db_utils.db_port, dbname=db_utils.db_name,
+                                 user=db_utils.db_user, password=db_utils.db_password)
+        pool = AsyncConnectionPool(conninfo, min_size=self.min_size, max_size=self.max_size, timeout=self.timeout,
+                                   open=False)
+        try:
+            await pool.open(wait=True, timeout=self.timeout)
+        except psycopg.Error as e:
+            print(f"[Async DB] 연결 풀 열기 실패 - DB 조회는 스레드에서 실행합니다: {e}")
+            await pool.close()
+            return False
+        self.pool = pool
+        print(f"[Async DB] 연결 풀 열림 (PID={os.getpid()}, {self.min_size}~{self.max_size}개)")
+        return True
+
+    async def close(self) -> None:
+        if self.pool is not None:
+            pool, self.pool = self.pool, None
+            await pool.close()
+
+
+# 애플리케이션 전역 비동기 DB (워커 프로세스마다 하나)
+async_db = AsyncDatabase()
+
+
+async def aget_setting(setting_key: str) -> str | None:
+    """db_utils.get_setting 의 비동기 버전"""
+    if async_db.pool is None:
+        return await asyncio.to_thread(db_utils.get_setting, setting_key)
+    try:
+        async with async_db.pool.connection() as conn:
+            cur = await conn.execute("SELECT setting_value FROM system_settings WHERE setting_key = %s", (setting_key,))
+            result = await cur.fetchone()
+            return result[0] if result else None
+    except psycopg.Error as e:
+        print(f"[Async DB Get Setting] 오류 발생 (key={setting_key}): {e}")
+        return None
+
+
+async def aget_active_base_model() -> dict | None:
+    """db_utils.get_active_base_model 의 비동기 버전"""
+    if async_db.pool is None:
+        return await asyncio.to_thread(db_utils.get_active_base_model)
+    try:
+        async with async_db.pool.connection() as conn:
+            cur = conn.cursor(row_factory=dict_row)
+            await cur.execute("SELECT * FROM base_models WHERE is_active = TRUE ORDER BY id DESC LIMIT 1")
+            return await cur.fetchone()
+    except psycopg.Error as e:
+        print(f"[Async DB Get Active Model] 오류 발생: {e}")
+        return None
+
+
+async def aget_todays_usage(user_id: int) -> int:
+    """db_utils.get_todays_usage 의 비동기 버전"""
+    if async_db.pool is None:
+        return await asyncio.to_thread(db_utils.get_todays_usage, user_id)
+    try:
+        async with async_db.pool.connection() as conn:
+            cur = await conn.execute("SELECT count FROM usage_tracking WHERE user_id = %s AND usage_date = %s",
+                                     (user_id, date.today()))
+            result = await cur.fetchone()
+            return result[0] if result else 0
+    except psycopg.Error as e:
+        print(f"[Async DB Get Usage] 오류 발생 (User ID={user_id}): {e}")
+        return 0
+
+
+async def areserve_usage(user_id: int, daily_limit: int) -> date | None:
+    """db_utils.reserve_usage 의 비동기 버전 (한도 미만일 때만 1회분 예약, 예약한 날짜 반환)"""
+    if async_db.pool is None:
+        return await asyncio.to_thread(db_utils.reserve_usage, user_id, daily_limit)
+    if daily_limit <= 0:
+        return None
+    today = date.today()
+    try:
+        async with async_db.pool.connection() as conn: # 블록을 정상 종료하면 커밋, 예외면 롤백
+            cur = await conn.execute(
+                """
+                INSERT INTO usage_tracking (user_id, usage_date, count, last_attempt_at)
+                VALUES (%s, %s, 1, CURRENT_TIMESTAMP)
+                ON CONFLICT (user_id, usage_date)
+                DO UPDATE SET
+                    count = usage_tracking.count + 1,
+                    last_attempt_at = CURRENT_TIMESTAMP
+                WHERE usage_tracking.count < %s
+                RETURNING count;
+                """,
+                (user_id, today, daily_limit)
+            )
+            result = await cur.fetchone()
+        if result:
+            print(f"[Async DB Reserve Usage] 성공: User ID={user_id}, Date={today}, Count={result[0]}")
+            return today
+        print(f"[Async DB Reserve Usage] 한도 초과: User ID={user_id}, Date={today}, Limit={daily_limit}")
+    except psycopg.Error as e:
+        print(f"[Async DB Reserve Usage] 오류 발생 (User ID={user_id}, Date={today}): {e}")
+    return None
+
+
+async def arelease_usage(user_id: int, usage_date: date) -> bool:
+    """db_utils.release_usage 의 비동기 버전"""
+    if async_db.pool is None:
+        return await asyncio.to_thread(db_utils.release_usage, user_id, usage_date)
+    try:
+        async with async_db.pool.connection() as conn:
+            cur = await conn.execute(
+                "UPDATE usage_tracking SET count = GREATEST(count - 1, 0) WHERE user_id = %s AND usage_date = %s",
+                (user_id, usage_date)
+            )
+            print(f"[Async DB Release Usage] 예약 해제: User ID={user_id}, Date={usage_date}")
+            return cur.rowcount > 0
+    except psycopg.Error as e:
+        print(f"[Async DB Release Usage] 오류 발생 (User ID={user_id}, Date={usage_date}): {e}")
+        return False
+
+
+async def afind_classification_cache_candidates(bands: list[int], limit: int = 50) -> list[dict]:
+    """db_utils.find_classification_cache_candidates 의 비동기 버전"""
+    if async_db.pool is None:
+        return await asyncio.to_thread(db_utils.find_classification_cache_candidates, bands, limit)
+    try:
+        async with async_db.pool.connection() as conn:
+            cur = conn.cursor(row_factory=dict_row)
+            await cur.execute(
+                """
+                SELECT id, phash, dhash, item_type FROM classification_cache
+                WHERE band0 = %s OR band1 = %s OR band2 = %s OR band3 = %s
+                ORDER BY last_hit_at DESC NULLS LAST
+                LIMIT %s
+                """,
+                (*bands, limit)
+            )
+            return await cur.fetchall()
+    except psycopg.Error as e:
+        print(f"[Async DB Classify Cache Find] 오류 발생: {e}")
+        return []
+
+
+async def aadd_classification_cache_entry(phash: int, dhash: int, bands: list[int], item_type: str) -> bool:
+    """db_utils.add_classification_cache_entry 의 비동기 버전"""
+    if async_db.pool is None:
+        return await asyncio.to_thread(db_utils.add_classification_cache_entry, phash, dhash, bands, item_type)
+    try:
+        async with async_db.pool.connection() as conn:
+            await conn.execute(
+                """
+                INSERT INTO classification_cache (phash, dhash, band0, band1, band2, band3, item_type)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (phash)
+                DO UPDATE SET item_type = EXCLUDED.item_type, dhash = EXCLUDED.dhash;
+                """,
+                (phash, dhash, *bands, item_type)
+            )
+            return True
+    except psycopg.Error as e:
+        print(f"[Async DB Classify Cache Add] 오류 발생: {e}")
+        return False
+
+
+async def arecord_classification_cache_hit(entry_id: int) -> bool:
+    """db_utils.record_classification_cache_hit 의 비동기 버전"""
+    if async_db.pool is None:
+        return await asyncio.to_thread(db_utils.record_classification_cache_hit, entry_id)
+    try:
+        async with async_db.pool.connection() as conn:
+            cur = await conn.execute(
+                "UPDATE classification_cache SET hit_count = hit_count + 1, last_hit_at = CURRENT_TIMESTAMP WHERE id = %s",
+                (entry_id,)
+            )
+            return cur.rowcount > 0
+    except psycopg.Error as e:
+        print(f"[Async DB Classify Cache Hit] 오류 발생 (ID={entry_id}): {e}")
+        return False
+
+
+def init_async_db(app) -> AsyncDatabase:
+    """
+    환경 변수로 비동기 DB 연결 풀을 설정합니다. (풀은 ASGI 워커가 시작될 때 엽니다)
+    ASYNC_DB_POOL_MIN_SIZE: 최소 연결 수 (기본 1)
+    ASYNC_DB_POOL_MAX_SIZE: 최대 연결 수 (기본 10)
+    ASYNC_DB_POOL_TIMEOUT: 연결 대기 최대 시간(초, 기본 10)
+    """
+    async_db.configure(min_size=int(os.getenv('ASYNC_DB_POOL_MIN_SIZE', '1')),
+                       max_size=int(os.getenv('ASYNC_DB_POOL_MAX_SIZE', '10')),
+                       timeout=float(os.getenv('ASYNC_DB_POOL_TIMEOUT', '10')))
+    app.config['ASYNC_DB'] = async_db
+    print(f" * 비동기 DB: {'psycopg 3 연결 풀' if psycopg else '스레드 (psycopg 3 미설치)'} "
+          f"(최대 {async_db.max_size}개)")
+    return async_db
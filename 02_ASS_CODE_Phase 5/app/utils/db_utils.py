@@ -562,6 +562,86 @@ def increment_usage(user_id: int) -> bool:
             # print("[DB Connection] 연결 종료 (increment_usage)")
     return success
 
+def reserve_usage(user_id: int, daily_limit: int) -> date | None:
+    """
+    오늘 사용량이 daily_limit 미만일 때만 사용량을 1 증가시켜 합성 1회분을 예약합니다. (조회-증가 경쟁 상태 방지)
+    합성이 실패하거나 시간 초과되면 release_usage() 로 예약을 되돌려야 합니다.
+
+    Args:
+        user_id (int): 사용자 ID
+        daily_limit (int): 일일 최대 사용 횟수
+
+    Returns:
+        date or None: 예약 성공 시 예약한 사용 날짜 (release_usage 에 전달), 한도 초과 또는 오류 시 None
+    """
+    if daily_limit <= 0: return None
+    conn = get_db_connection()
+    if not conn: return None
+
+    reserved_date = None
+    today = date.today()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO usage_tracking (user_id, usage_date, count, last_attempt_at)
+                VALUES (%s, %s, 1, CURRENT_TIMESTAMP)
+                ON CONFLICT (user_id, usage_date)
+                DO UPDATE SET
+                    count = usage_tracking.count + 1,
+                    last_attempt_at = CURRENT_TIMESTAMP
+                WHERE usage_tracking.count < %s
+                RETURNING count;
+                """,
+                (user_id, today, daily_limit)
+            )
+            result = cur.fetchone()
+            conn.commit()
+            if result:
+                reserved_date = today
+                print(f"[DB Reserve Usage] 성공: User ID={user_id}, Date={today}, Count={result[0]}")
+            else:
+                print(f"[DB Reserve Usage] 한도 초과: User ID={user_id}, Date={today}, Limit={daily_limit}")
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Reserve Usage] 오류 발생 (User ID={user_id}, Date={today}): {e}")
+    finally:
+        if conn:
+            conn.close()
+    return reserved_date
+
+def release_usage(user_id: int, usage_date: date) -> bool:
+    """
+    reserve_usage() 로 예약한 사용량 1회를 되돌립니다. (합성 실패/시간 초과 시)
+
+    Args:
+        user_id (int): 사용자 ID
+        usage_date (date): reserve_usage() 가 반환한 날짜
+
+    Returns:
+        bool: 성공 시 True, 실패 시 False
+    """
+    conn = get_db_connection()
+    if not conn: return False
+
+    success = False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE usage_tracking SET count = GREATEST(count - 1, 0) WHERE user_id = %s AND usage_date = %s",
+                (user_id, usage_date)
+            )
+            conn.commit()
+            success = cur.rowcount > 0
+            print(f"[DB Release Usage] 예약 해제: User ID={user_id}, Date={usage_date}")
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Release Usage] 오류 발생 (User ID={user_id}, Date={usage_date}): {e}")
+    finally:
+        if conn:
+            conn.close()
+    return success
+
 # --- 추가: 특정 날짜의 총 사용량 조회 함수 ---
 def get_total_usage_for_date(usage_date: date) -> int:
     """
@@ -598,6 +678,1417 @@ def get_total_usage_for_date(usage_date: date) -> int:
             # print("[DB Connection] 연결 종료 (get_total_usage_for_date)")
     return total_count
 
+# --- 아이템 분류 캐시 (classification_cache) 관련 함수 ---
+def find_classification_cache_candidates(bands: list[int], limit: int = 50) -> list[dict]:
+    """
+    pHash 밴드 중 하나라도 일치하는 분류 캐시 항목을 후보로 조회합니다.
+    (해밍 거리 비교는 호출하는 쪽에서 수행)
+
+    Args:
+        bands (list[int]): pHash 를 4개로 나눈 16비트 밴드 값
+        limit (int, optional): 최대 후보 수. Defaults to 50.
+
+    Returns:
+        list[dict]: 후보 항목 리스트 (id, phash, dhash, item_type), 오류 시 빈 리스트
+    """
+    conn = get_db_connection(use_dict_cursor=True)
+    if not conn: return []
+
+    candidates = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, phash, dhash, item_type FROM classification_cache
+                WHERE band0 = %s OR band1 = %s OR band2 = %s OR band3 = %s
+                ORDER BY last_hit_at DESC NULLS LAST
+                LIMIT %s
+                """,
+                (*bands, limit)
+            )
+            candidates = [dict(row) for row in cur.fetchall()]
+            print(f"[DB Classify Cache Find] 후보 {len(candidates)}개 조회")
+    except psycopg2.Error as e:
+        print(f"[DB Classify Cache Find] 오류 발생: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return candidates
+
+def add_classification_cache_entry(phash: int, dhash: int, bands: list[int], item_type: str) -> bool:
+    """
+    AI 분류 결과를 분류 캐시에 저장합니다. 같은 pHash 가 이미 있으면 분류 결과를 갱신합니다.
+
+    Args:
+        phash (int): pHash (BIGINT 범위로 변환된 값)
+        dhash (int): dHash (BIGINT 범위로 변환된 값)
+        bands (list[int]): pHash 밴드 값 4개
+        item_type (str): 분류된 아이템 종류
+
+    Returns:
+        bool: 저장 성공 시 True, 실패 시 False
+    """
+    conn = get_db_connection()
+    if not conn: return False
+
+    success = False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO classification_cache (phash, dhash, band0, band1, band2, band3, item_type)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (phash)
+                DO UPDATE SET item_type = EXCLUDED.item_type, dhash = EXCLUDED.dhash;
+                """,
+                (phash, dhash, *bands, item_type)
+            )
+            conn.commit()
+            success = True
+            print(f"[DB Classify Cache Add] 성공: type={item_type}")
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Classify Cache Add] 오류 발생: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return success
+
+def record_classification_cache_hit(entry_id: int) -> bool:
+    """
+    분류 캐시 항목의 적중 횟수(hit_count)를 1 증가시키고 마지막 적중 시각을 갱신합니다.
+
+    Args:
+        entry_id (int): 캐시 항목 ID
+
+    Returns:
+        bool: 성공 시 True, 실패 시 False
+    """
+    conn = get_db_connection()
+    if not conn: return False
+
+    success = False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE classification_cache SET hit_count = hit_count + 1, last_hit_at = CURRENT_TIMESTAMP WHERE id = %s",
+                (entry_id,)
+            )
+            conn.commit()
+            success = cur.rowcount > 0
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Classify Cache Hit] 오류 발생 (ID={entry_id}): {e}")
+    finally:
+        if conn:
+            conn.close()
+    return success
+
+def get_classification_cache_stats() -> dict:
+    """
+    분류 캐시 테이블의 누적 통계를 조회합니다. (모든 워커/재시작 포함)
+
+    Returns:
+        dict: {'entries': int, 'total_hits': int}, 오류 시 0 값
+    """
+    conn = get_db_connection()
+    if not conn: return {'entries': 0, 'total_hits': 0}
+
+    stats = {'entries': 0, 'total_hits': 0}
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*), COALESCE(SUM(hit_count), 0) FROM classification_cache")
+            result = cur.fetchone()
+            if result:
+                stats = {'entries': result[0], 'total_hits': result[1]}
+    except psycopg2.Error as e:
+        print(f"[DB Classify Cache Stats] 오류 발생: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return stats
+
+# --- 비동기 합성 작업 (synthesis_jobs) 관련 함수 ---
+def create_synthesis_job(job_id: str, user_id: int, item_count: int) -> bool:
+    """
+    대기(queued) 상태의 합성 작업을 기록합니다. (작업 상태 조회는 어느 워커에서든 가능)
+
+    Args:
+        job_id (str): 작업 ID (UUID 문자열)
+        user_id (int): 요청한 사용자 ID
+        item_count (int): 합성할 아이템 수
+
+    Returns:
+        bool: 성공 시 True, 실패 시 False
+    """
+    conn = get_db_connection()
+    if not conn: return False
+
+    success = False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO synthesis_jobs (job_id, user_id, status, item_count) VALUES (%s, %s, 'queued', %s)",
+                (job_id, user_id, item_count)
+            )
+            conn.commit()
+            success = True
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Synthesis Job Create] 오류 발생 (Job ID={job_id}): {e}")
+    finally:
+        if conn:
+            conn.close()
+    return success
+
+def update_synthesis_job(job_id: str, status: str, output_filename: str = None, error_message: str = None) -> bool:
+    """
+    합성 작업 상태를 갱신합니다. ('running', 'succeeded', 'failed', 'timeout')
+
+    Args:
+        job_id (str): 작업 ID
+        status (str): 새 상태
+        output_filename (str, optional): 성공 시 결과 파일 이름
+        error_message (str, optional): 실패 시 사용자에게 보여줄 오류 메시지
+
+    Returns:
+        bool: 성공 시 True, 실패 시 False
+    """
+    conn = get_db_connection()
+    if not conn: return False
+
+    success = False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE synthesis_jobs
+                SET status = %s, output_filename = COALESCE(%s, output_filename), error_message = %s,
+                    started_at = CASE WHEN %s = 'running' THEN CURRENT_TIMESTAMP ELSE started_at END,
+                    finished_at = CASE WHEN %s IN ('succeeded', 'failed', 'timeout') THEN CURRENT_TIMESTAMP ELSE finished_at END
+                WHERE job_id = %s
+                """,
+                (status, output_filename, error_message, status, status, job_id)
+            )
+            conn.commit()
+            success = cur.rowcount > 0
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Synthesis Job Update] 오류 발생 (Job ID={job_id}): {e}")
+    finally:
+        if conn:
+            conn.close()
+    return success
+
+def get_synthesis_job(job_id: str) -> dict | None:
+    """
+    합성 작업을 조회합니다.
+
+    Args:
+        job_id (str): 작업 ID
+
+    Returns:
+        dict or None: 작업 정보 (job_id, user_id, status, item_count, output_filename, error_message, 시각), 없거나 오류 시 None
+    """
+    conn = get_db_connection(use_dict_cursor=True)
+    if not conn: return None
+
+    job = None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT job_id, user_id, status, item_count, output_filename, error_message,
+                       created_at, started_at, finished_at
+                FROM synthesis_jobs WHERE job_id = %s
+                """,
+                (job_id,)
+            )
+            row = cur.fetchone()
+            job = dict(row) if row else None
+    except psycopg2.Error as e:
+        print(f"[DB Synthesis Job Get] 오류 발생 (Job ID={job_id}): {e}")
+    finally:
+        if conn:
+            conn.close()
+    return job
+
+# --- AI 호출 기록 (ai_calls) 관련 함수 ---
+AI_CALL_COLUMNS = (
+    'user_id', 'task', 'model_name', 'status', 'attempts', 'retries', 'request_bytes', 'response_bytes',
+    'prompt_tokens', 'output_tokens', 'total_tokens', 'ttfb_ms', 'latency_ms', 'rate_limit_wait_ms',
+    'finish_reason', 'error_code', 'cost_usd'
+)
+
+def insert_ai_calls(rows: list[dict]) -> int:
+    """
+    AI 호출 기록 여러 건을 한 번의 INSERT 로 저장합니다. (ai_call_log 백그라운드 기록기에서 호출)
+
+    Args:
+        rows (list[dict]): AI_CALL_COLUMNS 키를 가진 호출 기록
+
+    Returns:
+        int: 저장된 행 수, 오류 시 0
+    """
+    if not rows: return 0
+    conn = get_db_connection()
+    if not conn: return 0
+
+    inserted = 0
+    try:
+        with conn.cursor() as cur:
+            psycopg2.extras.execute_values(
+                cur,
+                f"INSERT INTO ai_calls ({', '.join(AI_CALL_COLUMNS)}) VALUES %s",
+                [tuple(row.get(column) for column in AI_CALL_COLUMNS) for row in rows],
+                page_size=len(rows)
+            )
+            conn.commit()
+            inserted = len(rows)
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB AI Calls Insert] 오류 발생 ({len(rows)}건): {e}")
+    finally:
+        if conn:
+            conn.close()
+    return inserted
+
+def get_ai_cost_rollup(days: int = 30, limit: int = 20) -> dict:
+    """
+    최근 days 일 동안의 AI 호출 비용/토큰/지연을 모델별, 사용자별로 집계합니다.
+
+    Args:
+        days (int, optional): 집계 기간(일). Defaults to 30.
+        limit (int, optional): 사용자별 집계 최대 행 수 (비용 순). Defaults to 20.
+
+    Returns:
+        dict: {'by_model': list[dict], 'by_user': list[dict]}, 오류 시 빈 리스트
+    """
+    rollup = {'by_model': [], 'by_user': []}
+    conn = get_db_connection(use_dict_cursor=True)
+    if not conn: return rollup
+
+    aggregates = """
+        COUNT(*) AS calls,
+        COUNT(*) FILTER (WHERE c.status <> 'ok') AS failed_calls,
+        COALESCE(SUM(c.retries), 0) AS retries,
+        COALESCE(SUM(c.prompt_tokens), 0) AS prompt_tokens,
+        COALESCE(SUM(c.output_tokens), 0) AS output_tokens,
+        COALESCE(SUM(c.request_bytes), 0) AS request_bytes,
+        COALESCE(SUM(c.response_bytes), 0) AS response_bytes,
+        COALESCE(SUM(c.cost_usd), 0) AS cost_usd,
+        ROUND(AVG(c.latency_ms)) AS avg_latency_ms,
+        PERCENTILE_DISC(0.95) WITHIN GROUP (ORDER BY c.latency_ms) AS p95_latency_ms
+    """
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                SELECT c.model_name, c.task, {aggregates}
+                FROM ai_calls c
+                WHERE c.created_at >= CURRENT_TIMESTAMP - make_interval(days => %s)
+                GROUP BY c.model_name, c.task
+                ORDER BY cost_usd DESC, calls DESC
+                """,
+                (days,)
+            )
+            rollup['by_model'] = [dict(row) for row in cur.fetchall()]
+            cur.execute(
+                f"""
+                SELECT c.user_id, u.email, {aggregates}
+                FROM ai_calls c LEFT JOIN users u ON u.id = c.user_id
+                WHERE c.created_at >= CURRENT_TIMESTAMP - make_interval(days => %s)
+                GROUP BY c.user_id, u.email
+                ORDER BY cost_usd DESC, calls DESC
+                LIMIT %s
+                """,
+                (days, limit)
+            )
+            rollup['by_user'] = [dict(row) for row in cur.fetchall()]
+    except psycopg2.Error as e:
+        print(f"[DB AI Cost Rollup] 오류 발생: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return rollup
+
+def get_recent_ai_calls(task: str = None, days: int = 7, limit: int = 5000) -> list[dict]:
+    """
+    최근 AI 호출 기록을 시간 순으로 조회합니다. (벤치마크용 호출 재생 기록 생성)
+
+    Args:
+        task (str, optional): 작업 종류로 제한 ('synthesize' 등)
+        days (int, optional): 최근 며칠. Defaults to 7.
+        limit (int, optional): 최대 행 수. Defaults to 5000.
+
+    Returns:
+        list[dict]: (created_at, task, model_name, status, attempts, ttfb_ms, latency_ms, request_bytes, response_bytes, error_code),
+                    오류 시 빈 리스트
+    """
+    conn = get_db_connection(use_dict_cursor=True)
+    if not conn: return []
+
+    rows = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT * FROM (
+                    SELECT created_at, task, model_name, status, attempts, ttfb_ms, latency_ms,
+                           request_bytes, response_bytes, error_code
+                    FROM ai_calls
+                    WHERE created_at >= NOW() - make_interval(days => %s) AND (%s::text IS NULL OR task = %s)
+                    ORDER BY created_at DESC
+                    LIMIT %s
+                ) recent ORDER BY created_at
+                """,
+                (days, task, task, limit)
+            )
+            rows = [dict(row) for row in cur.fetchall()]
+    except psycopg2.Error as e:
+        print(f"[DB AI Calls Recent] 오류 발생: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return rows
+
+# --- 점진적 합성 중간 결과 캐시 ---
+def find_outfit_prefixes(prefix_keys: list[str]) -> list[dict]:
+    """
+    주어진 접두 키 중 캐시에 있는 항목을 조회합니다.
+
+    Args:
+        prefix_keys (list[str]): 아이템 목록 접두별 키
+
+    Returns:
+        list[dict]: (prefix_key, model_name, item_count, chain_depth, file_path), 오류 시 빈 리스트
+    """
+    if not prefix_keys: return []
+    conn = get_db_connection(use_dict_cursor=True)
+    if not conn: return []
+
+    entries = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT prefix_key, model_name, item_count, chain_depth, file_path
+                FROM outfit_prefix_cache WHERE prefix_key = ANY(%s)
+                """,
+                (list(prefix_keys),)
+            )
+            entries = [dict(row) for row in cur.fetchall()]
+    except psycopg2.Error as e:
+        print(f"[DB Outfit Cache Find] 오류 발생: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return entries
+
+def save_outfit_prefix(prefix_key: str, model_name: str, item_count: int, chain_depth: int, file_path: str) -> bool:
+    """
+    중간 결과를 캐시에 저장합니다. 같은 키가 있으면 새 결과로 갱신합니다.
+
+    Returns:
+        bool: 저장 성공 시 True, 실패 시 False
+    """
+    conn = get_db_connection()
+    if not conn: return False
+
+    success = False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO outfit_prefix_cache (prefix_key, model_name, item_count, chain_depth, file_path)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (prefix_key)
+                DO UPDATE SET chain_depth = EXCLUDED.chain_depth, file_path = EXCLUDED.file_path,
+                              created_at = CURRENT_TIMESTAMP, last_used_at = CURRENT_TIMESTAMP;
+                """,
+                (prefix_key, model_name, item_count, chain_depth, file_path)
+            )
+            conn.commit()
+            success = True
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Outfit Cache Save] 오류 발생: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return success
+
+def record_outfit_prefix_hit(prefix_key: str) -> bool:
+    """캐시 항목의 재사용 횟수와 마지막 사용 시각을 갱신합니다."""
+    conn = get_db_connection()
+    if not conn: return False
+
+    success = False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE outfit_prefix_cache SET hit_count = hit_count + 1, last_used_at = CURRENT_TIMESTAMP WHERE prefix_key = %s;",
+                (prefix_key,)
+            )
+            conn.commit()
+            success = True
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Outfit Cache Hit] 오류 발생: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return success
+
+def delete_outfit_prefixes(prefix_keys: list[str] = None, unused_hours: float = None) -> list[str]:
+    """
+    캐시 항목을 삭제합니다. (지정한 키, 또는 unused_hours 시간 동안 사용되지 않은 항목)
+
+    Returns:
+        list[str]: 삭제된 항목의 file_path (호출하는 쪽에서 파일 삭제), 오류 시 빈 리스트
+    """
+    if not prefix_keys and unused_hours is None: return []
+    conn = get_db_connection()
+    if not conn: return []
+
+    file_paths = []
+    try:
+        with conn.cursor() as cur:
+            if prefix_keys:
+                cur.execute("DELETE FROM outfit_prefix_cache WHERE prefix_key = ANY(%s) RETURNING file_path;",
+                            (list(prefix_keys),))
+            else:
+                cur.execute(
+                    "DELETE FROM outfit_prefix_cache WHERE last_used_at < NOW() - make_interval(secs => %s) RETURNING file_path;",
+                    (unused_hours * 3600,)
+                )
+            file_paths = [row[0] for row in cur.fetchall()]
+            conn.commit()
+            if file_paths:
+                print(f"[DB Outfit Cache Delete] {len(file_paths)}개 항목 삭제")
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Outfit Cache Delete] 오류 발생: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return file_paths
+
+# --- 추측 합성 (speculative_syntheses) 관련 함수 ---
+# 추측 요청, 실제 합성 요청, 취소 요청이 서로 다른 워커로 가도 같은 상태를 보도록 DB 에 둡니다.
+def start_speculative_synthesis(user_id: int, outfit_key: str, job_id: str, ttl_seconds: float) -> dict | None:
+    """
+    사용자의 코디(outfit_key) 추측 합성을 등록합니다. 같은 사용자의 다른 코디 중 아직 가져가지 않은('running') 작업은
+    'cancelled' 로 바꾸고, 같은 코디가 이미 진행 중('running'/'claimed')이면 새로 등록하지 않습니다.
+    마감(expires_at)이 지난 행은 작업하던 워커가 죽은 것으로 보고 먼저 삭제합니다.
+
+    Args:
+        user_id (int): 사용자 ID
+        outfit_key (str): 아이템 목록 전체의 outfit_prefix_cache 키
+        job_id (str): 새 작업 ID
+        ttl_seconds (float): 작업 마감까지의 시간(초, 작업 큐 대기 포함)
+
+    Returns:
+        dict or None: {'job_id': str, 'started': bool, 'cancelled': list[str]} - started 가 False 이면 진행 중인 기존 작업,
+                      cancelled 는 취소로 바뀐 이전 작업 ID, 오류 시 None
+    """
+    conn = get_db_connection()
+    if not conn: return None
+
+    record = None
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM speculative_syntheses WHERE expires_at < CURRENT_TIMESTAMP;")
+            cur.execute(
+                """
+                UPDATE speculative_syntheses SET status = 'cancelled', updated_at = CURRENT_TIMESTAMP
+                WHERE user_id = %s AND outfit_key <> %s AND status = 'running'
+                RETURNING job_id;
+                """,
+                (user_id, outfit_key)
+            )
+            cancelled = [row[0] for row in cur.fetchall()]
+            cur.execute(
+                """
+                INSERT INTO speculative_syntheses (user_id, outfit_key, job_id, status, expires_at)
+                VALUES (%s, %s, %s, 'running', CURRENT_TIMESTAMP + %s * INTERVAL '1 second')
+                ON CONFLICT (user_id, outfit_key)
+                DO UPDATE SET job_id = EXCLUDED.job_id, status = 'running', started_at = CURRENT_TIMESTAMP,
+                              updated_at = CURRENT_TIMESTAMP, expires_at = EXCLUDED.expires_at
+                    WHERE speculative_syntheses.status NOT IN ('running', 'claimed')
+                RETURNING job_id;
+                """,
+                (user_id, outfit_key, job_id, ttl_seconds)
+            )
+            if cur.fetchone():
+                record = {'job_id': job_id, 'started': True, 'cancelled': cancelled}
+            else:
+                cur.execute("SELECT job_id FROM speculative_syntheses WHERE user_id = %s AND outfit_key = %s;",
+                            (user_id, outfit_key))
+                row = cur.fetchone()
+                record = {'job_id': row[0], 'started': False, 'cancelled': cancelled} if row else None
+            conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Speculation Start] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return record
+
+def cancel_speculative_synthesis(user_id: int) -> list[str]:
+    """
+    사용자의 아직 가져가지 않은('running') 추측 합성을 'cancelled' 로 바꿉니다.
+
+    Returns:
+        list[str]: 취소로 바뀐 작업 ID (실행 중인 워커가 상태를 확인해 멈춤), 오류 시 빈 리스트
+    """
+    conn = get_db_connection()
+    if not conn: return []
+
+    job_ids = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE speculative_syntheses SET status = 'cancelled', updated_at = CURRENT_TIMESTAMP
+                WHERE user_id = %s AND status = 'running'
+                RETURNING job_id;
+                """,
+                (user_id,)
+            )
+            job_ids = [row[0] for row in cur.fetchall()]
+            conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Speculation Cancel] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return job_ids
+
+def claim_speculative_synthesis(outfit_key: str) -> str | None:
+    """
+    코디(outfit_key)의 진행 중인 추측 합성 하나를 'claimed' 로 바꿉니다. (이후 취소 요청이 와도 취소되지 않음)
+    캐시 키는 내용 해시이므로 다른 사용자의 추측 합성도 가져갈 수 있습니다.
+
+    Returns:
+        str or None: 가져간 작업 ID, 진행 중인 작업이 없거나 오류 시 None
+    """
+    conn = get_db_connection()
+    if not conn: return None
+
+    job_id = None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE speculative_syntheses SET status = 'claimed', updated_at = CURRENT_TIMESTAMP
+                WHERE job_id = (
+                    SELECT job_id FROM speculative_syntheses
+                    WHERE outfit_key = %s AND status IN ('running', 'claimed') AND expires_at > CURRENT_TIMESTAMP
+                    ORDER BY started_at LIMIT 1
+                    FOR UPDATE
+                )
+                RETURNING job_id;
+                """,
+                (outfit_key,)
+            )
+            row = cur.fetchone()
+            job_id = row[0] if row else None
+            conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Speculation Claim] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return job_id
+
+def get_speculative_synthesis_status(job_id: str) -> str | None:
+    """
+    추측 합성 작업의 상태를 조회합니다. 마감이 지났는데 끝나지 않은 작업은 'expired' 로 반환합니다.
+
+    Returns:
+        str or None: 'running', 'claimed', 'cancelled', 'completed', 'failed', 'expired',
+                     작업이 없거나(다른 작업으로 바뀜) 오류 시 None
+    """
+    conn = get_db_connection()
+    if not conn: return None
+
+    status = None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT CASE WHEN status IN ('running', 'claimed') AND expires_at < CURRENT_TIMESTAMP THEN 'expired'
+                            ELSE status END
+                FROM speculative_syntheses WHERE job_id = %s;
+                """,
+                (job_id,)
+            )
+            row = cur.fetchone()
+            status = row[0] if row else None
+    except psycopg2.Error as e:
+        print(f"[DB Speculation Status] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return status
+
+def finish_speculative_synthesis(job_id: str, status: str) -> bool:
+    """
+    추측 합성 작업의 결과 상태('completed', 'failed', 'cancelled')를 기록합니다. (이미 끝난 작업은 그대로 둠)
+
+    Returns:
+        bool: 저장 성공 시 True, 실패 시 False
+    """
+    conn = get_db_connection()
+    if not conn: return False
+
+    success = False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE speculative_syntheses SET status = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE job_id = %s AND status IN ('running', 'claimed');
+                """,
+                (status, job_id)
+            )
+            conn.commit()
+            success = True
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Speculation Finish] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return success
+
+def count_speculative_syntheses() -> dict:
+    """
+    진행 중인 추측 합성 수를 조회합니다. (모든 워커 기준, 관리자 화면용)
+
+    Returns:
+        dict: {'running': int, 'claimed': int}, 오류 시 0
+    """
+    conn = get_db_connection()
+    if not conn: return {'running': 0, 'claimed': 0}
+
+    counts = {'running': 0, 'claimed': 0}
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT status, COUNT(*) FROM speculative_syntheses
+                WHERE status IN ('running', 'claimed') AND expires_at > CURRENT_TIMESTAMP
+                GROUP BY status;
+                """
+            )
+            counts.update({status: count for status, count in cur.fetchall()})
+    except psycopg2.Error as e:
+        print(f"[DB Speculation Count] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return counts
+
+def record_item_usage(items: list[dict]) -> bool:
+    """
+    한 번의 합성에 사용된 아이템과 아이템 쌍(요청 순서 유지)의 사용 횟수를 1씩 늘립니다. (전체 횟수와 오늘 날짜의 일별 횟수)
+
+    Args:
+        items (list[dict]): [{'digest': str, 'type': str, 'file_path': str}] (요청 순서)
+
+    Returns:
+        bool: 저장 성공 시 True, 실패 시 False
+    """
+    if not items: return False
+    conn = get_db_connection()
+    if not conn: return False
+
+    success = False
+    try:
+        with conn.cursor() as cur:
+            for item in items:
+                cur.execute(
+                    """
+                    INSERT INTO item_popularity (item_digest, item_type, file_path, use_count)
+                    VALUES (%s, %s, %s, 1)
+                    ON CONFLICT (item_digest)
+                    DO UPDATE SET use_count = item_popularity.use_count + 1, item_type = EXCLUDED.item_type,
+                                  file_path = EXCLUDED.file_path, last_used_at = CURRENT_TIMESTAMP;
+                    """,
+                    (item['digest'], item['type'], item['file_path'])
+                )
+                cur.execute(
+                    """
+                    INSERT INTO item_usage_daily (item_digest, usage_date, use_count)
+                    VALUES (%s, CURRENT_DATE, 1)
+                    ON CONFLICT (item_digest, usage_date)
+                    DO UPDATE SET use_count = item_usage_daily.use_count + 1;
+                    """,
+                    (item['digest'],)
+                )
+            for i, first in enumerate(items):
+                for second in items[i + 1:]:
+                    if first['digest'] == second['digest']: continue
+                    cur.execute(
+                        """
+                        INSERT INTO item_pair_popularity (first_digest, second_digest, use_count)
+                        VALUES (%s, %s, 1)
+                        ON CONFLICT (first_digest, second_digest)
+                        DO UPDATE SET use_count = item_pair_popularity.use_count + 1, last_used_at = CURRENT_TIMESTAMP;
+                        """,
+                        (first['digest'], second['digest'])
+                    )
+                    cur.execute(
+                        """
+                        INSERT INTO item_pair_usage_daily (first_digest, second_digest, usage_date, use_count)
+                        VALUES (%s, %s, CURRENT_DATE, 1)
+                        ON CONFLICT (first_digest, second_digest, usage_date)
+                        DO UPDATE SET use_count = item_pair_usage_daily.use_count + 1;
+                        """,
+                        (first['digest'], second['digest'])
+                    )
+            conn.commit()
+            success = True
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Item Usage Record] 오류 발생: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return success
+
+def prune_item_usage(unused_days: int) -> list[str]:
+    """
+    인기도 기록을 정리합니다. unused_days 일 이전의 일별 사용 횟수와, 그 기간 동안 사용되지 않은 아이템/쌍을 삭제합니다.
+
+    Returns:
+        list[str]: 삭제된 아이템의 file_path (호출하는 쪽에서 보관 파일 삭제), 오류 시 빈 리스트
+    """
+    conn = get_db_connection()
+    if not conn: return []
+
+    file_paths = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM item_usage_daily WHERE usage_date <= CURRENT_DATE - %s;", (unused_days,))
+            cur.execute("DELETE FROM item_pair_usage_daily WHERE usage_date <= CURRENT_DATE - %s;", (unused_days,))
+            cur.execute("DELETE FROM item_pair_popularity WHERE last_used_at < NOW() - make_interval(days => %s);",
+                        (unused_days,))
+            cur.execute( # 쌍/일별 기록은 ON DELETE CASCADE 로 함께 삭제
+                "DELETE FROM item_popularity WHERE last_used_at < NOW() - make_interval(days => %s) RETURNING file_path;",
+                (unused_days,)
+            )
+            file_paths = [row[0] for row in cur.fetchall()]
+            conn.commit()
+            if file_paths:
+                print(f"[DB Item Usage Prune] 사용하지 않은 아이템 {len(file_paths)}개 삭제")
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Item Usage Prune] 오류 발생: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return file_paths
+
+def get_popular_items(limit: int = 20, days: int = 30) -> list[dict]:
+    """
+    최근 days 일(오늘 포함) 안의 사용 횟수 합계 순으로 아이템을 조회합니다. (일별 사용 횟수 집계)
+
+    Returns:
+        list[dict]: (item_digest, item_type, file_path, use_count - 기간 안의 사용 횟수), 오류 시 빈 리스트
+    """
+    conn = get_db_connection(use_dict_cursor=True)
+    if not conn: return []
+
+    rows = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT i.item_digest, i.item_type, i.file_path, SUM(d.use_count) AS use_count
+                FROM item_usage_daily d
+                JOIN item_popularity i ON i.item_digest = d.item_digest
+                WHERE d.usage_date > CURRENT_DATE - %s
+                GROUP BY i.item_digest
+                ORDER BY use_count DESC, MAX(d.usage_date) DESC LIMIT %s;
+                """,
+                (days, limit)
+            )
+            rows = [dict(row) for row in cur.fetchall()]
+    except psycopg2.Error as e:
+        print(f"[DB Popular Items] 오류 발생: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return rows
+
+def get_popular_item_pairs(limit: int = 20, days: int = 30) -> list[dict]:
+    """
+    최근 days 일(오늘 포함) 안에 함께 사용된 횟수 합계 순으로 아이템 쌍을 조회합니다. (일별 사용 횟수 집계)
+
+    Returns:
+        list[dict]: (first_digest, first_type, first_path, second_digest, second_type, second_path, use_count),
+                    오류 시 빈 리스트
+    """
+    conn = get_db_connection(use_dict_cursor=True)
+    if not conn: return []
+
+    rows = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT p.first_digest, a.item_type AS first_type, a.file_path AS first_path,
+                       p.second_digest, b.item_type AS second_type, b.file_path AS second_path,
+                       SUM(d.use_count) AS use_count
+                FROM item_pair_usage_daily d
+                JOIN item_pair_popularity p ON p.first_digest = d.first_digest AND p.second_digest = d.second_digest
+                JOIN item_popularity a ON a.item_digest = p.first_digest
+                JOIN item_popularity b ON b.item_digest = p.second_digest
+                WHERE d.usage_date > CURRENT_DATE - %s
+                GROUP BY p.first_digest, p.second_digest, a.item_digest, b.item_digest
+                ORDER BY use_count DESC, MAX(d.usage_date) DESC LIMIT %s;
+                """,
+                (days, limit)
+            )
+            rows = [dict(row) for row in cur.fetchall()]
+    except psycopg2.Error as e:
+        print(f"[DB Popular Item Pairs] 오류 발생: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return rows
+
+def claim_idempotency_key(user_id: int, idem_key: str, endpoint: str, request_hash: str, ttl_seconds: float,
+                          lease_token: str, lease_seconds: float) -> dict | None:
+    """
+    멱등 키를 선점합니다. 키가 없거나 만료되었으면 'in_progress' 로 새로 저장하고,
+    아직 유효한 키가 있으면 저장된 레코드를 반환합니다. (INSERT ... ON CONFLICT 로 워커 간 경쟁 상태 방지)
+    같은 요청의 'in_progress' 키라도 선점(lease)이 만료되었으면 (처리하던 워커가 죽음) 이 요청이 이어받습니다.
+
+    Args:
+        user_id (int): 사용자 ID
+        idem_key (str): Idempotency-Key 헤더 값
+        endpoint (str): 엔드포인트 이름
+        request_hash (str): 요청 내용 해시
+        ttl_seconds (float): 키 유지 시간(초)
+        lease_token (str): 이 요청의 선점 토큰 (갱신/완료/삭제 시 사용)
+        lease_seconds (float): 선점 유지 시간(초), 처리 중에는 renew_idempotency_leases 로 연장
+
+    Returns:
+        dict or None: {'claimed': True} 선점 성공,
+                      {'claimed': False, 'endpoint', 'request_hash', 'status', 'response_status', 'response_body', 'content_type'} 기존 키,
+                      오류 시 None
+    """
+    conn = get_db_connection(use_dict_cursor=True)
+    if not conn: return None
+
+    record = None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO idempotency_keys (user_id, idem_key, endpoint, request_hash, status, expires_at,
+                                              lease_token, lease_until)
+                VALUES (%s, %s, %s, %s, 'in_progress', CURRENT_TIMESTAMP + %s * INTERVAL '1 second',
+                        %s, CURRENT_TIMESTAMP + %s * INTERVAL '1 second')
+                ON CONFLICT (user_id, idem_key)
+                DO UPDATE SET endpoint = EXCLUDED.endpoint, request_hash = EXCLUDED.request_hash, status = 'in_progress',
+                              response_status = NULL, response_body = NULL, content_type = NULL,
+                              created_at = CURRENT_TIMESTAMP, expires_at = EXCLUDED.expires_at,
+                              lease_token = EXCLUDED.lease_token, lease_until = EXCLUDED.lease_until
+                    WHERE idempotency_keys.expires_at < CURRENT_TIMESTAMP
+                       OR (idempotency_keys.status = 'in_progress'
+                           AND idempotency_keys.lease_until < CURRENT_TIMESTAMP
+                           AND idempotency_keys.endpoint = EXCLUDED.endpoint
+                           AND idempotency_keys.request_hash = EXCLUDED.request_hash)
+                RETURNING user_id;
+                """,
+                (user_id, idem_key, endpoint, request_hash, ttl_seconds, lease_token, lease_seconds)
+            )
+            if cur.fetchone():
+                record = {'claimed': True}
+            else:
+                cur.execute(
+                    """
+                    SELECT endpoint, request_hash, status, response_status, response_body, content_type
+                    FROM idempotency_keys WHERE user_id = %s AND idem_key = %s;
+                    """,
+                    (user_id, idem_key)
+                )
+                row = cur.fetchone()
+                record = dict(row, claimed=False) if row else None
+            conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Idempotency Claim] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return record
+
+def get_idempotency_key(user_id: int, idem_key: str) -> dict | None:
+    """
+    유효한(만료되지 않은) 멱등 키 레코드를 조회합니다. (진행 중인 요청의 완료 대기용)
+
+    Returns:
+        dict or None: (status, response_status, response_body, content_type, lease_expired), 없거나 오류 시 None
+                      lease_expired 는 'in_progress' 인데 처리하던 요청의 선점이 만료된 경우 True
+    """
+    conn = get_db_connection(use_dict_cursor=True)
+    if not conn: return None
+
+    record = None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT status, response_status, response_body, content_type,
+                       (status = 'in_progress' AND lease_until < CURRENT_TIMESTAMP) AS lease_expired
+                FROM idempotency_keys
+                WHERE user_id = %s AND idem_key = %s AND expires_at >= CURRENT_TIMESTAMP;
+                """,
+                (user_id, idem_key)
+            )
+            row = cur.fetchone()
+            record = dict(row) if row else None
+    except psycopg2.Error as e:
+        print(f"[DB Idempotency Get] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return record
+
+def complete_idempotency_key(user_id: int, idem_key: str, lease_token: str, response_status: int, response_body: str,
+                             content_type: str) -> bool:
+    """
+    멱등 키에 최종 응답을 저장하고 선점을 해제합니다. 이후 같은 키의 요청은 이 응답을 그대로 받습니다.
+    선점이 만료되어 다른 요청이 이어받았으면 (lease_token 불일치) 저장하지 않습니다.
+
+    Returns:
+        bool: 성공 시 True, 실패 시 False
+    """
+    conn = get_db_connection()
+    if not conn: return False
+
+    success = False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE idempotency_keys
+                SET status = 'completed', response_status = %s, response_body = %s, content_type = %s,
+                    lease_token = NULL, lease_until = NULL
+                WHERE user_id = %s AND idem_key = %s AND lease_token = %s;
+                """,
+                (response_status, response_body, content_type, user_id, idem_key, lease_token)
+            )
+            conn.commit()
+            success = cur.rowcount > 0
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Idempotency Complete] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return success
+
+def release_idempotency_key(user_id: int, idem_key: str, lease_token: str) -> bool:
+    """
+    진행 중인 멱등 키를 삭제합니다. (서버 오류 등 다시 시도해도 되는 실패 - 같은 키로 다시 처리 가능)
+    다른 요청이 이어받은 키(lease_token 불일치)는 삭제하지 않습니다.
+
+    Returns:
+        bool: 성공 시 True, 실패 시 False
+    """
+    conn = get_db_connection()
+    if not conn: return False
+
+    success = False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "DELETE FROM idempotency_keys WHERE user_id = %s AND idem_key = %s AND status = 'in_progress' AND lease_token = %s;",
+                (user_id, idem_key, lease_token)
+            )
+            conn.commit()
+            success = True
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Idempotency Release] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return success
+
+def renew_idempotency_leases(leases: list[tuple], lease_seconds: float) -> int:
+    """
+    처리 중인 멱등 키들의 선점을 lease_seconds 만큼 연장합니다. (처리하는 워커가 살아 있음을 알림)
+
+    Args:
+        leases (list[tuple]): (user_id, idem_key, lease_token) 목록
+        lease_seconds (float): 지금부터 선점을 유지할 시간(초)
+
+    Returns:
+        int: 연장한 키 수 (오류 시 0)
+    """
+    if not leases:
+        return 0
+    conn = get_db_connection()
+    if not conn: return 0
+
+    renewed = 0
+    try:
+        with conn.cursor() as cur:
+            psycopg2.extras.execute_values(
+                cur,
+                """
+                UPDATE idempotency_keys AS k
+                SET lease_until = CURRENT_TIMESTAMP + v.lease_seconds * INTERVAL '1 second'
+                FROM (VALUES %s) AS v (user_id, idem_key, lease_token, lease_seconds)
+                WHERE k.user_id = v.user_id AND k.idem_key = v.idem_key AND k.lease_token = v.lease_token
+                  AND k.status = 'in_progress';
+                """,
+                [(user_id, idem_key, lease_token, float(lease_seconds)) for user_id, idem_key, lease_token in leases],
+                page_size=len(leases)
+            )
+            renewed = cur.rowcount
+            conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Idempotency Renew] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return renewed
+
+def delete_expired_idempotency_keys() -> int:
+    """
+    만료된 멱등 키를 삭제합니다.
+
+    Returns:
+        int: 삭제한 키 수 (오류 시 0)
+    """
+    conn = get_db_connection()
+    if not conn: return 0
+
+    deleted = 0
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM idempotency_keys WHERE expires_at < CURRENT_TIMESTAMP;")
+            deleted = cur.rowcount
+            conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Idempotency Prune] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return deleted
+
+def add_wardrobe_item(user_id: int, item_digest: str, item_type: str, file_path: str, thumbnail_path: str,
+                      width: int, height: int, original_filename: str = None) -> dict | None:
+    """
+    옷장에 아이템을 추가합니다. 같은 사용자에게 같은 내용(해시)의 아이템이 있으면 새로 만들지 않고 기존 아이템을 반환합니다.
+
+    Returns:
+        dict or None: 아이템 정보 + 'created' (새로 추가했으면 True), 오류 시 None
+    """
+    conn = get_db_connection(use_dict_cursor=True)
+    if not conn: return None
+
+    item = None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO wardrobe_items (user_id, item_digest, item_type, file_path, thumbnail_path, width, height,
+                                            original_filename)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (user_id, item_digest)
+                DO UPDATE SET last_used_at = CURRENT_TIMESTAMP
+                RETURNING id, item_digest, item_type, file_path, thumbnail_path, width, height, original_filename,
+                          created_at, (xmax = 0) AS created;
+                """,
+                (user_id, item_digest, item_type, file_path, thumbnail_path, width, height, original_filename)
+            )
+            row = cur.fetchone()
+            conn.commit()
+            item = dict(row) if row else None
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Wardrobe Add] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return item
+
+def get_wardrobe_item_by_digest(user_id: int, item_digest: str) -> dict | None:
+    """
+    사용자의 옷장에서 같은 내용(해시)의 아이템을 찾습니다. (다시 업로드한 아이템의 분류/저장 생략용)
+
+    Returns:
+        dict or None: 아이템 정보, 없거나 오류 시 None
+    """
+    conn = get_db_connection(use_dict_cursor=True)
+    if not conn: return None
+
+    item = None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, item_digest, item_type, file_path, thumbnail_path, width, height, original_filename, created_at
+                FROM wardrobe_items WHERE user_id = %s AND item_digest = %s;
+                """,
+                (user_id, item_digest)
+            )
+            row = cur.fetchone()
+            item = dict(row) if row else None
+    except psycopg2.Error as e:
+        print(f"[DB Wardrobe Lookup] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return item
+
+def get_wardrobe_items(user_id: int, limit: int = 24, before_id: int = None, item_type: str = None) -> list[dict]:
+    """
+    사용자의 옷장 아이템을 최근 추가 순으로 조회합니다. (키셋 페이지네이션: before_id 보다 작은 ID)
+
+    Args:
+        user_id (int): 사용자 ID
+        limit (int): 최대 개수
+        before_id (int, optional): 이전 페이지의 마지막 아이템 ID
+        item_type (str, optional): 아이템 종류 필터
+
+    Returns:
+        list[dict]: (id, item_digest, item_type, file_path, thumbnail_path, width, height, original_filename, created_at),
+                    오류 시 빈 리스트
+    """
+    conn = get_db_connection(use_dict_cursor=True)
+    if not conn: return []
+
+    items = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, item_digest, item_type, file_path, thumbnail_path, width, height, original_filename, created_at
+                FROM wardrobe_items
+                WHERE user_id = %s AND (%s IS NULL OR id < %s) AND (%s IS NULL OR item_type = %s)
+                ORDER BY id DESC
+                LIMIT %s;
+                """,
+                (user_id, before_id, before_id, item_type, item_type, limit)
+            )
+            items = [dict(row) for row in cur.fetchall()]
+    except psycopg2.Error as e:
+        print(f"[DB Wardrobe List] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return items
+
+def get_wardrobe_items_by_ids(user_id: int, item_ids: list[int]) -> dict[int, dict]:
+    """
+    사용자의 옷장 아이템을 ID 로 조회하고 사용 시각을 갱신합니다. (다른 사용자의 아이템은 제외)
+
+    Returns:
+        dict[int, dict]: {아이템 ID: 아이템 정보}, 오류 시 빈 딕셔너리
+    """
+    if not item_ids: return {}
+    conn = get_db_connection(use_dict_cursor=True)
+    if not conn: return {}
+
+    items = {}
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE wardrobe_items SET last_used_at = CURRENT_TIMESTAMP
+                WHERE user_id = %s AND id = ANY(%s)
+                RETURNING id, item_digest, item_type, file_path, thumbnail_path, width, height, original_filename, created_at;
+                """,
+                (user_id, list(item_ids))
+            )
+            items = {row['id']: dict(row) for row in cur.fetchall()}
+            conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Wardrobe Get] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return items
+
+def update_wardrobe_item_type(user_id: int, item_id: int, item_type: str) -> dict | None:
+    """
+    옷장 아이템의 종류를 바꿉니다. (분류가 틀렸을 때)
+
+    Returns:
+        dict or None: 수정된 아이템 정보, 없거나 오류 시 None
+    """
+    conn = get_db_connection(use_dict_cursor=True)
+    if not conn: return None
+
+    item = None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE wardrobe_items SET item_type = %s
+                WHERE user_id = %s AND id = %s
+                RETURNING id, item_digest, item_type, file_path, thumbnail_path, width, height, original_filename, created_at;
+                """,
+                (item_type, user_id, item_id)
+            )
+            row = cur.fetchone()
+            conn.commit()
+            item = dict(row) if row else None
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Wardrobe Update] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return item
+
+def delete_wardrobe_item(user_id: int, item_id: int) -> dict | None:
+    """
+    옷장 아이템을 삭제합니다. (파일은 호출하는 쪽에서 삭제)
+
+    Returns:
+        dict or None: 삭제한 아이템의 (file_path, thumbnail_path), 없거나 오류 시 None
+    """
+    conn = get_db_connection(use_dict_cursor=True)
+    if not conn: return None
+
+    item = None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "DELETE FROM wardrobe_items WHERE user_id = %s AND id = %s RETURNING file_path, thumbnail_path;",
+                (user_id, item_id)
+            )
+            row = cur.fetchone()
+            conn.commit()
+            item = dict(row) if row else None
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Wardrobe Delete] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return item
+
+def count_wardrobe_items(user_id: int) -> int:
+    """
+    사용자의 옷장 아이템 수를 반환합니다. (오류 시 0)
+    """
+    conn = get_db_connection()
+    if not conn: return 0
+
+    count = 0
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM wardrobe_items WHERE user_id = %s;", (user_id,))
+            count = cur.fetchone()[0]
+    except psycopg2.Error as e:
+        print(f"[DB Wardrobe Count] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return count
+
+def add_synthesis_record(user_id: int, source: str, item_types: list[str], item_digests: list[str],
+                         output_filename: str, base_model_id: int = None, strategy: str = None,
+                         model_name: str = None, queue_ms: int = None, synthesis_ms: int = None,
+                         total_ms: int = None, output_bytes: int = None, output_digest: str = None,
+                         thumbnail_filename: str = None, placeholder: str = None,
+                         watermarked: bool = False) -> int | None:
+    """
+    사용자에게 전달한 합성 결과를 합성 기록(syntheses)에 추가합니다.
+
+    Returns:
+        int or None: 기록 ID, 오류 시 None
+    """
+    conn = get_db_connection()
+    if not conn: return None
+
+    record_id = None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO syntheses (user_id, base_model_id, source, item_types, item_digests, strategy, model_name,
+                                       queue_ms, synthesis_ms, total_ms, output_bytes, output_digest,
+                                       output_filename, thumbnail_filename, placeholder, watermarked)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING id;
+                """,
+                (user_id, base_model_id, source, item_types, item_digests, strategy, model_name, queue_ms,
+                 synthesis_ms, total_ms, output_bytes, output_digest, output_filename, thumbnail_filename, placeholder,
+                 watermarked)
+            )
+            record_id = cur.fetchone()[0]
+            conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Synthesis Record] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return record_id
+
+def set_synthesis_thumbnail(record_id: int, thumbnail_filename: str, placeholder: str = None) -> bool:
+    """
+    합성 기록에 (기록 후 백그라운드에서 만든) 썸네일 파일 이름과 자리 표시 이미지를 저장합니다.
+
+    Returns:
+        bool: 갱신 여부
+    """
+    conn = get_db_connection()
+    if not conn: return False
+
+    updated = False
+    try:
+        with conn.cursor() as cur:
+            cur.execute("UPDATE syntheses SET thumbnail_filename = %s, placeholder = %s WHERE id = %s;",
+                        (thumbnail_filename, placeholder, record_id))
+            updated = cur.rowcount > 0
+            conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"[DB Synthesis Thumbnail] 오류 발생 (ID={record_id}): {e}")
+    finally:
+        if conn: conn.close()
+    return updated
+
+def get_syntheses(user_id: int, limit: int = 24, before_id: int = None) -> list[dict]:
+    """
+    사용자의 합성 기록을 최신순으로 조회합니다. (키셋 페이지네이션: before_id 보다 작은 ID)
+    (user_id, id DESC) 인덱스를 따라 읽으므로 기록이 많아도 페이지 크기만큼만 읽습니다. (OFFSET 사용 안 함)
+
+    Args:
+        user_id (int): 사용자 ID
+        limit (int): 최대 개수
+        before_id (int, optional): 이전 페이지의 마지막 기록 ID
+
+    Returns:
+        list[dict]: 합성 기록 (베이스 모델 이름 포함), 오류 시 빈 리스트
+    """
+    conn = get_db_connection(use_dict_cursor=True)
+    if not conn: return []
+
+    records = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT s.id, s.base_model_id, b.name AS base_model_name, s.source, s.item_types, s.strategy,
+                       s.model_name, s.queue_ms, s.synthesis_ms, s.total_ms, s.output_bytes, s.output_digest,
+                       s.output_filename, s.thumbnail_filename, s.placeholder, s.watermarked, s.created_at
+                FROM syntheses s
+                LEFT JOIN base_models b ON b.id = s.base_model_id
+                WHERE s.user_id = %s AND (%s IS NULL OR s.id < %s)
+                ORDER BY s.id DESC
+                LIMIT %s;
+                """,
+                (user_id, before_id, before_id, limit)
+            )
+            records = [dict(row) for row in cur.fetchall()]
+    except psycopg2.Error as e:
+        print(f"[DB Synthesis History] 오류 발생: {e}")
+    finally:
+        if conn: conn.close()
+    return records
+
 # --- 추가적인 유틸리티 함수 (필요시) ---
 # 예: 특정 역할(role)을 가진 사용자 목록 조회 등
 
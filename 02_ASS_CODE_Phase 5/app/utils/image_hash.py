@@ -0,0 +1,120 @@
+# app/utils/image_hash.py
+# 지각 해시(perceptual hash) 계산 함수 모음 (NumPy 사용)
+# 같은 상품 사진의 리사이즈/재압축 사본도 비슷한 해시값을 갖도록 dHash, pHash를 계산합니다.
+
+from functools import lru_cache
+import numpy as np
+from PIL import Image
+
+HASH_BITS = 64
+BAND_COUNT = 4 # 64비트 해시를 16비트씩 4개 밴드로 분할 (DB 후보 검색용)
+BAND_BITS = HASH_BITS // BAND_COUNT
+
+_RESAMPLING = Image.Resampling.LANCZOS if hasattr(Image, 'Resampling') else Image.ANTIALIAS
+
+
+def _to_grayscale(img: Image.Image) -> Image.Image:
+    """알파 채널이 있는 이미지는 흰 배경에 합친 뒤 그레이스케일로 변환합니다."""
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        rgba = img.convert('RGBA')
+        background = Image.new('RGBA', rgba.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(background, rgba)
+    return img.convert('L')
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    """불리언 배열을 부호 없는 정수로 변환합니다. (앞쪽 비트가 상위 비트)"""
+    value = 0
+    for bit in bits.flatten():
+        value = (value << 1) | int(bit)
+    return value
+
+
+@lru_cache(maxsize=4)
+def _dct_matrix(size: int) -> np.ndarray:
+    """size x size DCT-II 변환 행렬 (직교 정규화)"""
+    n = np.arange(size)
+    k = n.reshape(-1, 1)
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size))
+    matrix[0, :] *= 1 / np.sqrt(2)
+    return matrix * np.sqrt(2 / size)
+
+
+def dhash(img: Image.Image, hash_size: int = 8) -> int:
+    """
+    Difference hash: 인접 픽셀 밝기 차이의 부호로 64비트 해시를 만듭니다.
+
+    Args:
+        img (Image.Image): Pillow 이미지 객체
+        hash_size (int): 해시 한 변의 크기 (8 -> 64비트)
+
+    Returns:
+        int: 부호 없는 64비트 해시값
+    """
+    gray = _to_grayscale(img).resize((hash_size + 1, hash_size), resample=_RESAMPLING)
+    pixels = np.asarray(gray, dtype=np.int16)
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def phash(img: Image.Image, hash_size: int = 8, highfreq_factor: int = 4) -> int:
+    """
+    Perceptual hash: 32x32 그레이스케일 이미지의 DCT 저주파 8x8 계수를
+    중앙값과 비교하여 64비트 해시를 만듭니다. 리사이즈/재압축에 강합니다.
+
+    Args:
+        img (Image.Image): Pillow 이미지 객체
+        hash_size (int): 사용할 저주파 영역 크기 (8 -> 64비트)
+        highfreq_factor (int): DCT 입력 크기 배수 (hash_size * highfreq_factor)
+
+    Returns:
+        int: 부호 없는 64비트 해시값
+    """
+    size = hash_size * highfreq_factor
+    gray = _to_grayscale(img).resize((size, size), resample=_RESAMPLING)
+    pixels = np.asarray(gray, dtype=np.float64)
+    dct = _dct_matrix(size)
+    coeffs = dct @ pixels @ dct.T
+    low_freq = coeffs[:hash_size, :hash_size]
+    median = np.median(low_freq.flatten()[1:]) # DC 성분 제외
+    return _bits_to_int(low_freq > median)
+
+
+def hamming_distance(hash_a: int, hash_b: int) -> int:
+    """두 해시값 사이의 해밍 거리 (다른 비트 수)"""
+    return bin((hash_a ^ hash_b) & ((1 << HASH_BITS) - 1)).count('1')
+
+
+def to_signed64(value: int) -> int:
+    """부호 없는 64비트 값을 PostgreSQL BIGINT 범위(부호 있는 64비트)로 변환합니다."""
+    return value - (1 << HASH_BITS) if value >= (1 << (HASH_BITS - 1)) else value
+
+
+def from_signed64(value: int) -> int:
+    """BIGINT 로 저장된 값을 부호 없는 64비트 값으로 되돌립니다."""
+    return value + (1 << HASH_BITS) if value < 0 else value
+
+
+def split_bands(value: int) -> list[int]:
+    """
+    64비트 해시를 BAND_COUNT 개의 밴드로 나눕니다.
+    비둘기집 원리에 따라 해밍 거리가 BAND_COUNT - 1 이하인 두 해시는
+    최소 하나의 밴드가 정확히 일치하므로, 밴드 일치로 DB 후보를 좁힐 수 있습니다.
+    """
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (BAND_BITS * (BAND_COUNT - 1 - i))) & mask for i in range(BAND_COUNT)]
+
+
+def compute_image_hashes(image_path: str) -> dict:
+    """
+    이미지 파일의 pHash, dHash, pHash 밴드를 계산합니다.
+
+    Args:
+        image_path (str): 이미지 파일 경로
+
+    Returns:
+        dict: {'phash': int, 'dhash': int, 'bands': list[int]}
+    """
+    with Image.open(image_path) as img_fp:
+        img = img_fp.copy()
+    p_value = phash(img)
+    return {'phash': p_value, 'dhash': dhash(img), 'bands': split_bands(p_value)}
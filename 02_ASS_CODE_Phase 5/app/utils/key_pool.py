@@ -0,0 +1,289 @@
+# app/utils/key_pool.py
+# Gemini API 키 풀
+# 여러 API 키로 각각 genai.Client 를 만들고, 호출마다 가장 여유 있는 정상 키를 골라 사용합니다.
+# 키별 분당 요청 수는 레이트 리미터 버킷(key:<라벨>)으로 워커 간에 공유되며,
+# 429/403 이 연속으로 발생한 키는 일정 시간 동안 풀에서 제외(ejection)됩니다.
+# 403 은 키 문제(키 무효/권한 없음)로 보고 같은 요청을 다음 키로 다시 보냅니다. 모든 정상 키가 403 을 반환했을 때만
+# 오류를 호출자에게 넘기므로, 모델 레지스트리는 키 하나의 403 때문에 모델을 제외하지 않습니다.
+
+import os
+import asyncio
+import threading
+import time
+from google import genai
+
+from app.utils.metrics import metrics
+from app.utils.rate_limiter import rate_limiter, BucketSpec, RateLimitTimeout
+from app.utils.resilience import remaining_time, mark_attempt_sent
+
+# 키 상태 악화로 간주하는 HTTP 상태 코드 (할당량 초과, 권한 없음/키 무효)
+KEY_FAILURE_CODES = (429, 403)
+# 다음 키로 즉시 다시 보내는 상태 코드 (429 는 resilience 재시도/백오프에 맡김)
+KEY_REJECTED_CODE = 403
+
+
+def mask_key(api_key: str) -> str:
+    """로그/화면 표시용으로 키의 마지막 4자리만 남깁니다."""
+    return f"...{api_key[-4:]}" if api_key and len(api_key) > 4 else "****"
+
+
+class ApiKeyState:
+    """API 키 하나의 클라이언트, 요청 제한, 사용/오류 통계"""
+
+    def __init__(self, label: str, client, rpm: float = None, burst: float = None):
+        self.label = label
+        self.client = client
+        self.bucket = {f'key:{label}': BucketSpec(rpm, burst)} if rpm else {}
+        self.in_flight = 0
+        self.calls = 0
+        self.errors = 0
+        self.failure_counts = {code: 0 for code in KEY_FAILURE_CODES}
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.last_error = None
+        self.recent_calls = [] # 최근 60초 호출 시각 (부하 비교용)
+
+    def load(self, now: float) -> tuple:
+        """부하 정렬 키: (진행 중인 요청 수, 최근 1분 요청 수)"""
+        self.recent_calls = [t for t in self.recent_calls if now - t < 60]
+        return (self.in_flight, len(self.recent_calls))
+
+
+class ApiKeyPool:
+    """
+    API 키 풀. 가장 부하가 적은 정상 키를 고르고, 반복 실패한 키는 지수적으로 늘어나는 기간 동안 제외합니다.
+
+    Args:
+        eject_threshold (int): 연속 429/403 이 이 횟수에 도달하면 제외
+        eject_seconds (float): 첫 제외 기간(초), 반복 제외 시 2배씩 증가
+        max_eject_seconds (float): 제외 기간 상한(초)
+    """
+
+    def __init__(self, eject_threshold: int = 3, eject_seconds: float = 60, max_eject_seconds: float = 900):
+        self._lock = threading.Lock()
+        self._keys = []
+        self.eject_threshold = eject_threshold
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+
+    def add_key(self, label: str, client, rpm: float = None, burst: float = None) -> ApiKeyState:
+        state = ApiKeyState(label, client, rpm, burst)
+        with self._lock:
+            self._keys.append(state)
+        return state
+
+    def __len__(self):
+        return len(self._keys)
+
+    # --- 키 선택 ---
+    def _candidates(self, now: float, exclude: tuple = ()) -> list[ApiKeyState]:
+        """정상 키를 부하 순으로 반환합니다. 모두 제외 상태이면 가장 먼저 복귀하는 키 하나. (exclude 의 라벨은 건너뜀)"""
+        keys = [k for k in self._keys if k.label not in exclude]
+        healthy = [k for k in keys if k.ejected_until <= now]
+        if not healthy:
+            return [min(keys, key=lambda k: k.ejected_until)] if keys else []
+        return sorted(healthy, key=lambda k: k.load(now))
+
+    def has_healthy_key(self, exclude: tuple = ()) -> bool:
+        """exclude 의 라벨을 제외하고 제외(ejection) 상태가 아닌 키가 남아 있는지"""
+        now = time.time()
+        with self._lock:
+            return any(k.label not in exclude and k.ejected_until <= now for k in self._keys)
+
+    def acquire(self, timeout: float = None, exclude: tuple = ()) -> ApiKeyState:
+        """
+        호출에 사용할 키를 고르고 진행 중 요청 수를 늘립니다. 모든 키의 요청 제한이 찼으면 토큰이 생길 때까지 대기합니다.
+        사용 후에는 반드시 release() 를 호출해야 합니다.
+
+        Args:
+            timeout (float, optional): 대기 최대 시간(초), 기본은 남은 마감 시간
+            exclude (tuple): 이번 요청에서 이미 거절된 키 라벨 (건너뜀)
+
+        Raises:
+            RuntimeError: 풀에 키가 없음
+            RateLimitTimeout: 대기 시간 안에 사용할 수 있는 키가 없음
+        """
+        if timeout is None:
+            timeout = remaining_time(default=60.0)
+        start = time.monotonic()
+        while True:
+            state, sleep_seconds = self._try_acquire(start, timeout, exclude)
+            if state:
+                return state
+            time.sleep(sleep_seconds)
+
+    async def aacquire(self, timeout: float = None, exclude: tuple = ()) -> ApiKeyState:
+        """acquire 의 비동기 버전 (대기 중 이벤트 루프를 막지 않음)"""
+        if timeout is None:
+            timeout = remaining_time(default=60.0)
+        start = time.monotonic()
+        while True:
+            state, sleep_seconds = self._try_acquire(start, timeout, exclude)
+            if state:
+                return state
+            await asyncio.sleep(sleep_seconds)
+
+    def _try_acquire(self, start: float, timeout: float, exclude: tuple = ()) -> tuple[ApiKeyState | None, float]:
+        """부하 순으로 키별 요청 제한 토큰을 시도합니다. (선택된 키, 0) 또는 (None, 다음 시도까지 잘 시간)"""
+        with self._lock:
+            candidates = self._candidates(time.time(), exclude)
+        if not candidates:
+            raise RuntimeError("사용할 수 있는 Gemini API 키가 없습니다.")
+        min_wait = None
+        for state in candidates:
+            wait_seconds = rate_limiter.try_take(state.bucket)
+            if wait_seconds <= 0:
+                with self._lock:
+                    state.in_flight += 1
+                    state.calls += 1
+                    state.recent_calls.append(time.time())
+                metrics.increment('ai_key_calls', key=state.label)
+                return state, 0.0
+            min_wait = wait_seconds if min_wait is None else min(min_wait, wait_seconds)
+        waited = time.monotonic() - start
+        if waited + min_wait > timeout:
+            raise RateLimitTimeout([k for state in candidates for k in state.bucket], waited)
+        return None, min(min_wait, 1.0)
+
+    def release(self, state: ApiKeyState, error: Exception = None) -> None:
+        """호출 결과를 기록합니다. 429/403 이 연속 eject_threshold 회 발생하면 키를 제외합니다."""
+        code = getattr(error, 'code', None) if error else None
+        with self._lock:
+            state.in_flight = max(0, state.in_flight - 1)
+            if error is None:
+                state.consecutive_failures = 0
+                return
+            state.errors += 1
+            state.last_error = str(error)[:200]
+            if code not in KEY_FAILURE_CODES:
+                return # 키와 무관한 오류 (요청 형식, 서버 오류 등)
+            state.failure_counts[code] += 1
+            state.consecutive_failures += 1
+            if state.consecutive_failures < self.eject_threshold:
+                return
+            duration = min(self.max_eject_seconds, self.eject_seconds * (2 ** state.ejections))
+            state.ejections += 1
+            state.consecutive_failures = 0
+            state.ejected_until = time.time() + duration
+        metrics.increment('ai_key_ejections', key=state.label)
+        print(f"[API Key Pool] 키 제외: {state.label} ({duration:.0f}초, 최근 오류 {code})")
+
+    def should_try_next_key(self, state: ApiKeyState, error: Exception, tried: tuple) -> bool:
+        """403 을 받은 요청을 아직 시도하지 않은 정상 키로 다시 보낼지 판단합니다."""
+        if getattr(error, 'code', None) != KEY_REJECTED_CODE or not self.has_healthy_key(tried):
+            return False
+        print(f"[API Key Pool] 키 거절(403): {state.label} - 다음 키로 재시도")
+        return True
+
+    def status(self) -> list[dict]:
+        """관리자 화면용 키별 사용 현황 (현재 워커 프로세스 기준)"""
+        now = time.time()
+        with self._lock:
+            return [{
+                'label': k.label,
+                'status': 'ejected' if k.ejected_until > now else 'ok',
+                'ejected_for': max(0, int(k.ejected_until - now)),
+                'in_flight': k.in_flight,
+                'calls': k.calls,
+                'calls_last_minute': k.load(now)[1],
+                'errors': k.errors,
+                'errors_429': k.failure_counts[429],
+                'errors_403': k.failure_counts[403],
+                'last_error': k.last_error,
+            } for k in self._keys]
+
+
+class _PooledModels:
+    """client.models 대체: 호출마다 풀에서 키를 골라 해당 키의 클라이언트로 요청합니다."""
+
+    def __init__(self, pool: ApiKeyPool):
+        self._pool = pool
+
+    def generate_content(self, model: str, contents, config=None):
+        tried = ()
+        while True:
+            state = self._pool.acquire(exclude=tried)
+            mark_attempt_sent() # 키 대기 시간은 호출 지연시간(헤징 기준)에서 제외
+            try:
+                response = state.client.models.generate_content(model=model, contents=contents, config=config)
+            except Exception as e:
+                self._pool.release(state, e)
+                tried += (state.label,)
+                if self._pool.should_try_next_key(state, e, tried):
+                    continue
+                raise
+            self._pool.release(state)
+            return response
+
+    def get(self, model: str, config=None):
+        # 모델 점검(probe)용 메타데이터 조회: 모델 권한 오류(403)가 키 제외로 이어지지 않도록 결과는 기록하지 않음
+        state = self._pool.acquire()
+        try:
+            return state.client.models.get(model=model)
+        finally:
+            self._pool.release(state)
+
+
+class _AsyncPooledModels:
+    """client.aio.models 대체: 비동기 호출마다 풀에서 키를 골라 해당 키의 비동기 클라이언트로 요청합니다."""
+
+    def __init__(self, pool: ApiKeyPool):
+        self._pool = pool
+
+    async def generate_content(self, model: str, contents, config=None):
+        tried = ()
+        while True:
+            state = await self._pool.aacquire(exclude=tried)
+            mark_attempt_sent() # 키 대기 시간은 호출 지연시간(헤징 기준)에서 제외
+            try:
+                response = await state.client.aio.models.generate_content(model=model, contents=contents, config=config)
+            except BaseException as e: # 취소(CancelledError)도 진행 중 요청 수에서 제외
+                self._pool.release(state, e if isinstance(e, Exception) else None)
+                tried += (state.label,)
+                if isinstance(e, Exception) and self._pool.should_try_next_key(state, e, tried):
+                    continue
+                raise
+            self._pool.release(state)
+            return response
+
+
+class _AsyncPooledClient:
+    def __init__(self, pool: ApiKeyPool):
+        self.models = _AsyncPooledModels(pool)
+
+
+class PooledGenAIClient:
+    """
+    genai.Client 와 같은 방식(client.models.generate_content, client.aio.models.generate_content)으로
+    사용하는 키 풀 클라이언트. ai_module 등 기존 호출 코드는 변경 없이 사용할 수 있습니다.
+    """
+
+    def __init__(self, pool: ApiKeyPool):
+        self.pool = pool
+        self.models = _PooledModels(pool)
+        self.aio = _AsyncPooledClient(pool)
+
+
+def load_api_keys() -> list[str]:
+    """GEMINI_API_KEYS(쉼표 구분)를 우선 사용하고, 없으면 GEMINI_API_KEY 하나를 사용합니다."""
+    keys = [k.strip() for k in os.getenv('GEMINI_API_KEYS', '').split(',') if k.strip()]
+    if not keys and os.getenv('GEMINI_API_KEY'):
+        keys = [os.getenv('GEMINI_API_KEY').strip()]
+    return list(dict.fromkeys(keys)) # 중복 제거 (순서 유지)
+
+
+def create_pooled_client(api_keys: list[str], client_factory=None) -> PooledGenAIClient:
+    """
+    키 목록으로 키 풀 클라이언트를 만듭니다.
+    GEMINI_KEY_RPM, GEMINI_KEY_BURST: 키별 분당 요청 수/버스트 (0 이면 키별 제한 없음)
+    GEMINI_KEY_EJECT_THRESHOLD, GEMINI_KEY_EJECT_SECONDS: 제외 기준 연속 실패 횟수/첫 제외 기간(초)
+    """
+    client_factory = client_factory or (lambda key: genai.Client(api_key=key))
+    rpm = float(os.getenv('GEMINI_KEY_RPM', '0')) or None
+    burst = float(os.getenv('GEMINI_KEY_BURST', '0')) or None
+    pool = ApiKeyPool(eject_threshold=int(os.getenv('GEMINI_KEY_EJECT_THRESHOLD', '3')),
+                      eject_seconds=float(os.getenv('GEMINI_KEY_EJECT_SECONDS', '60')))
+    for index, api_key in enumerate(api_keys, start=1):
+        pool.add_key(f"key{index}{mask_key(api_key)}", client_factory(api_key), rpm, burst)
+    return PooledGenAIClient(pool)
@@ -0,0 +1,236 @@
+# app/utils/local_classifier.py
+# CPU 에서 동작하는 경량 아이템 분류기 (NumPy 특징 추출 + 소프트맥스 회귀)
+# 확신도가 충분히 높을 때만 사용하고, 낮으면 AI(Gemini) 분류로 넘깁니다.
+
+import os
+import numpy as np
+from PIL import Image
+
+ITEM_CATEGORIES = ['top', 'bottom', 'shoes', 'bag', 'accessory', 'hair']
+
+FEATURE_SIZE = 64 # 특징 추출 시 정사각형 리사이즈 크기
+GRID_SIZE = 8 # 전경 마스크 분포 그리드 (8x8)
+HUE_BINS, SAT_BINS, VAL_BINS = 12, 4, 4
+EDGE_BINS = 8
+
+_RESAMPLING = Image.Resampling.BILINEAR if hasattr(Image, 'Resampling') else Image.BILINEAR
+
+
+# --- 특징 추출 ---
+def _foreground_mask(rgb: np.ndarray, tolerance: float = 30.0) -> np.ndarray:
+    """테두리 픽셀의 중앙값을 배경색으로 보고, 배경과 색 차이가 큰 픽셀을 전경으로 판단합니다."""
+    border = np.concatenate([rgb[0], rgb[-1], rgb[:, 0], rgb[:, -1]])
+    background = np.median(border, axis=0)
+    distance = np.sqrt(((rgb - background) ** 2).sum(axis=2))
+    mask = distance > tolerance
+    if mask.sum() < 0.01 * mask.size: # 배경 추정 실패 시 전체를 전경으로 사용
+        mask = np.ones_like(mask, dtype=bool)
+    return mask
+
+
+def _rgb_to_hsv(rgb: np.ndarray) -> np.ndarray:
+    """0~255 RGB 배열을 0~1 범위 HSV 배열로 변환합니다."""
+    rgb = rgb / 255.0
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    maxc = rgb.max(axis=-1)
+    minc = rgb.min(axis=-1)
+    delta = maxc - minc
+    safe_delta = np.where(delta == 0, 1, delta)
+    hue = np.where(maxc == r, ((g - b) / safe_delta) % 6,
+          np.where(maxc == g, (b - r) / safe_delta + 2, (r - g) / safe_delta + 4)) / 6.0
+    hue = np.where(delta == 0, 0, hue)
+    sat = np.where(maxc == 0, 0, delta / np.where(maxc == 0, 1, maxc))
+    return np.stack([hue, sat, maxc], axis=-1)
+
+
+def extract_features(img: Image.Image) -> np.ndarray:
+    """
+    이미지 한 장에서 고정 길이 특징 벡터를 추출합니다.
+    - 전경 바운딩 박스 비율/채움 비율/점유율 (3)
+    - 전경 마스크 8x8 분포 (64)
+    - 전경 HSV 히스토그램 (12 + 4 + 4)
+    - 엣지 방향 히스토그램 (8)
+
+    Args:
+        img (Image.Image): Pillow 이미지 객체
+
+    Returns:
+        np.ndarray: float32 특징 벡터
+    """
+    if img.mode in ('RGBA', 'LA', 'P'):
+        rgba = img.convert('RGBA')
+        background = Image.new('RGBA', rgba.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(background, rgba)
+    rgb = np.asarray(img.convert('RGB').resize((FEATURE_SIZE, FEATURE_SIZE), resample=_RESAMPLING), dtype=np.float32)
+    mask = _foreground_mask(rgb)
+
+    # 1. 바운딩 박스 기반 형태 특징 (원본 비율 반영)
+    rows = np.where(mask.any(axis=1))[0]
+    cols = np.where(mask.any(axis=0))[0]
+    bbox_h = (rows[-1] - rows[0] + 1) * img.height / FEATURE_SIZE
+    bbox_w = (cols[-1] - cols[0] + 1) * img.width / FEATURE_SIZE
+    bbox_mask = mask[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+    shape_features = [np.log(bbox_h / max(bbox_w, 1e-6)), bbox_mask.mean(), mask.mean()]
+
+    # 2. 바운딩 박스 내 전경 분포 (8x8)
+    cell = Image.fromarray((bbox_mask * 255).astype(np.uint8)).resize((GRID_SIZE, GRID_SIZE), resample=_RESAMPLING)
+    grid_features = (np.asarray(cell, dtype=np.float32) / 255.0).flatten()
+
+    # 3. 전경 색상 히스토그램
+    hsv = _rgb_to_hsv(rgb)[mask]
+    hue_hist = np.histogram(hsv[:, 0], bins=HUE_BINS, range=(0, 1))[0]
+    sat_hist = np.histogram(hsv[:, 1], bins=SAT_BINS, range=(0, 1))[0]
+    val_hist = np.histogram(hsv[:, 2], bins=VAL_BINS, range=(0, 1))[0]
+    color_features = np.concatenate([hue_hist, sat_hist, val_hist]) / max(len(hsv), 1)
+
+    # 4. 엣지 방향 히스토그램 (그래디언트 크기 가중)
+    gray = rgb.mean(axis=2)
+    gx = np.zeros_like(gray); gy = np.zeros_like(gray)
+    gx[:, 1:-1] = gray[:, 2:] - gray[:, :-2]
+    gy[1:-1, :] = gray[2:, :] - gray[:-2, :]
+    magnitude = np.hypot(gx, gy)
+    angle = np.arctan2(gy, gx) % np.pi
+    edge_hist = np.histogram(angle, bins=EDGE_BINS, range=(0, np.pi), weights=magnitude)[0]
+    edge_features = edge_hist / max(edge_hist.sum(), 1e-6)
+
+    return np.concatenate([shape_features, grid_features, color_features, edge_features]).astype(np.float32)
+
+
+def extract_features_batch(images: list[Image.Image]) -> np.ndarray:
+    """여러 이미지의 특징 벡터를 (N, D) 배열로 반환합니다."""
+    return np.stack([extract_features(img) for img in images])
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+# --- 분류기 ---
+class LocalItemClassifier:
+    """
+    표준화된 특징 벡터에 대한 소프트맥스 회귀 분류기.
+    temperature 는 검증 데이터로 보정(temperature scaling)되어 확신도가 실제 정확도에 가깝도록 합니다.
+    """
+
+    def __init__(self, classes, mean, std, weights, bias, temperature=1.0):
+        self.classes = list(classes)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.std = np.asarray(std, dtype=np.float32)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.temperature = float(temperature)
+
+    def _logits(self, features: np.ndarray) -> np.ndarray:
+        return ((features - self.mean) / self.std) @ self.weights + self.bias
+
+    def predict_proba_features(self, features: np.ndarray) -> np.ndarray:
+        """(N, D) 특징 배열에 대한 보정된 클래스 확률 (N, C)"""
+        return _softmax(self._logits(features) / self.temperature)
+
+    def predict_proba(self, images: list[Image.Image]) -> np.ndarray:
+        """이미지 리스트에 대한 배치 추론. (N, C) 확률 배열 반환"""
+        return self.predict_proba_features(extract_features_batch(images))
+
+    def predict(self, images: list[Image.Image]) -> list[tuple[str, float]]:
+        """
+        이미지 리스트를 배치로 분류합니다.
+
+        Returns:
+            list[tuple[str, float]]: 이미지별 (예측 종류, 보정된 확신도)
+        """
+        probs = self.predict_proba(images)
+        indices = probs.argmax(axis=1)
+        return [(self.classes[i], float(probs[row, i])) for row, i in enumerate(indices)]
+
+    def save(self, path: str) -> None:
+        """모델 파라미터를 .npz 파일로 저장합니다."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez(path, classes=np.array(self.classes), mean=self.mean, std=self.std,
+                 weights=self.weights, bias=self.bias, temperature=np.array(self.temperature))
+
+    @classmethod
+    def load(cls, path: str) -> 'LocalItemClassifier':
+        """저장된 .npz 파일에서 분류기를 불러옵니다."""
+        with np.load(path) as data:
+            return cls(classes=[str(c) for c in data['classes']], mean=data['mean'], std=data['std'],
+                       weights=data['weights'], bias=data['bias'], temperature=float(data['temperature']))
+
+
+def _fit_temperature(logits: np.ndarray, labels: np.ndarray) -> float:
+    """검증 데이터의 음의 로그 우도(NLL)를 최소화하는 temperature 를 격자 탐색으로 찾습니다."""
+    best_t, best_nll = 1.0, float('inf')
+    for t in np.linspace(0.25, 5.0, 96):
+        probs = _softmax(logits / t)
+        nll = -np.log(probs[np.arange(len(labels)), labels] + 1e-12).mean()
+        if nll < best_nll:
+            best_t, best_nll = float(t), nll
+    return best_t
+
+
+def train_local_classifier(features: np.ndarray, labels: list[str], classes: list[str] = None,
+                           epochs: int = 500, learning_rate: float = 0.1, l2: float = 1e-3,
+                           validation_ratio: float = 0.2, seed: int = 42) -> LocalItemClassifier:
+    """
+    특징 배열과 (AI 분류) 라벨로 소프트맥스 회귀를 학습하고 temperature 를 보정합니다.
+
+    Args:
+        features (np.ndarray): (N, D) 특징 배열
+        labels (list[str]): 이미지별 라벨 (ITEM_CATEGORIES 중 하나)
+        classes (list[str], optional): 클래스 목록. Defaults to ITEM_CATEGORIES.
+        epochs (int): 경사하강 반복 횟수
+        learning_rate (float): 학습률
+        l2 (float): L2 정규화 계수
+        validation_ratio (float): temperature 보정용 검증 데이터 비율
+        seed (int): 데이터 분할 난수 시드
+
+    Returns:
+        LocalItemClassifier: 학습된 분류기
+    """
+    classes = list(classes or ITEM_CATEGORIES)
+    y = np.array([classes.index(label) for label in labels])
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(y))
+    val_count = int(len(y) * validation_ratio) if len(y) >= 10 else 0
+    val_idx, train_idx = order[:val_count], order[val_count:]
+
+    mean = features[train_idx].mean(axis=0)
+    std = features[train_idx].std(axis=0) + 1e-6
+    x_train = (features[train_idx] - mean) / std
+    y_onehot = np.eye(len(classes))[y[train_idx]]
+
+    weights = np.zeros((features.shape[1], len(classes)), dtype=np.float64)
+    bias = np.zeros(len(classes), dtype=np.float64)
+    for _ in range(epochs):
+        probs = _softmax(x_train @ weights + bias)
+        grad = probs - y_onehot
+        weights -= learning_rate * (x_train.T @ grad / len(x_train) + l2 * weights)
+        bias -= learning_rate * grad.mean(axis=0)
+
+    model = LocalItemClassifier(classes, mean, std, weights, bias)
+    if val_count:
+        model.temperature = _fit_temperature(model._logits(features[val_idx]), y[val_idx])
+    return model
+
+
+def load_local_classifier(path: str) -> LocalItemClassifier | None:
+    """
+    앱 시작 시 분류기 파일을 한 번 불러옵니다. 파일이 없거나 손상되었으면 None.
+
+    Args:
+        path (str): 모델 파일(.npz) 경로
+
+    Returns:
+        LocalItemClassifier or None
+    """
+    if not path or not os.path.exists(path):
+        print(f"[Local Classifier] 모델 파일 없음 - 로컬 분류 비활성화 ({path})")
+        return None
+    try:
+        model = LocalItemClassifier.load(path)
+        print(f"[Local Classifier] 모델 로드 완료: {path} (classes={model.classes}, T={model.temperature:.2f})")
+        return model
+    except Exception as e:
+        print(f"[Local Classifier] 오류: 모델 로드 실패 - {e}")
+        return None
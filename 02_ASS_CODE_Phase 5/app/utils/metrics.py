@@ -0,0 +1,91 @@
+# app/utils/metrics.py
+# 프로세스 내 간단한 메트릭 레지스트리 (카운터 / 관측값 샘플)
+# 외부 모니터링 시스템 없이 관리자 페이지와 로그에서 확인하기 위한 용도입니다.
+
+import threading
+from collections import defaultdict, deque
+
+
+def _metric_key(name: str, labels: dict) -> str:
+    """메트릭 이름과 라벨로 고유 키 문자열을 만듭니다. 예: 'classify_cache_lookups{result=hit}'"""
+    if not labels:
+        return name
+    label_str = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{label_str}}}"
+
+
+class MetricsRegistry:
+    """
+    스레드 안전한 카운터 / 관측값(지연시간 등) 저장소.
+    관측값은 최근 max_samples 개만 보관하며 분위수(p50, p95 등) 계산에 사용합니다.
+    """
+
+    def __init__(self, max_samples: int = 1000):
+        self._lock = threading.Lock()
+        self._max_samples = max_samples
+        self._counters = defaultdict(float)
+        self._samples = defaultdict(lambda: deque(maxlen=self._max_samples))
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        """카운터를 value 만큼 증가시킵니다."""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._counters[key] += value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """관측값(예: 지연시간 ms)을 기록합니다."""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._samples[key].append(float(value))
+
+    def get_counter(self, name: str, **labels) -> float:
+        """카운터 현재 값을 반환합니다. 기록이 없으면 0."""
+        key = _metric_key(name, labels)
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def sample_count(self, name: str, **labels) -> int:
+        """보관 중인 최근 관측값 개수를 반환합니다."""
+        key = _metric_key(name, labels)
+        with self._lock:
+            return len(self._samples.get(key, ()))
+
+    def quantile(self, name: str, q: float, **labels) -> float | None:
+        """
+        최근 관측값의 분위수를 반환합니다.
+
+        Args:
+            name (str): 메트릭 이름
+            q (float): 0~1 사이 분위 (예: 0.95)
+
+        Returns:
+            float or None: 분위수 값, 관측값이 없으면 None
+        """
+        key = _metric_key(name, labels)
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, int(round(q * (len(samples) - 1)))))
+        return samples[index]
+
+    def snapshot(self) -> dict:
+        """현재 모든 카운터와 관측값 요약(count, p50, p95, max)을 딕셔너리로 반환합니다."""
+        with self._lock:
+            counters = dict(self._counters)
+            samples = {key: sorted(values) for key, values in self._samples.items()}
+        summaries = {}
+        for key, values in samples.items():
+            if not values:
+                continue
+            summaries[key] = {
+                "count": len(values),
+                "p50": values[int(0.50 * (len(values) - 1))],
+                "p95": values[int(0.95 * (len(values) - 1))],
+                "max": values[-1],
+            }
+        return {"counters": counters, "observations": summaries}
+
+
+# 애플리케이션 전역에서 공유하는 기본 레지스트리
+metrics = MetricsRegistry()
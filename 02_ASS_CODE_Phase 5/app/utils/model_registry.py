@@ -0,0 +1,224 @@
+# app/utils/model_registry.py
+# AI 모델 가용성 레지스트리
+# 작업 종류(classify, synthesize)별 후보 모델을 시작 시/주기적으로 점검(probe)하고,
+# 실패한 모델은 백오프 기간 동안 제외(negative cache)하여 매 호출마다 실패 왕복이 생기지 않도록 합니다.
+
+import os
+import threading
+import time
+
+# 작업별 기본 후보 모델 (앞에 있을수록 우선)
+DEFAULT_TASK_MODELS = {
+    'classify': ['gemini-pro-vision', 'gemini-2.0-flash-exp-image-generation'],
+    'synthesize': ['gemini-2.0-flash-exp-image-generation'],
+}
+
+# 모델 자체를 사용할 수 없음을 뜻하는 HTTP 상태 코드 (일시적 오류 429/5xx 는 제외)
+MODEL_UNAVAILABLE_CODES = (403, 404)
+
+
+def is_model_unavailable_error(error: Exception) -> bool:
+    """
+    API 오류가 '모델 사용 불가'(존재하지 않음, 권한 없음, 미지원 기능)를 뜻하는지 판단합니다.
+    일시적인 오류(429, 5xx, 네트워크)는 False.
+    키 풀 클라이언트는 403 을 받으면 다른 키로 다시 보내므로, 여기까지 온 403 은 모든 정상 키가 거절한 경우입니다.
+    """
+    code = getattr(error, 'code', None)
+    if code in MODEL_UNAVAILABLE_CODES:
+        return True
+    message = str(error).lower()
+    return code == 400 and ('model' in message and ('not found' in message or 'not supported' in message))
+
+
+class ModelRegistry:
+    """
+    작업별 후보 모델 목록과 모델 상태(정상/실패, 재시도 가능 시각)를 관리합니다.
+    실패한 모델은 base_backoff 부터 max_backoff 까지 지수적으로 늘어나는 기간 동안 제외됩니다.
+    """
+
+    def __init__(self, task_models: dict = None, probe_interval: float = 600,
+                 base_backoff: float = 60, max_backoff: float = 3600):
+        self._lock = threading.Lock()
+        self._client = None
+        self._task_models = {task: list(models) for task, models in (task_models or DEFAULT_TASK_MODELS).items()}
+        self._probe_interval = probe_interval
+        self._base_backoff = base_backoff
+        self._max_backoff = max_backoff
+        self._state = {} # model_name -> {'healthy': bool, 'failures': int, 'retry_at': float, 'last_error': str, 'checked_at': float}
+        self._probe_thread = None
+        self._stop_event = threading.Event()
+
+    # --- 설정 ---
+    def configure(self, client, task_models: dict = None, probe_interval: float = None,
+                  base_backoff: float = None, max_backoff: float = None) -> None:
+        """앱 시작 시 클라이언트와 작업별 후보 모델을 설정합니다."""
+        with self._lock:
+            self._client = client
+            if task_models:
+                self._task_models = {task: list(models) for task, models in task_models.items()}
+            if probe_interval is not None: self._probe_interval = probe_interval
+            if base_backoff is not None: self._base_backoff = base_backoff
+            if max_backoff is not None: self._max_backoff = max_backoff
+
+    def candidates(self, task: str) -> list[str]:
+        """작업의 후보 모델 목록 (설정 순서)"""
+        return list(self._task_models.get(task, []))
+
+    # --- 상태 갱신 ---
+    def mark_ok(self, model_name: str) -> None:
+        """모델 호출/점검 성공을 기록합니다."""
+        with self._lock:
+            was_failed = not self._state.get(model_name, {}).get('healthy', True)
+            self._state[model_name] = {'healthy': True, 'failures': 0, 'retry_at': 0.0,
+                                       'last_error': None, 'checked_at': time.time()}
+        if was_failed:
+            print(f"[Model Registry] 모델 복구됨: {model_name}")
+
+    def mark_failed(self, model_name: str, error: Exception | str = None) -> None:
+        """모델 사용 불가를 기록하고, 실패 횟수에 따라 백오프 후 재시도 시각을 설정합니다."""
+        with self._lock:
+            state = self._state.get(model_name, {})
+            failures = state.get('failures', 0) + 1
+            backoff = min(self._max_backoff, self._base_backoff * (2 ** (failures - 1)))
+            self._state[model_name] = {'healthy': False, 'failures': failures,
+                                       'retry_at': time.time() + backoff,
+                                       'last_error': str(error)[:200] if error else None,
+                                       'checked_at': time.time()}
+        print(f"[Model Registry] 모델 제외: {model_name} ({backoff:.0f}초 후 재확인, 실패 {failures}회) - {error}")
+
+    def _is_available(self, model_name: str, now: float) -> bool:
+        state = self._state.get(model_name)
+        return state is None or state['healthy'] or now >= state['retry_at']
+
+    # --- 조회 ---
+    def resolve(self, task: str, exclude: tuple = ()) -> str | None:
+        """
+        작업에 사용할 모델을 반환합니다. 제외 기간이 지나지 않은 실패 모델은 건너뜁니다.
+        모든 후보가 실패 상태이면 가장 먼저 재시도 가능한 모델을 반환합니다.
+
+        Args:
+            task (str): 작업 종류 ('classify', 'synthesize')
+            exclude (tuple): 이번 호출에서 이미 실패한 모델 (건너뜀)
+
+        Returns:
+            str or None: 모델 이름, 후보가 없으면 None
+        """
+        now = time.time()
+        candidates = [m for m in self.candidates(task) if m not in exclude]
+        if not candidates:
+            return None
+        with self._lock:
+            for model_name in candidates:
+                if self._is_available(model_name, now):
+                    return model_name
+            return min(candidates, key=lambda m: self._state[m]['retry_at'])
+
+    def status(self) -> dict:
+        """관리자 화면용 작업별 모델 상태"""
+        now = time.time()
+        with self._lock:
+            result = {}
+            for task, models in self._task_models.items():
+                result[task] = []
+                for model_name in models:
+                    state = self._state.get(model_name)
+                    result[task].append({
+                        'model': model_name,
+                        'status': 'unknown' if state is None else ('ok' if state['healthy'] else 'failed'),
+                        'failures': state['failures'] if state else 0,
+                        'retry_in': max(0, int(state['retry_at'] - now)) if state and not state['healthy'] else 0,
+                        'last_error': state['last_error'] if state else None,
+                    })
+            return result
+
+    # --- 점검(probe) ---
+    def probe(self, model_name: str) -> bool:
+        """
+        모델 메타데이터 조회(models.get)로 모델 사용 가능 여부를 확인합니다. (생성 호출 없음)
+
+        Returns:
+            bool: 사용 가능하면 True
+        """
+        client = self._client
+        if client is None:
+            return False
+        try:
+            model_info = client.models.get(model=model_name)
+            actions = getattr(model_info, 'supported_actions', None)
+            if actions and 'generateContent' not in actions:
+                self.mark_failed(model_name, "generateContent 미지원")
+                return False
+            self.mark_ok(model_name)
+            return True
+        except Exception as e:
+            if is_model_unavailable_error(e):
+                self.mark_failed(model_name, e)
+            else:
+                # 네트워크 등 일시적 오류는 상태를 바꾸지 않음
+                print(f"[Model Registry] 경고: 모델 점검 중 일시적 오류 ({model_name}) - {e}")
+            return False
+
+    def probe_all(self, force: bool = False) -> None:
+        """모든 후보 모델을 점검합니다. force=False 이면 제외 기간 중인 모델은 건너뜁니다."""
+        now = time.time()
+        model_names = sorted({m for models in self._task_models.values() for m in models})
+        for model_name in model_names:
+            with self._lock:
+                skip = not force and not self._is_available(model_name, now)
+            if not skip:
+                self.probe(model_name)
+
+    def start_background_probing(self) -> None:
+        """시작 시 1회 점검 후 probe_interval 마다 점검하는 데몬 스레드를 시작합니다."""
+        if self._client is None or (self._probe_thread and self._probe_thread.is_alive()):
+            return
+        self._stop_event.clear()
+
+        def _loop():
+            self.probe_all(force=True)
+            while not self._stop_event.wait(self._probe_interval):
+                self.probe_all()
+
+        self._probe_thread = threading.Thread(target=_loop, name='model-registry-probe', daemon=True)
+        self._probe_thread.start()
+        print(f"[Model Registry] 백그라운드 모델 점검 시작 (주기 {self._probe_interval:.0f}초)")
+
+    def stop_background_probing(self) -> None:
+        self._stop_event.set()
+
+
+# 애플리케이션 전역 레지스트리 (ai_module 에서 사용)
+model_registry = ModelRegistry()
+
+
+def _parse_model_list(value: str | None) -> list[str] | None:
+    if not value:
+        return None
+    models = [name.strip() for name in value.split(',') if name.strip()]
+    return models or None
+
+
+def init_model_registry(app, client) -> ModelRegistry:
+    """
+    환경 변수로 작업별 후보 모델을 설정하고 백그라운드 점검을 시작합니다.
+    AI_MODELS_CLASSIFY, AI_MODELS_SYNTHESIZE: 쉼표로 구분된 모델 이름 (우선순위 순)
+    """
+    task_models = dict(DEFAULT_TASK_MODELS)
+    for task in list(task_models):
+        configured = _parse_model_list(os.getenv(f'AI_MODELS_{task.upper()}'))
+        if configured:
+            task_models[task] = configured
+    model_registry.configure(
+        client,
+        task_models=task_models,
+        probe_interval=float(os.getenv('AI_MODEL_PROBE_INTERVAL', '600')),
+        base_backoff=float(os.getenv('AI_MODEL_FAILURE_BACKOFF', '60')),
+    )
+    app.config['MODEL_REGISTRY'] = model_registry
+    app.config['AI_MODEL_PROBE_ENABLED'] = client is not None and \
+        os.getenv('AI_MODEL_PROBE_ENABLED', 'true').lower() == 'true'
+    print(f" * AI 모델 레지스트리 설정: {task_models}")
+    # DEFER_BACKGROUND_TASKS 이면 워커 프로세스가 fork 된 뒤 start_background_tasks() 에서 시작
+    if app.config['AI_MODEL_PROBE_ENABLED'] and not app.config.get('DEFER_BACKGROUND_TASKS'):
+        model_registry.start_background_probing()
+    return model_registry
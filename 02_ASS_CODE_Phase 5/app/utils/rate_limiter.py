@@ -0,0 +1,323 @@
+# app/utils/rate_limiter.py
+# AI API 호출용 토큰 버킷 레이트 리미터 (워커 프로세스 간 공유)
+# gunicorn 워커마다 따로 Gemini 를 호출해도 프로젝트 RPM 할당량을 넘지 않도록,
+# 같은 노드의 프로세스들은 파일 잠금으로 버킷 상태를 공유하고, 여러 노드는 PostgreSQL 테이블로 공유할 수 있습니다.
+# 버킷은 작업별(task:classify)과 모델별(model:<이름>)로 따로 적용되며, 호출은 토큰이 생길 때까지 마감 시간 안에서 대기합니다.
+
+import os
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from app.utils.metrics import metrics
+from app.utils.resilience import remaining_time
+
+try:
+    import fcntl # POSIX
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+
+class RateLimitTimeout(TimeoutError):
+    """마감 시간 안에 레이트 리미터 토큰을 얻지 못했을 때 발생합니다."""
+
+    def __init__(self, bucket_keys: list[str], waited: float):
+        self.bucket_keys = bucket_keys
+        self.waited = waited
+        super().__init__(f"AI 호출 레이트 리밋 대기 시간 초과 ({', '.join(bucket_keys)}, {waited:.1f}초 대기)")
+
+
+class BucketSpec:
+    """
+    버킷 설정.
+
+    Args:
+        rate_per_minute (float): 분당 보충되는 토큰 수 (RPM)
+        burst (float, optional): 버킷 최대 크기 (순간 허용량). 기본값은 rate_per_minute
+    """
+
+    def __init__(self, rate_per_minute: float, burst: float = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = max(1.0, burst if burst is not None else rate_per_minute)
+
+    def __repr__(self):
+        return f"BucketSpec(rpm={self.rate_per_second * 60:g}, burst={self.capacity:g})"
+
+
+def _take_tokens(states: dict, specs: dict, now: float, cost: float = 1.0) -> float:
+    """
+    버킷 상태를 보충한 뒤 모든 버킷에서 cost 만큼 토큰을 가져옵니다. (전부 가능할 때만 차감)
+
+    Args:
+        states (dict): bucket_key -> {'tokens': float, 'updated_at': float} (제자리 갱신)
+        specs (dict): bucket_key -> BucketSpec
+        now (float): 현재 시각 (time.time(), 프로세스 간 공통 기준)
+
+    Returns:
+        float: 0 이면 토큰 획득 성공, 양수이면 다시 시도하기까지 기다려야 할 시간(초)
+    """
+    wait_seconds = 0.0
+    for key, spec in specs.items():
+        state = states.setdefault(key, {'tokens': spec.capacity, 'updated_at': now})
+        elapsed = max(0.0, now - state['updated_at'])
+        state['tokens'] = min(spec.capacity, state['tokens'] + elapsed * spec.rate_per_second)
+        state['updated_at'] = now
+        if state['tokens'] < cost:
+            wait_seconds = max(wait_seconds, (cost - state['tokens']) / spec.rate_per_second)
+    if wait_seconds == 0.0:
+        for key in specs:
+            states[key]['tokens'] -= cost
+    return wait_seconds
+
+
+# --- 버킷 상태 저장소 ---
+class MemoryBucketStore:
+    """단일 프로세스용 저장소 (개발/점검용)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states = {}
+
+    def take(self, specs: dict, cost: float = 1.0) -> float:
+        with self._lock:
+            return _take_tokens(self._states, specs, time.time(), cost)
+
+
+class FileBucketStore:
+    """
+    같은 노드의 여러 프로세스가 공유하는 저장소.
+    하나의 JSON 상태 파일을 배타적 파일 잠금(flock) 아래에서 읽고 갱신합니다.
+    """
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self._state_path = os.path.join(directory, 'ai_rate_limit_buckets.json')
+        self._lock_path = os.path.join(directory, 'ai_rate_limit_buckets.lock')
+        self._thread_lock = threading.Lock() # 같은 프로세스 내 스레드 간 직렬화
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock, open(self._lock_path, 'a+') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def take(self, specs: dict, cost: float = 1.0) -> float:
+        with self._locked():
+            try:
+                with open(self._state_path, encoding='utf-8') as f:
+                    states = json.load(f)
+            except (FileNotFoundError, ValueError):
+                states = {}
+            wait_seconds = _take_tokens(states, specs, time.time(), cost)
+            temp_path = self._state_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(states, f)
+            os.replace(temp_path, self._state_path)
+        return wait_seconds
+
+
+class PostgresBucketStore:
+    """
+    여러 노드가 공유하는 저장소 (ai_rate_limit_buckets 테이블, 행 잠금 SELECT ... FOR UPDATE).
+    DB 연결에 실패하면 같은 노드용 대체 저장소(fallback)를 사용합니다.
+    """
+
+    def __init__(self, fallback=None):
+        self._fallback = fallback or MemoryBucketStore()
+
+    def take(self, specs: dict, cost: float = 1.0) -> float:
+        from app.utils.db_utils import get_db_connection # 순환 import 방지
+        conn = get_db_connection()
+        if not conn:
+            return self._fallback.take(specs, cost)
+        keys = sorted(specs)
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO ai_rate_limit_buckets (bucket_key, tokens, updated_at) "
+                    "SELECT k, NULL, NULL FROM unnest(%s::text[]) AS k ON CONFLICT (bucket_key) DO NOTHING",
+                    (keys,)
+                )
+                cur.execute(
+                    "SELECT bucket_key, tokens, updated_at FROM ai_rate_limit_buckets "
+                    "WHERE bucket_key = ANY(%s) ORDER BY bucket_key FOR UPDATE",
+                    (keys,)
+                )
+                states = {row[0]: {'tokens': row[1], 'updated_at': row[2]} for row in cur.fetchall()
+                          if row[1] is not None}
+                wait_seconds = _take_tokens(states, specs, time.time(), cost)
+                for key in keys:
+                    cur.execute(
+                        "UPDATE ai_rate_limit_buckets SET tokens = %s, updated_at = %s WHERE bucket_key = %s",
+                        (states[key]['tokens'], states[key]['updated_at'], key)
+                    )
+            conn.commit()
+            return wait_seconds
+        except Exception as e:
+            conn.rollback()
+            print(f"[Rate Limiter] 경고: DB 버킷 갱신 실패, 로컬 버킷 사용 - {e}")
+            return self._fallback.take(specs, cost)
+        finally:
+            conn.close()
+
+
+class RateLimiter:
+    """
+    작업별/모델별 토큰 버킷 레이트 리미터.
+    설정되지 않은 버킷은 제한하지 않으며, 'model:*' 는 개별 설정이 없는 모든 모델에 적용됩니다.
+    """
+
+    def __init__(self, store=None, limits: dict = None, max_sleep: float = 1.0):
+        self._store = store or MemoryBucketStore()
+        self._limits = dict(limits or {})
+        self._max_sleep = max_sleep
+
+    def configure(self, store=None, limits: dict = None) -> None:
+        if store is not None:
+            self._store = store
+        if limits is not None:
+            self._limits = dict(limits)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._limits)
+
+    def specs_for(self, task: str, model_name: str = None) -> dict:
+        """이번 호출에 적용할 버킷 (bucket_key -> BucketSpec)"""
+        specs = {}
+        task_key = f'task:{task}'
+        if task_key in self._limits:
+            specs[task_key] = self._limits[task_key]
+        if model_name:
+            model_spec = self._limits.get(f'model:{model_name}', self._limits.get('model:*'))
+            if model_spec:
+                specs[f'model:{model_name}'] = model_spec
+        return specs
+
+    def try_take(self, specs: dict) -> float:
+        """
+        주어진 버킷에서 기다리지 않고 토큰을 가져옵니다.
+
+        Returns:
+            float: 0 이면 성공, 양수이면 토큰이 생길 때까지 남은 시간(초)
+        """
+        if not specs:
+            return 0.0
+        return self._store.take(specs)
+
+    def acquire(self, task: str, model_name: str = None, timeout: float = None) -> float:
+        """
+        작업/모델 버킷에서 토큰을 하나씩 얻을 때까지 기다립니다.
+
+        Args:
+            task (str): 작업 종류
+            model_name (str, optional): 호출할 모델
+            timeout (float, optional): 최대 대기 시간(초). 지정하지 않으면 현재 AI 호출의 남은 마감 시간
+
+        Returns:
+            float: 실제로 기다린 시간(초)
+
+        Raises:
+            RateLimitTimeout: 대기 시간 안에 토큰을 얻지 못함
+        """
+        specs = self.specs_for(task, model_name)
+        if not specs:
+            return 0.0
+        if timeout is None:
+            timeout = remaining_time(default=60.0)
+        start = time.monotonic()
+        while True:
+            sleep_seconds = self._next_wait(task, specs, start, timeout)
+            if sleep_seconds is None:
+                return time.monotonic() - start
+            time.sleep(sleep_seconds)
+
+    async def aacquire(self, task: str, model_name: str = None, timeout: float = None) -> float:
+        """acquire 의 비동기 버전 (대기 중 이벤트 루프를 막지 않음)"""
+        specs = self.specs_for(task, model_name)
+        if not specs:
+            return 0.0
+        if timeout is None:
+            timeout = remaining_time(default=60.0)
+        start = time.monotonic()
+        while True:
+            sleep_seconds = self._next_wait(task, specs, start, timeout)
+            if sleep_seconds is None:
+                return time.monotonic() - start
+            await asyncio.sleep(sleep_seconds)
+
+    def _next_wait(self, task: str, specs: dict, start: float, timeout: float) -> float | None:
+        """토큰 획득을 시도합니다. 성공하면 None, 아니면 다음 시도까지 잘 시간(초). 대기 한도를 넘으면 RateLimitTimeout."""
+        wait_seconds = self._store.take(specs)
+        waited = time.monotonic() - start
+        if wait_seconds <= 0:
+            if waited > 0.001:
+                metrics.increment('ai_rate_limit_waits', task=task)
+                metrics.observe('ai_rate_limit_wait_ms', waited * 1000, task=task)
+            return None
+        if waited + wait_seconds > timeout:
+            metrics.increment('ai_rate_limit_timeouts', task=task)
+            raise RateLimitTimeout(sorted(specs), waited)
+        return min(wait_seconds, self._max_sleep)
+
+
+# 애플리케이션 전역 레이트 리미터 (ai_module 에서 사용)
+rate_limiter = RateLimiter()
+
+
+def parse_rate_limits(value: str | None) -> dict:
+    """
+    'task:synthesize=10,model:*=30:5' 형식의 문자열을 버킷 설정으로 변환합니다.
+    각 항목은 bucket_key=분당요청수[:버스트] 형식입니다.
+    """
+    limits = {}
+    for entry in (value or '').split(','):
+        if '=' not in entry:
+            continue
+        key, spec = entry.split('=', 1)
+        rate, _, burst = spec.partition(':')
+        try:
+            limits[key.strip()] = BucketSpec(float(rate), float(burst) if burst else None)
+        except ValueError:
+            print(f" * 경고: 잘못된 AI_RATE_LIMITS 항목 무시 - '{entry}'")
+    return limits
+
+
+def init_rate_limiter(app) -> RateLimiter:
+    """
+    환경 변수로 레이트 리미터를 설정합니다.
+    AI_RATE_LIMITS: 버킷 설정 (예: 'task:synthesize=10,task:classify=60,model:*=30'), 비어 있으면 제한 없음
+    AI_RATE_LIMIT_STORE: 'file'(기본, 같은 노드의 워커 간 공유) | 'postgres'(여러 노드 공유) | 'memory'
+    AI_RATE_LIMIT_DIR: file 저장소 디렉토리 (기본: 시스템 임시 디렉토리)
+    """
+    limits = parse_rate_limits(os.getenv('AI_RATE_LIMITS', ''))
+    store_name = os.getenv('AI_RATE_LIMIT_STORE', 'file').lower()
+    directory = os.getenv('AI_RATE_LIMIT_DIR', os.path.join(tempfile.gettempdir(), 'ai_rate_limits'))
+    if store_name == 'memory':
+        store = MemoryBucketStore()
+    elif store_name == 'postgres':
+        store = PostgresBucketStore(fallback=FileBucketStore(directory))
+    else:
+        store = FileBucketStore(directory)
+    rate_limiter.configure(store=store, limits=limits)
+    app.config['AI_RATE_LIMITER'] = rate_limiter
+    if limits:
+        print(f" * AI 레이트 리미터 설정 ({store_name}): {limits}")
+    else:
+        print(" * AI 레이트 리미터: AI_RATE_LIMITS 미설정 - 제한 없음")
+    return rate_limiter
@@ -0,0 +1,419 @@
+# app/utils/resilience.py
+# AI API 호출 복원력(resilience) 래퍼
+# 일시적 오류(429, 5xx, 네트워크)는 지터가 적용된 지수 백오프로 재시도하고, 전체 마감 시간(deadline)을 넘기지 않습니다.
+# 헤징(hedging)이 켜진 작업은 응답이 p95 지연시간보다 늦으면 같은 요청을 한 번 더 보내고 먼저 끝난 결과를 사용합니다.
+# HTTP 요청/작업(job) 단위 마감 시간은 contextvar(ai_deadline)로 전달되며, 작업별 마감 시간과 둘 중 이른 쪽이 적용됩니다.
+
+import os
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+
+from app.utils.metrics import metrics
+
+try:
+    import httpx # google-genai 의존성 (네트워크 오류 판별용)
+    _TRANSPORT_ERRORS = (ConnectionError, httpx.TransportError)
+except ImportError:
+    _TRANSPORT_ERRORS = (ConnectionError,)
+
+# 재시도할 HTTP 상태 코드 (요청 제한, 서버 일시 오류)
+RETRYABLE_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+# 지연시간 메트릭 이름 (헤징 지연 계산에도 사용)
+LATENCY_METRIC = 'ai_call_latency_ms'
+
+
+class AIDeadlineExceeded(TimeoutError):
+    """재시도를 포함한 AI 호출이 마감 시간 안에 끝나지 않았을 때 발생합니다. (모델 오류와 구분)"""
+
+    def __init__(self, task: str, deadline: float, last_error: Exception = None):
+        self.task = task
+        self.deadline = deadline
+        self.last_error = last_error
+        detail = f", 마지막 오류: {last_error}" if last_error else ""
+        super().__init__(f"AI 호출 마감 시간 초과 (task={task}, deadline={deadline:.1f}초{detail})")
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """재시도하면 성공할 수 있는 일시적 오류인지 판단합니다."""
+    if isinstance(error, AIDeadlineExceeded):
+        return False
+    if getattr(error, 'code', None) in RETRYABLE_STATUS_CODES:
+        return True
+    return isinstance(error, _TRANSPORT_ERRORS)
+
+
+class RetryPolicy:
+    """
+    작업별 재시도/마감/헤징 설정.
+
+    Args:
+        max_attempts (int): 최대 시도 횟수 (첫 시도 포함)
+        base_delay (float): 백오프 기본 대기 시간(초). n번째 재시도는 0 ~ base_delay * 2^(n-1) 사이 무작위 대기
+        max_delay (float): 백오프 대기 시간 상한(초)
+        deadline (float): 재시도를 포함한 전체 마감 시간(초)
+        hedge (bool): 헤징 사용 여부 (요청이 중복 전송되므로 비용이 큰 작업에는 주의)
+        hedge_delay (float): 관측값이 충분하지 않을 때 사용할 헤징 지연(초)
+        hedge_quantile (float): 헤징 지연으로 사용할 성공 지연시간 분위 (기본 p95)
+        hedge_min_samples (int): 분위수를 사용하기 위한 최소 관측값 수
+    """
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.5, max_delay: float = 8.0,
+                 deadline: float = 60.0, hedge: bool = False, hedge_delay: float = 3.0,
+                 hedge_quantile: float = 0.95, hedge_min_samples: int = 20):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+
+    def backoff(self, retry_number: int) -> float:
+        """n번째 재시도 전 대기 시간 (full jitter)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (retry_number - 1))))
+
+    def hedge_delay_for(self, task: str) -> float:
+        """최근 성공 호출 지연시간의 분위수(초). 관측값이 부족하면 기본 hedge_delay."""
+        if metrics.sample_count(LATENCY_METRIC, task=task, outcome='ok') >= self.hedge_min_samples:
+            value_ms = metrics.quantile(LATENCY_METRIC, self.hedge_quantile, task=task, outcome='ok')
+            if value_ms is not None:
+                return value_ms / 1000.0
+        return self.hedge_delay
+
+
+# 작업별 정책 (configure_resilience 로 설정, 미설정 작업은 기본 정책)
+_policies = {}
+_default_policy = RetryPolicy()
+_executor = None
+_executor_lock = threading.Lock()
+# 현재 컨텍스트(HTTP 요청, 작업, 실행 중인 시도)의 마감 시각 (time.monotonic() 기준)
+_deadline_at = contextvars.ContextVar('ai_deadline_at', default=None)
+# 실행 중인 시도의 지연시간 측정 시작 시각 [time.perf_counter()] - 요청을 보내기 직전에 mark_attempt_sent() 로 갱신
+# (리스트로 담아 시도 안에서 컨텍스트가 복사되어도 같은 값을 갱신)
+_attempt_sent_at = contextvars.ContextVar('ai_attempt_sent_at', default=None)
+
+
+def get_policy(task: str) -> RetryPolicy:
+    return _policies.get(task, _default_policy)
+
+
+def set_policy(task: str, policy: RetryPolicy) -> None:
+    _policies[task] = policy
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """마감/헤징 대기를 위해 호출을 실행하는 공유 스레드 풀"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=int(os.getenv('AI_CALL_MAX_THREADS', '32')),
+                                           thread_name_prefix='ai-call')
+        return _executor
+
+
+@contextmanager
+def ai_deadline(seconds: float | None):
+    """
+    블록 안에서 호출되는 모든 AI 호출의 마감 시간을 지정합니다. (HTTP 요청, 백그라운드 작업 단위)
+    이미 더 이른 마감 시간이 설정되어 있으면 그 값을 유지합니다.
+
+    사용 예:
+        with ai_deadline(30):
+            synthesize_multi_items_single_call(...)
+    """
+    if seconds is None:
+        yield
+        return
+    deadline_at = time.monotonic() + seconds
+    current = _deadline_at.get()
+    token = _deadline_at.set(deadline_at if current is None else min(current, deadline_at))
+    try:
+        yield
+    finally:
+        _deadline_at.reset(token)
+
+
+def set_deadline(seconds: float | None):
+    """ai_deadline 의 비 with 버전 (Flask before_request 등). 반환된 토큰을 reset_deadline 에 전달해야 합니다."""
+    if seconds is None:
+        return None
+    return _deadline_at.set(time.monotonic() + seconds)
+
+
+def reset_deadline(token) -> None:
+    if token is not None:
+        _deadline_at.reset(token)
+
+
+def remaining_time(default: float = None) -> float | None:
+    """현재 컨텍스트의 남은 마감 시간(초). 마감 시간이 없으면 default."""
+    deadline_at = _deadline_at.get()
+    if deadline_at is None:
+        return default
+    return max(0.0, deadline_at - time.monotonic())
+
+
+def mark_attempt_sent() -> None:
+    """
+    시도 안에서 레이트 리미터 토큰/API 키를 얻은 뒤, 요청을 보내기 직전에 호출합니다.
+    지연시간 메트릭(헤징 지연 계산에 사용)은 이 시각부터 재므로 토큰/키 대기 시간이 포함되지 않습니다.
+    """
+    sent_at = _attempt_sent_at.get()
+    if sent_at is not None:
+        sent_at[0] = time.perf_counter()
+
+
+def _record_attempt(task: str, kind: str, start: float, error: Exception = None) -> None:
+    """시도별 메트릭(횟수, 지연시간)을 기록합니다. start 는 요청을 보낸 시각 (mark_attempt_sent)"""
+    outcome = 'ok' if error is None else ('retryable' if is_retryable_error(error) else 'error')
+    metrics.increment('ai_call_attempts', task=task, kind=kind, outcome=outcome)
+    metrics.observe(LATENCY_METRIC, (time.perf_counter() - start) * 1000, task=task, outcome=outcome)
+
+
+def _timed_call(call, task: str, kind: str, deadline_at: float):
+    """한 번의 시도를 실행하고 시도별 메트릭을 기록합니다. (복사된 컨텍스트 안에서 실행)"""
+    sent_at = [time.perf_counter()] # mark_attempt_sent() 가 호출되지 않으면 시도 시작 시각
+    _deadline_at.set(deadline_at)
+    _attempt_sent_at.set(sent_at)
+    try:
+        result = call()
+    except Exception as e:
+        _record_attempt(task, kind, sent_at[0], e)
+        raise
+    _record_attempt(task, kind, sent_at[0])
+    return result
+
+
+def _submit(executor: ThreadPoolExecutor, call, task: str, kind: str, deadline_at: float):
+    """호출자의 컨텍스트(contextvars)를 복사하여 스레드 풀에서 시도를 실행합니다."""
+    return executor.submit(contextvars.copy_context().run, _timed_call, call, task, kind, deadline_at)
+
+
+def _run_attempt(call, task: str, policy: RetryPolicy, deadline_at: float, deadline_seconds: float):
+    """
+    한 번의 시도(헤징 요청 포함)를 실행합니다.
+    헤징이 켜져 있으면 hedge_delay 안에 끝나지 않을 때 두 번째 요청을 보내고, 먼저 성공한 결과를 반환합니다.
+    마감 시간까지 끝나지 않으면 AIDeadlineExceeded.
+    (시도 안에서는 remaining_time() 으로 HTTP 요청 타임아웃을 설정하므로, 남은 요청도 마감 시각에 취소됩니다)
+    """
+    executor = _get_executor()
+    primary = _submit(executor, call, task, 'primary', deadline_at)
+    pending = {primary}
+
+    if policy.hedge:
+        hedge_delay = policy.hedge_delay_for(task)
+        if hedge_delay < deadline_at - time.monotonic():
+            done, _ = wait(pending, timeout=hedge_delay)
+            if not done:
+                metrics.increment('ai_call_hedges', task=task)
+                print(f"[AI Resilience] 응답 지연 ({hedge_delay:.2f}초 초과) - 헤징 요청 전송 (task={task})")
+                pending.add(_submit(executor, call, task, 'hedge', deadline_at))
+
+    first_error = None
+    while pending:
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            error = future.exception()
+            if error is None:
+                for other in pending:
+                    other.cancel()
+                if future is not primary:
+                    metrics.increment('ai_call_hedge_wins', task=task)
+                return future.result()
+            first_error = first_error or error
+    if pending or first_error is None:
+        raise AIDeadlineExceeded(task, deadline_seconds, first_error)
+    raise first_error
+
+
+def _call_deadline(task: str, policy: RetryPolicy) -> tuple[float, float]:
+    """(시작 시각, 마감 시각). 작업별 마감과 요청/작업 마감(ai_deadline) 중 이른 쪽을 사용합니다."""
+    start_at = time.monotonic()
+    deadline_at = start_at + policy.deadline
+    outer_deadline_at = _deadline_at.get()
+    if outer_deadline_at is not None:
+        deadline_at = min(deadline_at, outer_deadline_at) # 요청/작업 마감 시간이 더 이르면 그 시간까지만
+    if deadline_at <= start_at:
+        metrics.increment('ai_call_deadline_exceeded', task=task)
+        raise AIDeadlineExceeded(task, 0.0)
+    return start_at, deadline_at
+
+
+def _retry_delay(error: Exception, attempt: int, task: str, policy: RetryPolicy,
+                 start_at: float, deadline_at: float) -> float:
+    """
+    실패한 시도 뒤 재시도 대기 시간을 정합니다.
+    재시도할 수 없는 오류이면 그대로 다시 발생시키고, 대기 후 마감을 넘기면 AIDeadlineExceeded.
+    """
+    if not is_retryable_error(error) or attempt >= policy.max_attempts:
+        raise error
+    delay = policy.backoff(attempt)
+    if time.monotonic() + delay >= deadline_at:
+        metrics.increment('ai_call_deadline_exceeded', task=task)
+        raise AIDeadlineExceeded(task, deadline_at - start_at, error) from error
+    metrics.increment('ai_call_retries', task=task)
+    print(f"[AI Resilience] 일시적 오류 ({getattr(error, 'code', type(error).__name__)}) - {delay:.2f}초 후 재시도 "
+          f"({attempt + 1}/{policy.max_attempts}, task={task})")
+    return delay
+
+
+def call_with_resilience(call, task: str, policy: RetryPolicy = None):
+    """
+    call() 을 재시도/마감/헤징 정책에 따라 실행합니다.
+
+    Args:
+        call (callable): 인자 없이 호출되는 함수 (예: lambda: client.models.generate_content(...))
+        task (str): 작업 종류 ('classify', 'synthesize') - 정책 및 메트릭 라벨
+        policy (RetryPolicy, optional): 지정하지 않으면 작업별 설정 정책
+
+    Returns:
+        call() 의 반환값
+
+    Raises:
+        AIDeadlineExceeded: 마감 시간 초과 (작업별 마감 또는 ai_deadline 으로 지정된 요청/작업 마감 중 이른 쪽)
+        Exception: 재시도할 수 없는 오류 또는 재시도 횟수를 모두 사용한 마지막 오류
+    """
+    policy = policy or get_policy(task)
+    start_at, deadline_at = _call_deadline(task, policy)
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return _run_attempt(call, task, policy, deadline_at, deadline_at - start_at)
+        except AIDeadlineExceeded:
+            metrics.increment('ai_call_deadline_exceeded', task=task)
+            raise
+        except Exception as e:
+            time.sleep(_retry_delay(e, attempt, task, policy, start_at, deadline_at))
+
+
+# --- 비동기(asyncio) 버전 ---
+async def _atimed_call(call, task: str, kind: str, deadline_at: float):
+    """비동기 시도 하나를 실행하고 시도별 메트릭을 기록합니다. (태스크마다 컨텍스트가 복사됨)"""
+    sent_at = [time.perf_counter()] # mark_attempt_sent() 가 호출되지 않으면 시도 시작 시각
+    _deadline_at.set(deadline_at)
+    _attempt_sent_at.set(sent_at)
+    try:
+        result = await call()
+    except Exception as e:
+        _record_attempt(task, kind, sent_at[0], e)
+        raise
+    _record_attempt(task, kind, sent_at[0])
+    return result
+
+
+async def _arun_attempt(call, task: str, policy: RetryPolicy, deadline_at: float, deadline_seconds: float):
+    """_run_attempt 의 비동기 버전. 스레드 대신 asyncio 태스크를 사용하며, 진 요청과 마감 초과 요청은 취소합니다."""
+    primary = asyncio.ensure_future(_atimed_call(call, task, 'primary', deadline_at))
+    pending = {primary}
+    try:
+        if policy.hedge:
+            hedge_delay = policy.hedge_delay_for(task)
+            if hedge_delay < deadline_at - time.monotonic():
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+                if not done:
+                    metrics.increment('ai_call_hedges', task=task)
+                    pending.add(asyncio.ensure_future(_atimed_call(call, task, 'hedge', deadline_at)))
+
+        first_error = None
+        while pending:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    if future is not primary:
+                        metrics.increment('ai_call_hedge_wins', task=task)
+                    return future.result()
+                first_error = first_error or error
+        if pending or first_error is None:
+            raise AIDeadlineExceeded(task, deadline_seconds, first_error)
+        raise first_error
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def acall_with_resilience(call, task: str, policy: RetryPolicy = None):
+    """
+    call_with_resilience 의 비동기 버전. 스레드 풀 없이 이벤트 루프 안에서 재시도/마감/헤징을 적용합니다.
+
+    Args:
+        call (callable): 인자 없이 호출하면 코루틴을 반환하는 함수 (예: lambda: client.aio.models.generate_content(...))
+        task (str): 작업 종류
+        policy (RetryPolicy, optional): 지정하지 않으면 작업별 설정 정책
+    """
+    policy = policy or get_policy(task)
+    start_at, deadline_at = _call_deadline(task, policy)
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return await _arun_attempt(call, task, policy, deadline_at, deadline_at - start_at)
+        except AIDeadlineExceeded:
+            metrics.increment('ai_call_deadline_exceeded', task=task)
+            raise
+        except Exception as e:
+            await asyncio.sleep(_retry_delay(e, attempt, task, policy, start_at, deadline_at))
+
+
+def configure_resilience(app) -> None:
+    """
+    환경 변수로 작업별 재시도 정책을 설정합니다.
+    AI_RETRY_MAX_ATTEMPTS, AI_RETRY_BASE_DELAY, AI_RETRY_MAX_DELAY: 재시도 설정 (모든 작업 공통)
+    AI_DEADLINE_CLASSIFY, AI_DEADLINE_SYNTHESIZE: 작업별 전체 마감 시간(초)
+    AI_HEDGE_TASKS: 헤징을 사용할 작업 (쉼표 구분, 기본 'classify' - 합성은 비용 때문에 기본 미사용)
+    AI_HEDGE_DEFAULT_DELAY, AI_HEDGE_QUANTILE: 헤징 지연 설정
+    """
+    hedge_tasks = {t.strip() for t in os.getenv('AI_HEDGE_TASKS', 'classify').split(',') if t.strip()}
+    deadlines = {
+        'classify': float(os.getenv('AI_DEADLINE_CLASSIFY', '20')),
+        'synthesize': float(os.getenv('AI_DEADLINE_SYNTHESIZE', '120')),
+    }
+    for task, deadline in deadlines.items():
+        set_policy(task, RetryPolicy(
+            max_attempts=int(os.getenv('AI_RETRY_MAX_ATTEMPTS', '4')),
+            base_delay=float(os.getenv('AI_RETRY_BASE_DELAY', '0.5')),
+            max_delay=float(os.getenv('AI_RETRY_MAX_DELAY', '8')),
+            deadline=deadline,
+            hedge=task in hedge_tasks,
+            hedge_delay=float(os.getenv('AI_HEDGE_DEFAULT_DELAY', '3')),
+            hedge_quantile=float(os.getenv('AI_HEDGE_QUANTILE', '0.95')),
+        ))
+    app.config['AI_RETRY_POLICIES'] = dict(_policies)
+    print(f" * AI 호출 재시도 정책 설정: 마감={deadlines}, 헤징 작업={sorted(hedge_tasks) or '없음'}")
+    init_request_deadlines(app)
+
+
+def init_request_deadlines(app) -> None:
+    """
+    HTTP 요청마다 AI 호출 마감 시간을 설정합니다. 요청 처리 중 호출되는 모든 AI 호출은 이 시간을 넘지 않습니다.
+    AI_REQUEST_DEADLINE: 요청당 AI 호출 마감 시간(초, 기본 100 - gunicorn 워커 timeout 보다 짧게)
+    클라이언트는 X-Request-Deadline-Ms 헤더로 더 짧은 마감 시간을 지정할 수 있습니다.
+    """
+    from flask import g, request
+    app.config['AI_REQUEST_DEADLINE'] = float(os.getenv('AI_REQUEST_DEADLINE', '100'))
+
+    @app.before_request
+    def _set_ai_request_deadline():
+        seconds = app.config['AI_REQUEST_DEADLINE']
+        header_ms = request.headers.get('X-Request-Deadline-Ms', type=int)
+        if header_ms and header_ms > 0:
+            seconds = min(seconds, header_ms / 1000.0)
+        g.ai_deadline_token = set_deadline(seconds)
+
+    @app.teardown_request
+    def _reset_ai_request_deadline(exc=None):
+        reset_deadline(g.pop('ai_deadline_token', None))
@@ -0,0 +1,15 @@
+# asgi.py
+# 운영 서버용 ASGI 진입점: GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py asgi:app
+# /synthesize/web, /classify_item 은 비동기 라우트로, 나머지는 Flask 앱으로 처리합니다. (app/asgi.py 참고)
+
+import os
+from dotenv import load_dotenv
+
+# .env 파일 로드 (Flask 앱 생성 전에 환경 변수 로드)
+load_dotenv()
+
+from app import create_app
+from app.asgi import create_asgi_app
+
+flask_app = create_app(os.getenv('FLASK_ENV') or 'production')
+app = create_asgi_app(flask_app)
@@ -0,0 +1,60 @@
+# gunicorn.conf.py
+# 운영 서버 설정: gunicorn -c gunicorn.conf.py wsgi:app
+#           (비동기 라우트: GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py asgi:app)
+#
+# 요청 대부분이 AI 호출(수 초 ~ 수십 초)을 기다리는 I/O 대기이므로, 프로세스 수가 아니라 동시에 대기할 수 있는 요청 수가 처리량을 정합니다.
+#  - gthread (기본): 워커마다 스레드 GUNICORN_THREADS 개. AI SDK 호출은 대기 중 GIL 을 놓으므로 워커당 여러 요청을 동시에 처리합니다.
+#  - gevent: 워커마다 그린렛 GUNICORN_WORKER_CONNECTIONS 개 (gevent 설치 필요). 표준 라이브러리를 몽키패치하므로
+#    작업 큐 이벤트 루프 스레드(asyncio)와 AI SDK 의 스레드 사용이 그린렛 위에서 돌게 됩니다 - wsgi_worker_bench.py 로 확인 후 사용하세요.
+#  - uvicorn.workers.UvicornWorker (asgi:app): /synthesize/web, /classify_item 을 코루틴으로 처리해 AI 응답을 기다리는 요청이
+#    스레드를 차지하지 않습니다. 나머지 Flask 라우트는 워커당 ASGI_THREADS 개 스레드에서 실행됩니다. (app/asgi.py)
+#  - sync: 워커 하나가 요청 하나만 처리합니다. AI 호출 동안 워커가 막히므로 이 앱에는 맞지 않습니다.
+#
+# preload_app: 마스터에서 앱을 한 번 만든 뒤 fork 하므로 워커 시작이 빠르고 메모리(모듈, 로컬 분류 모델)를 공유합니다.
+# 스레드는 fork 로 복사되지 않으므로 백그라운드 작업(모델 점검, 캐시 예열)은 post_fork 에서 워커마다 시작합니다. (DEFER_BACKGROUND_TASKS)
+# max_requests: 워커를 주기적으로 새로 띄워 이미지 처리 중 늘어난 메모리를 돌려받습니다. (jitter 로 동시에 재시작하지 않도록 분산)
+
+import os
+import multiprocessing
+
+# 앱을 만들기 전에 설정해야 하므로 가장 먼저 (마스터에서는 백그라운드 스레드를 시작하지 않음)
+os.environ.setdefault('DEFER_BACKGROUND_TASKS', 'true')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('GUNICORN_WORKERS') or os.getenv('WEB_CONCURRENCY') or multiprocessing.cpu_count() * 2 + 1)
+threads = int(os.getenv('GUNICORN_THREADS', '16')) # gthread 워커당 동시 요청 수
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '200')) # gevent 워커당 동시 요청 수
+
+# 합성 요청은 SYNTH_JOB_DEADLINE(기본 120초)까지 걸릴 수 있으므로 워커 timeout 은 그보다 길게
+# (gthread/gevent 에서는 요청 시간이 아니라 워커 응답 없음 기준이지만, sync 워커에서는 요청 하나가 이 시간을 넘으면 워커를 죽임)
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '180'))
+# 재시작/종료 시 진행 중인 요청과 접수된 합성 작업(202)을 마칠 시간
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '150'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+# 워커 heartbeat 파일을 메모리 파일시스템에 (디스크가 느리거나 가득 차면 워커가 멈춘 것으로 오인하는 문제 방지)
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = os.getenv('GUNICORN_ERROR_LOG', '-')
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    """워커 프로세스마다 백그라운드 작업 시작 (preload 하지 않으면 앱을 여기서 처음 로드)"""
+    from app import start_background_tasks
+    application = server.app.wsgi() # wsgi:app 이면 Flask 앱, asgi:app 이면 Flask 앱을 감싼 ASGI 앱
+    start_background_tasks(getattr(getattr(application, 'state', None), 'flask_app', application))
+
+
+def worker_exit(server, worker):
+    """워커 종료/재시작(max_requests) 시 접수된 합성 작업을 graceful_timeout 안에서 마치고 백그라운드 작업 정리"""
+    from app import stop_background_tasks
+    unfinished = stop_background_tasks(drain_timeout=max(1, graceful_timeout - 5))
+    if unfinished:
+        server.log.warning("워커 %s 종료: 끝내지 못한 합성 작업 %d개 중단", worker.pid, unfinished)
@@ -0,0 +1,170 @@
+# local_classifier_tool.py
+# 로컬 CPU 아이템 분류기 라벨링 / 학습 / 평가 스크립트 (웹 서버 없이 실행)
+#
+# 사용 예:
+#   1) AI(Gemini) 라벨 생성:  python local_classifier_tool.py label --images ./item_images --labels labels.csv
+#   2) 로컬 분류기 학습:       python local_classifier_tool.py train --labels labels.csv --model ../models/local_item_classifier.npz
+#   3) AI 라벨 대비 정확도 평가: python local_classifier_tool.py eval --labels holdout_labels.csv --model ../models/local_item_classifier.npz
+#
+# 평가는 학습에 사용하지 않은 이미지(holdout)의 라벨 파일로 실행해야 의미가 있습니다.
+
+import argparse
+import csv
+import os
+import time
+import numpy as np
+from PIL import Image
+from dotenv import load_dotenv
+
+from app.utils.local_classifier import (
+    ITEM_CATEGORIES, LocalItemClassifier, extract_features, train_local_classifier
+)
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def read_labels(labels_path: str) -> list[tuple[str, str]]:
+    """CSV(path,label) 파일을 읽어 허용된 카테고리 라벨만 반환합니다."""
+    rows = []
+    with open(labels_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if row.get('label') in ITEM_CATEGORIES and os.path.exists(row['path']):
+                rows.append((row['path'], row['label']))
+    return rows
+
+
+def load_features(rows: list[tuple[str, str]]) -> np.ndarray:
+    """라벨 파일의 이미지들에서 특징 벡터를 추출합니다."""
+    features = []
+    for path, _ in rows:
+        with Image.open(path) as img_fp:
+            features.append(extract_features(img_fp.copy()))
+    return np.stack(features)
+
+
+def run_label(images_dir: str, labels_path: str) -> None:
+    """디렉토리의 이미지를 AI(Gemini)로 분류하여 라벨 CSV 를 만듭니다. 이미 라벨된 이미지는 건너뜁니다."""
+    from google import genai
+    from app.utils.ai_module import classify_item_type
+
+    load_dotenv()
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        print("오류: .env 파일에서 GEMINI_API_KEY를 찾을 수 없습니다.")
+        return
+    client = genai.Client(api_key=api_key)
+
+    done = set()
+    if os.path.exists(labels_path):
+        with open(labels_path, newline='', encoding='utf-8') as f:
+            done = {row['path'] for row in csv.DictReader(f)}
+
+    paths = sorted(
+        os.path.join(images_dir, name) for name in os.listdir(images_dir)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    write_header = not os.path.exists(labels_path)
+    with open(labels_path, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['path', 'label'])
+        if write_header:
+            writer.writeheader()
+        for path in paths:
+            if path in done:
+                continue
+            label = classify_item_type(client, path) or ''
+            writer.writerow({'path': path, 'label': label})
+            f.flush()
+            print(f"  - {os.path.basename(path)}: {label or '(분류 실패)'}")
+
+
+def run_train(labels_path: str, model_path: str) -> None:
+    """AI 라벨로 로컬 분류기를 학습하고 저장합니다."""
+    rows = read_labels(labels_path)
+    if len(rows) < len(ITEM_CATEGORIES):
+        print(f"오류: 학습 데이터가 너무 적습니다 ({len(rows)}개).")
+        return
+    print(f"특징 추출 중... ({len(rows)}개 이미지)")
+    features = load_features(rows)
+    labels = [label for _, label in rows]
+    model = train_local_classifier(features, labels)
+    train_acc = np.mean([model.classes[i] == label for i, label in
+                         zip(model.predict_proba_features(features).argmax(axis=1), labels)])
+    model.save(model_path)
+    print(f"학습 완료: {model_path} (학습 정확도 {train_acc:.3f}, temperature {model.temperature:.2f})")
+
+
+def run_eval(labels_path: str, model_path: str, thresholds: list[float]) -> None:
+    """AI 라벨 대비 로컬 분류기의 정확도, 클래스별 정확도, 혼동 행렬, 임계값별 커버리지를 출력합니다."""
+    rows = read_labels(labels_path)
+    if not rows:
+        print("오류: 평가할 라벨 데이터가 없습니다.")
+        return
+    model = LocalItemClassifier.load(model_path)
+
+    start = time.perf_counter()
+    features = load_features(rows)
+    probs = model.predict_proba_features(features)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    truth = np.array([model.classes.index(label) for _, label in rows])
+    predicted = probs.argmax(axis=1)
+    confidence = probs.max(axis=1)
+    correct = predicted == truth
+
+    print(f"--- 로컬 분류기 평가 ({len(rows)}개, AI 라벨 기준) ---")
+    print(f"전체 정확도: {correct.mean():.3f}")
+    print(f"추론 시간: 총 {elapsed_ms:.1f}ms (이미지당 {elapsed_ms / len(rows):.2f}ms, 특징 추출 포함)")
+
+    print("\n클래스별 정확도:")
+    for index, name in enumerate(model.classes):
+        mask = truth == index
+        if mask.any():
+            print(f"  {name:<10} {correct[mask].mean():.3f} ({mask.sum()}개)")
+
+    print("\n혼동 행렬 (행: AI 라벨, 열: 로컬 예측):")
+    print(" " * 8 + "".join(f"{name[:6]:>8}" for name in model.classes))
+    for index, name in enumerate(model.classes):
+        counts = [int(((truth == index) & (predicted == j)).sum()) for j in range(len(model.classes))]
+        print(f"  {name[:6]:<6}" + "".join(f"{c:>8}" for c in counts))
+
+    print("\n확신도 임계값별 (로컬 처리 비율 / 로컬 처리분 정확도):")
+    for threshold in thresholds:
+        covered = confidence >= threshold
+        accuracy = correct[covered].mean() if covered.any() else float('nan')
+        print(f"  >= {threshold:.2f}: 커버리지 {covered.mean():.3f}, 정확도 {accuracy:.3f}")
+
+    # 보정 품질: Expected Calibration Error (10 구간)
+    bins = np.linspace(0, 1, 11)
+    ece = 0.0
+    for low, high in zip(bins[:-1], bins[1:]):
+        in_bin = (confidence > low) & (confidence <= high)
+        if in_bin.any():
+            ece += in_bin.mean() * abs(correct[in_bin].mean() - confidence[in_bin].mean())
+    print(f"\n보정 오차(ECE): {ece:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="로컬 아이템 분류기 라벨링/학습/평가")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    label_parser = sub.add_parser('label', help="AI(Gemini)로 이미지 라벨 CSV 생성")
+    label_parser.add_argument('--images', required=True, help="아이템 이미지 디렉토리")
+    label_parser.add_argument('--labels', required=True, help="출력 CSV 경로 (path,label)")
+
+    train_parser = sub.add_parser('train', help="라벨 CSV 로 로컬 분류기 학습")
+    train_parser.add_argument('--labels', required=True)
+    train_parser.add_argument('--model', required=True, help="저장할 모델 파일(.npz) 경로")
+
+    eval_parser = sub.add_parser('eval', help="AI 라벨 대비 로컬 분류기 정확도 평가")
+    eval_parser.add_argument('--labels', required=True)
+    eval_parser.add_argument('--model', required=True)
+    eval_parser.add_argument('--thresholds', default='0.5,0.7,0.85,0.9,0.95',
+                             help="커버리지를 계산할 확신도 임계값 목록 (쉼표 구분)")
+
+    args = parser.parse_args()
+    if args.command == 'label':
+        run_label(args.images, args.labels)
+    elif args.command == 'train':
+        run_train(args.labels, args.model)
+    else:
+        run_eval(args.labels, args.model, [float(t) for t in args.thresholds.split(',')])
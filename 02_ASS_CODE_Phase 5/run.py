@@ -16,10 +16,12 @@ load_dotenv()
 # os.getenv('FLASK_CONFIG') or 'default' 와 같은 방식으로 환경별 설정 로드 가능
 app = create_app(os.getenv('FLASK_ENV') or 'development')
 
-# 이 스크립트가 직접 실행될 때만 Flask 개발 서버 실행
+# 이 스크립트가 직접 실행될 때만 Flask 개발 서버 실행 (운영 서버는 wsgi.py + gunicorn.conf.py 사용)
 if __name__ == '__main__':
     # app.run()을 사용하여 개발 서버 시작
-    # debug=True: 개발 모드 활성화 (코드 변경 시 자동 재시작, 디버거 사용 가능)
-    # host='0.0.0.0': 로컬 네트워크의 다른 기기에서 접근 가능하도록 설정 (기본값: '127.0.0.1')
-    # port=5000: 사용할 포트 번호 (기본값: 5000)
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # FLASK_DEBUG=true: 개발 모드 활성화 (코드 변경 시 자동 재시작, 디버거 사용 가능)
+    #   디버거는 브라우저에서 임의 코드를 실행할 수 있으므로 기본값은 꺼짐 - 외부에 열린 서버에서는 켜지 마세요.
+    # FLASK_RUN_HOST: 기본 '127.0.0.1' ('0.0.0.0' 이면 로컬 네트워크의 다른 기기에서 접근 가능)
+    # FLASK_RUN_PORT: 사용할 포트 번호 (기본값: 5000)
+    debug = os.getenv('FLASK_DEBUG', 'false').lower() in ('true', '1')
+    app.run(debug=debug, host=os.getenv('FLASK_RUN_HOST', '127.0.0.1'), port=int(os.getenv('FLASK_RUN_PORT', '5000')))
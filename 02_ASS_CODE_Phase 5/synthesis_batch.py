@@ -0,0 +1,18 @@
+# synthesis_batch.py
+# 카탈로그 x 베이스 모델 대량 합성 (웹 서버 없이 실행, 'flask synth-batch' 와 같은 명령)
+#
+# 사용 예:
+#   python synthesis_batch.py catalog.jsonl --processes 4 --concurrency 4
+#   python synthesis_batch.py catalog.csv --bases models/m1.png,models/m2.png --output-dir ./batch_outputs --report stats.json
+#   (중단된 뒤 같은 명령을 다시 실행하면 catalog.jsonl.checkpoint.jsonl 에 기록된 완료 작업은 건너뜁니다)
+#
+# 워커 프로세스마다 웹 서버와 같은 설정(.env)으로 앱을 만들므로, AI_RATE_LIMITS 의 파일/PostgreSQL 레이트 리미터를
+# 실행 중인 웹 서버 워커와 함께 나눠 씁니다. 서비스 트래픽이 많은 시간에는 --processes/--concurrency 를 낮추세요.
+
+from dotenv import load_dotenv
+
+from app.services.batch_synthesis import synth_batch_command
+
+if __name__ == "__main__":
+    load_dotenv()
+    synth_batch_command(prog_name='synthesis_batch.py')
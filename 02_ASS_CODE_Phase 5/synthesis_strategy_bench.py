@@ -0,0 +1,167 @@
+# synthesis_strategy_bench.py
+# 다중 아이템 합성 전략(single / sequential / parallel)별 지연, 요청/응답 바이트, 모델 호출 수, 실패율 측정 (웹 서버, API 키 불필요)
+#
+# 사용 예:
+#   1) 가짜 백엔드:           python synthesis_strategy_bench.py --backend fake --items 2,3,5 --runs 20 --fake-failure-rate 0.05
+#   2) 운영 호출 기록 내보내기: python synthesis_strategy_bench.py --export-recording synth_calls.jsonl --days 7   (DB 필요)
+#   3) 기록 재생 백엔드:       python synthesis_strategy_bench.py --backend recorded --recording synth_calls.jsonl --latency-scale 0.1
+#
+# 가짜/재생 백엔드는 베이스 이미지를 그대로 돌려주므로 화질 비교가 아니라 지연/바이트/실패율 비교용입니다.
+# 재생 백엔드는 기록된 실제 호출의 응답 시간과 오류를 순서대로 재생하므로, 운영 트래픽에서의 전략별 지연과 실패율을 추정할 수 있습니다.
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from PIL import Image
+from dotenv import load_dotenv
+
+from app.utils.ai_backends import FakeGenAIClient, RecordedGenAIClient
+from app.utils.ai_call_log import ai_call_log
+from app.utils.resilience import ai_deadline
+from app.services.synthesis_strategies import STRATEGIES, synthesize_with_strategy
+
+ITEM_TYPES = ('top', 'bottom', 'shoes', 'hat', 'outer', 'bag')
+
+
+def make_images(workdir: str, base_size: tuple[int, int], item_size: tuple[int, int], count: int) -> tuple[str, list[dict]]:
+    """벤치마크용 베이스/아이템 이미지 (무늬가 있는 PNG, 실제 사진과 비슷한 바이트 크기가 되도록 노이즈 포함)"""
+    def _save(path: str, size: tuple[int, int], seed: int) -> str:
+        noise = Image.effect_noise(size, 40 + seed * 7).convert('RGB')
+        Image.blend(Image.new('RGB', size, (40 * seed % 255, 90, 160)), noise, 0.5).save(path)
+        return path
+
+    base_path = _save(os.path.join(workdir, 'base.png'), base_size, 0)
+    items = [{'type': ITEM_TYPES[i % len(ITEM_TYPES)], 'path': _save(os.path.join(workdir, f'item_{i}.png'), item_size, i + 1)}
+             for i in range(count)]
+    return base_path, items
+
+
+def run_case(client, strategy: str, base_path: str, items: list[dict], runs: int, deadline: float) -> dict:
+    """한 전략/아이템 수 조합을 runs 번 실행하고 결과를 집계합니다."""
+    latencies, failures, calls = [], 0, []
+    original_submit = ai_call_log.submit
+    ai_call_log.submit = calls.append # 모델 호출마다 AICall (요청/응답 바이트, 시도 수) 수집
+    try:
+        for _ in range(runs):
+            start = time.perf_counter()
+            try:
+                with ai_deadline(deadline):
+                    result = synthesize_with_strategy(client, strategy, base_path, items)
+            except Exception as e: # 마감 시간 초과 등
+                print(f"  - {strategy}/{len(items)}개: 실패 ({type(e).__name__}: {e})")
+                result = None
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not result:
+                failures += 1
+    finally:
+        ai_call_log.submit = original_submit
+
+    latencies.sort()
+    return {
+        'strategy': strategy, 'items': len(items), 'runs': runs,
+        'failure_rate': failures / runs,
+        'p50_ms': statistics.median(latencies),
+        'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        'model_calls': len(calls) / runs,
+        'attempts': sum(call.attempts for call in calls) / runs,
+        'request_bytes': sum(call.request_bytes for call in calls) / runs,
+        'response_bytes': sum(call.response_bytes for call in calls) / runs,
+    }
+
+
+def build_client(backend: str, args):
+    if backend == 'fake':
+        return FakeGenAIClient(latency=args.fake_latency, latency_jitter=args.fake_jitter,
+                               slow_rate=args.fake_slow_rate, slow_latency=args.fake_slow_latency,
+                               failure_rate=args.fake_failure_rate, failure_codes=(503, 429), seed=args.seed)
+    if not args.recording:
+        raise SystemExit("--backend recorded 에는 --recording 파일이 필요합니다. (--export-recording 으로 생성)")
+    return RecordedGenAIClient.from_file(args.recording, task='synthesize', latency_scale=args.latency_scale)
+
+
+def export_recording(path: str, days: int) -> None:
+    """ai_calls 테이블의 최근 합성 호출을 재생 기록 파일(JSON Lines)로 저장합니다."""
+    from app.utils.db_utils import get_recent_ai_calls
+    rows = get_recent_ai_calls(task='synthesize', days=days)
+    if not rows:
+        raise SystemExit("내보낼 호출 기록이 없습니다. (DB 연결과 AI_CALL_LOG_ENABLED 설정을 확인하세요)")
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in rows:
+            row['created_at'] = row['created_at'].isoformat()
+            f.write(json.dumps(row, ensure_ascii=False) + '\n')
+    print(f"합성 호출 기록 {len(rows)}건 저장: {path}")
+
+
+def print_table(results: list[dict]) -> None:
+    print(f"\n{'backend':<9} {'strategy':<11} {'items':>5} {'fail%':>6} {'p50ms':>8} {'p95ms':>8} "
+          f"{'calls':>6} {'tries':>6} {'req KB':>9} {'resp KB':>8}")
+    for r in results:
+        print(f"{r['backend']:<9} {r['strategy']:<11} {r['items']:>5} {r['failure_rate'] * 100:>5.1f}% "
+              f"{r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} {r['model_calls']:>6.1f} {r['attempts']:>6.1f} "
+              f"{r['request_bytes'] / 1024:>9.0f} {r['response_bytes'] / 1024:>8.0f}")
+
+
+def _size(value: str) -> tuple[int, int]:
+    width, _, height = value.lower().partition('x')
+    return int(width), int(height or width)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="다중 아이템 합성 전략별 지연/바이트/실패율 벤치마크")
+    parser.add_argument('--backend', default='fake', help="fake, recorded 또는 둘 다 (쉼표 구분)")
+    parser.add_argument('--strategies', default=','.join(STRATEGIES), help="측정할 전략 (쉼표 구분)")
+    parser.add_argument('--items', default='2,3,5', help="측정할 아이템 수 (쉼표 구분)")
+    parser.add_argument('--runs', type=int, default=10, help="조합당 실행 횟수")
+    parser.add_argument('--deadline', type=float, default=120, help="합성 한 번의 마감 시간(초)")
+    parser.add_argument('--base-size', type=_size, default=(768, 1024), help="베이스 이미지 크기 (예: 768x1024)")
+    parser.add_argument('--item-size', type=_size, default=(512, 512), help="아이템 이미지 크기")
+    parser.add_argument('--fake-latency', type=float, default=0.3)
+    parser.add_argument('--fake-jitter', type=float, default=0.2)
+    parser.add_argument('--fake-slow-rate', type=float, default=0.02)
+    parser.add_argument('--fake-slow-latency', type=float, default=3.0)
+    parser.add_argument('--fake-failure-rate', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--recording', help="재생할 호출 기록 파일 (JSON Lines)")
+    parser.add_argument('--latency-scale', type=float, default=1.0, help="기록된 지연 배율 (예: 0.1 = 10배 빠르게 재생)")
+    parser.add_argument('--export-recording', metavar='PATH', help="ai_calls 테이블의 최근 합성 호출을 기록 파일로 저장하고 종료")
+    parser.add_argument('--days', type=int, default=7, help="--export-recording 대상 기간(일)")
+    parser.add_argument('--csv', help="결과를 CSV 로도 저장")
+    args = parser.parse_args()
+
+    if args.export_recording:
+        export_recording(args.export_recording, args.days)
+        raise SystemExit(0)
+
+    strategies = [s.strip() for s in args.strategies.split(',') if s.strip()]
+    unknown = [s for s in strategies if s not in STRATEGIES]
+    if unknown:
+        raise SystemExit(f"알 수 없는 전략: {', '.join(unknown)}")
+    item_counts = [int(n) for n in args.items.split(',')]
+
+    workdir = tempfile.mkdtemp(prefix='strategy_bench_')
+    results = []
+    try:
+        base_path, all_items = make_images(workdir, args.base_size, args.item_size, max(item_counts))
+        for backend in [b.strip() for b in args.backend.split(',') if b.strip()]:
+            for count in item_counts:
+                for strategy in strategies:
+                    client = build_client(backend, args) # 조합마다 같은 오류/지연 순서로 시작
+                    print(f"[{backend}] {strategy} / 아이템 {count}개 x {args.runs}회 ...")
+                    result = run_case(client, strategy, base_path, all_items[:count], args.runs, args.deadline)
+                    results.append(dict(result, backend=backend))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(results)
+    if args.csv:
+        with open(args.csv, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['backend'] + [k for k in results[0] if k != 'backend'])
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"\nCSV 저장: {args.csv}")
@@ -0,0 +1,16 @@
+# tests/conftest.py
+# 테스트 공통 설정: 가짜 AI 백엔드(AI_BACKEND=fake)를 사용하고 백그라운드 작업(모델 점검, 캐시 예열)은 시작하지 않습니다.
+# 실행: (02_ASS_CODE_Phase 5 폴더에서) python -m pytest -q
+
+import os
+import sys
+
+os.environ.setdefault('AI_BACKEND', 'fake')
+os.environ.setdefault('FAKE_AI_LATENCY', '0')
+os.environ.setdefault('FAKE_AI_LATENCY_JITTER', '0')
+os.environ.setdefault('FAKE_AI_FAILURE_RATE', '0')
+os.environ.setdefault('CACHE_WARM_ENABLED', 'false')
+os.environ.setdefault('AI_MODEL_PROBE_ENABLED', 'false')
+os.environ.setdefault('FLASK_SECRET_KEY', 'test-secret-key')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,74 @@
+# tests/test_asgi_routes.py
+# ASGI 앱(app/asgi.py): 비동기 라우트의 로그인 확인, 비동기 라우트가 처리하지 않는 요청
+# (Idempotency-Key, base_model_ids)을 읽은 본문 그대로 Flask 라우트로 넘기는지, 분류 요청은 코루틴으로 처리하는지 확인
+
+from io import BytesIO
+
+import pytest
+from flask import Flask, jsonify, request
+from PIL import Image
+from starlette.testclient import TestClient
+
+from app.asgi import create_asgi_app
+from app.services.idempotency import IDEMPOTENCY_HEADER
+from app.utils.ai_backends import FakeGenAIClient
+
+
+@pytest.fixture
+def flask_app():
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', AI_CLIENT=object())
+
+    @app.route('/synthesize/web', methods=['POST'])
+    def synthesize_web():
+        return jsonify({'handled_by': 'flask', 'form': request.form.to_dict(),
+                        'files': sorted(request.files), 'idempotency_key': request.headers.get(IDEMPOTENCY_HEADER)})
+
+    return app
+
+
+@pytest.fixture
+def client(flask_app):
+    # lifespan(비동기 DB 연결 풀)은 열지 않음 - with 블록 없이 사용
+    client = TestClient(create_asgi_app(flask_app))
+    cookie = flask_app.session_interface.get_signing_serializer(flask_app).dumps({'user_id': 1})
+    client.cookies.set(flask_app.config['SESSION_COOKIE_NAME'], cookie)
+    return client
+
+
+def _synthesize(client, data: dict, headers: dict = None):
+    return client.post('/synthesize/web', data=data, files={'top_image': ('top.png', b'png-bytes', 'image/png')},
+                       headers={'Accept': 'application/json', **(headers or {})})
+
+
+def test_async_routes_require_login(flask_app):
+    client = TestClient(create_asgi_app(flask_app))
+    for path in ('/synthesize/web', '/classify_item'):
+        response = client.post(path, headers={'Accept': 'application/json'})
+        assert response.status_code == 401
+
+
+def test_idempotency_key_request_falls_back_to_flask(client):
+    response = _synthesize(client, {'strategy': 'auto'}, {IDEMPOTENCY_HEADER: 'key-1'})
+    assert response.status_code == 200
+    assert response.json() == {'handled_by': 'flask', 'form': {'strategy': 'auto'}, 'files': ['top_image'],
+                               'idempotency_key': 'key-1'}
+
+
+def test_base_model_ids_request_falls_back_to_flask(client):
+    response = _synthesize(client, {'base_model_ids': '1,2'})
+    assert response.status_code == 200
+    assert response.json()['handled_by'] == 'flask'
+    assert response.json()['form'] == {'base_model_ids': '1,2'}
+    assert response.json()['files'] == ['top_image']
+
+
+def test_classify_item_is_handled_by_async_route(flask_app, client):
+    flask_app.config.update(AI_CLIENT=FakeGenAIClient(latency=0, classify_label='bottom'),
+                            ALLOWED_EXTENSIONS={'png'}, CLASSIFY_CACHE_ENABLED=False)
+    buffer = BytesIO()
+    Image.new('RGB', (32, 32), 'white').save(buffer, format='PNG')
+    response = client.post('/classify_item', files={'item_image': ('item.png', buffer.getvalue(), 'image/png')},
+                           headers={'Accept': 'application/json'})
+    assert (response.status_code, response.json()) == (200, {'item_type': 'bottom'})
+    assert flask_app.config['AI_CLIENT'].call_count == 1
@@ -0,0 +1,53 @@
+# tests/test_cache_warmer.py
+# 인기 아이템 보관 이미지/기록 정리: 집계 기간 동안 사용되지 않은 아이템은 DB 기록과 파일을 삭제
+
+import os
+import time
+
+import pytest
+
+from app.services import cache_warmer as warmer_module
+from app.services.cache_warmer import CacheWarmer
+
+
+@pytest.fixture
+def warmer(tmp_path):
+    warmer = CacheWarmer()
+    warmer.configure(enabled=True, item_folder=str(tmp_path / 'warm_items'), days=30)
+    os.makedirs(warmer.item_folder)
+    return warmer
+
+
+def _write(path, age_days: float = 0) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'item')
+    stamp = time.time() - age_days * 86400
+    os.utime(path, (stamp, stamp))
+    return str(path)
+
+
+def test_prune_removes_unused_rows_files_and_orphans(warmer, tmp_path, monkeypatch):
+    folder = tmp_path / 'warm_items'
+    pruned_row = _write(folder / 'aa' / 'aa01.png', age_days=40)
+    orphan = _write(folder / 'bb' / 'bb01.png', age_days=31) # DB 기록 없이 남은 파일
+    recent = _write(folder / 'cc' / 'cc01.png', age_days=1)
+    calls = []
+    monkeypatch.setattr(warmer_module, 'prune_item_usage', lambda days: calls.append(days) or [pruned_row])
+
+    assert warmer.prune() == 2
+    assert calls == [30]
+    assert not os.path.exists(pruned_row) and not os.path.exists(orphan)
+    assert os.path.exists(recent)
+
+
+def test_record_prunes_periodically(warmer, tmp_path, monkeypatch):
+    item = _write(tmp_path / 'upload.png')
+    monkeypatch.setattr(warmer_module, 'PRUNE_EVERY_RECORDS', 2)
+    monkeypatch.setattr(warmer_module, 'record_item_usage', lambda items: True)
+    pruned = []
+    monkeypatch.setattr(warmer, 'prune', lambda: pruned.append(True) or 0)
+
+    for _ in range(4):
+        assert warmer.record([{'type': 'top', 'path': item}])
+    assert len(pruned) == 2
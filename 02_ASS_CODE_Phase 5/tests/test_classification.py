@@ -0,0 +1,100 @@
+# tests/test_classification.py
+# AI 클라이언트가 없을 때 /classify_item(s): 캐시/로컬 분류기로 분류되는 항목은 그대로, AI 가 필요한 항목만 503
+# 일괄 분류 응답 검증: index 가 1..N 의 순열이 아니면 형식 오류(None -> 개별 분류)
+
+import json
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+from PIL import Image
+
+from app.routes import synthesize
+from app.utils import ai_module
+
+
+class SizeClassifier:
+    """이미지 너비로 확신도를 정하는 로컬 분류기 (너비 10 이면 확신, 나머지는 AI 필요)"""
+
+    def predict(self, images):
+        return [('top', 0.99) if image.width == 10 else ('top', 0.1) for image in images]
+
+
+def _png(width: int) -> tuple[BytesIO, str]:
+    buffer = BytesIO()
+    Image.new('RGB', (width, 10), 'white').save(buffer, format='PNG')
+    buffer.seek(0)
+    return buffer, f'item_{width}.png'
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', ALLOWED_EXTENSIONS={'png'}, AI_CLIENT=None, CLASSIFY_CACHE_ENABLED=False,
+                      LOCAL_CLASSIFIER=SizeClassifier())
+    app.register_blueprint(synthesize.bp)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    return client
+
+
+def test_classify_items_uses_local_classifier_without_ai_client(client):
+    response = client.post('/classify_items', data={'item_images': [_png(10), _png(20)]},
+                           content_type='multipart/form-data', headers={'Accept': 'application/json'})
+    assert response.status_code == 200
+    local, remote = response.get_json()['results']
+    assert (local['item_type'], local['source']) == ('top', 'local')
+    assert 'error' not in local
+    assert (remote['item_type'], remote['source'], remote['status']) == (None, 'unavailable', 503)
+
+
+def test_classify_items_returns_503_when_every_item_needs_ai(client):
+    response = client.post('/classify_items', data={'item_images': [_png(20), _png(30)]},
+                           content_type='multipart/form-data', headers={'Accept': 'application/json'})
+    assert response.status_code == 503
+    assert [r['source'] for r in response.get_json()['results']] == ['unavailable', 'unavailable']
+
+
+def test_classify_item_without_ai_client(client):
+    response = client.post('/classify_item', data={'item_image': _png(10)},
+                           content_type='multipart/form-data', headers={'Accept': 'application/json'})
+    assert (response.status_code, response.get_json()) == (200, {'item_type': 'top'})
+    response = client.post('/classify_item', data={'item_image': _png(20)},
+                           content_type='multipart/form-data', headers={'Accept': 'application/json'})
+    assert response.status_code == 503
+
+
+@pytest.mark.parametrize('payload, expected', [
+    ([{'index': 2, 'item_type': 'shoes'}, {'index': 1, 'item_type': 'top'}], ['top', 'shoes']),
+    ([{'index': 1, 'item_type': 'top'}, {'index': 1, 'item_type': 'shoes'}], None), # 중복 index
+    ([{'index': True, 'item_type': 'top'}, {'index': 2, 'item_type': 'shoes'}], None),
+    ([{'index': 1, 'item_type': 'top'}, {'index': 2, 'item_type': 'hat'}], ['top', None]),
+])
+def test_classify_items_batch_requires_index_permutation(tmp_path, monkeypatch, payload, expected):
+    paths = []
+    for i in range(2):
+        path = tmp_path / f'item_{i}.png'
+        Image.new('RGB', (8, 8), 'white').save(path)
+        paths.append(str(path))
+    monkeypatch.setattr(ai_module, '_generate_content',
+                        lambda *args, **kwargs: SimpleNamespace(text=json.dumps(payload)))
+    assert ai_module.classify_items_batch(object(), paths) == expected
+
+
+def test_failed_model_classification_is_not_counted_as_model(tmp_path, monkeypatch):
+    from app.services import classification_service
+    from app.utils.metrics import metrics
+
+    path = tmp_path / 'item.png'
+    Image.new('RGB', (8, 8), 'white').save(path)
+    monkeypatch.setattr(classification_service, 'classify_item_type', lambda client, image_path: None)
+    app = Flask(__name__)
+    app.config.update(CLASSIFY_CACHE_ENABLED=False)
+    model_before = metrics.get_counter('classify_source', source='model')
+    failed_before = metrics.get_counter('classify_source', source='failed')
+    with app.app_context():
+        assert classification_service.classify_images(object(), [str(path)]) == [{'item_type': None, 'source': None}]
+    assert metrics.get_counter('classify_source', source='model') == model_before
+    assert metrics.get_counter('classify_source', source='failed') == failed_before + 1
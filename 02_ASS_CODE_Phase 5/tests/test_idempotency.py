@@ -0,0 +1,146 @@
+# tests/test_idempotency.py
+# Idempotency-Key: 저장된 응답 재전송, 다른 요청 거절, 진행 중 충돌, 선점 만료 시 이어받기
+# DB 대신 메모리 저장소로 db_utils 의 멱등 키 함수를 바꿔 끼웁니다.
+
+import time
+
+import pytest
+from flask import Flask, jsonify, request
+
+from app.services import idempotency
+from app.services.idempotency import idempotent
+
+
+class FakeKeyStore:
+    """idempotency_keys 테이블의 선점/만료 규칙을 흉내 내는 메모리 저장소"""
+
+    def __init__(self):
+        self.rows = {}
+
+    def claim(self, user_id, key, endpoint, request_hash, ttl_seconds, lease_token, lease_seconds):
+        now = time.time()
+        row = self.rows.get((user_id, key))
+        takeover = row is not None and row['status'] == 'in_progress' and row['lease_until'] < now \
+            and (row['endpoint'], row['request_hash']) == (endpoint, request_hash)
+        if row is None or row['expires_at'] < now or takeover:
+            self.rows[(user_id, key)] = {'endpoint': endpoint, 'request_hash': request_hash, 'status': 'in_progress',
+                                         'response_status': None, 'response_body': None, 'content_type': None,
+                                         'expires_at': now + ttl_seconds, 'lease_token': lease_token,
+                                         'lease_until': now + lease_seconds}
+            return {'claimed': True}
+        return dict(row, claimed=False)
+
+    def get(self, user_id, key):
+        row = self.rows.get((user_id, key))
+        if row is None:
+            return None
+        return dict(row, lease_expired=row['status'] == 'in_progress' and row['lease_until'] < time.time())
+
+    def complete(self, user_id, key, lease_token, response_status, response_body, content_type):
+        row = self.rows.get((user_id, key))
+        if row is None or row['lease_token'] != lease_token:
+            return False
+        row.update(status='completed', response_status=response_status, response_body=response_body,
+                   content_type=content_type, lease_token=None, lease_until=None)
+        return True
+
+    def release(self, user_id, key, lease_token):
+        row = self.rows.get((user_id, key))
+        if row and row['status'] == 'in_progress' and row['lease_token'] == lease_token:
+            del self.rows[(user_id, key)]
+        return True
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeKeyStore()
+    monkeypatch.setattr(idempotency, 'claim_idempotency_key', store.claim)
+    monkeypatch.setattr(idempotency, 'get_idempotency_key', store.get)
+    monkeypatch.setattr(idempotency, 'complete_idempotency_key', store.complete)
+    monkeypatch.setattr(idempotency, 'release_idempotency_key', store.release)
+    monkeypatch.setattr(idempotency, 'renew_idempotency_leases', lambda leases, seconds: len(leases))
+    monkeypatch.setattr(idempotency, 'delete_expired_idempotency_keys', lambda: 0)
+    return store
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.config.update(IDEMPOTENCY_WAIT_SECONDS=0.5)
+    app.calls = []
+
+    @app.route('/submit', methods=['POST'])
+    @idempotent('submit')
+    def submit():
+        app.calls.append(dict(request.form))
+        status = int(request.form.get('status', 200))
+        return jsonify({'call': len(app.calls)}), status
+
+    return app
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 7
+    return client
+
+
+def post(client, key='key-1', **form):
+    return client.post('/submit', data=form or {'item': 'a'}, headers={'Idempotency-Key': key})
+
+
+def test_replays_stored_response(app, client, store):
+    first = post(client)
+    second = post(client)
+    assert first.status_code == second.status_code == 200
+    assert second.get_json() == first.get_json() == {'call': 1}
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert len(app.calls) == 1
+
+
+def test_without_key_is_not_deduplicated(app, client, store):
+    client.post('/submit', data={'item': 'a'})
+    client.post('/submit', data={'item': 'a'})
+    assert len(app.calls) == 2
+    assert not store.rows
+
+
+def test_same_key_different_request_is_rejected(app, client, store):
+    post(client, item='a')
+    response = post(client, item='b')
+    assert response.status_code == 422
+    assert len(app.calls) == 1
+
+
+def test_server_error_releases_key(app, client, store):
+    assert post(client, status='503').status_code == 503
+    assert not store.rows
+    assert post(client, status='503').status_code == 503
+    assert len(app.calls) == 2 # 다시 처리됨 (저장된 응답 없음)
+
+
+def test_in_progress_conflict_returns_409(app, client, store):
+    store.claim(7, 'key-1', 'submit', idempotency_hash(app), 3600, 'other-worker', 60)
+    response = post(client)
+    assert response.status_code == 409
+    assert response.headers['Retry-After']
+    assert not app.calls
+
+
+def test_expired_lease_is_taken_over(app, client, store):
+    # 처리하던 워커가 죽어 선점 연장이 멈춘 키
+    store.claim(7, 'key-1', 'submit', idempotency_hash(app), 3600, 'dead-worker', -1)
+    response = post(client)
+    assert response.status_code == 200
+    assert len(app.calls) == 1
+    row = store.rows[(7, 'key-1')]
+    assert row['status'] == 'completed' and row['lease_token'] is None
+
+
+def idempotency_hash(app) -> str:
+    """post() 가 보내는 기본 요청의 지문"""
+    with app.test_request_context('/submit', method='POST', data={'item': 'a'}):
+        return idempotency.request_fingerprint('submit')
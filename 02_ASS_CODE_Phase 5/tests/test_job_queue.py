@@ -0,0 +1,104 @@
+# tests/test_job_queue.py
+# 작업 큐: 대기/실행 중 취소, 취소 후 자리(세마포어) 반환, 낮은 우선순위 양보, 종료 전 drain
+
+import asyncio
+import threading
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+
+from app.services.job_queue import JobQueue
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(max_concurrency=1, max_low_priority=1)
+    yield queue
+    queue.stop()
+
+
+def wait_for_status(queue, job_id, status, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if queue.get(job_id)['status'] == status:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def blocking_job(release: threading.Event, result='done'):
+    async def _job():
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+        return result
+    return _job
+
+
+def quick_job(result='done'):
+    async def _job():
+        return result
+    return _job
+
+
+def test_runs_job_and_records_result(queue):
+    future = queue.submit('job-1', quick_job('ok'), user_id=3)
+    assert future.result(timeout=2) == 'ok'
+    job = queue.get('job-1')
+    assert job['status'] == 'succeeded' and job['result'] == 'ok' and job['user_id'] == 3
+
+
+def test_cancel_while_queued_frees_nothing_and_records_status(queue):
+    release = threading.Event()
+    running = queue.submit('running', blocking_job(release))
+    assert wait_for_status(queue, 'running', 'running')
+    queued = queue.submit('queued', quick_job())
+    time.sleep(0.05)
+    assert queue.get('queued')['status'] == 'queued'
+
+    queued.cancel()
+    with pytest.raises(CancelledError):
+        queued.result(timeout=2)
+    assert wait_for_status(queue, 'queued', 'cancelled')
+    assert queue.get('queued')['finished_at'] is not None
+
+    release.set()
+    assert running.result(timeout=2) == 'done'
+    # 취소된 대기 작업이 자리를 반환(release)하지 않았으므로 한도는 그대로 1
+    assert queue._semaphore._value == 1
+    assert queue.submit('after', quick_job('next')).result(timeout=2) == 'next'
+
+
+def test_cancel_running_job_releases_slot(queue):
+    future = queue.submit('running', blocking_job(threading.Event()))
+    assert wait_for_status(queue, 'running', 'running')
+    future.cancel()
+    assert wait_for_status(queue, 'running', 'cancelled')
+    assert queue.submit('after', quick_job('next')).result(timeout=2) == 'next'
+    assert queue.stats()['cancelled'] == 1
+
+
+def test_low_priority_waits_for_normal_jobs(queue):
+    release = threading.Event()
+    normal = queue.submit('normal', blocking_job(release))
+    assert wait_for_status(queue, 'normal', 'running')
+    low = queue.submit('low', quick_job('low'), priority='low')
+    time.sleep(0.05)
+    assert queue.get('low')['status'] == 'queued'
+    low.cancel()
+    assert wait_for_status(queue, 'low', 'cancelled')
+    release.set()
+    normal.result(timeout=2)
+    assert queue.submit('low-2', quick_job('low'), priority='low').result(timeout=2) == 'low'
+
+
+def test_drain_cancels_low_priority_and_waits_for_normal(queue):
+    release = threading.Event()
+    normal = queue.submit('normal', blocking_job(release))
+    assert wait_for_status(queue, 'normal', 'running')
+    low = queue.submit('low', quick_job(), priority='low')
+    assert queue.drain(timeout=0.1) == 1 # 일반 작업은 아직 진행 중
+    assert low.cancelled()
+    release.set()
+    assert queue.drain(timeout=2) == 0
+    assert normal.result() == 'done'
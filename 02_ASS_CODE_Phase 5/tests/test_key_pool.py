@@ -0,0 +1,86 @@
+# tests/test_key_pool.py
+# API 키 풀: 403 키 전환, 연속 실패 키 제외(ejection)
+
+import asyncio
+
+import pytest
+
+from app.utils.ai_backends import FakeGenAIClient
+from app.utils.key_pool import ApiKeyPool, PooledGenAIClient
+
+
+def make_pool(*clients, eject_threshold: int = 3) -> PooledGenAIClient:
+    pool = ApiKeyPool(eject_threshold=eject_threshold, eject_seconds=60)
+    for index, client in enumerate(clients, start=1):
+        pool.add_key(f'key{index}', client)
+    return PooledGenAIClient(pool)
+
+
+def rejecting_client(code: int = 403) -> FakeGenAIClient:
+    return FakeGenAIClient(latency=0, failure_rate=1.0, failure_codes=(code,))
+
+
+def test_403_retries_next_key():
+    rejected, healthy = rejecting_client(), FakeGenAIClient(latency=0)
+    client = make_pool(rejected, healthy)
+    # 부하가 같으면 먼저 등록된 키(거절하는 키)가 선택됨
+    response = client.models.generate_content(model='m', contents=['hello'])
+    assert response.text
+    assert (rejected.call_count, healthy.call_count) == (1, 1)
+    status = {k['label']: k for k in client.pool.status()}
+    assert status['key1']['errors_403'] == 1
+    assert status['key2']['errors'] == 0
+
+
+def test_403_from_every_key_is_raised():
+    client = make_pool(rejecting_client(), rejecting_client())
+    with pytest.raises(Exception) as excinfo:
+        client.models.generate_content(model='m', contents=['hello'])
+    assert getattr(excinfo.value, 'code', None) == 403
+    assert all(k['errors_403'] == 1 for k in client.pool.status())
+
+
+def test_429_is_not_retried_on_next_key():
+    throttled, healthy = rejecting_client(429), FakeGenAIClient(latency=0)
+    client = make_pool(throttled, healthy)
+    with pytest.raises(Exception) as excinfo:
+        client.models.generate_content(model='m', contents=['hello'])
+    assert excinfo.value.code == 429 # 재시도/백오프는 resilience 가 담당
+    assert healthy.call_count == 0
+
+
+def test_key_ejected_after_consecutive_failures():
+    throttled, healthy = rejecting_client(429), FakeGenAIClient(latency=0)
+    client = make_pool(throttled, eject_threshold=2)
+    for _ in range(2):
+        with pytest.raises(Exception):
+            client.models.generate_content(model='m', contents=['hello'])
+    status = client.pool.status()[0]
+    assert status['status'] == 'ejected'
+    assert status['ejected_for'] > 0
+
+    # 제외된 키는 부하와 관계없이 선택되지 않음
+    client.pool.add_key('key2', healthy)
+    for _ in range(3):
+        client.models.generate_content(model='m', contents=['hello'])
+    assert (throttled.call_count, healthy.call_count) == (2, 3)
+
+
+def test_success_resets_consecutive_failures():
+    flaky = FakeGenAIClient(latency=0, failure_plan=[429, None, 429])
+    client = make_pool(flaky, eject_threshold=2)
+    for _ in range(3):
+        try:
+            client.models.generate_content(model='m', contents=['hello'])
+        except Exception:
+            pass
+    assert client.pool.status()[0]['status'] == 'ok'
+
+
+def test_async_403_retries_next_key():
+    rejected, healthy = rejecting_client(), FakeGenAIClient(latency=0)
+    client = make_pool(rejected, healthy)
+    response = asyncio.run(client.aio.models.generate_content(model='m', contents=['hello']))
+    assert response.text
+    assert (rejected.call_count, healthy.call_count) == (1, 1)
+    assert all(k['in_flight'] == 0 for k in client.pool.status())
@@ -0,0 +1,41 @@
+# tests/test_resilience.py
+# 시도별 지연시간 메트릭(헤징 지연 기준)은 레이트 리미터/키 대기가 끝나고 요청을 보낸 시각부터 잽니다.
+
+import asyncio
+import time
+
+from app.utils.metrics import metrics
+from app.utils.resilience import (
+    LATENCY_METRIC, RetryPolicy, call_with_resilience, acall_with_resilience, mark_attempt_sent
+)
+
+POLICY = RetryPolicy(max_attempts=1, deadline=5)
+
+
+def test_latency_sample_excludes_wait_before_send():
+    def _call():
+        time.sleep(0.2) # 토큰/키 대기
+        mark_attempt_sent()
+        return 'ok'
+
+    assert call_with_resilience(_call, 'test_sync_wait', POLICY) == 'ok'
+    assert metrics.quantile(LATENCY_METRIC, 1.0, task='test_sync_wait', outcome='ok') < 100
+
+
+def test_async_latency_sample_excludes_wait_before_send():
+    async def _call():
+        await asyncio.sleep(0.2)
+        mark_attempt_sent()
+        return 'ok'
+
+    assert asyncio.run(acall_with_resilience(_call, 'test_async_wait', POLICY)) == 'ok'
+    assert metrics.quantile(LATENCY_METRIC, 1.0, task='test_async_wait', outcome='ok') < 100
+
+
+def test_latency_sample_without_mark_covers_whole_attempt():
+    def _call():
+        time.sleep(0.2)
+        return 'ok'
+
+    call_with_resilience(_call, 'test_unmarked', POLICY)
+    assert metrics.quantile(LATENCY_METRIC, 1.0, task='test_unmarked', outcome='ok') >= 200
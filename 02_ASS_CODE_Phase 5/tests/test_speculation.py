@@ -0,0 +1,138 @@
+# tests/test_speculation.py
+# 추측 합성 상태는 DB 에 있으므로, 추측/취소/실제 합성 요청이 서로 다른 워커(관리자 인스턴스)로 가도 같은 작업을 봅니다.
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services import speculation as speculation_module
+from app.services.job_queue import job_queue
+from app.services.speculation import SpeculativeSynthesis
+
+
+class FakeSpeculationStore:
+    """speculative_syntheses 테이블과 outfit_prefix_cache 키 목록을 흉내 내는 공유 저장소 (마감 없음)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = {} # (user_id, outfit_key) -> {'job_id', 'status'}
+        self.cached = set()
+
+    def start(self, user_id, outfit_key, job_id, ttl_seconds):
+        with self.lock:
+            cancelled = []
+            for (row_user, row_key), row in self.rows.items():
+                if row_user == user_id and row_key != outfit_key and row['status'] == 'running':
+                    row['status'] = 'cancelled'
+                    cancelled.append(row['job_id'])
+            row = self.rows.get((user_id, outfit_key))
+            if row and row['status'] in ('running', 'claimed'):
+                return {'job_id': row['job_id'], 'started': False, 'cancelled': cancelled}
+            self.rows[(user_id, outfit_key)] = {'job_id': job_id, 'status': 'running'}
+            return {'job_id': job_id, 'started': True, 'cancelled': cancelled}
+
+    def cancel(self, user_id):
+        with self.lock:
+            job_ids = []
+            for (row_user, _), row in self.rows.items():
+                if row_user == user_id and row['status'] == 'running':
+                    row['status'] = 'cancelled'
+                    job_ids.append(row['job_id'])
+            return job_ids
+
+    def claim(self, outfit_key):
+        with self.lock:
+            for (_, row_key), row in self.rows.items():
+                if row_key == outfit_key and row['status'] in ('running', 'claimed'):
+                    row['status'] = 'claimed'
+                    return row['job_id']
+            return None
+
+    def status(self, job_id):
+        with self.lock:
+            return next((row['status'] for row in self.rows.values() if row['job_id'] == job_id), None)
+
+    def finish(self, job_id, status):
+        with self.lock:
+            for row in self.rows.values():
+                if row['job_id'] == job_id and row['status'] in ('running', 'claimed'):
+                    row['status'] = status
+            return True
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeSpeculationStore()
+    monkeypatch.setattr(speculation_module, 'start_speculative_synthesis', store.start)
+    monkeypatch.setattr(speculation_module, 'cancel_speculative_synthesis', store.cancel)
+    monkeypatch.setattr(speculation_module, 'claim_speculative_synthesis', store.claim)
+    monkeypatch.setattr(speculation_module, 'get_speculative_synthesis_status', store.status)
+    monkeypatch.setattr(speculation_module, 'finish_speculative_synthesis', store.finish)
+    monkeypatch.setattr(speculation_module, 'find_outfit_prefixes',
+                        lambda keys: [{'prefix_key': key} for key in keys if key in store.cached])
+    return store
+
+
+def _workers(count: int = 2) -> list[SpeculativeSynthesis]:
+    return [SpeculativeSynthesis(enabled=True, poll_ms=20, ttl_seconds=5) for _ in range(count)]
+
+
+def _wait(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "시간 안에 조건을 만족하지 않음"
+        time.sleep(0.01)
+
+
+def test_cancel_on_another_worker_stops_running_job(store):
+    runner, other = _workers()
+    done = threading.Event()
+
+    async def _synthesize():
+        await asyncio.sleep(5)
+        return True
+
+    started = runner.start(1, 'key-a', _synthesize, on_done=done.set)
+    assert started['started']
+    # 같은 코디는 다른 워커에서 요청해도 새로 시작하지 않음
+    assert other.start(1, 'key-a', _synthesize) == {'job_id': started['job_id'], 'started': False}
+
+    assert other.cancel(1)
+    assert done.wait(5)
+    assert store.status(started['job_id']) == 'cancelled'
+    assert job_queue.get(started['job_id'])['status'] == 'cancelled'
+
+
+def test_claim_on_another_worker_waits_for_shared_cache(store):
+    runner, other = _workers()
+    release = threading.Event()
+
+    async def _synthesize():
+        await asyncio.to_thread(release.wait, 5)
+        store.cached.add('key-b') # outfit_cache.store
+        return True
+
+    started = runner.start(2, 'key-b', _synthesize)
+    job_id = other.claim('key-b')
+    assert job_id == started['job_id']
+    # 가져간 작업은 아이템이 바뀌어도 취소되지 않음
+    assert not other.cancel(2)
+
+    release.set()
+    assert asyncio.run(other.await_claimed('key-b', job_id, timeout=5))
+    _wait(lambda: store.status(job_id) == 'completed')
+
+
+def test_claimed_job_that_fails_falls_back(store):
+    runner, other = _workers()
+
+    async def _synthesize():
+        await asyncio.sleep(0.05)
+        return False # 합성 실패 - 캐시에 없음
+
+    runner.start(3, 'key-c', _synthesize)
+    job_id = other.claim('key-c')
+    assert other.wait_claimed('key-c', job_id, timeout=5) is False
+    assert store.status(job_id) == 'failed'
@@ -0,0 +1,133 @@
+# tests/test_synthesis_history.py
+# 합성 기록: 썸네일/스프라이트는 요청 안에서 만들지 않고 작업 큐(낮은 우선순위)에서 만든 뒤 반영, 기록 목록 키셋 페이지네이션
+
+import threading
+import time
+
+import pytest
+from flask import Flask
+from PIL import Image
+
+from app.routes import synthesize
+from app.services import synthesis_history as history_module
+from app.services.job_queue import job_queue
+from app.services.synthesis_history import SynthesisHistory, SPRITE_COLUMNS
+from app.services.thumbnail_service import sprite_filename
+
+
+def _wait_job(job_id: str, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = job_queue.get(job_id)
+        if job and job['finished_at']:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"작업이 끝나지 않음: {job_id}")
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    thumbnails = {}
+    monkeypatch.setattr(history_module, 'add_synthesis_record', lambda *args, **kwargs: 7)
+    monkeypatch.setattr(history_module, 'set_synthesis_thumbnail',
+                        lambda record_id, filename, placeholder: thumbnails.update({record_id: (filename, placeholder)}) or True)
+    monkeypatch.setattr(history_module, 'file_digest', lambda path: 'digest')
+    (tmp_path / 'sprites').mkdir()
+    history = SynthesisHistory()
+    history.configure(enabled=True, output_folder=str(tmp_path), thumbnail_side=64,
+                      sprite_folder=str(tmp_path / 'sprites'), sprite_cell=32)
+    history.thumbnails = thumbnails
+    return history
+
+
+def _save_output(folder, name: str) -> str:
+    Image.new('RGB', (200, 300), 'navy').save(folder / name)
+    return name
+
+
+def test_record_builds_thumbnail_in_job_queue(history, tmp_path, monkeypatch):
+    release = threading.Event()
+    save_thumbnail = history_module.save_thumbnail
+
+    def _blocked_save(*args, **kwargs):
+        assert release.wait(5)
+        return save_thumbnail(*args, **kwargs)
+
+    monkeypatch.setattr(history_module, 'save_thumbnail', _blocked_save)
+    name = _save_output(tmp_path, 'out.png')
+
+    # 썸네일 작업이 막혀 있어도 기록은 바로 끝남
+    assert history.record(1, 'web', [{'type': 'top', 'path': 'item.png'}], {'output_filename': name}) == 7
+    assert 7 not in history.thumbnails
+    release.set()
+
+    assert _wait_job('thumb-7')['status'] == 'succeeded'
+    filename, placeholder = history.thumbnails[7]
+    assert (tmp_path / filename).is_file()
+    assert placeholder.startswith('data:image/')
+
+
+def test_page_sprite_is_built_in_background_then_reused(history, tmp_path):
+    app = Flask(__name__)
+    app.register_blueprint(synthesize.bp)
+    records = []
+    for record_id in (1, 2):
+        name = _save_output(tmp_path, f'out_{record_id}.png')
+        filename, _ = history._save_thumbnail(name)
+        records.append({'id': record_id, 'output_filename': name, 'thumbnail_filename': filename})
+    pending = {'id': 3, 'output_filename': _save_output(tmp_path, 'out_3.png'), 'thumbnail_filename': None}
+
+    with app.test_request_context():
+        # 처음에는 스프라이트 없이 응답하고 작업 큐에서 만듦 (썸네일 없는 기록은 썸네일 작업 요청)
+        assert history.page_sprite(records + [pending]) == (None, {})
+        paths = [str(tmp_path / record['thumbnail_filename']) for record in records]
+        assert _wait_job(f"sprite-{sprite_filename(paths, 32, SPRITE_COLUMNS)}")['status'] == 'succeeded'
+        assert _wait_job('thumb-3')['status'] == 'succeeded'
+        assert history.thumbnails[3][0]
+
+        sprite, indexes = history.page_sprite(records + [pending])
+        assert sprite['columns'] == 2 and sprite['rows'] == 1
+        assert indexes == {1: 0, 2: 1}
+        assert history.to_json(dict(pending, created_at=None, source='web', base_model_id=None, item_types=['top'],
+                                    strategy=None, model_name=None, watermarked=False, output_bytes=None,
+                                    output_digest=None, queue_ms=None, synthesis_ms=None,
+                                    total_ms=None))['thumbnail_url'] is None
+
+
+def _keyset_page(rows: list[dict], limit: int, before_id: int = None) -> list[dict]:
+    """get_syntheses 와 같은 키셋 조회 (id < before_id, 최신순)"""
+    return sorted((row for row in rows if before_id is None or row['id'] < before_id),
+                  key=lambda row: row['id'], reverse=True)[:limit]
+
+
+def test_history_route_pages_with_keyset(monkeypatch):
+    rows = [{'id': record_id} for record_id in (3, 5, 8, 13, 21)]
+    calls = []
+
+    def _get_syntheses(user_id, limit, before_id=None):
+        calls.append((limit, before_id))
+        return _keyset_page(rows, limit, before_id)
+
+    monkeypatch.setattr(synthesize, 'get_syntheses', _get_syntheses)
+    monkeypatch.setattr(synthesize.synthesis_history, 'enabled', True)
+    monkeypatch.setattr(synthesize.synthesis_history, 'page_sprite', lambda records: (None, {}))
+    monkeypatch.setattr(synthesize.synthesis_history, 'to_json', lambda record, sprite_index=None: {'id': record['id']})
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'test'
+    app.register_blueprint(synthesize.bp)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+
+    pages, before = [], None
+    while True:
+        query = {'limit': 2, **({'before': before} if before else {})}
+        page = client.get('/synthesize/history', query_string=query, headers={'Accept': 'application/json'}).get_json()
+        pages.append([item['id'] for item in page['items']])
+        before = page['next_before']
+        if before is None:
+            break
+
+    assert pages == [[21, 13], [8, 5], [3]]
+    # 다음 페이지 확인용으로 한 개 더, 이전 페이지 마지막 ID 부터 조회 (OFFSET 없음)
+    assert calls == [(3, None), (3, 13), (3, 5)]
@@ -0,0 +1,60 @@
+# tests/test_synthesis_strategies.py
+# parallel 전략의 실패 시 나머지 호출 취소, 코디 캐시 키의 전략/축소 크기 구분
+
+import asyncio
+
+import pytest
+from PIL import Image
+
+from app.services import synthesis_strategies
+from app.services.outfit_cache import prefix_keys
+
+
+@pytest.fixture
+def fake_calls(monkeypatch):
+    """아이템의 'delay' 초 뒤에 'result' 를 반환(또는 발생)하는 가짜 모델 호출"""
+    cancelled = []
+
+    async def _call(client, base_image_path, items, max_image_side=None, base_is_outfit=False):
+        item = items[0]
+        try:
+            await asyncio.sleep(item['delay'])
+        except asyncio.CancelledError:
+            cancelled.append(item['type'])
+            raise
+        if isinstance(item['result'], Exception):
+            raise item['result']
+        return item['result']
+
+    monkeypatch.setattr(synthesis_strategies, 'asynthesize_multi_items', _call)
+    return cancelled
+
+
+def run_parallel(items):
+    return asyncio.run(synthesis_strategies.asynthesize_with_strategy(None, 'parallel', 'base.png', items))
+
+
+def test_parallel_failure_cancels_pending_calls(fake_calls):
+    items = [{'type': 'top', 'delay': 0.01, 'result': None}, {'type': 'bottom', 'delay': 5, 'result': b'png'}]
+    assert run_parallel(items) is None
+    assert fake_calls == ['bottom']
+
+
+def test_parallel_error_cancels_pending_calls(fake_calls):
+    items = [{'type': 'top', 'delay': 0.01, 'result': RuntimeError('boom')},
+             {'type': 'bottom', 'delay': 5, 'result': b'png'}]
+    with pytest.raises(RuntimeError):
+        run_parallel(items)
+    assert fake_calls == ['bottom']
+
+
+def test_prefix_keys_depend_on_strategy_and_image_side(tmp_path):
+    base, item = tmp_path / 'base.png', tmp_path / 'item.png'
+    Image.new('RGB', (8, 8), 'white').save(base)
+    Image.new('RGB', (8, 8), 'red').save(item)
+    items = [{'type': 'top', 'path': str(item)}]
+
+    key = prefix_keys('model', str(base), items, 'single', None)
+    assert key == prefix_keys('model', str(base), items, 'SINGLE', None)
+    assert key != prefix_keys('model', str(base), items, 'parallel', None)
+    assert key != prefix_keys('model', str(base), items, 'single', 1024)
@@ -0,0 +1,56 @@
+# tests/test_wardrobe.py
+# 옷장 목록: 키셋 페이지네이션(before=이전 페이지 마지막 ID)과 종류 필터
+
+import pytest
+from flask import Flask
+
+from app.routes import wardrobe as wardrobe_routes
+
+
+@pytest.fixture
+def fake_items(monkeypatch):
+    rows = [{'id': item_id, 'item_type': item_type}
+            for item_id, item_type in ((2, 'top'), (4, 'bottom'), (6, 'top'), (9, 'top'), (12, 'bottom'))]
+    calls = []
+
+    def _get_wardrobe_items(user_id, limit, before_id=None, item_type=None):
+        calls.append((limit, before_id, item_type))
+        matched = [row for row in rows if (before_id is None or row['id'] < before_id)
+                   and (item_type is None or row['item_type'] == item_type)]
+        return sorted(matched, key=lambda row: row['id'], reverse=True)[:limit]
+
+    monkeypatch.setattr(wardrobe_routes, 'get_wardrobe_items', _get_wardrobe_items)
+    monkeypatch.setattr(wardrobe_routes.wardrobe, 'to_json', lambda item: {'id': item['id'], 'item_type': item['item_type']})
+    return calls
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', WARDROBE_ENABLED=True)
+    app.register_blueprint(wardrobe_routes.bp, url_prefix='/wardrobe')
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    return client
+
+
+def _all_pages(client, **query) -> list[list[int]]:
+    pages, before = [], None
+    while True:
+        params = dict(query, **({'before': before} if before else {}))
+        page = client.get('/wardrobe/items', query_string=params, headers={'Accept': 'application/json'}).get_json()
+        pages.append([item['id'] for item in page['items']])
+        before = page['next_before']
+        if before is None:
+            return pages
+
+
+def test_wardrobe_items_keyset_pages(client, fake_items):
+    assert _all_pages(client, limit=2) == [[12, 9], [6, 4], [2]]
+    assert fake_items == [(3, None, None), (3, 9, None), (3, 4, None)]
+
+
+def test_wardrobe_items_keyset_pages_with_type_filter(client, fake_items):
+    assert _all_pages(client, limit=2, type='top') == [[9, 6], [2]]
+    assert fake_items == [(3, None, 'top'), (3, 6, 'top')]
@@ -0,0 +1,13 @@
+# wsgi.py
+# 운영 서버용 WSGI 진입점: gunicorn -c gunicorn.conf.py wsgi:app
+# (개발 서버는 run.py - 디버거/자동 재시작은 운영에서 사용하지 않습니다)
+
+import os
+from dotenv import load_dotenv
+
+# .env 파일 로드 (Flask 앱 생성 전에 환경 변수 로드)
+load_dotenv()
+
+from app import create_app
+
+app = create_app(os.getenv('FLASK_ENV') or 'production')
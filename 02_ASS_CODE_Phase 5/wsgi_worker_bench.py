@@ -0,0 +1,206 @@
+# wsgi_worker_bench.py
+# gunicorn 워커 종류(sync / gthread / gevent / uvicorn)별 처리량과 지연 측정 (가짜 AI 백엔드, API 키/DB 불필요)
+#
+# 사용 예:
+#   1) 기본 비교:            python wsgi_worker_bench.py --workers 2 --concurrency 64 --requests 400
+#   2) 느린 AI 호출 가정:     python wsgi_worker_bench.py --fake-latency 5 --concurrency 200 --requests 600 --classes gthread,gevent
+#   3) 스레드 수 조정:        python wsgi_worker_bench.py --classes gthread --threads 8,16,32
+#   4) 비동기 라우트(ASGI):   python wsgi_worker_bench.py --classes gthread,uvicorn --concurrency 500 --requests 2000
+#
+# 워커 종류마다 gunicorn.conf.py 로 서버를 띄우고(AI_BACKEND=fake), 로그인 세션 쿠키를 만들어 /classify_item 에
+# 동시에 요청을 보냅니다. 요청마다 다른 이미지를 보내므로 분류 캐시를 타지 않고 매번 (가짜) AI 호출을 기다립니다.
+# 분류 캐시 조회는 DB 가 없으면 실패하고 넘어가므로 결과는 "AI 호출 대기 + 요청 처리 오버헤드" 비교입니다.
+# uvicorn 은 asgi:app (비동기 라우트)으로 띄웁니다. gevent / uvicorn 은 설치되어 있을 때만 측정합니다.
+
+import argparse
+import csv
+import importlib.util
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import requests
+from flask import Flask
+from PIL import Image
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BENCH_SECRET_KEY = 'wsgi-worker-bench-secret'
+# 이름 -> (gunicorn 워커 클래스, 앱, 필요한 패키지)
+WORKER_CLASSES = {
+    'sync': ('sync', 'wsgi:app', None),
+    'gthread': ('gthread', 'wsgi:app', None),
+    'gevent': ('gevent', 'wsgi:app', 'gevent'),
+    'uvicorn': ('uvicorn.workers.UvicornWorker', 'asgi:app', 'uvicorn'),
+}
+
+
+def session_cookie(secret_key: str, user_id: int = 1) -> str:
+    """앱과 같은 SECRET_KEY 로 서명한 로그인 세션 쿠키 값"""
+    app = Flask(__name__)
+    app.secret_key = secret_key
+    return app.session_interface.get_signing_serializer(app).dumps({'user_id': user_id, 'username': 'bench'})
+
+
+def make_image(seed: int, side: int) -> bytes:
+    """요청마다 다른 작은 PNG (분류 캐시를 타지 않도록)"""
+    image = Image.effect_noise((side, side), 30 + seed % 50).convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(name: str, workers: int, threads: int, port: int, args) -> subprocess.Popen:
+    worker_class, app_target, _ = WORKER_CLASSES[name]
+    env = dict(os.environ, AI_BACKEND='fake', FAKE_AI_LATENCY=str(args.fake_latency),
+               FAKE_AI_LATENCY_JITTER=str(args.fake_latency_jitter), FAKE_AI_FAILURE_RATE='0',
+               FLASK_SECRET_KEY=BENCH_SECRET_KEY, CACHE_WARM_ENABLED='false', AI_MODEL_PROBE_ENABLED='false',
+               GUNICORN_BIND=f'127.0.0.1:{port}', GUNICORN_WORKER_CLASS=worker_class,
+               GUNICORN_WORKERS=str(workers), GUNICORN_THREADS=str(threads),
+               GUNICORN_WORKER_CONNECTIONS=str(max(threads, args.concurrency)),
+               GUNICORN_ACCESS_LOG='/dev/null', GUNICORN_MAX_REQUESTS='0')
+    log = open(os.path.join(args.log_dir, f'gunicorn_{name}_{threads}.log'), 'w')
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', app_target],
+                               cwd=HERE, env=env, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn 시작 실패 ({name}) - 로그: {log.name}")
+        try:
+            requests.get(f'http://127.0.0.1:{port}/auth/login', timeout=1)
+            return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f"gunicorn 시작 시간 초과 ({name}) - 로그: {log.name}")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+
+
+def run_load(port: int, cookie: str, total: int, concurrency: int, image_side: int) -> dict:
+    """total 개 요청을 concurrency 개씩 동시에 보내고 지연/오류를 집계합니다."""
+    url = f'http://127.0.0.1:{port}/classify_item'
+    images = [make_image(i, image_side) for i in range(total)]
+
+    def _one(index: int) -> tuple[float, int]:
+        started = time.perf_counter()
+        try:
+            response = requests.post(url, files={'item_image': (f'item_{index}.png', images[index], 'image/png')},
+                                     cookies={'session': cookie}, headers={'Accept': 'application/json'}, timeout=300)
+            status = response.status_code
+        except requests.RequestException:
+            status = 0
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(_one, range(total)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, status in results if status == 200)
+    errors = sum(1 for _, status in results if status != 200)
+
+    def _pct(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else 0.0
+
+    return {
+        'requests': total, 'errors': errors, 'wall_s': round(wall, 2),
+        'throughput_rps': round((total - errors) / wall, 2) if wall else 0.0,
+        'p50_ms': round(_pct(0.50)), 'p95_ms': round(_pct(0.95)), 'p99_ms': round(_pct(0.99)),
+        'mean_ms': round(statistics.fmean(latencies)) if latencies else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='gunicorn 워커 종류별 처리량/지연 비교 (가짜 AI 백엔드)')
+    parser.add_argument('--classes', default='sync,gthread,gevent,uvicorn', help=f"워커 종류 (쉼표 구분: {', '.join(WORKER_CLASSES)})")
+    parser.add_argument('--workers', type=int, default=2, help='워커 프로세스 수')
+    parser.add_argument('--threads', default='16', help='gthread 워커당 스레드 수 (쉼표로 여러 값)')
+    parser.add_argument('--concurrency', type=int, default=64, help='동시 요청 수')
+    parser.add_argument('--requests', type=int, default=400, help='워커 종류별 전체 요청 수')
+    parser.add_argument('--warmup', type=int, default=10, help='측정 전 요청 수')
+    parser.add_argument('--fake-latency', type=float, default=1.0, help='가짜 AI 호출 지연(초)')
+    parser.add_argument('--fake-latency-jitter', type=float, default=0.2, help='가짜 AI 호출 지연 편차(초)')
+    parser.add_argument('--image-side', type=int, default=256, help='요청 이미지 한 변 길이(px)')
+    parser.add_argument('--startup-timeout', type=float, default=60, help='서버 시작 대기(초)')
+    parser.add_argument('--log-dir', default=os.path.join(tempfile.gettempdir(), 'wsgi_worker_bench'), help='gunicorn 로그 폴더')
+    parser.add_argument('--csv', help='결과를 저장할 CSV 경로')
+    args = parser.parse_args()
+
+    if importlib.util.find_spec('gunicorn') is None:
+        sys.exit("gunicorn 이 설치되어 있지 않습니다. (pip install gunicorn)")
+    os.makedirs(args.log_dir, exist_ok=True)
+    cookie = session_cookie(BENCH_SECRET_KEY)
+
+    runs = []
+    for worker_class in [name.strip() for name in args.classes.split(',') if name.strip()]:
+        if worker_class not in WORKER_CLASSES:
+            sys.exit(f"알 수 없는 워커 종류: {worker_class} ({', '.join(WORKER_CLASSES)})")
+        package = WORKER_CLASSES[worker_class][2]
+        if package and importlib.util.find_spec(package) is None:
+            print(f"{package} 미설치 - {worker_class} 건너뜀 (pip install {package})")
+            continue
+        thread_counts = [int(t) for t in args.threads.split(',')] if worker_class == 'gthread' else [1]
+        for threads in thread_counts:
+            runs.append((worker_class, threads))
+
+    rows = []
+    for worker_class, threads in runs:
+        port = free_port()
+        label = f"{worker_class}" + (f" x{threads}" if worker_class == 'gthread' else '')
+        print(f"\n[{label}] 워커 {args.workers}개, 동시 요청 {args.concurrency}, 요청 {args.requests}개 "
+              f"(가짜 AI 지연 {args.fake_latency}s)")
+        process = start_server(worker_class, args.workers, threads, port, args)
+        try:
+            cookie_check = requests.get(f'http://127.0.0.1:{port}/', cookies={'session': cookie},
+                                        headers={'Accept': 'application/json'}, allow_redirects=False, timeout=30)
+            if cookie_check.status_code == 401:
+                raise RuntimeError("세션 쿠키가 거부되었습니다. (FLASK_SECRET_KEY 확인)")
+            if args.warmup:
+                run_load(port, cookie, args.warmup, min(args.warmup, args.concurrency), args.image_side)
+            result = run_load(port, cookie, args.requests, args.concurrency, args.image_side)
+        finally:
+            stop_server(process)
+        row = {'worker_class': worker_class, 'threads': threads, 'workers': args.workers,
+               'concurrency': args.concurrency, **result}
+        rows.append(row)
+        print(f"  처리량 {row['throughput_rps']} req/s, p50 {row['p50_ms']}ms, p95 {row['p95_ms']}ms, "
+              f"p99 {row['p99_ms']}ms, 오류 {row['errors']}/{row['requests']} ({row['wall_s']}s)")
+
+    if not rows:
+        return
+    print(f"\n{'worker':<14}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for row in rows:
+        label = row['worker_class'] + (f" x{row['threads']}" if row['worker_class'] == 'gthread' else '')
+        print(f"{label:<14}{row['throughput_rps']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}"
+              f"{row['errors']:>8}")
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"\nCSV 저장: {args.csv}")
+
+
+if __name__ == '__main__':
+    main()
@@ -105,6 +105,264 @@ COMMENT ON COLUMN usage_tracking.count IS '해당 사용자의 해당 날짜 사
 COMMENT ON COLUMN usage_tracking.last_attempt_at IS '해당 날짜의 마지막 시도 시각';
 
 
+-- Create the 'classification_cache' table
+-- 아이템 분류 결과를 지각 해시(pHash) 기준으로 캐싱 (재시작/워커 간 공유)
+CREATE TABLE IF NOT EXISTS classification_cache (
+    id SERIAL PRIMARY KEY,                      -- 캐시 항목 고유 ID
+    phash BIGINT NOT NULL UNIQUE,               -- 64비트 pHash (부호 있는 BIGINT 로 저장)
+    dhash BIGINT NOT NULL,                      -- 64비트 dHash (검증용)
+    band0 INTEGER NOT NULL,                     -- pHash 상위 16비트
+    band1 INTEGER NOT NULL,
+    band2 INTEGER NOT NULL,
+    band3 INTEGER NOT NULL,                     -- pHash 하위 16비트
+    item_type VARCHAR(50) NOT NULL,             -- 분류 결과 ('top', 'bottom' 등)
+    hit_count INTEGER NOT NULL DEFAULT 0,       -- 캐시 적중 횟수
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP, -- 생성 시각
+    last_hit_at TIMESTAMP WITH TIME ZONE        -- 마지막 적중 시각
+);
+
+-- 밴드 일치로 해밍 거리 후보를 찾기 위한 인덱스
+CREATE INDEX IF NOT EXISTS idx_classification_cache_band0 ON classification_cache (band0);
+CREATE INDEX IF NOT EXISTS idx_classification_cache_band1 ON classification_cache (band1);
+CREATE INDEX IF NOT EXISTS idx_classification_cache_band2 ON classification_cache (band2);
+CREATE INDEX IF NOT EXISTS idx_classification_cache_band3 ON classification_cache (band3);
+
+COMMENT ON TABLE classification_cache IS '지각 해시 기반 아이템 분류 결과 캐시';
+COMMENT ON COLUMN classification_cache.phash IS '64비트 pHash (리사이즈/재압축 사본도 해밍 거리가 작음)';
+COMMENT ON COLUMN classification_cache.hit_count IS '캐시 적중 횟수 (적중률 통계용)';
+
+
+-- Create the 'ai_rate_limit_buckets' table
+-- AI API 호출 토큰 버킷 상태 (AI_RATE_LIMIT_STORE=postgres 일 때 여러 노드가 공유)
+CREATE TABLE IF NOT EXISTS ai_rate_limit_buckets (
+    bucket_key VARCHAR(255) PRIMARY KEY,        -- 버킷 키 ('task:synthesize', 'model:<모델 이름>')
+    tokens DOUBLE PRECISION,                    -- 남은 토큰 수 (NULL 이면 가득 찬 상태로 시작)
+    updated_at DOUBLE PRECISION                 -- 마지막 보충 시각 (UNIX epoch 초)
+);
+
+COMMENT ON TABLE ai_rate_limit_buckets IS 'AI API 호출 레이트 리미터 토큰 버킷 (노드 간 공유)';
+
+
+-- Create the 'synthesis_jobs' table
+-- 비동기 합성 작업 상태 (POST /synthesize/jobs 로 생성, 어느 워커에서든 조회 가능)
+CREATE TABLE IF NOT EXISTS synthesis_jobs (
+    job_id VARCHAR(64) PRIMARY KEY,             -- 작업 ID (UUID)
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE, -- 요청한 사용자
+    status VARCHAR(20) NOT NULL DEFAULT 'queued', -- queued, running, succeeded, failed, timeout
+    item_count INTEGER NOT NULL DEFAULT 0,      -- 합성할 아이템 수
+    output_filename VARCHAR(255),               -- 성공 시 결과 파일 이름 (outputs 폴더)
+    error_message TEXT,                         -- 실패 시 오류 메시지
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS idx_synthesis_jobs_user_id ON synthesis_jobs (user_id, created_at DESC);
+
+COMMENT ON TABLE synthesis_jobs IS '비동기 합성 작업 상태';
+
+
+-- Create the 'ai_calls' table
+-- AI 모델 호출 기록 (호출마다 1행, 백그라운드에서 일괄 저장) - 사용자별/모델별 비용 집계용
+CREATE TABLE IF NOT EXISTS ai_calls (
+    id BIGSERIAL PRIMARY KEY,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    user_id INTEGER REFERENCES users(id) ON DELETE SET NULL, -- 호출한 사용자 (배치/백그라운드 호출은 NULL)
+    task VARCHAR(50) NOT NULL,                  -- 작업 종류 ('classify', 'synthesize')
+    model_name VARCHAR(255) NOT NULL,           -- 호출한 모델
+    status VARCHAR(20) NOT NULL,                -- ok, error, timeout, cancelled
+    attempts INTEGER NOT NULL DEFAULT 1,        -- 시도 수 (재시도/헤징 포함)
+    retries INTEGER NOT NULL DEFAULT 0,         -- attempts - 1
+    request_bytes BIGINT,                       -- 요청 크기 (인코딩된 이미지 + 텍스트)
+    response_bytes BIGINT,                      -- 응답 크기 (이미지 + 텍스트)
+    prompt_tokens INTEGER,                      -- usage_metadata.prompt_token_count
+    output_tokens INTEGER,                      -- usage_metadata.candidates_token_count (+ thoughts)
+    total_tokens INTEGER,                       -- usage_metadata.total_token_count
+    ttfb_ms INTEGER,                            -- 성공한 시도의 요청 전송 ~ 응답 수신 (ms)
+    latency_ms INTEGER,                         -- 재시도/대기 포함 전체 지연 (ms)
+    rate_limit_wait_ms INTEGER,                 -- 레이트 리미터 대기 시간 합계 (ms)
+    finish_reason VARCHAR(50),                  -- STOP, SAFETY, MAX_TOKENS 등
+    error_code INTEGER,                         -- 실패 시 HTTP 상태 코드
+    cost_usd NUMERIC(12, 6)                     -- AI_MODEL_PRICES 기준 추정 비용
+);
+
+CREATE INDEX IF NOT EXISTS idx_ai_calls_created_at ON ai_calls (created_at);
+CREATE INDEX IF NOT EXISTS idx_ai_calls_user_created ON ai_calls (user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_ai_calls_model_created ON ai_calls (model_name, created_at);
+
+COMMENT ON TABLE ai_calls IS 'AI 모델 호출별 토큰/바이트/지연 기록 (비용 집계용)';
+
+
+-- Create the 'outfit_prefix_cache' table
+-- 점진적 합성용 중간 결과 캐시: 아이템 목록의 각 접두(prefix)까지 적용한 합성 이미지 (이미지 파일은 SYNTH_CACHE_FOLDER)
+CREATE TABLE IF NOT EXISTS outfit_prefix_cache (
+    prefix_key CHAR(64) PRIMARY KEY,            -- sha256(모델 + 베이스 이미지 + 아이템 1..n 의 종류/내용 해시) 체인
+    model_name VARCHAR(255) NOT NULL,           -- 합성한 모델
+    item_count INTEGER NOT NULL,                -- 적용된 아이템 수 (접두 길이)
+    chain_depth INTEGER NOT NULL DEFAULT 0,     -- 처음부터 합성한 결과 위에 점진 합성을 몇 번 쌓았는지 (0 = 처음부터 합성)
+    file_path TEXT NOT NULL,                    -- 중간 결과 PNG 경로 (워터마크 적용 전)
+    hit_count INTEGER NOT NULL DEFAULT 0,       -- 재사용 횟수
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    last_used_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_outfit_prefix_cache_last_used ON outfit_prefix_cache (last_used_at);
+
+COMMENT ON TABLE outfit_prefix_cache IS '점진적 합성 중간 결과 캐시 (아이템 목록 접두별, 내용 해시 키)';
+
+
+-- Create the 'speculative_syntheses' table
+-- 추측 합성 진행 상태: 추측 요청, 실제 합성 요청(claim), 취소 요청이 서로 다른 워커로 가도 같은 작업을 보도록 DB 에 둠
+-- 결과 이미지는 outfit_prefix_cache 에 저장되며, 실제 합성 요청은 그 캐시와 이 상태를 확인하며 기다림
+CREATE TABLE IF NOT EXISTS speculative_syntheses (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    outfit_key CHAR(64) NOT NULL,               -- 아이템 목록 전체의 outfit_prefix_cache 키
+    job_id VARCHAR(64) NOT NULL UNIQUE,         -- 작업 큐 작업 ID (spec-...)
+    status VARCHAR(20) NOT NULL DEFAULT 'running', -- 'running', 'claimed'(실제 요청이 기다리는 중, 취소 안 함), 'cancelled', 'completed', 'failed'
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL, -- 작업 마감 시각 (지나도 running 이면 작업하던 워커가 죽은 것으로 봄)
+    PRIMARY KEY (user_id, outfit_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_speculative_syntheses_key ON speculative_syntheses (outfit_key);
+CREATE INDEX IF NOT EXISTS idx_speculative_syntheses_expires ON speculative_syntheses (expires_at);
+
+COMMENT ON TABLE speculative_syntheses IS '사용자/코디별 추측 합성 진행 상태 (워커 간 공유)';
+
+
+-- Create the 'item_popularity' / 'item_pair_popularity' tables
+-- 아이템 인기도: 합성에 사용된 아이템(내용 해시)과 함께 사용된 아이템 쌍의 사용 횟수 (캐시 예열 대상 선정용)
+CREATE TABLE IF NOT EXISTS item_popularity (
+    item_digest CHAR(64) PRIMARY KEY,           -- 아이템 이미지 내용 sha256 (전처리 후)
+    item_type VARCHAR(50) NOT NULL,             -- 아이템 종류 (top, bottom, ...)
+    file_path TEXT NOT NULL,                    -- 예열용으로 보관한 아이템 이미지 경로 (CACHE_WARM_ITEM_FOLDER)
+    use_count INTEGER NOT NULL DEFAULT 0,       -- 합성에 사용된 전체 횟수 (순위는 item_usage_daily 의 최근 기간 합계)
+    last_used_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+DROP INDEX IF EXISTS idx_item_popularity_rank; -- 전체 횟수 순위 인덱스 (최근 기간 집계로 바뀌어 사용하지 않음)
+CREATE INDEX IF NOT EXISTS idx_item_popularity_last_used ON item_popularity (last_used_at);
+
+CREATE TABLE IF NOT EXISTS item_pair_popularity (
+    first_digest CHAR(64) NOT NULL REFERENCES item_popularity(item_digest) ON DELETE CASCADE,  -- 요청에서 앞선 아이템
+    second_digest CHAR(64) NOT NULL REFERENCES item_popularity(item_digest) ON DELETE CASCADE, -- 뒤의 아이템 (합성 캐시 키가 순서에 의존)
+    use_count INTEGER NOT NULL DEFAULT 0,
+    last_used_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (first_digest, second_digest)
+);
+
+DROP INDEX IF EXISTS idx_item_pair_popularity_rank;
+CREATE INDEX IF NOT EXISTS idx_item_pair_popularity_last_used ON item_pair_popularity (last_used_at);
+
+-- 일별 사용 횟수: 인기 순위는 최근 CACHE_WARM_DAYS 일 안의 사용 횟수 합으로 정함 (오래 전 사용 횟수가 순위를 차지하지 않도록)
+CREATE TABLE IF NOT EXISTS item_usage_daily (
+    item_digest CHAR(64) NOT NULL REFERENCES item_popularity(item_digest) ON DELETE CASCADE,
+    usage_date DATE NOT NULL DEFAULT CURRENT_DATE,
+    use_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (item_digest, usage_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_item_usage_daily_date ON item_usage_daily (usage_date);
+
+CREATE TABLE IF NOT EXISTS item_pair_usage_daily (
+    first_digest CHAR(64) NOT NULL,
+    second_digest CHAR(64) NOT NULL,
+    usage_date DATE NOT NULL DEFAULT CURRENT_DATE,
+    use_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (first_digest, second_digest, usage_date),
+    FOREIGN KEY (first_digest, second_digest)
+        REFERENCES item_pair_popularity(first_digest, second_digest) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_item_pair_usage_daily_date ON item_pair_usage_daily (usage_date);
+
+COMMENT ON TABLE item_popularity IS '합성에 사용된 아이템별 사용 횟수 (인기 아이템 캐시 예열)';
+COMMENT ON TABLE item_pair_popularity IS '함께 합성된 아이템 쌍별 사용 횟수 (인기 코디 캐시 예열)';
+COMMENT ON TABLE item_usage_daily IS '아이템별 일별 사용 횟수 (최근 기간 인기 순위 집계)';
+COMMENT ON TABLE item_pair_usage_daily IS '아이템 쌍별 일별 사용 횟수 (최근 기간 인기 순위 집계)';
+
+
+-- Create the 'idempotency_keys' table
+-- 합성 요청 멱등 키: 같은 Idempotency-Key 로 다시 보낸 요청(재전송/중복 클릭)에는 처음 요청의 응답을 돌려줌
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    idem_key VARCHAR(255) NOT NULL,             -- 클라이언트가 요청마다 만든 키 (crypto.randomUUID)
+    endpoint VARCHAR(100) NOT NULL,             -- 키를 사용한 엔드포인트
+    request_hash CHAR(64) NOT NULL,             -- 요청 내용(폼 필드/파일) sha256 - 같은 키로 다른 요청을 보내면 거절
+    status VARCHAR(20) NOT NULL DEFAULT 'in_progress', -- in_progress / completed
+    response_status INTEGER,                    -- 저장한 응답 상태 코드
+    response_body TEXT,                         -- 저장한 응답 본문
+    content_type VARCHAR(100),                  -- 저장한 응답 형식 (application/json, application/x-ndjson)
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL, -- 이후에는 같은 키를 새 요청으로 처리 (IDEMPOTENCY_TTL_HOURS)
+    lease_token CHAR(32),                       -- 처리 중인 요청(선점한 워커)의 토큰 - 갱신/완료/삭제는 이 토큰으로만
+    lease_until TIMESTAMP WITH TIME ZONE,       -- in_progress 선점 만료 시각 (처리 중 주기적으로 연장, 지나면 다른 요청이 이어받음)
+    PRIMARY KEY (user_id, idem_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys (expires_at);
+
+-- lease 열 추가 전에 만든 테이블용
+ALTER TABLE idempotency_keys ADD COLUMN IF NOT EXISTS lease_token CHAR(32);
+ALTER TABLE idempotency_keys ADD COLUMN IF NOT EXISTS lease_until TIMESTAMP WITH TIME ZONE;
+
+COMMENT ON TABLE idempotency_keys IS '합성 요청 멱등 키 (재전송 시 같은 작업/결과 반환)';
+
+
+-- Create the 'wardrobe_items' table
+-- 사용자별 옷장: 전처리된 아이템 이미지(내용 해시로 중복 제거)와 분류된 종류, 썸네일
+CREATE TABLE IF NOT EXISTS wardrobe_items (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    item_digest CHAR(64) NOT NULL,              -- 전처리 후 이미지 내용 sha256 (합성 캐시 키와 같음)
+    item_type VARCHAR(50) NOT NULL,             -- 아이템 종류 (top, bottom, ...)
+    file_path TEXT NOT NULL,                    -- 옷장 폴더의 아이템 이미지 경로 (WARDROBE_FOLDER)
+    thumbnail_path TEXT NOT NULL,               -- 목록용 썸네일 경로
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    original_filename VARCHAR(255),             -- 업로드한 파일 이름 (표시용)
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    last_used_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, item_digest)
+);
+
+CREATE INDEX IF NOT EXISTS idx_wardrobe_items_user_id ON wardrobe_items (user_id, id DESC);
+
+COMMENT ON TABLE wardrobe_items IS '사용자별 옷장 아이템 (다시 업로드/분류/전처리하지 않고 ID 로 합성)';
+
+
+-- Create the 'syntheses' table
+-- 합성 기록 (사용자에게 전달한 합성 1회 = 1행) - 갤러리/기록 조회용
+CREATE TABLE IF NOT EXISTS syntheses (
+    id BIGSERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    base_model_id INTEGER REFERENCES base_models(id) ON DELETE SET NULL, -- 합성에 사용한 베이스 모델
+    source VARCHAR(20) NOT NULL,                -- 요청 경로 ('web', 'job', 'fanout')
+    item_types TEXT[] NOT NULL,                 -- 아이템 종류 (합성 순서)
+    item_digests TEXT[] NOT NULL,               -- 아이템 이미지 내용 sha256 (합성 순서, 합성 캐시 키와 같음)
+    strategy VARCHAR(20),                       -- 합성 전략 (single, sequential, parallel)
+    model_name VARCHAR(255),                    -- 합성 모델
+    queue_ms INTEGER,                           -- 작업 큐 대기 시간 (동기 요청은 NULL)
+    synthesis_ms INTEGER,                       -- 합성(캐시 조회 + 모델 호출) 시간
+    total_ms INTEGER,                           -- 요청/작업 시작부터 결과 저장까지
+    output_bytes BIGINT,                        -- 결과 PNG 크기
+    output_digest CHAR(64),                     -- 결과 PNG 내용 sha256
+    output_filename VARCHAR(255) NOT NULL,      -- 결과 파일 이름 (outputs 폴더)
+    thumbnail_filename VARCHAR(255),            -- 갤러리용 썸네일 파일 이름 (outputs 폴더, WebP)
+    placeholder TEXT,                           -- 썸네일을 받기 전에 보여줄 저화질 이미지 (data URI, 수백 바이트)
+    watermarked BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 사용자별 최신순 키셋 페이지네이션 (WHERE user_id = ? AND id < ? ORDER BY id DESC LIMIT ?) - 행 수와 관계없이 페이지 크기만큼 읽음
+CREATE INDEX IF NOT EXISTS idx_syntheses_user_id ON syntheses (user_id, id DESC);
+
+ALTER TABLE syntheses ADD COLUMN IF NOT EXISTS placeholder TEXT; -- placeholder 열 추가 전에 만든 테이블용
+
+COMMENT ON TABLE syntheses IS '사용자별 합성 기록 (갤러리)';
+
+
 -- Function to automatically update 'updated_at' timestamp on users table
 -- (Optional but good practice)
 CREATE OR REPLACE FUNCTION trigger_set_timestamp()